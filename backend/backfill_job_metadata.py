@@ -0,0 +1,77 @@
+"""
+One-off backfill of the ingest-time job columns for the existing catalog.
+
+Scans the jobs table in id order, runs job_normalizer.normalize_job on every
+row and writes back only the derived columns in batches. Safe to re-run:
+rows that already have values are skipped unless --force is given.
+
+Usage:
+    python backfill_job_metadata.py [--batch-size 500] [--force] [--dry-run]
+"""
+import argparse
+import logging
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from supabase_service import SupabaseService
+from job_normalizer import normalize_job, CLASSIFIED_COLUMNS
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DERIVED_COLUMNS = CLASSIFIED_COLUMNS + ("salary_min_usd", "salary_max_usd")
+SOURCE_COLUMNS = "id, title, description, location, job_type, salary"
+
+
+def backfill(batch_size: int = 500, force: bool = False, dry_run: bool = False) -> dict:
+    stats = {"scanned": 0, "updated": 0, "skipped": 0, "batches": 0}
+    columns = ", ".join((SOURCE_COLUMNS,) + DERIVED_COLUMNS)
+    last_id = None
+    start = time.time()
+
+    while True:
+        rows = SupabaseService.get_jobs_batch(after_id=last_id, limit=batch_size, columns=columns)
+        if not rows:
+            break
+        last_id = rows[-1]["id"]
+        stats["batches"] += 1
+        stats["scanned"] += len(rows)
+
+        updates = []
+        for row in rows:
+            if not force and all(row.get(col) is not None for col in CLASSIFIED_COLUMNS):
+                stats["skipped"] += 1
+                continue
+            job = {k: v for k, v in row.items() if k not in DERIVED_COLUMNS}
+            normalize_job(job)
+            updates.append({"id": row["id"], **{col: job.get(col) for col in DERIVED_COLUMNS}})
+
+        if updates and not dry_run:
+            stats["updated"] += SupabaseService.update_jobs_columns(updates)
+        elif updates:
+            stats["updated"] += len(updates)
+
+        logger.info(
+            f"Batch {stats['batches']}: scanned {stats['scanned']}, "
+            f"updated {stats['updated']}, skipped {stats['skipped']}"
+        )
+
+    stats["elapsed_seconds"] = round(time.time() - start, 1)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill seniority/experience/remote/function/salary columns on jobs")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--force", action="store_true", help="Reclassify rows that already have values")
+    parser.add_argument("--dry-run", action="store_true", help="Classify without writing")
+    args = parser.parse_args()
+
+    result = backfill(batch_size=args.batch_size, force=args.force, dry_run=args.dry_run)
+    logger.info(f"Backfill complete: {result}")
@@ -0,0 +1,364 @@
+"""
+AI pipeline load test (offline, against llm_stub.py)
+
+Drives the real pipelines through llm_gateway against the local
+Groq/OpenAI-compatible stub, so prompts, parsing, the stage graph, key
+scheduling and the gateway's queueing all run as in production without
+spending quota. Scenarios:
+
+- analyze_resume: resume_analyzer.analyze_resume
+- expert_documents: document_generator.generate_expert_documents (facts ->
+  draft, cover letter alongside)
+- cover_letter_stream: the streamed cover letter (time to first token)
+- scrape_extract: scraper_service.scrape_job_description on a job page
+  served by the stub (fetch, page extraction, packing, AI extraction)
+- interview: InterviewOrchestrator sessions (first question, answers with
+  background evaluations, final report), plus a Whisper transcription per
+  answer when the groq SDK is installed
+
+Each scenario runs --requests requests, --concurrency at a time, and
+reports throughput, latency, failures, per call site queue wait / retries
+/ 429s (llm_telemetry), the stub's peak upstream in-flight against
+LLM_MAX_CONCURRENCY, and event-loop lag (how late a 10ms timer fires) while
+the scenario runs. Every request uses its own resume text, so stored resume
+facts never short-circuit extraction; the response cache is off unless
+--cache.
+
+Usage:
+    python bench_ai.py [--scenarios analyze_resume,expert_documents,...]
+                       [--requests 40] [--concurrency 8] [--keys 1]
+                       [--latency 800,2500] [--chunk-latency 15]
+                       [--rate-limit-p 0.05] [--rpm 30] [--tpm 60000]
+                       [--cache] [--json]
+
+--rpm / --tpm give each stub key a rate-limit window (the gateway should
+queue on the x-ratelimit headers instead of collecting 429s);
+--rate-limit-p answers that share of requests with a 429 regardless.
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+from typing import Dict, Any, List, Callable, Awaitable
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from llm_stub import LLMStub
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SCENARIOS = ["analyze_resume", "expert_documents", "cover_letter_stream", "scrape_extract", "interview"]
+PROBE_INTERVAL = 0.01
+INTERVIEW_QUESTIONS = 3
+
+RESUME = """ALEX RIVERA
+Austin, TX | alex@example.com | 555-0100 | linkedin.com/in/alex
+
+SUMMARY
+Backend engineer with 6 years of Python, building APIs and data pipelines.
+
+EXPERIENCE
+Acme Corp - Backend Engineer (2019 - Present)
+- Moved reporting to async workers, cutting p95 latency by 40%
+- Built the billing API serving 2M requests a day
+- Led the Postgres 11 to 15 upgrade with zero downtime
+
+Initech - Software Engineer (2017 - 2019)
+- Maintained the Postgres data layer
+- Added Redis caching to the search service
+
+SKILLS
+Python, FastAPI, PostgreSQL, Redis, AWS, Docker
+
+EDUCATION
+BS Computer Science, UT Austin, 2017
+"""
+
+JOB_DESCRIPTION = """Senior Backend Engineer - Example Labs (Remote, US)
+
+About the role
+We are looking for a Senior Backend Engineer to build and scale the APIs behind our hiring platform.
+
+Responsibilities
+- Design, build and operate Python services handling millions of requests a day
+- Move slow synchronous work to queues and async workers
+- Own observability: metrics, tracing and alerting
+
+Requirements
+- 5+ years of backend development in Python
+- Production experience with PostgreSQL and Redis
+- Kubernetes and Terraform on AWS
+"""
+
+
+def _resume(i: int) -> str:
+    # Unique per request: resume facts are stored by content
+    return f"{RESUME}\nReference #{i}"
+
+
+def _configure(base_url: str, keys: int, cache: bool):
+    """Point the app at the stub; must run before the pipeline modules are imported"""
+    os.environ["GROQ_BASE_URL"] = base_url
+    os.environ["OPENAI_BASE_URL"] = f"{base_url}/v1"
+    os.environ["GROQ_API_KEY"] = "bench-key-0"
+    for i in range(1, 11):
+        if i < keys:
+            os.environ[f"GROQ_API_KEY_{i}"] = f"bench-key-{i}"
+        else:
+            os.environ.pop(f"GROQ_API_KEY_{i}", None)
+    os.environ["OPENAI_API_KEY"] = "bench-openai-key"
+    if not cache:
+        os.environ["LLM_CACHE_ENABLED"] = "false"
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    return {
+        "p50": round(statistics.median(ordered), 1),
+        "p95": round(ordered[int(0.95 * (len(ordered) - 1))], 1),
+        "max": round(ordered[-1], 1),
+        "samples": len(ordered),
+    }
+
+
+async def probe(stop: asyncio.Event, lag_ms: List[float]):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lag_ms.append((time.perf_counter() - start - PROBE_INTERVAL) * 1000)
+
+
+def _scenario(name: str, base_url: str, ttft_ms: List[float]) -> Callable[[int], Awaitable[bool]]:
+    """One request of the scenario: index -> succeeded"""
+    if name == "analyze_resume":
+        from resume_analyzer import analyze_resume
+
+        async def run(i: int) -> bool:
+            result = await analyze_resume(_resume(i), JOB_DESCRIPTION)
+            return "hardSkills" in result and not result.get("error")
+
+    elif name == "expert_documents":
+        from document_generator import generate_expert_documents
+
+        async def run(i: int) -> bool:
+            result = await generate_expert_documents(
+                _resume(i), JOB_DESCRIPTION, job_title="Senior Backend Engineer", company="Example Labs"
+            )
+            # resume_json is empty when drafting failed and the rescue resume was used
+            return bool(result and result.get("resume_json") and result.get("cover_letter"))
+
+    elif name == "cover_letter_stream":
+        from document_generator import stream_cover_letter_content
+
+        async def run(i: int) -> bool:
+            start = time.perf_counter()
+            parts = []
+            async for delta in stream_cover_letter_content(_resume(i), JOB_DESCRIPTION, "Senior Backend Engineer", "Example Labs"):
+                if not parts:
+                    ttft_ms.append((time.perf_counter() - start) * 1000)
+                parts.append(delta)
+            return bool("".join(parts).strip())
+
+    elif name == "scrape_extract":
+        from scraper_service import scrape_job_description
+
+        async def run(i: int) -> bool:
+            result = await scrape_job_description(f"{base_url}/jobs/{i}")
+            return bool(result.get("success")) and not result.get("note")
+
+    elif name == "interview":
+        import interview_service
+        from interview_service import AIService, InterviewOrchestrator
+        from supabase_service import SupabaseService
+
+        async def run(i: int) -> bool:
+            resume = await asyncio.to_thread(SupabaseService.insert_interview_resume,
+                                             {"file_name": f"resume-{i}.pdf", "parsed_text": _resume(i)})
+            session = await asyncio.to_thread(SupabaseService.insert_interview_session, {
+                "resume_id": resume["id"],
+                "role_title": "Senior Backend Engineer",
+                "job_description": JOB_DESCRIPTION,
+                "status": "active",
+                "question_count": 0,
+                "target_questions": INTERVIEW_QUESTIONS,
+            })
+            orchestrator = InterviewOrchestrator(session["id"])
+            await orchestrator.generate_initial_question()
+            for turn in range(INTERVIEW_QUESTIONS):
+                answer = f"Answer {turn + 1}: I led the migration to async workers."
+                if interview_service.groq_client:
+                    answer = await AIService.transcribe_audio(("answer.webm", b"\x1aE\xdf\xa3" * 256, "audio/webm"))
+                await orchestrator.process_answer_and_get_next(answer)
+            report = await orchestrator.finalize_and_generate_report()
+            return bool(report)
+
+    else:
+        raise SystemExit(f"Unknown scenario: {name} (choose from {', '.join(SCENARIOS)})")
+    return run
+
+
+async def run_scenario(name: str, args, stub: LLMStub, base_url: str) -> Dict[str, Any]:
+    from llm_gateway import LLM_MAX_CONCURRENCY
+    from llm_telemetry import llm_telemetry
+
+    ttft_ms: List[float] = []
+    request = _scenario(name, base_url, ttft_ms)
+    llm_telemetry.reset()
+    stub.reset()
+
+    slots = asyncio.Semaphore(args.concurrency)
+    latency_s: List[float] = []
+    failures: List[str] = []
+
+    async def one(i: int):
+        async with slots:
+            start = time.perf_counter()
+            try:
+                if not await request(i):
+                    failures.append("degraded result")
+            except Exception as e:
+                failures.append(repr(e))
+            latency_s.append(time.perf_counter() - start)
+
+    stop = asyncio.Event()
+    lag_ms: List[float] = []
+    probe_task = asyncio.create_task(probe(stop, lag_ms))
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe_task
+
+    for failure in failures[:3]:
+        logger.warning(f"{name} request failed: {failure}")
+    telemetry = llm_telemetry.snapshot()
+    stub_stats = stub.stats()
+    call_sites = {}
+    for site in telemetry["call_sites"]:
+        call_sites[site["call_site"]] = {
+            "calls": site["calls"],
+            "errors": site["errors"],
+            "retries": site["retries"],
+            "rate_limited": site["rate_limited"],
+        }
+    for site in llm_telemetry.slowest_call_sites(n=len(call_sites)):
+        call_sites.setdefault(site["call_site"], {}).update({
+            "p95_ms": site["p95_ms"],
+            "queue_wait_p95_ms": site["queue_wait_p95_ms"],
+        })
+    return {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "failed": len(failures),
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_rps": round(args.requests / elapsed, 2) if elapsed else None,
+        "latency_seconds": _summary(latency_s),
+        "ttft_ms": _summary(ttft_ms),
+        "loop_lag_ms": _summary(lag_ms),
+        "call_sites": call_sites,
+        "limits": {
+            "llm_max_concurrency": LLM_MAX_CONCURRENCY,
+            "peak_upstream_in_flight": stub_stats["peak_in_flight"],
+            "gateway_saturated": stub_stats["peak_in_flight"] >= LLM_MAX_CONCURRENCY,
+            "upstream_429s": stub_stats["rate_limited"],
+        },
+        "stub": stub_stats,
+    }
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    random.seed(args.seed)
+    stub = LLMStub(latency=args.latency, chunk_latency=args.chunk_latency, rate_limit_p=args.rate_limit_p,
+                   rpm=args.rpm, tpm=args.tpm)
+    base_url = stub.start()
+    _configure(base_url, args.keys, args.cache)
+
+    from llm_gateway import llm_gateway as gateway
+    from interview_state import interview_states
+    from supabase_service import SupabaseService
+    from local_supabase import LocalSupabaseClient
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    report: Dict[str, Any] = {"config": {
+        "latency_ms": args.latency, "chunk_latency_ms": args.chunk_latency, "keys": args.keys,
+        "rate_limit_p": args.rate_limit_p, "rpm": args.rpm, "tpm": args.tpm, "cache": args.cache,
+    }, "scenarios": {}}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Resume facts and interview sessions go to a throwaway SQLite store, never Supabase
+        SupabaseService._instance = LocalSupabaseClient(os.path.join(workdir, "supabase.db"))
+
+        idle_lag: List[float] = []
+        stop = asyncio.Event()
+        idle = asyncio.create_task(probe(stop, idle_lag))
+        await asyncio.sleep(1)
+        stop.set()
+        await idle
+        report["idle_loop_lag_ms"] = _summary(idle_lag)
+
+        try:
+            for name in scenarios:
+                report["scenarios"][name] = await run_scenario(name, args, stub, base_url)
+            if "interview" in scenarios:
+                await interview_states.flush()
+        finally:
+            await gateway.close()
+            stub.stop()
+    return report
+
+
+def _print_report(report: Dict[str, Any]):
+    config = report["config"]
+    print(f"Stub latency {config['latency_ms']} ms, {config['keys']} key(s), 429 p={config['rate_limit_p']}, "
+          f"rpm={config['rpm'] or '-'}, tpm={config['tpm'] or '-'}, cache {'on' if config['cache'] else 'off'}")
+    print(f"Idle loop lag: {report['idle_loop_lag_ms']} ms")
+    for name, result in report["scenarios"].items():
+        limits = result["limits"]
+        print(f"\n{name}: {result['requests']} requests x{result['concurrency']} "
+              f"({result['failed']} failed) in {result['elapsed_seconds']}s = {result['throughput_rps']} req/s")
+        print(f"  Latency:      {result['latency_seconds']} s")
+        if result["ttft_ms"]:
+            print(f"  TTFT:         {result['ttft_ms']} ms")
+        print(f"  Loop lag:     {result['loop_lag_ms']} ms")
+        print(f"  Upstream:     peak {limits['peak_upstream_in_flight']} in flight / cap {limits['llm_max_concurrency']}"
+              f"{' (saturated)' if limits['gateway_saturated'] else ''}, {limits['upstream_429s']} x 429")
+        for site, stats in result["call_sites"].items():
+            print(f"  {site:<28}{stats.get('calls', 0):>5} calls  p95 {stats.get('p95_ms')} ms  "
+                  f"queue p95 {stats.get('queue_wait_p95_ms')} ms  retries {stats.get('retries', 0)}  "
+                  f"429s {stats.get('rate_limited', 0)}  errors {stats.get('errors', 0)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline AI pipeline load test against llm_stub.py")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated: {', '.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=40, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once")
+    parser.add_argument("--keys", type=int, default=1, help="Groq keys in the pool (1-11)")
+    parser.add_argument("--latency", default="800,2500", help='Stub completion latency in ms: "800", "800,2500" or "lognormal:900,0.6"')
+    parser.add_argument("--chunk-latency", default="15", help="Stub delay between streamed chunks in ms")
+    parser.add_argument("--rate-limit-p", type=float, default=0.0, help="Share of stub responses that are 429s")
+    parser.add_argument("--rpm", type=int, default=0, help="Stub requests per minute per key (0 = unlimited)")
+    parser.add_argument("--tpm", type=int, default=0, help="Stub tokens per minute per key (0 = unlimited)")
+    parser.add_argument("--cache", action="store_true", help="Keep the LLM response cache on")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
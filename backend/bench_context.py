@@ -0,0 +1,229 @@
+"""
+Context packing benchmark (context_packer.py)
+
+Token savings per call site on real job descriptions and resumes, and (with
+--live) what packing does to analyze_resume latency and output quality.
+
+    # 1. Snapshot real JDs and resumes from Supabase (PII: the fixture file is
+    #    gitignored and stays on the machine that recorded it)
+    python bench_context.py record [--jobs 100] [--resumes 30]
+
+    # 2. Offline: full vs packed tokens per call site, packer time
+    python bench_context.py run [--json]
+
+    # 3. Live: analyze_resume with full context (golden) vs packed context on
+    #    the first N resume/JD pairs; latency, prompt tokens, matchScore delta
+    #    and missing-skill overlap with the golden output
+    python bench_context.py run --live 10
+
+Packing is lossy by design; the live run is how a budget change in
+CONTEXT_BUDGETS is judged (score delta within a few points, missing skills
+mostly the same).
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+import argparse
+import statistics
+from typing import Dict, Any, List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import context_packer
+from context_packer import CONTEXT_BUDGETS, count_tokens, pack_for
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "context", "requests.jsonl")
+MIN_JD_CHARS = 1500
+MIN_RESUME_CHARS = 1500
+
+# Sample questions for the generate_answer call site
+QUESTIONS = [
+    "Describe a project where you improved performance or reliability.",
+    "Why are you interested in this role?",
+    "Tell us about your experience leading a team.",
+]
+
+
+def record(args):
+    from supabase_service import SupabaseService
+
+    client = SupabaseService.get_client()
+    if not client:
+        raise SystemExit("Supabase is not configured")
+    jobs = client.table("jobs").select("title, company, description") \
+        .order("created_at", desc=True).limit(args.jobs * 3).execute().data or []
+    resumes = client.table("profiles").select("resume_text").limit(args.resumes * 3).execute().data or []
+
+    rows = [{"kind": "jd", "title": j.get("title"), "company": j.get("company"), "text": j["description"]}
+            for j in jobs if len(j.get("description") or "") >= MIN_JD_CHARS][:args.jobs]
+    rows += [{"kind": "resume", "text": r["resume_text"]}
+             for r in resumes if len(r.get("resume_text") or "") >= MIN_RESUME_CHARS][:args.resumes]
+
+    os.makedirs(os.path.dirname(FIXTURES), exist_ok=True)
+    with open(FIXTURES, "w") as f:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+    print(f"Recorded {sum(r['kind'] == 'jd' for r in rows)} JDs and "
+          f"{sum(r['kind'] == 'resume' for r in rows)} resumes to {FIXTURES}")
+
+
+def _load() -> Dict[str, List[Dict[str, Any]]]:
+    if not os.path.exists(FIXTURES):
+        raise SystemExit(f"No fixtures at {FIXTURES}; run `python bench_context.py record` first")
+    fixtures: Dict[str, List[Dict[str, Any]]] = {"jd": [], "resume": []}
+    with open(FIXTURES) as f:
+        for line in f:
+            row = json.loads(line)
+            fixtures[row["kind"]].append(row)
+    return fixtures
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    return {
+        "p50": round(statistics.median(ordered), 1),
+        "p95": round(ordered[int(0.95 * (len(ordered) - 1))], 1),
+        "max": round(ordered[-1], 1),
+        "samples": len(ordered),
+    }
+
+
+def _cases(fixtures) -> List[tuple]:
+    """(call site, document, text, query, keep_head) for every fixture the call site would see"""
+    jds, resumes = fixtures["jd"], fixtures["resume"]
+    cases = []
+    for jd in jds:
+        for site in ("analyze_resume", "expert_draft", "cover_letter", "resume_tailor"):
+            cases.append((site, "jd", jd["text"], "", 0))
+        header = f"{jd.get('title') or ''}\n{jd.get('company') or ''}\n"
+        cases.append(("scrape_job_description", "page", header + jd["text"], "", 150))
+    for i, resume in enumerate(resumes):
+        jd = jds[i % len(jds)]["text"] if jds else ""
+        cases.append(("cover_letter", "resume", resume["text"], jd, 40))
+        cases.append(("generate_answer", "resume", resume["text"], QUESTIONS[i % len(QUESTIONS)], 60))
+    return cases
+
+
+def run_offline(fixtures) -> Dict[str, Any]:
+    sites: Dict[str, Dict[str, List[float]]] = {}
+    for site, document, text, query, keep_head in _cases(fixtures):
+        start = time.perf_counter()
+        packed = pack_for(site, document, text, query=query, keep_head=keep_head)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        full, kept = count_tokens(text), count_tokens(packed)
+        stats = sites.setdefault(f"{site}.{document}", {"full": [], "packed": [], "saved_pct": [], "pack_ms": []})
+        stats["full"].append(full)
+        stats["packed"].append(kept)
+        stats["saved_pct"].append(100 * (full - kept) / full if full else 0)
+        stats["pack_ms"].append(elapsed_ms)
+
+    report = {}
+    for name, stats in sorted(sites.items()):
+        site, document = name.split(".")
+        report[name] = {
+            "budget": CONTEXT_BUDGETS[site][document],
+            "total_full": sum(stats["full"]),
+            "total_packed": sum(stats["packed"]),
+            "full_tokens": _summary(stats["full"]),
+            "packed_tokens": _summary(stats["packed"]),
+            "saved_pct": _summary(stats["saved_pct"]),
+            "pack_ms": _summary(stats["pack_ms"]),
+        }
+    return report
+
+
+def _missing_skills(analysis: Dict[str, Any]) -> set:
+    missing = (analysis.get("hardSkills") or {}).get("missing") or []
+    return {str(m.get("skill") if isinstance(m, dict) else m).strip().lower() for m in missing}
+
+
+async def run_live(fixtures, pairs: int) -> Dict[str, Any]:
+    from resume_analyzer import analyze_resume
+
+    jds, resumes = fixtures["jd"], fixtures["resume"]
+    latency = {"full": [], "packed": []}
+    prompt_tokens = {"full": [], "packed": []}
+    score_delta: List[float] = []
+    jaccard: List[float] = []
+    failed = 0
+
+    for i in range(min(pairs, len(resumes))):
+        resume, jd = resumes[i]["text"], jds[i % len(jds)]["text"]
+        outputs = {}
+        # Sequential on purpose: the toggle is process-wide
+        for mode in ("full", "packed"):
+            context_packer.CONTEXT_PACKING_ENABLED = mode == "packed"
+            packed_jd = pack_for("analyze_resume", "jd", jd)
+            prompt_tokens[mode].append(count_tokens(resume) + count_tokens(packed_jd))
+            start = time.perf_counter()
+            outputs[mode] = await analyze_resume(resume, jd)
+            latency[mode].append(time.perf_counter() - start)
+
+        full, packed = outputs["full"], outputs["packed"]
+        if full.get("error") or packed.get("error"):
+            failed += 1
+            continue
+        score_delta.append(abs(float(full.get("matchScore") or 0) - float(packed.get("matchScore") or 0)))
+        golden, got = _missing_skills(full), _missing_skills(packed)
+        jaccard.append(len(golden & got) / len(golden | got) if golden | got else 1.0)
+    context_packer.CONTEXT_PACKING_ENABLED = True
+
+    return {
+        "pairs": len(score_delta),
+        "failed": failed,
+        "latency_seconds": {mode: _summary(values) for mode, values in latency.items()},
+        "prompt_tokens": {mode: _summary(values) for mode, values in prompt_tokens.items()},
+        "match_score_abs_delta": _summary(score_delta),
+        "missing_skill_jaccard": _summary(jaccard),
+    }
+
+
+def _print_report(report: Dict[str, Any]):
+    print(f"{'call site':<32}{'budget':>7}{'full p50':>10}{'packed p50':>12}{'saved':>8}{'pack ms p95':>13}")
+    for name, site in report["offline"].items():
+        saved = 100 * (site["total_full"] - site["total_packed"]) / (site["total_full"] or 1)
+        print(f"{name:<32}{site['budget']:>7}{site['full_tokens']['p50']:>10}{site['packed_tokens']['p50']:>12}"
+              f"{saved:>7.0f}%{site['pack_ms']['p95']:>13}")
+    live = report.get("live")
+    if live:
+        print(f"\nanalyze_resume, {live['pairs']} pairs ({live['failed']} failed)")
+        print(f"Latency:        {live['latency_seconds']} s")
+        print(f"Prompt tokens:  {live['prompt_tokens']}")
+        print(f"Score delta:    {live['match_score_abs_delta']}")
+        print(f"Missing skills: {live['missing_skill_jaccard']} (Jaccard vs full context)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Context packing benchmark")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="Snapshot JDs and resumes from Supabase")
+    rec.add_argument("--jobs", type=int, default=100)
+    rec.add_argument("--resumes", type=int, default=30)
+    run = sub.add_parser("run", help="Token savings per call site")
+    run.add_argument("--live", type=int, default=0, help="Also compare analyze_resume on N pairs (calls the LLM)")
+    run.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args)
+    else:
+        fixtures = _load()
+        report = {"offline": run_offline(fixtures)}
+        if args.live:
+            report["live"] = asyncio.run(run_live(fixtures, args.live))
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            _print_report(report)
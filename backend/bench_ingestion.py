@@ -0,0 +1,271 @@
+"""
+Ingestion throughput benchmark (offline, against recorded fixtures)
+
+Runs JobAggregator.aggregate_all_jobs end-to-end with HTTP served by
+ingest_replay and Supabase replaced by the local SQLite stand-in, then drains
+the write-behind spool. Reports jobs/sec, peak RSS and cumulative time per
+stage.
+
+Usage:
+    # 1. Capture a fixture corpus from the live sources (needs network + API keys)
+    python bench_ingestion.py record [--fixtures fixtures/ingest] [--seed 42]
+
+    # 2. Benchmark offline, optionally with latency and error injection
+    python bench_ingestion.py run [--latency 20,120] [--error-rate 0.05] [--seed 42] [--json]
+
+    # 3. Sharded crawl: every board, split into --shards shards over N processes
+    python bench_ingestion.py run --workers 4 [--shards 8] [--latency 20,120]
+
+Record captures every crawl unit (all boards), so both run modes replay from
+the same corpus. Single-process runs should use the record --seed: the
+aggregator shuffles its company lists with the global random module.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import resource
+import tempfile
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import job_fetcher
+import job_spool
+import detail_cache
+from supabase_service import SupabaseService
+from local_supabase import LocalSupabaseClient
+from ingest_replay import FixtureStore, FIXTURES_DIR, record, replay
+from job_apis.job_aggregator import JobAggregator
+from crawl_shards import crawl_units, crawl_shard
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+AGGREGATE_KWARGS = {"use_adzuna": False, "use_jsearch": True, "use_usajobs": True, "use_rss": True}
+
+
+class StageTimer:
+    """Accumulates wall time and call counts per stage by wrapping callables"""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    def _add(self, name: str, elapsed: float):
+        stage = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+        stage["seconds"] += elapsed
+        stage["calls"] += 1
+
+    def wrap(self, name: str, fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def timed_async(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    self._add(name, time.perf_counter() - start)
+            return timed_async
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._add(name, time.perf_counter() - start)
+        return timed
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {"seconds": round(s["seconds"], 3), "calls": int(s["calls"])}
+            for name, s in sorted(self.stages.items(), key=lambda item: -item[1]["seconds"])
+        }
+
+
+def _use_local_backends(workdir: str):
+    """Point Supabase, the spool and the detail cache at throwaway local SQLite files"""
+    SupabaseService._instance = LocalSupabaseClient(os.path.join(workdir, "supabase.db"))
+    job_spool._spool = job_spool.JobSpool(os.path.join(workdir, "spool.db"))
+    detail_cache._cache = detail_cache.DetailCache(os.path.join(workdir, "details.db"))
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss / (1024 * 1024) if sys.platform == "darwin" else peak_rss / 1024
+
+
+def _instrument(aggregator: JobAggregator, timer: StageTimer):
+    aggregator.adzuna.fetch_multiple_pages = timer.wrap("fetch.adzuna", aggregator.adzuna.fetch_multiple_pages)
+    aggregator.jsearch.fetch_multiple_queries = timer.wrap("fetch.jsearch", aggregator.jsearch.fetch_multiple_queries)
+    aggregator.usajobs.fetch_all_pages = timer.wrap("fetch.usajobs", aggregator.usajobs.fetch_all_pages)
+    aggregator.rss.fetch_popular_usa_jobs = timer.wrap("fetch.rss", aggregator.rss.fetch_popular_usa_jobs)
+    aggregator._deduplicate_jobs = timer.wrap("dedupe", aggregator._deduplicate_jobs)
+    aggregator._store_jobs = timer.wrap("spool.enqueue", aggregator._store_jobs)
+    # aggregate_all_jobs imports these from job_fetcher at call time
+    for name in ("fetch_greenhouse_jobs", "fetch_lever_jobs", "fetch_ashby_jobs"):
+        setattr(job_fetcher, name, timer.wrap(f"fetch.{name[6:-5]}", getattr(job_fetcher, name)))
+
+
+async def run_record(args) -> Dict[str, Any]:
+    store = FixtureStore(args.fixtures)
+    random.seed(args.seed)
+    with tempfile.TemporaryDirectory() as workdir:
+        _use_local_backends(workdir)
+        with record(store) as stats:
+            result = await JobAggregator().aggregate_units(crawl_units(**_unit_kwargs()))
+    count, size = store.size()
+    return {"recorded": stats["recorded"], "fixtures": count, "corpus_bytes": size, "fetched": result["total_fetched"]}
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    store = FixtureStore(args.fixtures)
+    low, high = (float(x) for x in args.latency.split(","))
+    random.seed(args.seed)
+    timer = StageTimer()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        _use_local_backends(workdir)
+        aggregator = JobAggregator()
+        _instrument(aggregator, timer)
+
+        start = time.perf_counter()
+        with replay(store, latency_ms=(low, high), error_rate=args.error_rate, seed=args.seed) as http:
+            result = await timer.wrap("aggregate_all_jobs", aggregator.aggregate_all_jobs)(**AGGREGATE_KWARGS)
+        flushed = timer.wrap("spool.flush", job_spool.get_job_spool().flush)()
+        elapsed = time.perf_counter() - start
+
+    peak_rss_mb = _peak_rss_mb()
+
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "jobs_fetched": result["total_fetched"],
+        "jobs_unique": result["total_unique"],
+        "jobs_flushed": flushed,
+        "jobs_per_second": round(flushed / elapsed, 1) if elapsed else 0.0,
+        "peak_rss_mb": round(peak_rss_mb, 1),
+        "http": http,
+        "stages": timer.report(),
+    }
+
+
+def _unit_kwargs() -> Dict[str, bool]:
+    return {k: AGGREGATE_KWARGS[k] for k in ("use_jsearch", "use_usajobs", "use_rss")}
+
+
+def _crawl_shard_process(fixtures: str, workdir: str, shard: int, shard_count: int,
+                         latency: tuple, error_rate: float, seed: int) -> Dict[str, Any]:
+    """One crawl worker: replay HTTP, crawl a shard, spool into the shared spool file"""
+    _use_local_backends(workdir)
+    start = time.perf_counter()
+    with replay(FixtureStore(fixtures), latency_ms=latency, error_rate=error_rate, seed=seed + shard) as http:
+        stats = asyncio.run(crawl_shard(shard, shard_count, crawl_units(**_unit_kwargs())))
+    return {
+        "shard": shard,
+        "pid": os.getpid(),
+        "units": stats["units"],
+        "fetched": stats["total_fetched"],
+        "seconds": round(time.perf_counter() - start, 3),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "http": http,
+    }
+
+
+def run_sharded_benchmark(args) -> Dict[str, Any]:
+    """
+    Crawl all shards with a pool of --workers processes. Idle processes take
+    the next unclaimed shard, as leased workers do; results merge in the
+    shared spool and are flushed once at the end.
+    """
+    latency = tuple(float(x) for x in args.latency.split(","))
+    timer = StageTimer()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        _use_local_backends(workdir)
+        start = time.perf_counter()
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=context) as pool:
+            shards = list(pool.map(
+                _crawl_shard_process,
+                *zip(*[(args.fixtures, workdir, shard, args.shards, latency, args.error_rate, args.seed)
+                       for shard in range(args.shards)])
+            ))
+        crawl_seconds = time.perf_counter() - start
+        flushed = timer.wrap("spool.flush", job_spool.get_job_spool().flush)()
+        elapsed = time.perf_counter() - start
+
+    return {
+        "workers": args.workers,
+        "shards": args.shards,
+        "elapsed_seconds": round(elapsed, 3),
+        "crawl_seconds": round(crawl_seconds, 3),
+        "jobs_fetched": sum(s["fetched"] for s in shards),
+        "jobs_flushed": flushed,
+        "jobs_per_second": round(flushed / elapsed, 1) if elapsed else 0.0,
+        "peak_rss_mb": max(s["peak_rss_mb"] for s in shards),
+        "per_shard": shards,
+        "stages": timer.report(),
+    }
+
+
+def _print_sharded_report(report: Dict[str, Any]):
+    print(f"Workers/shards: {report['workers']} / {report['shards']}")
+    print(f"Elapsed:        {report['elapsed_seconds']}s (crawl {report['crawl_seconds']}s)")
+    print(f"Jobs fetched:   {report['jobs_fetched']} ({report['jobs_flushed']} flushed after merge)")
+    print(f"Throughput:     {report['jobs_per_second']} jobs/sec")
+    print(f"Peak RSS:       {report['peak_rss_mb']} MB (largest worker)")
+    print("Shards (units / fetched / seconds / pid):")
+    for shard in report["per_shard"]:
+        print(f"  shard {shard['shard']:<3} {shard['units']:>5} {shard['fetched']:>8} {shard['seconds']:>9.3f}s  {shard['pid']}")
+
+
+def _print_report(report: Dict[str, Any]):
+    print(f"Elapsed:        {report['elapsed_seconds']}s")
+    print(f"Jobs fetched:   {report['jobs_fetched']} ({report['jobs_unique']} unique, {report['jobs_flushed']} flushed)")
+    print(f"Throughput:     {report['jobs_per_second']} jobs/sec")
+    print(f"Peak RSS:       {report['peak_rss_mb']} MB")
+    print(f"HTTP replay:    {report['http']}")
+    print("Stages (cumulative seconds / calls):")
+    for name, stage in report["stages"].items():
+        print(f"  {name:<22} {stage['seconds']:>9.3f}s  {stage['calls']:>5}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline ingestion benchmark")
+    parser.add_argument("mode", choices=["record", "run"])
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency", default="0,0", help="Replay latency range in ms, e.g. 20,120")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of replayed requests that fail")
+    parser.add_argument("--workers", type=int, default=0, help="Sharded crawl with N worker processes")
+    parser.add_argument("--shards", type=int, default=8, help="Shard count for --workers")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    if args.mode == "record":
+        print(json.dumps(asyncio.run(run_record(args)), indent=2))
+    elif args.workers:
+        report = run_sharded_benchmark(args)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            _print_sharded_report(report)
+    else:
+        report = asyncio.run(run_benchmark(args))
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            _print_report(report)
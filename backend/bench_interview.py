@@ -0,0 +1,232 @@
+"""
+Interview load test (offline, against the local LLM stub)
+
+Runs N mock interviews concurrently through InterviewOrchestrator (first
+question, every answer with its background evaluation, final report) while a probe measures what the rest of
+the app sees: event-loop lag (how late a 10ms timer fires) and the latency of a
+cheap "other endpoint" (a Supabase read). Each turn's time outside the LLM
+call (state lookup, Supabase writes) is reported too. Groq is llm_stub.py on
+its own thread with configurable completion latency; Supabase is the local
+SQLite stand-in. bench_ai.py covers the other AI pipelines the same way.
+
+Usage:
+    python bench_interview.py [--interviews 20] [--questions 5] [--latency 800,2500]
+                              [--think 2000,5000] [--json]
+
+    # Compare with the old synchronous client (blocking HTTP call on the loop)
+    python bench_interview.py --blocking
+
+Probe latencies should stay flat in the default mode however many interviews
+are in flight; with --blocking they grow with the completion latency.
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+import contextvars
+import urllib.request
+from typing import Dict, Any, List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import llm_gateway
+import interview_service
+from llm_gateway import llm_gateway as gateway
+from interview_service import AIService, InterviewOrchestrator
+from interview_state import interview_states
+from supabase_service import SupabaseService
+from local_supabase import LocalSupabaseClient
+from llm_stub import LLMStub
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+PROBE_INTERVAL = 0.01
+
+# Seconds the current interview task spent inside AIService.chat
+llm_seconds: contextvars.ContextVar = contextvars.ContextVar("llm_seconds")
+
+def _use_blocking_client(url: str):
+    """Old behaviour: a synchronous HTTP call straight from the coroutine"""
+
+    async def blocking_chat(prompt: str, json_mode: bool = True, max_tokens: int = 2048) -> str:
+        payload = {"model": interview_service.INTERVIEW_MODEL, "messages": [{"role": "user", "content": prompt}]}
+        request = urllib.request.Request(
+            url, data=json.dumps(payload).encode(), headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())["choices"][0]["message"]["content"]
+
+    AIService.chat = staticmethod(blocking_chat)
+
+
+def _time_llm_calls():
+    chat = AIService.chat
+
+    async def timed_chat(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await chat(*args, **kwargs)
+        finally:
+            llm_seconds.get()[0] += time.perf_counter() - start
+
+    AIService.chat = staticmethod(timed_chat)
+
+
+def _create_session(index: int, questions: int) -> str:
+    resume = SupabaseService.insert_interview_resume({"file_name": f"resume-{index}.pdf", "parsed_text": "Backend engineer, 6 years of Python."})
+    session = SupabaseService.insert_interview_session({
+        "resume_id": resume["id"],
+        "role_title": "Senior Backend Engineer",
+        "job_description": "Build and scale APIs.",
+        "status": "active",
+        "question_count": 0,
+        "target_questions": questions,
+    })
+    return session["id"]
+
+
+async def run_interview(session_id: str, questions: int, timings: List[float], overhead_ms: List[float],
+                        finalize_seconds: List[float], think_ms: List[int]):
+    orchestrator = InterviewOrchestrator(session_id)
+    spent = [0.0]
+    llm_seconds.set(spent)
+
+    async def timed(step):
+        start = time.perf_counter()
+        spent[0] = 0.0
+        await step
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+        overhead_ms.append((elapsed - spent[0]) * 1000)
+
+    await timed(orchestrator.generate_initial_question())
+    for turn in range(questions):
+        # The user reads the question and answers
+        await asyncio.sleep(random.uniform(*think_ms) / 1000)
+        await timed(orchestrator.process_answer_and_get_next(f"Answer {turn + 1}: I led the migration to async workers."))
+    start = time.perf_counter()
+    await orchestrator.finalize_and_generate_report()
+    finalize_seconds.append(time.perf_counter() - start)
+
+
+async def probe(stop: asyncio.Event, lag_ms: List[float], endpoint_ms: List[float], session_id: str):
+    """What every other request on this worker experiences while interviews run"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lag_ms.append((time.perf_counter() - start - PROBE_INTERVAL) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.to_thread(SupabaseService.get_interview_session, session_id)
+        endpoint_ms.append((time.perf_counter() - start) * 1000)
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    return {
+        "p50": round(statistics.median(ordered), 1),
+        "p95": round(ordered[int(0.95 * (len(ordered) - 1))], 1),
+        "max": round(ordered[-1], 1),
+        "samples": len(ordered),
+    }
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    random.seed(args.seed)
+    url = f"{LLMStub(latency=args.latency).start()}/openai/v1/chat/completions"
+    llm_gateway.PROVIDERS["groq"]["url"] = url
+    os.environ["GROQ_API_KEY"] = os.environ.get("GROQ_API_KEY") or "bench-key"
+    gateway.reload_keys()
+    if args.blocking:
+        _use_blocking_client(url)
+    _time_llm_calls()
+    think_ms = [int(v) for v in args.think.split(",")]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        SupabaseService._instance = LocalSupabaseClient(os.path.join(workdir, "supabase.db"))
+        session_ids = [_create_session(i, args.questions) for i in range(args.interviews)]
+
+        # Baseline: probe with nothing else running
+        stop = asyncio.Event()
+        idle_lag: List[float] = []
+        idle_endpoint: List[float] = []
+        idle = asyncio.create_task(probe(stop, idle_lag, idle_endpoint, session_ids[0]))
+        await asyncio.sleep(1)
+        stop.set()
+        await idle
+
+        stop = asyncio.Event()
+        lag_ms: List[float] = []
+        endpoint_ms: List[float] = []
+        turn_seconds: List[float] = []
+        overhead_ms: List[float] = []
+        finalize_seconds: List[float] = []
+        probe_task = asyncio.create_task(probe(stop, lag_ms, endpoint_ms, session_ids[0]))
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(run_interview(sid, args.questions, turn_seconds, overhead_ms, finalize_seconds, think_ms) for sid in session_ids), return_exceptions=True
+        )
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await probe_task
+        await interview_states.flush()
+        await gateway.close()
+
+    failures = [r for r in results if isinstance(r, Exception)]
+    for failure in failures[:3]:
+        logger.warning(f"Interview failed: {failure!r}")
+    return {
+        "mode": "blocking" if args.blocking else "async",
+        "interviews": args.interviews,
+        "failed": len(failures),
+        "elapsed_seconds": round(elapsed, 2),
+        "turn_seconds": _summary(turn_seconds),
+        "turn_overhead_ms": _summary(overhead_ms),
+        "finalize_seconds": _summary(finalize_seconds),
+        "state_cache": interview_states.stats(),
+        "idle": {"loop_lag_ms": _summary(idle_lag), "endpoint_ms": _summary(idle_endpoint)},
+        "loaded": {"loop_lag_ms": _summary(lag_ms), "endpoint_ms": _summary(endpoint_ms)},
+    }
+
+
+def _print_report(report: Dict[str, Any]):
+    print(f"Mode:           {report['mode']}")
+    print(f"Interviews:     {report['interviews']} ({report['failed']} failed) in {report['elapsed_seconds']}s")
+    print(f"Turn latency:   {report['turn_seconds']} s")
+    print(f"Outside LLM:    {report['turn_overhead_ms']} ms")
+    print(f"Finalize:       {report['finalize_seconds']} s")
+    print(f"State cache:    {report['state_cache']}")
+    for phase in ("idle", "loaded"):
+        print(f"{phase.capitalize():<8}loop lag  {report[phase]['loop_lag_ms']} ms")
+        print(f"{'':<8}endpoint  {report[phase]['endpoint_ms']} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline interview load test")
+    parser.add_argument("--interviews", type=int, default=20)
+    parser.add_argument("--questions", type=int, default=5)
+    parser.add_argument("--latency", default="800,2500", help="Stub completion latency in ms (llm_stub.Latency formats)")
+    parser.add_argument("--think", default="2000,5000", help="User think time between answers in ms")
+    parser.add_argument("--blocking", action="store_true", help="Use a synchronous client (old behaviour)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
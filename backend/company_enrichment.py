@@ -280,6 +280,15 @@ def enrich_job_metadata(job: dict) -> dict:
     title = job.get("title", "")
     desc = job.get("description", "") or job.get("fullDescription", "")
     location = job.get("location", "")
+
+    # Prefer the columns classified once at ingest (job_normalizer) over re-inferring
+    from job_normalizer import SENIORITY_LABELS, REMOTE_TYPE_LABELS
+    if job.get("seniority") in SENIORITY_LABELS:
+        job["seniority"] = SENIORITY_LABELS[job["seniority"]]
+    if not job.get("remoteType") and job.get("remote_type") in REMOTE_TYPE_LABELS:
+        job["remoteType"] = REMOTE_TYPE_LABELS[job["remote_type"]]
+    if not job.get("experienceLevel") and job.get("experience_years") is not None:
+        job["experienceLevel"] = f"{job['experience_years']}+ years exp"
     
     job["seniority"] = job.get("seniority") or infer_seniority(title)
     job["experienceLevel"] = job.get("experienceLevel") or infer_experience_years(title, desc)
@@ -0,0 +1,271 @@
+"""
+Context Packer - Fit resumes, JDs and scraped pages into a token budget
+
+Prompts used to carry the full resume and JD (or a blind text[:N] cut, which
+drops whatever comes last, usually the requirements). pack() keeps what
+matters instead, deterministically and without a model call:
+
+1. Split the text into lines grouped under their section headings; a section
+   kind (requirements, benefits, EEO boilerplate, experience, ...) is derived
+   from the heading, or from the line itself for headless boilerplate
+2. Score every line: BM25 against the query (e.g. the application question,
+   or the JD when packing a resume for it) plus term density for queryless
+   packing, weighted by the section kind and a small bonus for position
+3. Greedily take the best lines that fit the budget, each with its section
+   heading and the role line it belongs to (a bullet without its company is
+   useless), and emit them in the original order
+
+Text that already fits is returned unchanged, so short documents are never
+altered. When no line fits whole (one huge unsplittable line), the best one
+is cut to the budget, so non-empty text never packs to nothing. Tokens are
+a local estimate (count_tokens), close to the Llama/GPT BPE counts for
+English prose; budgets are per call site (CONTEXT_BUDGETS).
+CONTEXT_PACKING=false turns packing off (full text, as before) for
+comparisons.
+"""
+
+import os
+import re
+import math
+import logging
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_PACKING_ENABLED = os.getenv("CONTEXT_PACKING", "true").lower() != "false"
+
+# call site -> {document: token budget}
+CONTEXT_BUDGETS = {
+    "analyze_resume": {"jd": 1200},
+    "expert_draft": {"jd": 1200},
+    "cover_letter": {"resume": 700, "jd": 500},
+    "resume_tailor": {"jd": 1200, "reference": 800},
+    "generate_answer": {"resume": 2500},
+    "scrape_job_description": {"page": 1000},
+}
+
+_TOKEN = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+_TERM = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+_BULLET = re.compile(r"^\s*(?:[-*•◦▪●·–]|\d{1,2}[.)])\s+")
+_SENTENCE_END = re.compile(r"(?<=[.!?;])\s+(?=[A-Z(\"'])")
+# Longer lines (one-paragraph JDs, flattened pages) are packed sentence by sentence
+MAX_LINE_TOKENS = 80
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have in is it its of on or our that the their this to was we
+were will with you your they them he she i my me us not can all any if so do does into over about who
+what which when where how than then also may more most other such these those through while within
+""".split())
+
+# Heading keyword -> section kind
+SECTION_KINDS: List[Tuple[str, Tuple[str, ...]]] = [
+    ("boilerplate", ("equal opportunity", "eeo", "accommodation", "privacy", "disclaimer", "e-verify",
+                     "pay transparency", "benefit", "perks", "why join", "why work", "life at",
+                     "about us", "about the company", "who we are", "our mission", "our values",
+                     "our culture", "cookie", "similar jobs", "share this")),
+    ("requirements", ("requirement", "qualification", "what you bring", "what you'll bring", "must have",
+                      "nice to have", "preferred", "who you are", "you have", "skills", "tech stack",
+                      "experience with", "minimum", "basic")),
+    ("role", ("responsibilit", "what you'll do", "what you will do", "the role", "about the role",
+              "the job", "your impact", "day to day", "in this role", "overview", "description")),
+    ("experience", ("experience", "employment", "work history", "professional history")),
+    ("projects", ("project",)),
+    ("summary", ("summary", "profile", "objective", "about me")),
+    ("education", ("education", "certification", "degree", "award", "publication")),
+    ("compensation", ("compensation", "salary", "pay range", "location")),
+]
+
+# Lines that are boilerplate wherever they appear
+BOILERPLATE_LINE = re.compile(
+    r"equal opportunity|without regard to|reasonable accommodation|e-verify|privacy (?:policy|notice)|"
+    r"cookies?\b|sign in|log in|apply now|share (?:this|on)|all rights reserved|recaptcha|"
+    r"protected veteran|gender identity|national origin",
+    re.IGNORECASE
+)
+
+# Multiplier per section kind and document kind
+KIND_WEIGHTS: Dict[str, Dict[str, float]] = {
+    "jd": {"requirements": 1.6, "role": 1.4, "compensation": 0.8, "boilerplate": 0.1},
+    "page": {"requirements": 1.6, "role": 1.4, "compensation": 1.2, "boilerplate": 0.1},
+    "resume": {"experience": 1.2, "projects": 1.1, "summary": 1.1, "education": 0.9},
+    "reference": {"experience": 1.2, "projects": 1.1},
+}
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """Local BPE-ish token estimate: words ~5 chars/token, numbers 3 digits/token, punctuation 1"""
+    if not text:
+        return 0
+    tokens = 0
+    for match in _TOKEN.finditer(text):
+        piece = match.group(0)
+        tokens += max(1, (len(piece) + 2) // 5) if piece[0].isalpha() else 1
+    return tokens
+
+
+def truncate_tokens(text: str, budget: int) -> str:
+    """The head of `text` that fits in `budget` tokens (count_tokens estimate)"""
+    used = 0
+    for match in _TOKEN.finditer(text):
+        piece = match.group(0)
+        tokens = max(1, (len(piece) + 2) // 5) if piece[0].isalpha() else 1
+        if used + tokens > budget:
+            # A word longer than what's left (e.g. a run-on URL) is cut mid-word
+            partial = piece[:(budget - used) * 5] if piece[0].isalpha() else ""
+            return (text[:match.start()] + partial).rstrip()
+        used += tokens
+    return text
+
+
+def terms(text: str) -> List[str]:
+    return [t for t in _TERM.findall(text.lower()) if t not in STOPWORDS]
+
+
+def _section_kind(heading: str) -> str:
+    lowered = heading.lower()
+    for kind, keys in SECTION_KINDS:
+        if any(key in lowered for key in keys):
+            return kind
+    return "other"
+
+
+def _is_heading(line: str) -> bool:
+    stripped = line.strip().strip("#*_ ").strip()
+    if not stripped or len(stripped) > 60 or _BULLET.match(line) or stripped.endswith((".", ",", ";")):
+        return False
+    words = stripped.rstrip(":").split()
+    if len(words) > 7:
+        return False
+    return (stripped.endswith(":") or stripped.isupper()
+            or (len(words) <= 4 and _section_kind(stripped) != "other" and stripped[0].isupper()))
+
+
+class _Line:
+    __slots__ = ("index", "text", "tokens", "kind", "heading", "anchor", "terms", "score")
+
+    def __init__(self, index: int, text: str):
+        self.index = index
+        self.text = text
+        self.tokens = count_tokens(text)
+        self.kind = "other"
+        self.heading: Optional[int] = None
+        self.anchor: Optional[int] = None
+        self.terms = terms(text)
+        self.score = 0.0
+
+
+def _pieces(text: str):
+    for raw in text.splitlines():
+        if not raw.strip():
+            continue
+        if count_tokens(raw) <= MAX_LINE_TOKENS:
+            yield raw
+        else:
+            yield from (sentence for sentence in _SENTENCE_END.split(raw) if sentence.strip())
+
+
+def _split(text: str) -> List[_Line]:
+    lines = []
+    heading = None
+    kind = "other"
+    anchor = None
+    for raw in _pieces(text):
+        line = _Line(len(lines), raw.rstrip())
+        if _is_heading(raw):
+            heading, anchor = line.index, None
+            kind = _section_kind(raw)
+            line.kind = kind
+        else:
+            line.heading = heading
+            line.kind = "boilerplate" if BOILERPLATE_LINE.search(raw) else kind
+            if _BULLET.match(raw):
+                line.anchor = anchor
+            elif line.tokens <= 40:
+                # Short non-bullet line (role / company / date): bullets below belong to it
+                anchor = line.index
+        lines.append(line)
+    return lines
+
+
+def _score(lines: List[_Line], query: str, doc_kind: str):
+    n = len(lines)
+    df: Counter = Counter()
+    for line in lines:
+        df.update(set(line.terms))
+    idf = {t: math.log(1 + (n - c + 0.5) / (c + 0.5)) for t, c in df.items()}
+    avg_len = sum(len(line.terms) for line in lines) / n or 1.0
+    query_terms = set(terms(query or ""))
+    weights = KIND_WEIGHTS.get(doc_kind, {})
+    k1, b = 1.2, 0.75
+
+    for line in lines:
+        counts = Counter(line.terms)
+        length_norm = k1 * (1 - b + b * len(line.terms) / avg_len)
+        bm25 = sum(
+            idf.get(t, 0.0) * counts[t] * (k1 + 1) / (counts[t] + length_norm)
+            for t in query_terms if t in counts
+        )
+        # Distinct informative terms, so requirement lines full of skills beat filler
+        density = sum(idf[t] for t in counts) / math.sqrt(len(line.terms) + 1)
+        position = 0.2 * (1 - line.index / n)
+        line.score = weights.get(line.kind, 1.0) * (bm25 + 0.3 * density + position)
+
+
+def pack(text: Optional[str], budget: int, query: str = "", kind: str = "jd", keep_head: int = 0) -> str:
+    """
+    The most relevant lines of `text` that fit in `budget` tokens, in original order.
+
+    Args:
+        query: what the text is needed for (question, JD...); empty ranks by section and density
+        kind: "jd", "page", "resume" or "reference" (section weights)
+        keep_head: tokens at the top that are always kept (name/contact, page title)
+    """
+    if not text or not CONTEXT_PACKING_ENABLED or count_tokens(text) <= budget:
+        return text or ""
+    lines = _split(text)
+    if not lines:
+        return ""
+    _score(lines, query, kind)
+
+    chosen = set()
+    used = 0
+
+    def cost(line: _Line) -> Tuple[int, List[int]]:
+        needed = [i for i in (line.heading, line.anchor, line.index) if i is not None and i not in chosen]
+        return sum(lines[i].tokens for i in needed), needed
+
+    head = 0
+    for line in lines:
+        if head + line.tokens > keep_head:
+            break
+        head += line.tokens
+        chosen.add(line.index)
+    used = head
+    kept_head = len(chosen)
+
+    ranked = sorted(lines, key=lambda l: (-l.score, l.index))
+    for line in ranked:
+        if line.index in chosen or line.kind == "boilerplate" and line.score < 0.5:
+            continue
+        extra, needed = cost(line)
+        if used + extra <= budget:
+            chosen.update(needed)
+            used += extra
+
+    texts = {i: lines[i].text for i in chosen}
+    if len(chosen) == kept_head:
+        # Nothing fit whole (e.g. one huge unsplittable line): cut the best line to what's left
+        best = next((line for line in ranked if line.index not in chosen), None)
+        if best is not None and budget > used:
+            texts[best.index] = truncate_tokens(best.text, budget - used)
+    return "\n".join(texts[i] for i in sorted(texts) if texts[i])
+
+
+def pack_for(call_site: str, document: str, text: Optional[str], query: str = "", keep_head: int = 0) -> str:
+    """pack() with the call site's budget for this document (CONTEXT_BUDGETS)"""
+    kind = {"resume": "resume", "reference": "reference", "page": "page"}.get(document, "jd")
+    packed = pack(text, CONTEXT_BUDGETS[call_site][document], query=query, kind=kind, keep_head=keep_head)
+    if text and packed != text:
+        logger.debug(f"Packed {call_site}.{document}: {count_tokens(text)} -> {count_tokens(packed)} tokens")
+    return packed
@@ -0,0 +1,150 @@
+"""
+Crawl Shards - Partition the crawl across worker processes / nodes
+
+The crawl is broken into units, one per (provider, board): each Greenhouse,
+Lever and Ashby board, each RSS feed, each JSearch query and the USAJobs
+feed. Units are placed on a consistent-hash ring of CRAWL_SHARDS shards, so
+adding or removing a board (or changing the shard count) only moves the
+units next to it on the ring.
+
+A cycle (one CRAWL_SHARD_INTERVAL_SECONDS period) does not crawl every unit:
+like the unsharded crawl it caps JSearch queries (API quota) and ATS boards
+per cycle, but instead of sampling at random it rotates through the lists by
+cycle number, so every query and board is visited every few cycles. Every
+shard derives the same plan from the clock, and each crawls the part of the
+cycle's selection that hashes to it.
+
+Each shard is a job on the LeasedScheduler (crawl_shard_0 .. crawl_shard_N-1).
+Workers claim shards through the same leases as every other job, which gives
+the rebalancing for free:
+
+- A new worker claims shards as soon as they are due and unclaimed
+- A worker that dies stops renewing; its shards are claimable again after
+  CRAWL_SHARD_LEASE_SECONDS
+- WORKER_CONCURRENCY bounds how many shards one worker crawls at once
+
+Every shard run ends in JobAggregator's shared filter / dedupe / store stage
+and spools jobs keyed by the content-hash job_id, so overlapping results
+from different shards merge in the spool before reaching Supabase.
+
+Sharding is enabled by setting CRAWL_SHARDS > 0 for the worker; the
+scheduled_job_fetch job then fans out to all shards instead of crawling.
+"""
+
+import os
+import time
+import bisect
+import hashlib
+import logging
+from typing import Dict, Any, List, Tuple, Optional
+
+from job_apis.job_aggregator import (
+    JobAggregator, GREENHOUSE_BOARDS, LEVER_BOARDS, ASHBY_BOARDS, JSEARCH_QUERIES
+)
+from job_apis.rss_service import RSSJobService
+
+logger = logging.getLogger(__name__)
+
+CRAWL_SHARDS = int(os.getenv("CRAWL_SHARDS", "0"))
+CRAWL_SHARD_INTERVAL_SECONDS = int(os.getenv("CRAWL_SHARD_INTERVAL_SECONDS", str(60 * 60)))
+CRAWL_SHARD_LEASE_SECONDS = int(os.getenv("CRAWL_SHARD_LEASE_SECONDS", "300"))
+RING_REPLICAS = 64
+# Per-cycle caps (same as the unsharded scheduled crawl); 0 = everything every cycle
+CRAWL_JSEARCH_QUERIES_PER_CYCLE = int(os.getenv("CRAWL_JSEARCH_QUERIES_PER_CYCLE", "5"))
+CRAWL_GREENHOUSE_BOARDS_PER_CYCLE = int(os.getenv("CRAWL_GREENHOUSE_BOARDS_PER_CYCLE", "25"))
+CRAWL_LEVER_BOARDS_PER_CYCLE = int(os.getenv("CRAWL_LEVER_BOARDS_PER_CYCLE", "15"))
+CRAWL_ASHBY_BOARDS_PER_CYCLE = int(os.getenv("CRAWL_ASHBY_BOARDS_PER_CYCLE", "15"))
+
+CrawlUnit = Tuple[str, str]
+
+
+def _hash(key: str) -> int:
+    return int(hashlib.md5(key.encode()).hexdigest()[:16], 16)
+
+
+class HashRing:
+    """Consistent-hash ring with virtual nodes"""
+
+    def __init__(self, nodes: List[str], replicas: int = RING_REPLICAS):
+        self.ring: List[Tuple[int, str]] = sorted(
+            (_hash(f"{node}#{i}"), node) for node in nodes for i in range(replicas)
+        )
+        self.points = [point for point, _ in self.ring]
+
+    def node_for(self, key: str) -> str:
+        index = bisect.bisect(self.points, _hash(key)) % len(self.ring)
+        return self.ring[index][1]
+
+
+def current_cycle(interval_seconds: int = CRAWL_SHARD_INTERVAL_SECONDS) -> int:
+    return int(time.time() // interval_seconds)
+
+
+def rotate(items: List[str], per_cycle: int, cycle: Optional[int]) -> List[str]:
+    """The cycle's window of `per_cycle` items, wrapping around the list"""
+    items = list(dict.fromkeys(items))
+    if cycle is None or per_cycle <= 0 or per_cycle >= len(items):
+        return items
+    start = cycle * per_cycle % len(items)
+    return (items + items)[start:start + per_cycle]
+
+
+def crawl_units(use_jsearch: bool = True, use_usajobs: bool = True, use_rss: bool = True,
+                cycle: Optional[int] = None) -> List[CrawlUnit]:
+    """The (provider, board) units crawled in `cycle` (every unit if cycle is None)"""
+    units: List[CrawlUnit] = []
+    units += [("greenhouse", board) for board in rotate(GREENHOUSE_BOARDS, CRAWL_GREENHOUSE_BOARDS_PER_CYCLE, cycle)]
+    units += [("lever", board) for board in rotate(LEVER_BOARDS, CRAWL_LEVER_BOARDS_PER_CYCLE, cycle)]
+    units += [("ashby", board) for board in rotate(ASHBY_BOARDS, CRAWL_ASHBY_BOARDS_PER_CYCLE, cycle)]
+    if use_rss:
+        units += [("rss", name) for name in RSSJobService().feeds]
+    if use_jsearch:
+        units += [("jsearch", query) for query in rotate(JSEARCH_QUERIES, CRAWL_JSEARCH_QUERIES_PER_CYCLE, cycle)]
+    if use_usajobs:
+        units.append(("usajobs", "all"))
+    return units
+
+
+def shard_name(shard: int) -> str:
+    return f"crawl_shard_{shard}"
+
+
+def assign_shards(units: List[CrawlUnit], shard_count: int) -> Dict[int, List[CrawlUnit]]:
+    """Map each unit to a shard via the consistent-hash ring"""
+    ring = HashRing([str(shard) for shard in range(shard_count)])
+    shards: Dict[int, List[CrawlUnit]] = {shard: [] for shard in range(shard_count)}
+    for provider, board in units:
+        shards[int(ring.node_for(f"{provider}:{board}"))].append((provider, board))
+    return shards
+
+
+async def crawl_shard(shard: int, shard_count: int, units: Optional[List[CrawlUnit]] = None) -> Dict[str, Any]:
+    """Crawl this cycle's units that hash to `shard` and spool the results"""
+    if units is None:
+        units = crawl_units(cycle=current_cycle())
+    mine = assign_shards(units, shard_count)[shard]
+    logger.info(f"🧩 Crawling {shard_name(shard)}/{shard_count}: {len(mine)} units")
+    stats = await JobAggregator().aggregate_units(mine)
+    logger.info(
+        f"✅ {shard_name(shard)} fetched {stats['total_fetched']}, "
+        f"stored {stats['total_stored']} ({len(stats['errors'])} errors)"
+    )
+    return stats
+
+
+def register_crawl_shards(scheduler, shard_count: int = CRAWL_SHARDS,
+                          interval_seconds: int = CRAWL_SHARD_INTERVAL_SECONDS) -> List[str]:
+    """Add one leased job per shard; returns the job names"""
+    names = []
+    for shard in range(shard_count):
+        async def run(shard=shard):
+            return await crawl_shard(shard, shard_count)
+
+        # Stagger first runs so a fresh fleet doesn't crawl every shard at once
+        delay = 30 + shard * interval_seconds // max(shard_count, 1)
+        scheduler.add_job(
+            shard_name(shard), run, interval_seconds=interval_seconds,
+            initial_delay_seconds=delay, lease_seconds=CRAWL_SHARD_LEASE_SECONDS
+        )
+        names.append(shard_name(shard))
+    return names
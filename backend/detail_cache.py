@@ -0,0 +1,115 @@
+"""
+Detail Cache - Local cache of per-posting detail payloads
+
+Some boards only list postings in bulk and need one request per posting for
+the description (Ashby: the GraphQL board query has no description, it lives
+in each posting page's window.__appData). Re-downloading every posting page
+on every crawl is what made Ashby the slowest source.
+
+The cache stores the extracted raw description per (provider, board,
+posting_id) together with a signature of the listing fields. A posting is
+re-fetched only when it is new or its signature changed; postings that drop
+off a board are evicted on the next crawl of that board. The raw (unparsed)
+description is cached, so parser fixes still apply to cached postings.
+
+SQLite in WAL mode, like the job spool; each worker process keeps its own
+file, so a cold worker simply fetches what it hasn't seen.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Iterable
+
+logger = logging.getLogger(__name__)
+
+DETAIL_CACHE_PATH = os.getenv(
+    "DETAIL_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "detail_cache.db")
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posting_details (
+    provider    TEXT NOT NULL,
+    board       TEXT NOT NULL,
+    posting_id  TEXT NOT NULL,
+    signature   TEXT NOT NULL,
+    description TEXT NOT NULL,
+    fetched_at  REAL NOT NULL,
+    PRIMARY KEY (provider, board, posting_id)
+);
+"""
+
+
+def listing_signature(*values: Any) -> str:
+    """Stable hash of the listing fields that indicate a posting changed"""
+    return hashlib.md5("\x1f".join("" if v is None else str(v) for v in values).encode()).hexdigest()
+
+
+class DetailCache:
+    def __init__(self, path: str = DETAIL_CACHE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.counters = {"hits": 0, "misses": 0, "evicted": 0}
+
+    def lookup(self, provider: str, board: str, signatures: Dict[str, str]) -> Dict[str, str]:
+        """posting_id -> cached description, for postings whose signature still matches"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT posting_id, signature, description FROM posting_details WHERE provider = ? AND board = ?",
+                (provider, board)
+            ).fetchall()
+        found = {pid: desc for pid, sig, desc in rows if signatures.get(pid) == sig}
+        self.counters["hits"] += len(found)
+        self.counters["misses"] += len(signatures) - len(found)
+        return found
+
+    def store(self, provider: str, board: str, details: List[Dict[str, str]]):
+        """Save fetched details: [{"posting_id", "signature", "description"}]"""
+        if not details:
+            return
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO posting_details "
+                "(provider, board, posting_id, signature, description, fetched_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(provider, board, d["posting_id"], d["signature"], d["description"], now) for d in details]
+            )
+
+    def retain(self, provider: str, board: str, posting_ids: Iterable[str]) -> int:
+        """Evict postings of a board that are no longer listed"""
+        keep = set(posting_ids)
+        with self.lock:
+            cached = [row[0] for row in self.conn.execute(
+                "SELECT posting_id FROM posting_details WHERE provider = ? AND board = ?", (provider, board)
+            )]
+            gone = [(provider, board, pid) for pid in cached if pid not in keep]
+            if gone:
+                self.conn.executemany(
+                    "DELETE FROM posting_details WHERE provider = ? AND board = ? AND posting_id = ?", gone
+                )
+        self.counters["evicted"] += len(gone)
+        return len(gone)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            size = self.conn.execute("SELECT COUNT(*) FROM posting_details").fetchone()[0]
+        return {**self.counters, "entries": size, "path": self.path}
+
+
+_cache: Optional[DetailCache] = None
+
+
+def get_detail_cache() -> DetailCache:
+    """Process-wide cache, opened on first use"""
+    global _cache
+    if _cache is None:
+        _cache = DetailCache()
+    return _cache
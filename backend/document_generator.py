@@ -17,7 +17,10 @@ import asyncio
 import json
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any, Union
-from resume_analyzer import call_groq_api, unified_api_call, clean_json_response
+from resume_analyzer import call_groq_api, unified_api_call, stream_groq_api, clean_json_response
+from stage_graph import Stage, run_stages
+from resume_facts import resume_facts
+from context_packer import pack_for
 
 logger = logging.getLogger(__name__)
 
@@ -288,7 +291,9 @@ Now generate the resume from RAW_INPUT:
 """
     try:
         logger.info(f"Running user-requested 'Expert' prompt tailoring for {company}")
-        response = await unified_api_call(prompt, max_tokens=6000, model="llama-3.3-70b-versatile")
+        response = await unified_api_call(
+            prompt, max_tokens=6000, model="llama-3.3-70b-versatile", call_site="simple_tailored_resume"
+        )
         
         if response and len(response.strip()) > 500:
             # Flatten to remove ALL excessive newlines
@@ -405,7 +410,9 @@ GENERATE THE {target_score}% OPTIMIZED RESUME JSON NOW:
 
     try:
         # Use unified call
-        response = await unified_api_call(prompt, max_tokens=8000, model="llama-3.1-8b-instant")
+        response = await unified_api_call(
+            prompt, max_tokens=8000, model="llama-3.1-8b-instant", call_site="optimized_resume"
+        )
         if not response:
             return None
         
@@ -418,20 +425,18 @@ GENERATE THE {target_score}% OPTIMIZED RESUME JSON NOW:
         return None
 
 
-async def generate_cover_letter_content(resume_text: str, job_description: str, job_title: str, company: str) -> Optional[str]:
-    """Generate a cover letter using AI"""
-    
-    prompt = f"""
+def build_cover_letter_prompt(resume_text: str, job_description: str, job_title: str, company: str) -> str:
+    return f"""
 Write a professional, compelling cover letter for this job application.
 
 APPLICANT'S RESUME:
-{resume_text[:2500]}
+{pack_for("cover_letter", "resume", resume_text, query=job_description, keep_head=40)}
 
 JOB TITLE: {job_title}
 COMPANY: {company}
 
 JOB DESCRIPTION:
-{job_description[:2000]}
+{pack_for("cover_letter", "jd", job_description)}
 
 Write a 3-4 paragraph cover letter that:
 1. Opens with enthusiasm for the specific role and company
@@ -443,16 +448,40 @@ Use a professional but personable tone. Do NOT use brackets or placeholders.
 Return ONLY the cover letter text, no JSON or markdown.
 """
 
+
+async def generate_cover_letter_content(resume_text: str, job_description: str, job_title: str, company: str) -> Optional[str]:
+    """Generate a cover letter using AI"""
+    prompt = build_cover_letter_prompt(resume_text, job_description, job_title, company)
+
     try:
-        response = await unified_api_call(prompt)
+        response = await unified_api_call(prompt, call_site="cover_letter")
         return response
     except Exception as e:
         logger.error(f"Failed to generate cover letter: {e}")
         return None
 
 
+def stream_cover_letter_content(resume_text: str, job_description: str, job_title: str, company: str):
+    """Token stream of the same cover letter generate_cover_letter_content returns"""
+    return stream_groq_api(
+        build_cover_letter_prompt(resume_text, job_description, job_title, company), call_site="cover_letter"
+    )
+
+
+# Bump when the extraction prompt or schema changes (invalidates stored facts)
+COMPLIANCE_FACTS_VERSION = 1
+
+
 async def extract_compliance_facts(resume_text: str) -> Optional[Dict]:
-    """Stage 1: Extract verbatim facts from resume into a strict JSON schema"""
+    """Stage 1: Verbatim facts of a resume, extracted once per resume content"""
+    return await resume_facts.get_or_extract(
+        "compliance_facts", COMPLIANCE_FACTS_VERSION, resume_text, _extract_compliance_facts,
+        is_valid=lambda facts: bool(facts and facts.get("employers"))
+    )
+
+
+async def _extract_compliance_facts(resume_text: str) -> Optional[Dict]:
+    """Extract verbatim facts from resume into a strict JSON schema"""
     # Truncate resume text only if massive
     truncated_resume = resume_text[:15000]
     
@@ -491,7 +520,10 @@ Return JSON with this exact schema:
 """
     try:
         # Use 70B for extraction to ensure NO content loss (Step 1 Optimization Reverted for Stability)
-        response_text = await unified_api_call(prompt, max_tokens=3500, model="llama-3.3-70b-versatile")
+        response_text = await unified_api_call(
+            prompt, max_tokens=3500, model="llama-3.3-70b-versatile",
+            call_site="extract_compliance_facts"
+        )
         if not response_text:
             return {}
         
@@ -502,35 +534,73 @@ Return JSON with this exact schema:
         return {}
 
 
+# Per-stage timeouts (seconds) of the generate_expert_documents pipeline
+EXPERT_STAGE_TIMEOUTS = {"facts": 60, "draft": 150, "cover_letter": 60, "rescue": 90}
+
+
 async def generate_expert_documents(
     resume_text: str, 
     job_description: str, 
     user_info: Optional[Dict] = None, 
     selected_sections: Optional[List[str]] = None,
+    selected_keywords: Optional[List[str]] = None,
+    job_title: str = "",
+    company: str = "",
+    include_cover_letter: bool = True
+) -> Optional[Dict[str, Any]]:
+    """Generate ATS Resume and Detailed CV using the compliance-grade two-stage pipeline
+
+    Stages run as a dependency graph (stage_graph.py): facts -> draft, with
+    the rescue resume only when drafting produced nothing. The cover letter
+    needs only the resume and JD, so it runs alongside the whole chain.
+    """
+    u = user_info or {}
+    role = job_title or u.get("target_role") or "Target Role"
+    employer = company or "Target Company"
+
+    stages = [
+        Stage("facts", lambda r: extract_compliance_facts(resume_text),
+              timeout=EXPERT_STAGE_TIMEOUTS["facts"], fallback={}),
+        Stage("draft", lambda r: draft_expert_resume(
+                  r["facts"], job_description, u, selected_sections, selected_keywords),
+              deps=("facts",), timeout=EXPERT_STAGE_TIMEOUTS["draft"]),
+        Stage("rescue", lambda r: generate_simple_tailored_resume(resume_text, job_description, role, employer),
+              deps=("draft",), timeout=EXPERT_STAGE_TIMEOUTS["rescue"], fallback="",
+              when=lambda r: not r["draft"]),
+    ]
+    if include_cover_letter:
+        stages.append(Stage("cover_letter", lambda r: generate_cover_letter_content(resume_text, job_description, role, employer),
+                            timeout=EXPERT_STAGE_TIMEOUTS["cover_letter"]))
+    results = await run_stages(stages, label="Expert documents")
+
+    cover_letter = results.get("cover_letter") or ""
+    if results["draft"]:
+        return {**results["draft"], "cover_letter": cover_letter}
+
+    simple_text = results["rescue"]
+    return {
+        "alignment_highlights": "- Full resume generated via rescue mode",
+        "ats_resume": simple_text, "detailed_cv": simple_text,
+        "cover_letter": cover_letter, "resume_json": {},
+        "changes": [], "skills_added": [], "skills_skipped": []
+    }
+
+
+async def draft_expert_resume(
+    facts_json: Dict,
+    job_description: str,
+    u: Dict,
+    selected_sections: Optional[List[str]] = None,
     selected_keywords: Optional[List[str]] = None
 ) -> Optional[Dict[str, Any]]:
-    """Generate ATS Resume and Detailed CV using the compliance-grade two-stage pipeline"""
-    
-    # Resolving model selection (Optimization)
-    extraction_model = "llama-3.1-8b-instant"
+    """Stage 2: Tailor the extracted facts to the JD. None when there is nothing usable."""
     drafting_model = "llama-3.3-70b-versatile"
-    
-    # Stage 1: Verbatim Fact Extraction
-    logger.info("Stage 1: Extracting verbatim facts")
-    facts_json = await extract_compliance_facts(resume_text)
-    
+
     if not facts_json or not facts_json.get("employers"):
         logger.warning("Fact extraction flaked - rescuing with simple tailoring")
-        simple_text = await generate_simple_tailored_resume(resume_text, job_description, "Target Role", "Target Company")
-        cl_text = await generate_cover_letter_content(resume_text, job_description, "Target Role", "Target Company")
-        return {
-            "alignment_highlights": "- Full resume generated via rescue mode",
-            "ats_resume": simple_text, "detailed_cv": simple_text,
-            "cover_letter": cl_text, "resume_json": {}
-        }
+        return None
 
     # Resolve Header - Robust handling for "undefined" or "None" strings
-    u = user_info or {}
     f = facts_json
     
     def get_clean_val(val, default):
@@ -602,7 +672,7 @@ YOUR INPUTS
 {json.dumps(facts_json, indent=2)}
 
 - [JD_TEXT]: The job description
-{job_description}
+{pack_for("expert_draft", "jd", job_description)}
 
 - [MISSING_SKILLS]: Array of skills the user selected to inject
 {missing_skills_str}
@@ -797,7 +867,6 @@ OUTPUT FORMAT — STRICT JSON
       {{"degree": "...", "school": "..."}}
     ]
   }},
-  "cover_letter": "A brief, highly compelling 3-paragraph cover letter tailored to the job description and the candidate's core strengths.",
   "changes": [
     {{
       "section": "summary|skills|experience|projects",
@@ -818,16 +887,15 @@ OUTPUT ONLY VALID JSON. NO PREAMBLE. NO CHAT. NO CONVERSATIONAL TEXT.
 """
 
     try:
-        response_text = await unified_api_call(resume_prompt, max_tokens=6000, model=drafting_model)
+        response_text = await unified_api_call(
+            resume_prompt, max_tokens=6000, model=drafting_model, call_site="expert_draft"
+        )
         if not response_text:
             raise ValueError("Drafting failed")
             
         json_text = clean_json_response(response_text)
         raw_output = json.loads(json_text)
         
-        # Merge cover letter back into output for compatibility if model outputted top-level
-        cl_text = raw_output.get('cover_letter', "")
-        
         # Validate and Render
         class JDExtraction(BaseModel):
             job_title: Optional[str] = ""
@@ -968,7 +1036,7 @@ OUTPUT ONLY VALID JSON. NO PREAMBLE. NO CHAT. NO CONVERSATIONAL TEXT.
         return {
             "alignment_highlights": "",
             "ats_resume": ats_resume_text, "detailed_cv": ats_resume_text,
-            "cover_letter": cl_text, "resume_json": rd.model_dump(),
+            "resume_json": rd.model_dump(),
             "changes": [
                 {
                     "section": c.section,
@@ -988,16 +1056,8 @@ OUTPUT ONLY VALID JSON. NO PREAMBLE. NO CHAT. NO CONVERSATIONAL TEXT.
             tf.write("ERROR:\\n" + traceback.format_exc() + "\\n\\n")
             tf.write("RAW JSON:\\n" + str(locals().get('json_text', 'No json_text')))
             
-        simple_text = await generate_simple_tailored_resume(resume_text, job_description, "Position", "Company")
-        cl_text = await generate_cover_letter_content(resume_text, job_description, "Position", "Company")
-        return {
-            "alignment_highlights": "- Tailored analysis complete",
-            "ats_resume": simple_text, "detailed_cv": simple_text,
-            "cover_letter": cl_text, "resume_json": {},
-            "changes": [], "skills_added": [], "skills_skipped": []
-        }
+        return None
 
-    return None
 
 def create_resume_docx(resume_data: Dict, font_family: str = "Times New Roman") -> io.BytesIO:
     """Create a comprehensive Word document from resume data"""
@@ -0,0 +1,209 @@
+"""
+Feed Watermarks - Incremental RSS ingestion
+
+Every RSS source (RSSJobService feeds, the YC jobs feed) goes through
+fetch_new_entries(), which keeps a high-water mark per feed:
+
+- seen_guids: entry GUIDs (or links) from the previous fetch
+- last_published: newest published/updated timestamp seen
+- etag / last_modified: sent back as conditional headers, so an unchanged
+  feed costs a 304 and no parsing at all
+
+Only entries that are not in seen_guids and not older than last_published
+are returned, so callers normalise new postings only. Parsing runs in a
+worker thread (feedparser is pure Python and CPU-bound).
+
+fetch_new_entries() does not advance the watermark itself: it returns the
+candidate mark, and the caller stages it into the run's collect_watermarks()
+batch, which JobAggregator commits only once the entries are in the ingestion
+spool. A run that dies before spooling leaves the old mark, so the entries
+are fetched again. Candidates staged outside a batch are dropped.
+
+The /api/jobs list only shows jobs whose created_at (refreshed on every
+upsert) is within 72h, and cleanup_old_jobs can retire older ones, so every
+FEED_FULL_REFRESH_HOURS a feed is re-read in full and all of its entries
+are returned once.
+
+Watermarks are persisted in the feed_watermarks table
+(feed_watermarks_schema.sql); without Supabase they live in memory for the
+life of the process.
+"""
+
+import time
+import asyncio
+import logging
+import calendar
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+import aiohttp
+import feedparser
+
+from supabase_service import SupabaseService
+from source_health import provider_trace
+
+logger = logging.getLogger(__name__)
+
+FEED_FULL_REFRESH_HOURS = 24
+FEED_TIMEOUT_SECONDS = 20
+MAX_SEEN_GUIDS = 2000
+
+
+def _entry_guid(entry: Any) -> str:
+    return entry.get("id") or entry.get("guid") or entry.get("link") or entry.get("title", "")
+
+
+def _entry_timestamp(entry: Any) -> Optional[float]:
+    parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+    return float(calendar.timegm(parsed)) if parsed else None
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts else None
+
+
+def _timestamp(value: Optional[str]) -> Optional[float]:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp() if value else None
+
+
+def select_new_entries(content: bytes, mark: Dict[str, Any], full: bool) -> Tuple[List[Any], Dict[str, Any], int]:
+    """
+    Parse a feed body and keep the entries past the watermark.
+    Returns (entries, updated watermark, total entries in feed).
+    """
+    feed = feedparser.parse(content)
+    seen = set(mark.get("seen_guids") or [])
+    last_published = _timestamp(mark.get("last_published"))
+
+    new_entries = []
+    guids = []
+    newest = last_published
+    for entry in feed.entries:
+        guid = _entry_guid(entry)
+        published = _entry_timestamp(entry)
+        guids.append(guid)
+        if published and (newest is None or published > newest):
+            newest = published
+        if full:
+            new_entries.append(entry)
+            continue
+        if guid in seen:
+            continue
+        if published and last_published and published < last_published:
+            continue
+        new_entries.append(entry)
+
+    updated = dict(mark)
+    updated["seen_guids"] = guids[:MAX_SEEN_GUIDS]
+    updated["last_published"] = _iso(newest)
+    return new_entries, updated, len(feed.entries)
+
+
+class FeedWatermarkStore:
+    def __init__(self):
+        self.marks: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+    def get(self, feed: str) -> Dict[str, Any]:
+        with self.lock:
+            if feed in self.marks:
+                return self.marks[feed]
+        mark = SupabaseService.get_feed_watermark(feed) or {"feed": feed}
+        with self.lock:
+            return self.marks.setdefault(feed, mark)
+
+    def save(self, feed: str, mark: Dict[str, Any]):
+        mark = {**mark, "feed": feed, "updated_at": datetime.now(timezone.utc).isoformat()}
+        with self.lock:
+            self.marks[feed] = mark
+        SupabaseService.upsert_feed_watermark(mark)
+
+
+feed_watermarks = FeedWatermarkStore()
+
+
+class PendingWatermarks:
+    """Candidate marks from one ingestion run, saved once its entries are spooled"""
+
+    def __init__(self):
+        self.marks: Dict[str, Dict[str, Any]] = {}
+
+    def stage(self, feed: str, mark: Dict[str, Any]):
+        self.marks[feed] = mark
+
+    def commit(self):
+        for feed, mark in self.marks.items():
+            feed_watermarks.save(feed, mark)
+        self.marks.clear()
+
+
+current_watermarks: ContextVar[Optional[PendingWatermarks]] = ContextVar("feed_watermarks_pending", default=None)
+
+
+@contextmanager
+def collect_watermarks():
+    """Collect the candidate marks staged inside the block (including gathered tasks)"""
+    pending = PendingWatermarks()
+    token = current_watermarks.set(pending)
+    try:
+        yield pending
+    finally:
+        current_watermarks.reset(token)
+
+
+def stage_watermark(feed: str, mark: Optional[Dict[str, Any]]):
+    """Hand a candidate mark to the current run; dropped if no run is collecting"""
+    pending = current_watermarks.get()
+    if mark and pending is not None:
+        pending.stage(feed, mark)
+
+
+async def fetch_new_entries(
+    feed: str,
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    provider: str = "rss",
+    incremental: bool = True
+) -> Tuple[List[Any], Optional[Dict[str, Any]]]:
+    """
+    Fetch a feed and return (entries past its watermark, candidate watermark).
+    All entries are returned when a full refresh is due. The candidate is None
+    when there is nothing to advance (304, error, incremental=False); otherwise
+    pass it to stage_watermark() so it is saved after the entries are spooled.
+    """
+    mark = await asyncio.to_thread(feed_watermarks.get, feed) if incremental else {"feed": feed}
+    last_full = _timestamp(mark.get("last_full_at"))
+    full = not incremental or not last_full or time.time() - last_full > FEED_FULL_REFRESH_HOURS * 3600
+
+    request_headers = dict(headers or {})
+    if not full:
+        if mark.get("etag"):
+            request_headers["If-None-Match"] = mark["etag"]
+        if mark.get("last_modified"):
+            request_headers["If-Modified-Since"] = mark["last_modified"]
+
+    async with aiohttp.ClientSession(trace_configs=[provider_trace(provider)]) as session:
+        async with session.get(
+            url, headers=request_headers, timeout=aiohttp.ClientTimeout(total=FEED_TIMEOUT_SECONDS)
+        ) as response:
+            if response.status == 304:
+                logger.info(f"RSS {feed}: not modified")
+                return [], None
+            if response.status != 200:
+                logger.error(f"RSS feed error {response.status} for {url}")
+                return [], None
+            content = await response.read()
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+
+    entries, updated, total = await asyncio.to_thread(select_new_entries, content, mark, full)
+    updated["etag"] = etag
+    updated["last_modified"] = last_modified
+    if full:
+        updated["last_full_at"] = datetime.now(timezone.utc).isoformat()
+
+    logger.info(f"RSS {feed}: {len(entries)} new of {total} entries{' (full refresh)' if full else ''}")
+    return entries, updated if incremental else None
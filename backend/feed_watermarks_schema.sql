@@ -0,0 +1,19 @@
+-- ================================================================
+-- Feed watermarks: per-RSS-feed high-water marks (see feed_watermarks.py)
+-- Lets each ingestion run normalise only entries it hasn't seen yet.
+-- Run this in Supabase SQL Editor (safe to re-run)
+-- ================================================================
+
+CREATE TABLE IF NOT EXISTS feed_watermarks (
+    feed            TEXT PRIMARY KEY,
+    last_published  TIMESTAMPTZ,
+    seen_guids      JSONB NOT NULL DEFAULT '[]'::jsonb,
+    etag            TEXT,
+    last_modified   TEXT,
+    last_full_at    TIMESTAMPTZ,
+    updated_at      TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+ALTER TABLE feed_watermarks ENABLE ROW LEVEL SECURITY;
+
+SELECT 'feed_watermarks table ready ✅' AS result;
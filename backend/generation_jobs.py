@@ -0,0 +1,637 @@
+"""
+Generation Jobs - Background queue for long AI pipelines
+
+/api/ai-ninja/apply, /api/scan/analyze, /api/generate/resume and
+/api/interview/finalize chain several LLM calls (30-90s), which used to hold
+the HTTP request and a worker open the whole time and ran into proxy
+timeouts. Their pipelines now run as generation jobs:
+
+- With ?async=1 the endpoint submit()s the pipeline, which stores the job and
+  queues it, and answers 202 with the job id at once. Without it the
+  pipeline runs inline in the request as it always did (no queue, no job row)
+- A fixed pool of GENERATION_WORKERS tasks runs the queue; the next job is
+  the one with the best plan priority (plan_priority), and every
+  GENERATION_PRIORITY_AGING_SECONDS of waiting counts as one tier better, so
+  free-plan jobs are delayed under load but never starved
+- Pipelines report progress (stage, fraction); clients poll
+  GET /api/generation-jobs/{id} or follow GET .../events (SSE), and may pass
+  a callbackUrl that gets the final snapshot POSTed to it (https hosts in
+  GENERATION_WEBHOOK_HOSTS only)
+- Results (JSON, or a GeneratedFile served from .../file) are kept for
+  GENERATION_JOB_TTL_SECONDS; job ids are unguessable and act as the read
+  capability (EventSource cannot send the auth header)
+- A job whose process died stops heartbeating and is reported failed
+  ("interrupted") after GENERATION_JOB_STALE_SECONDS
+
+Job stores:
+- SupabaseGenerationJobStore: generation_jobs table (generation_jobs_schema.sql),
+  so any replica can answer polls
+- SQLiteGenerationJobStore: local file, for local runs / a single host
+
+- MemoryGenerationJobStore: fallback when the configured store can't be
+  opened or written (e.g. generation_jobs_schema.sql not applied yet); jobs
+  then only live in this process, but submissions keep working
+
+GENERATION_JOB_BACKEND=supabase|sqlite picks one explicitly; by default
+Supabase is used when configured. Jobs themselves always run in the process
+that accepted them; queue limits are per process.
+"""
+
+import os
+import json
+import time
+import base64
+import asyncio
+import sqlite3
+import logging
+import secrets
+import threading
+import statistics
+from collections import deque
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import aiohttp
+
+from supabase_service import SupabaseService
+
+logger = logging.getLogger(__name__)
+
+GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", "4"))
+GENERATION_MAX_QUEUED = int(os.getenv("GENERATION_MAX_QUEUED", "200"))
+GENERATION_MAX_ACTIVE_PER_USER = int(os.getenv("GENERATION_MAX_ACTIVE_PER_USER", "3"))
+GENERATION_JOB_TIMEOUT_SECONDS = int(os.getenv("GENERATION_JOB_TIMEOUT_SECONDS", "600"))
+GENERATION_PRIORITY_AGING_SECONDS = float(os.getenv("GENERATION_PRIORITY_AGING_SECONDS", "30"))
+GENERATION_JOB_TTL_SECONDS = int(os.getenv("GENERATION_JOB_TTL_SECONDS", str(24 * 3600)))
+GENERATION_JOB_STALE_SECONDS = int(os.getenv("GENERATION_JOB_STALE_SECONDS", "300"))
+GENERATION_WEBHOOK_HOSTS = {h.strip().lower() for h in os.getenv("GENERATION_WEBHOOK_HOSTS", "").split(",") if h.strip()}
+GENERATION_JOBS_PATH = os.getenv(
+    "GENERATION_JOBS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "generation_jobs.db")
+)
+
+HEARTBEAT_SECONDS = 60
+PURGE_INTERVAL_SECONDS = 3600
+EVENTS_POLL_SECONDS = 1.0
+EVENTS_KEEPALIVE_SECONDS = 15
+WEBHOOK_ATTEMPTS = 3
+API_PATH = "/api/generation-jobs"
+
+TERMINAL = ("succeeded", "failed")
+
+# Lower runs first; same plan families as get_user_usage_limits
+PLAN_PRIORITIES = [
+    (0, ("pro-max", "ai-pro-max", "unlimited", "human-starter", "human-growth", "human-scale")),
+    (1, ("pro-plus", "ai-pro-plus")),
+    (2, ("pro", "ai-pro", "ai-yearly", "ai-monthly", "ai-quarterly", "ai-weekly")),
+    (3, ("beginner", "standard", "ai-beginner")),
+]
+FREE_PRIORITY = 4
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _age_seconds(value: Optional[str]) -> float:
+    if not value:
+        return 0.0
+    try:
+        then = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return 0.0
+    return (datetime.now(timezone.utc) - then).total_seconds()
+
+
+def plan_priority(user: Optional[Dict[str, Any]]) -> int:
+    """Queue priority of a user's plan (anonymous and expired plans are free)"""
+    if not user:
+        return FREE_PRIORITY
+    plan = str(user.get("plan") or "free").strip().lower()
+    expires_at = user.get("plan_expires_at")
+    if expires_at and _age_seconds(expires_at if isinstance(expires_at, str) else expires_at.isoformat()) > 0:
+        return FREE_PRIORITY
+    for priority, plans in PLAN_PRIORITIES:
+        if plan in plans:
+            return priority
+    return FREE_PRIORITY
+
+
+def webhook_allowed(url: str) -> bool:
+    parsed = urlparse(url or "")
+    return parsed.scheme == "https" and (parsed.hostname or "").lower() in GENERATION_WEBHOOK_HOSTS
+
+
+class GeneratedFile:
+    """Pipeline result that is a download (served from /api/generation-jobs/{id}/file)"""
+
+    def __init__(self, filename: str, media_type: str, data: bytes):
+        self.filename = filename
+        self.media_type = media_type
+        self.data = data
+
+
+class GenerationJobError(Exception):
+    """Rejected submission or failed job; status_code/detail mirror HTTPException"""
+
+    def __init__(self, detail: str, status_code: int = 500):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+# ============================================
+# JOB STORES
+# ============================================
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS generation_jobs (
+    id          TEXT PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    user_id     TEXT,
+    priority    INTEGER NOT NULL,
+    status      TEXT NOT NULL,
+    stage       TEXT,
+    progress    REAL,
+    result      TEXT,
+    file_data   TEXT,
+    error       TEXT,
+    status_code INTEGER,
+    callback_url TEXT,
+    created_at  TEXT NOT NULL,
+    started_at  TEXT,
+    finished_at TEXT,
+    updated_at  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_generation_jobs_updated ON generation_jobs(updated_at);
+"""
+
+
+class SQLiteGenerationJobStore:
+    """generation_jobs in a local SQLite file (WAL), shared by the workers of one host"""
+
+    def __init__(self, path: str = GENERATION_JOBS_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SQLITE_SCHEMA)
+
+    def create(self, row: Dict[str, Any]):
+        row = {**row, "result": json.dumps(row["result"]) if row.get("result") is not None else None}
+        columns = ", ".join(row)
+        with self.lock:
+            self.conn.execute(
+                f"INSERT INTO generation_jobs ({columns}) VALUES ({', '.join('?' for _ in row)})", list(row.values())
+            )
+
+    def update(self, job_id: str, fields: Dict[str, Any]):
+        if "result" in fields and fields["result"] is not None:
+            fields = {**fields, "result": json.dumps(fields["result"])}
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self.lock:
+            self.conn.execute(f"UPDATE generation_jobs SET {assignments} WHERE id = ?", [*fields.values(), job_id])
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            cursor = self.conn.execute("SELECT * FROM generation_jobs WHERE id = ?", (job_id,))
+            values = cursor.fetchone()
+            if not values:
+                return None
+            row = dict(zip([c[0] for c in cursor.description], values))
+        if row.get("result"):
+            row["result"] = json.loads(row["result"])
+        return row
+
+    def touch(self, job_ids: List[str], updated_at: str):
+        with self.lock:
+            self.conn.executemany(
+                "UPDATE generation_jobs SET updated_at = ? WHERE id = ?", [(updated_at, i) for i in job_ids]
+            )
+
+    def purge(self, before: str) -> int:
+        with self.lock:
+            return self.conn.execute("DELETE FROM generation_jobs WHERE updated_at < ?", (before,)).rowcount
+
+
+class SupabaseGenerationJobStore:
+    """Rows in the generation_jobs table, so polls can land on any replica"""
+
+    TABLE = "generation_jobs"
+
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, row: Dict[str, Any]):
+        self.client.table(self.TABLE).insert(row).execute()
+
+    def update(self, job_id: str, fields: Dict[str, Any]):
+        self.client.table(self.TABLE).update(fields).eq("id", job_id).execute()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        res = self.client.table(self.TABLE).select("*").eq("id", job_id).execute()
+        return res.data[0] if res.data else None
+
+    def touch(self, job_ids: List[str], updated_at: str):
+        self.client.table(self.TABLE).update({"updated_at": updated_at}).in_("id", job_ids).execute()
+
+    def purge(self, before: str) -> int:
+        res = self.client.table(self.TABLE).delete().lt("updated_at", before).execute()
+        return len(res.data or [])
+
+
+class MemoryGenerationJobStore:
+    """Jobs in process memory: the fallback when the configured store is unusable"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows: Dict[str, Dict[str, Any]] = {}
+
+    def create(self, row: Dict[str, Any]):
+        with self.lock:
+            self.rows[row["id"]] = dict(row)
+
+    def update(self, job_id: str, fields: Dict[str, Any]):
+        with self.lock:
+            if job_id in self.rows:
+                self.rows[job_id].update(fields)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self.rows.get(job_id)
+            return dict(row) if row else None
+
+    def touch(self, job_ids: List[str], updated_at: str):
+        with self.lock:
+            for job_id in job_ids:
+                if job_id in self.rows:
+                    self.rows[job_id]["updated_at"] = updated_at
+
+    def purge(self, before: str) -> int:
+        with self.lock:
+            expired = [job_id for job_id, row in self.rows.items() if row["updated_at"] < before]
+            for job_id in expired:
+                del self.rows[job_id]
+            return len(expired)
+
+
+def default_job_store():
+    backend = os.getenv("GENERATION_JOB_BACKEND", "").lower()
+    client = SupabaseService.get_client() if backend != "sqlite" else None
+    if client:
+        return SupabaseGenerationJobStore(client)
+    if backend == "supabase":
+        logger.warning("GENERATION_JOB_BACKEND=supabase but Supabase is not configured; using SQLite")
+    return SQLiteGenerationJobStore()
+
+
+# ============================================
+# QUEUE
+# ============================================
+
+Pipeline = Callable[[Callable[..., Awaitable[None]]], Awaitable[Any]]
+
+
+class GenerationJob:
+    """Handle of a job submitted in this process"""
+
+    def __init__(self, job_id: str, kind: str, user_id: Optional[str], priority: int, seq: int, run: Pipeline):
+        self.id = job_id
+        self.kind = kind
+        self.user_id = user_id
+        self.priority = priority
+        self.seq = seq
+        self.run = run
+        self.enqueued = time.monotonic()
+        self.running = False
+        self.done = asyncio.Event()
+        self.changed = asyncio.Event()
+        self.value: Any = None
+        self.error: Optional[GenerationJobError] = None
+
+    async def result(self) -> Any:
+        """The pipeline's return value; raises GenerationJobError if it failed"""
+        await self.done.wait()
+        if self.error:
+            raise self.error
+        return self.value
+
+
+class GenerationQueue:
+    def __init__(self, store=None, workers: int = GENERATION_WORKERS, max_queued: int = GENERATION_MAX_QUEUED,
+                 max_active_per_user: int = GENERATION_MAX_ACTIVE_PER_USER):
+        self.store = store
+        # Jobs the configured store could not take (see _create)
+        self.fallback = MemoryGenerationJobStore()
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_active_per_user = max_active_per_user
+        self.pending: List[GenerationJob] = []
+        self.local: Dict[str, GenerationJob] = {}
+        self.tasks: List[asyncio.Task] = []
+        self.webhooks: set = set()
+        self.ready: Optional[asyncio.Condition] = None
+        self.seq = 0
+        self.waits_ms: deque = deque(maxlen=500)
+        self.counters = {"submitted": 0, "succeeded": 0, "failed": 0, "rejected": 0, "timeouts": 0}
+
+    def _get_store(self):
+        if self.store is None:
+            try:
+                self.store = default_job_store()
+            except Exception as e:
+                logger.error(f"Generation job store unavailable ({e}); keeping jobs in memory")
+                self.store = self.fallback
+        return self.store
+
+    def _store_for(self, job_id: str):
+        return self.fallback if self.fallback.get(job_id) else self._get_store()
+
+    async def _create(self, row: Dict[str, Any]):
+        """Persist a new job; best effort, a store error keeps the job in memory instead of failing it"""
+        store = self._get_store()
+        if store is not self.fallback:
+            try:
+                await asyncio.to_thread(store.create, row)
+                return
+            except Exception as e:
+                logger.warning(
+                    f"Could not store generation job in {type(store).__name__} ({e}); keeping it in memory. "
+                    "Is generation_jobs_schema.sql applied?"
+                )
+        self.fallback.create(row)
+
+    def _start(self):
+        if self.tasks:
+            return
+        self.ready = asyncio.Condition()
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self.tasks.append(asyncio.create_task(self._housekeeping()))
+        logger.info(f"Generation queue started: {self.workers} workers ({type(self._get_store()).__name__})")
+
+    async def submit(self, kind: str, run: Pipeline, user: Optional[Dict[str, Any]] = None,
+                     callback_url: Optional[str] = None) -> GenerationJob:
+        """
+        Queue a pipeline: async def run(progress) -> result, where
+        `await progress(stage, fraction)` reports how far it got
+        """
+        user_id = (user or {}).get("id")
+        if callback_url and not webhook_allowed(callback_url):
+            raise GenerationJobError("callbackUrl must be https on an allowed host", 400)
+        if len(self.pending) >= self.max_queued:
+            self.counters["rejected"] += 1
+            raise GenerationJobError("Generation queue is full, please retry shortly", 503)
+        if user_id and sum(j.user_id == user_id for j in self.local.values()) >= self.max_active_per_user:
+            self.counters["rejected"] += 1
+            raise GenerationJobError("Too many generations in progress, wait for one to finish", 429)
+
+        self._start()
+        self.seq += 1
+        job = GenerationJob(secrets.token_urlsafe(24), kind, user_id, plan_priority(user), self.seq, run)
+        now = _now_iso()
+        await self._create({
+            "id": job.id,
+            "kind": kind,
+            "user_id": user_id,
+            "priority": job.priority,
+            "status": "queued",
+            "stage": "queued",
+            "progress": 0.0,
+            "callback_url": callback_url,
+            "created_at": now,
+            "updated_at": now,
+        })
+        self.local[job.id] = job
+        self.counters["submitted"] += 1
+        async with self.ready:
+            self.pending.append(job)
+            self.ready.notify()
+        return job
+
+    def _next(self) -> GenerationJob:
+        now = time.monotonic()
+        return min(self.pending, key=lambda j: (j.priority - (now - j.enqueued) / GENERATION_PRIORITY_AGING_SECONDS, j.seq))
+
+    async def _worker(self):
+        while True:
+            async with self.ready:
+                while not self.pending:
+                    await self.ready.wait()
+                job = self._next()
+                self.pending.remove(job)
+            await self._execute(job)
+
+    async def _execute(self, job: GenerationJob):
+        job.running = True
+        self.waits_ms.append((time.monotonic() - job.enqueued) * 1000)
+        await self._update(job, status="running", stage="started", started_at=_now_iso())
+
+        async def progress(stage: str, fraction: Optional[float] = None):
+            fields = {"stage": stage}
+            if fraction is not None:
+                fields["progress"] = round(fraction, 3)
+            await self._update(job, **fields)
+
+        fields: Dict[str, Any] = {"progress": 1.0, "finished_at": _now_iso()}
+        try:
+            job.value = await asyncio.wait_for(job.run(progress), timeout=GENERATION_JOB_TIMEOUT_SECONDS)
+            fields.update(status="succeeded", stage="done", **self._serialize(job.value))
+            self.counters["succeeded"] += 1
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                self.counters["timeouts"] += 1
+                e = GenerationJobError(f"Generation timed out after {GENERATION_JOB_TIMEOUT_SECONDS}s", 504)
+            detail = str(getattr(e, "detail", None) or e)
+            job.error = GenerationJobError(detail, getattr(e, "status_code", 500) or 500)
+            fields.update(status="failed", stage="failed", error=detail, status_code=job.error.status_code)
+            self.counters["failed"] += 1
+            logger.error(f"Generation job {job.kind} {job.id[:8]} failed: {detail}")
+        finally:
+            job.running = False
+        await self._update(job, **fields)
+        self.local.pop(job.id, None)
+        job.done.set()
+
+        row = await self._read(job.id)
+        if row and row.get("callback_url"):
+            task = asyncio.create_task(self._deliver_webhook(row["callback_url"], self._public(row)))
+            self.webhooks.add(task)
+            task.add_done_callback(self.webhooks.discard)
+
+    @staticmethod
+    def _serialize(value: Any) -> Dict[str, Any]:
+        if isinstance(value, GeneratedFile):
+            return {
+                "result": {"file": {"filename": value.filename, "mediaType": value.media_type, "size": len(value.data)}},
+                "file_data": base64.b64encode(value.data).decode("ascii"),
+            }
+        # datetimes etc. (e.g. usage resetDate) as strings, like the JSON response would have them
+        return {"result": json.loads(json.dumps(value, default=str))}
+
+    async def _update(self, job: GenerationJob, **fields):
+        fields["updated_at"] = _now_iso()
+        try:
+            await asyncio.to_thread(self._store_for(job.id).update, job.id, fields)
+        except Exception as e:
+            logger.warning(f"Could not update generation job {job.id[:8]}: {e}")
+        # Wake /events watchers of this job
+        changed, job.changed = job.changed, asyncio.Event()
+        changed.set()
+
+    async def _read(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self.fallback.get(job_id) or await asyncio.to_thread(self._get_store().get, job_id)
+        except Exception as e:
+            logger.error(f"Could not read generation job {job_id[:8]}: {e}")
+            return None
+
+    async def _deliver_webhook(self, url: str, payload: Dict[str, Any]):
+        timeout = aiohttp.ClientTimeout(total=10)
+        for attempt in range(WEBHOOK_ATTEMPTS):
+            try:
+                async with aiohttp.ClientSession(timeout=timeout) as session:
+                    async with session.post(url, json=payload) as response:
+                        if response.status < 500:
+                            return
+            except Exception as e:
+                logger.warning(f"Generation webhook to {urlparse(url).hostname} failed: {e}")
+            await asyncio.sleep(2 ** attempt)
+
+    async def _housekeeping(self):
+        """Heartbeat for this process's jobs (so others can tell they're alive) and result expiry"""
+        last_purge = 0.0
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            try:
+                if self.local:
+                    self.fallback.touch(list(self.local), _now_iso())
+                    await asyncio.to_thread(self._get_store().touch, list(self.local), _now_iso())
+                if time.monotonic() - last_purge > PURGE_INTERVAL_SECONDS:
+                    last_purge = time.monotonic()
+                    cutoff = datetime.fromtimestamp(time.time() - GENERATION_JOB_TTL_SECONDS, timezone.utc).isoformat()
+                    purged = self.fallback.purge(cutoff)
+                    purged += await asyncio.to_thread(self._get_store().purge, cutoff)
+                    if purged:
+                        logger.info(f"Purged {purged} expired generation jobs")
+            except Exception as e:
+                logger.warning(f"Generation job housekeeping failed: {e}")
+
+    # ---- Reading ----
+
+    def _public(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """API shape of a job row"""
+        job_id = row["id"]
+        status = row["status"]
+        error = row.get("error")
+        status_code = row.get("status_code")
+        if status not in TERMINAL and job_id not in self.local and _age_seconds(row.get("updated_at")) > GENERATION_JOB_STALE_SECONDS:
+            status, error, status_code = "failed", "Generation was interrupted, please retry", 503
+        snapshot = {
+            "jobId": job_id,
+            "kind": row["kind"],
+            "status": status,
+            "stage": row.get("stage"),
+            "progress": row.get("progress"),
+            "createdAt": row.get("created_at"),
+            "startedAt": row.get("started_at"),
+            "finishedAt": row.get("finished_at"),
+            "pollUrl": f"{API_PATH}/{job_id}",
+            "eventsUrl": f"{API_PATH}/{job_id}/events",
+        }
+        local = self.local.get(job_id)
+        if local and not local.running and local in self.pending:
+            now = time.monotonic()
+            rank = sorted(self.pending, key=lambda j: (j.priority - (now - j.enqueued) / GENERATION_PRIORITY_AGING_SECONDS, j.seq))
+            snapshot["queuePosition"] = rank.index(local) + 1
+        if status == "succeeded":
+            snapshot["result"] = row.get("result")
+            if (row.get("result") or {}).get("file"):
+                snapshot["fileUrl"] = f"{API_PATH}/{job_id}/file"
+        if status == "failed":
+            snapshot["error"] = error
+            snapshot["statusCode"] = status_code
+        return snapshot
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Public snapshot of a job (from any process), or None"""
+        row = await self._read(job_id)
+        return self._public(row) if row else None
+
+    async def get_file(self, job_id: str) -> Optional[GeneratedFile]:
+        row = await self._read(job_id)
+        meta = ((row or {}).get("result") or {}).get("file")
+        if not meta or row.get("status") != "succeeded" or not row.get("file_data"):
+            return None
+        return GeneratedFile(meta["filename"], meta["mediaType"], base64.b64decode(row["file_data"]))
+
+    async def watch(self, job_id: str) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Snapshots of a job as it changes, ending with the terminal one; None
+        when nothing changed for EVENTS_KEEPALIVE_SECONDS (send a keep-alive)
+        """
+        last = None
+        quiet_since = time.monotonic()
+        while True:
+            local = self.local.get(job_id)
+            changed = local.changed if local else None
+            snapshot = await self.get(job_id)
+            if snapshot is None:
+                return
+            key = (snapshot["status"], snapshot["stage"], snapshot["progress"], snapshot.get("queuePosition"))
+            if key != last:
+                last = key
+                quiet_since = time.monotonic()
+                yield snapshot
+            elif time.monotonic() - quiet_since > EVENTS_KEEPALIVE_SECONDS:
+                quiet_since = time.monotonic()
+                yield None
+            if snapshot["status"] in TERMINAL:
+                return
+            # Local jobs wake us on change; the poll also catches queue moves and other replicas' jobs
+            try:
+                if changed:
+                    await asyncio.wait_for(changed.wait(), timeout=EVENTS_POLL_SECONDS)
+                else:
+                    await asyncio.sleep(EVENTS_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    # ---- Lifecycle ----
+
+    async def close(self):
+        """Stop the workers; unfinished jobs of this process are marked failed"""
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        for job in list(self.local.values()):
+            await self._update(job, status="failed", stage="failed", error="Server restarted, please retry",
+                               status_code=503, finished_at=_now_iso())
+            job.error = GenerationJobError("Server restarted, please retry", 503)
+            job.done.set()
+        self.local.clear()
+        self.pending.clear()
+        if self.webhooks:
+            await asyncio.gather(*self.webhooks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self.waits_ms)
+        return {
+            **self.counters,
+            "workers": self.workers,
+            "running": sum(j.running for j in self.local.values()),
+            "queued": len(self.pending),
+            "queued_by_priority": {p: sum(j.priority == p for j in self.pending) for p in range(FREE_PRIORITY + 1)},
+            "queue_wait_ms": {
+                "p50": round(statistics.median(waits), 1),
+                "p95": round(waits[int(0.95 * (len(waits) - 1))], 1),
+                "samples": len(waits),
+            } if waits else {},
+            "store": type(self.store).__name__ if self.store else None,
+            "jobs_in_memory": len(self.fallback.rows),
+        }
+
+
+generation_queue = GenerationQueue()
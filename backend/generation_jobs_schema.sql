@@ -0,0 +1,32 @@
+-- ================================================================
+-- Generation jobs: queued/finished AI pipelines (see generation_jobs.py)
+-- Lets any replica answer GET /api/generation-jobs/{id} polls while
+-- the job runs in the process that accepted it. Rows are purged
+-- GENERATION_JOB_TTL_SECONDS after their last update.
+-- Run this in Supabase SQL Editor (safe to re-run)
+-- ================================================================
+
+CREATE TABLE IF NOT EXISTS generation_jobs (
+    id            TEXT PRIMARY KEY,
+    kind          TEXT NOT NULL,
+    user_id       TEXT,
+    priority      INT NOT NULL,
+    status        TEXT NOT NULL,
+    stage         TEXT,
+    progress      DOUBLE PRECISION,
+    result        JSONB,
+    file_data     TEXT,
+    error         TEXT,
+    status_code   INT,
+    callback_url  TEXT,
+    created_at    TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    started_at    TIMESTAMPTZ,
+    finished_at   TIMESTAMPTZ,
+    updated_at    TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_generation_jobs_updated_at ON generation_jobs(updated_at);
+
+ALTER TABLE generation_jobs ENABLE ROW LEVEL SECURITY;
+
+SELECT 'Generation jobs table ready ✅' AS result;
@@ -0,0 +1,198 @@
+"""
+Ingest Replay - Record/replay HTTP harness for the job ingestion pipeline
+
+Every job source (job_apis/*, job_fetcher fetch_* functions) talks HTTP through
+aiohttp.ClientSession, so patching ClientSession._request captures all of
+them without touching the services:
+
+- record(): passes requests through to the network and stores each response
+  as a gzip-compressed fixture keyed by (method, url, params, body)
+- replay(): serves the stored fixtures locally, with configurable latency
+  and error injection (HTTP 5xx / 429 / connection errors)
+
+Fixtures live in fixtures/ingest/<host>/<key>.json.gz by default.
+
+Usage:
+    with record(FixtureStore()):
+        await JobAggregator().aggregate_all_jobs()
+
+    with replay(FixtureStore(), latency_ms=(20, 120), error_rate=0.05) as stats:
+        await JobAggregator().aggregate_all_jobs()
+"""
+
+import os
+import gzip
+import json
+import base64
+import random
+import asyncio
+import hashlib
+import logging
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "ingest")
+
+INJECTED_ERRORS = ("503", "429", "connection")
+
+
+def request_key(method: str, url: str, params: Any = None, body: Any = None) -> str:
+    """Stable fixture key for a request"""
+    material = json.dumps(
+        [method.upper(), str(url), params if params is None else sorted(dict(params).items()), body],
+        sort_keys=True, default=str
+    )
+    return hashlib.sha1(material.encode()).hexdigest()
+
+
+class FixtureStore:
+    def __init__(self, root: str = FIXTURES_DIR):
+        self.root = root
+
+    def _path(self, url: str, key: str) -> str:
+        host = urlsplit(str(url)).hostname or "unknown"
+        return os.path.join(self.root, host, f"{key}.json.gz")
+
+    def save(self, key: str, method: str, url: str, status: int, headers: Dict[str, str], body: bytes):
+        path = self._path(url, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fixture = {
+            "method": method,
+            "url": str(url),
+            "status": status,
+            "headers": headers,
+            "body": base64.b64encode(body).decode("ascii"),
+        }
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(fixture, f)
+
+    def load(self, key: str, url: str) -> Optional[Dict[str, Any]]:
+        path = self._path(url, key)
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            fixture = json.load(f)
+        fixture["body"] = base64.b64decode(fixture["body"])
+        return fixture
+
+    def size(self) -> Tuple[int, int]:
+        """(fixture count, compressed bytes)"""
+        count = total = 0
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(".json.gz"):
+                    count += 1
+                    total += os.path.getsize(os.path.join(dirpath, name))
+        return count, total
+
+
+class ReplayResponse:
+    """Just enough of aiohttp.ClientResponse for the job sources"""
+
+    def __init__(self, method: str, url: str, status: int, headers: Dict[str, str], body: bytes):
+        self.method = method
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.content_type = headers.get("Content-Type", "application/octet-stream").split(";")[0]
+        self._body = body
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def text(self, encoding: Optional[str] = None, errors: str = "replace") -> str:
+        return self._body.decode(encoding or "utf-8", errors=errors)
+
+    async def json(self, content_type: Any = None, **kwargs) -> Any:
+        return json.loads(self._body.decode("utf-8"))
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise aiohttp.ClientResponseError(None, (), status=self.status, message=f"replayed {self.status}")
+
+    def release(self):
+        pass
+
+    def close(self):
+        pass
+
+    async def wait_for_close(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@contextmanager
+def record(store: FixtureStore):
+    """Capture every aiohttp response made inside the block into the fixture store"""
+    original = aiohttp.ClientSession._request
+    stats = {"recorded": 0}
+
+    async def recording_request(session, method, str_or_url, **kwargs):
+        response = await original(session, method, str_or_url, **kwargs)
+        body = await response.read()
+        key = request_key(method, str_or_url, kwargs.get("params"), kwargs.get("json") or kwargs.get("data"))
+        store.save(key, method, str(str_or_url), response.status, dict(response.headers), body)
+        stats["recorded"] += 1
+        return response
+
+    aiohttp.ClientSession._request = recording_request
+    try:
+        yield stats
+    finally:
+        aiohttp.ClientSession._request = original
+        logger.info(f"📼 Recorded {stats['recorded']} responses into {store.root}")
+
+
+@contextmanager
+def replay(
+    store: FixtureStore,
+    latency_ms: Tuple[float, float] = (0, 0),
+    error_rate: float = 0.0,
+    errors: Tuple[str, ...] = INJECTED_ERRORS,
+    seed: Optional[int] = None,
+):
+    """
+    Serve aiohttp requests from the fixture store.
+
+    Unrecorded requests get a 404. With error_rate > 0 a random share of
+    requests fail with one of `errors` ("503", "429" or "connection").
+    """
+    original = aiohttp.ClientSession._request
+    rng = random.Random(seed)
+    stats = {"served": 0, "misses": 0, "injected_errors": 0}
+
+    async def replaying_request(session, method, str_or_url, **kwargs):
+        low, high = latency_ms
+        if high > 0:
+            await asyncio.sleep(rng.uniform(low, high) / 1000)
+
+        if error_rate and rng.random() < error_rate:
+            stats["injected_errors"] += 1
+            kind = rng.choice(errors)
+            if kind == "connection":
+                raise aiohttp.ClientConnectionError(f"injected connection error for {str_or_url}")
+            return ReplayResponse(method, str(str_or_url), int(kind), {"Retry-After": "1"}, b"{}")
+
+        key = request_key(method, str_or_url, kwargs.get("params"), kwargs.get("json") or kwargs.get("data"))
+        fixture = store.load(key, str(str_or_url))
+        if not fixture:
+            stats["misses"] += 1
+            return ReplayResponse(method, str(str_or_url), 404, {}, b"{}")
+        stats["served"] += 1
+        return ReplayResponse(method, fixture["url"], fixture["status"], fixture["headers"], fixture["body"])
+
+    aiohttp.ClientSession._request = replaying_request
+    try:
+        yield stats
+    finally:
+        aiohttp.ClientSession._request = original
@@ -1,13 +1,26 @@
 """
 Interview Prep Service - AI-powered mock interviews
 Uses Groq for AI and MongoDB for storage (same DB as the rest of the app)
+
+Active sessions are served from the in-memory state cache (interview_state.py)
+with write-behind persistence, so a turn costs one LLM call and no waiting on
+Supabase.
+
+Nothing here blocks the event loop: chat goes through the async LLM gateway
+(at most INTERVIEW_LLM_CONCURRENCY interview completions at once, so
+interviews can't take every gateway slot), Whisper transcription runs on a
+small dedicated thread pool, and Supabase calls run in threads.
 """
 import json
 import os
+import time
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 import logging
+import weakref
+from collections import Counter
 
 try:
     from groq import Groq
@@ -16,9 +29,24 @@ except ImportError:
     print("Warning: groq module not found. Interview features will be disabled.")
 
 from supabase_service import SupabaseService
+from llm_gateway import llm_gateway
+from llm_telemetry import llm_telemetry, LLMCall, key_id
+from interview_state import InterviewState, interview_states
 
 logger = logging.getLogger(__name__)
 
+INTERVIEW_MODEL = "llama-3.3-70b-versatile"
+INTERVIEW_LLM_CONCURRENCY = int(os.getenv("INTERVIEW_LLM_CONCURRENCY", "8"))
+TRANSCRIBE_WORKERS = int(os.getenv("INTERVIEW_TRANSCRIBE_WORKERS", "4"))
+# Background turn evaluations, kept below INTERVIEW_LLM_CONCURRENCY so next-question calls always get a slot
+INTERVIEW_EVAL_CONCURRENCY = int(os.getenv("INTERVIEW_EVAL_CONCURRENCY", "4"))
+SCORE_DIMENSIONS = ("communication", "technical", "behavioral", "confidence")
+REPORT_TOP_N = 5
+
+_transcribe_pool = ThreadPoolExecutor(max_workers=TRANSCRIBE_WORKERS, thread_name_prefix="transcribe")
+_chat_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+_eval_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
 # Initialize Groq client
 if Groq:
     try:
@@ -85,8 +113,8 @@ class InterviewPrompts:
     }
     """
     
-    FINAL_REPORT = """
-    You are an expert interview coach reviewing a completed mock interview.
+    TURN_EVALUATION = """
+    You are an expert interview coach scoring one answer from a mock interview.
     
     CANDIDATE PROFILE:
     {{profile}}
@@ -94,31 +122,54 @@ class InterviewPrompts:
     JOB DESCRIPTION:
     {{jd}}
     
-    FULL TRANSCRIPT:
-    {{transcript}}
+    QUESTION:
+    {{question}}
+    
+    ANSWER:
+    {{answer}}
     
-    TASK: Generate a comprehensive evaluation report.
+    TASK: Evaluate this answer on its own merits.
     
     OUTPUT FORMAT:
     {
-      "summary": "Overall performance summary (2-3 sentences)",
-      "roleFitScore": 75,
-      "strengths": ["strength1", "strength2", "strength3"],
-      "gaps": ["gap1", "gap2"],
-      "repetition": "Feedback on repeated themes or crutch phrases",
       "scores": {
         "communication": 80,
         "technical": 70,
         "behavioral": 75,
         "confidence": 80
       },
-      "rewrittenAnswers": [
-        {
-          "question": "Original question",
-          "originalAnswer": "What they said",
-          "improvedAnswer": "How they should have answered"
-        }
-      ]
+      "roleFit": 75,
+      "strengths": ["strength1", "strength2"],
+      "gaps": ["gap1"],
+      "phrases": ["Crutch phrases or themes the candidate leaned on"],
+      "improvedAnswer": "How they should have answered"
+    }
+    """
+    
+    FINAL_SUMMARY = """
+    You are an expert interview coach wrapping up a mock interview.
+    
+    ROLE:
+    {{role}}
+    
+    AVERAGE SCORES (0-100):
+    {{scores}}
+    
+    RECURRING STRENGTHS:
+    {{strengths}}
+    
+    RECURRING GAPS:
+    {{gaps}}
+    
+    PHRASES AND THEMES (times used):
+    {{phrases}}
+    
+    TASK: Write the closing feedback.
+    
+    OUTPUT FORMAT:
+    {
+      "summary": "Overall performance summary (2-3 sentences)",
+      "repetition": "Feedback on repeated themes or crutch phrases"
     }
     """
 
@@ -127,140 +178,168 @@ class AIService:
     """AI service using Groq"""
     
     @staticmethod
-    def chat(prompt: str, json_mode: bool = True) -> str:
-        """Call Groq chat API"""
-        try:
-            if not groq_client:
-                raise ValueError("Groq client not initialized")
-                
-            response = groq_client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[{"role": "user", "content": prompt}],
-                response_format={"type": "json_object"} if json_mode else None
+    def _slots(slots=_chat_slots, limit: int = INTERVIEW_LLM_CONCURRENCY) -> asyncio.Semaphore:
+        # Per event loop, like the gateway's own semaphore
+        loop = asyncio.get_running_loop()
+        if loop not in slots:
+            slots[loop] = asyncio.Semaphore(limit)
+        return slots[loop]
+
+    @staticmethod
+    async def chat(prompt: str, json_mode: bool = True, max_tokens: int = 2048, call_site: str = "interview") -> str:
+        """Call Groq chat API through the LLM gateway"""
+        if not llm_gateway.available("groq"):
+            raise ValueError("Groq client not initialized")
+        async with AIService._slots():
+            content = await llm_gateway.chat(
+                [{"role": "user", "content": prompt}],
+                model=INTERVIEW_MODEL,
+                max_tokens=max_tokens,
+                temperature=1.0,
+                response_format={"type": "json_object"} if json_mode else None,
+                call_site=call_site
             )
-            return response.choices[0].message.content or ""
-        except Exception as e:
-            logger.error(f"Groq chat failed: {e}")
-            raise
+        if content is None:
+            logger.error("Groq chat failed")
+            raise RuntimeError("Groq chat failed")
+        return content
     
     @staticmethod
-    def transcribe_audio(audio_file) -> str:
-        """Transcribe audio using Groq Whisper"""
-        try:
-            if not groq_client:
-                raise ValueError("Groq client not initialized")
+    async def transcribe_audio(audio_file) -> str:
+        """Transcribe audio using Groq Whisper (on the transcription thread pool)"""
+        if not groq_client:
+            raise ValueError("Groq client not initialized")
 
-            transcription = groq_client.audio.transcriptions.create(
-                file=audio_file,
-                model="whisper-large-v3",
-                response_format="text"
-            )
-            return transcription
+        call = LLMCall("interview_transcribe", "groq", "whisper-large-v3")
+        call.key_id = key_id(groq_client.api_key)
+
+        def transcribe():
+            # Time before this runs is the wait for a transcription thread
+            sent = time.monotonic()
+            call.queue_wait_ms = (sent - call.started) * 1000
+            call.attempts = 1
+            try:
+                return groq_client.audio.transcriptions.create(
+                    file=audio_file,
+                    model="whisper-large-v3",
+                    response_format="text"
+                )
+            finally:
+                call.upstream_ms = (time.monotonic() - sent) * 1000
+
+        try:
+            text = await asyncio.get_running_loop().run_in_executor(_transcribe_pool, transcribe)
+            call.ok = True
+            return text
         except Exception as e:
             logger.error(f"Groq transcription failed: {e}")
             raise
+        finally:
+            llm_telemetry.record(call)
+
+
+def _top(items: List[str], n: int = REPORT_TOP_N) -> List[str]:
+    """Most frequent items, case-insensitively deduplicated, first spelling kept"""
+    counts: Counter = Counter()
+    spelling: Dict[str, str] = {}
+    for item in items:
+        key = str(item).strip().lower().rstrip('.')
+        if key:
+            counts[key] += 1
+            spelling.setdefault(key, str(item).strip())
+    return [spelling[key] for key, _ in counts.most_common(n)]
+
+
+def aggregate_evaluations(turns: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Report fields from the per-turn evaluations of answered turns"""
+    evaluated = [t for t in turns if t.get('answer_text') and t.get('evaluation')]
+    evaluations = [t['evaluation'] for t in evaluated]
+
+    def mean(values: List[Any]) -> int:
+        numbers = [v for v in values if isinstance(v, (int, float))]
+        return round(sum(numbers) / len(numbers)) if numbers else 0
+
+    phrases: Counter = Counter(
+        str(p).strip().lower() for e in evaluations for p in e.get('phrases', []) if str(p).strip()
+    )
+    return {
+        "roleFitScore": mean([e.get('roleFit') for e in evaluations]),
+        "scores": {d: mean([e.get('scores', {}).get(d) for e in evaluations]) for d in SCORE_DIMENSIONS},
+        "strengths": _top([x for e in evaluations for x in e.get('strengths', [])]),
+        "gaps": _top([x for e in evaluations for x in e.get('gaps', [])]),
+        "rewrittenAnswers": [
+            {
+                "question": t.get('question_text', ''),
+                "originalAnswer": t.get('answer_text', ''),
+                "improvedAnswer": t['evaluation'].get('improvedAnswer', '')
+            }
+            for t in evaluated if t['evaluation'].get('improvedAnswer')
+        ],
+        "phrases": phrases.most_common(2 * REPORT_TOP_N),
+    }
 
 
 class InterviewOrchestrator:
-    """Manages interview flow using MongoDB as primary storage"""
+    """Manages interview flow; active session state is cached in interview_states"""
     
     def __init__(self, session_id: str):
         self.session_id = session_id
     
+    async def get_state(self) -> InterviewState:
+        state = await interview_states.get(self.session_id)
+        if not state:
+            raise ValueError(f"Session not found: {self.session_id}")
+        return state
+
     async def get_session(self) -> Optional[Dict[str, Any]]:
-        """Get session from Supabase"""
-        session = SupabaseService.get_interview_session(self.session_id)
-        if not session:
-            return None
-        
-        # Get resume from Supabase
-        if session.get('resume_id'):
-            resume = SupabaseService.get_interview_resume(session['resume_id'])
-            session['resume'] = resume
-        
-        # Get turns from Supabase
-        turns = SupabaseService.get_interview_turns(self.session_id)
-        session['turns'] = turns
-        
-        return session
+        """Get session (with resume and turns) from the state cache"""
+        state = await interview_states.get(self.session_id)
+        return state.as_session() if state else None
 
 
     async def generate_initial_question(self) -> Dict[str, Any]:
         """Generate the first interview question"""
-        session = await self.get_session()
-        if not session:
-            raise ValueError(f"Session not found: {self.session_id}")
-        
-        # Resume text is stored directly in MongoDB session
-        profile = (
-            session.get('resume_text')
-            or session.get('resume', {}).get('parsed_text', '')
-            or ''
-        )
-        jd = session.get('job_description', '')
-        role = session.get('role_title', '')
-        if role:
-            jd = f"Role: {role}\n\n{jd}"
+        state = await self.get_state()
         
         prompt = InterviewPrompts.INITIAL_QUESTION\
-            .replace('{{profile}}', profile)\
-            .replace('{{jd}}', jd)
+            .replace('{{profile}}', state.profile)\
+            .replace('{{jd}}', state.jd)
         
-        response = AIService.chat(prompt, json_mode=True)
+        response = await AIService.chat(prompt, json_mode=True)
         result = json.loads(response)
         
-        # Save the turn in Supabase
-        turn_data = {
-            "session_id": self.session_id,
-            "turn_number": 1,
-            "question_text": result.get('question', ''),
-            "answer_text": None,
-            "created_at": datetime.utcnow().isoformat()
-        }
-        SupabaseService.insert_interview_turn(turn_data)
-
-        # Update session progress
-        SupabaseService.update_interview_session(self.session_id, {"question_count": 1})
+        # Save the turn and session progress (write-behind)
+        turn = state.new_turn(1, result.get('question', ''))
+        interview_states.persist(state, [turn], {"question_count": 1})
         
         return result
     
     async def process_answer_and_get_next(self, answer_text: str) -> Dict[str, Any]:
         """Process answer and generate next question"""
-        session = await self.get_session()
-        if not session:
-            raise ValueError(f"Session not found: {self.session_id}")
+        state = await self.get_state()
         
-        turns = session.get('turns', [])
+        turns = state.turns
         # Determine the current turn number (the one being answered)
         current_turn_number = len(turns)
-        target_questions = session.get('target_questions', 5)
+        target_questions = state.session.get('target_questions', 5)
         
-        # Update last unanswered turn's answer in Supabase
-        SupabaseService.update_interview_turn(self.session_id, current_turn_number, {"answer_text": answer_text})
+        # Record the answer on the last turn
+        answered = [t for t in turns if t.get('turn_number') == current_turn_number]
+        for t in answered:
+            t['answer_text'] = answer_text
+            t.pop('evaluation', None)
+            self._schedule_evaluation(state, t)
 
         # Check if done
         if current_turn_number >= target_questions:
-            SupabaseService.update_interview_session(self.session_id, {"status": "completed"})
+            interview_states.persist(state, answered, {"status": "completed"})
             return {"status": "completed"}
         
-        # Build profile & history
-        profile = (
-            session.get('resume_text')
-            or session.get('resume', {}).get('parsed_text', '')
-            or ''
-        )
-        jd = session.get('job_description', '')
-        role = session.get('role_title', '')
-        if role:
-            jd = f"Role: {role}\n\n{jd}"
-        
         # Build history including the current answer
         history_list = []
         for t in turns:
             q = t.get('question_text', '')
             a = t.get('answer_text', '')
-            if t.get('turn_number') == current_turn_number:
-                a = answer_text # Use the fresh answer
             if q:
                 history_list.append(f"Q: {q}\nA: {a if a else '[No Answer]'}")
         
@@ -268,61 +347,82 @@ class InterviewOrchestrator:
         logger.info(f"Submitting answer for session {self.session_id}, history length: {len(history)}")
         
         prompt = InterviewPrompts.NEXT_TURN\
-            .replace('{{profile}}', profile)\
-            .replace('{{jd}}', jd)\
+            .replace('{{profile}}', state.profile)\
+            .replace('{{jd}}', state.jd)\
             .replace('{{history}}', history)\
             .replace('{{lastAnswer}}', answer_text)
         
         logger.info(f"Calling AIService.chat for session {self.session_id}")
-        response = AIService.chat(prompt, json_mode=True)
-        logger.info(f"AIService response received for {self.session_id}: {response[:100]}...")
-        result = json.loads(response)
+        try:
+            response = await AIService.chat(prompt, json_mode=True)
+            logger.info(f"AIService response received for {self.session_id}: {response[:100]}...")
+            result = json.loads(response)
+        except Exception:
+            # Keep the answer even when the next question fails
+            interview_states.persist(state, answered)
+            raise
         
-        # Save next turn in Supabase
+        # Save the answered turn, the next turn and session progress in one batch
         next_turn_number = current_turn_number + 1
-        next_turn = {
-            "session_id": self.session_id,
-            "turn_number": next_turn_number,
-            "question_text": result.get('question', ''),
-            "answer_text": None,
-            "created_at": datetime.utcnow().isoformat()
-        }
-        SupabaseService.insert_interview_turn(next_turn)
-
-        # Update session progress
-        SupabaseService.update_interview_session(self.session_id, {"question_count": next_turn_number})
+        next_turn = state.new_turn(next_turn_number, result.get('question', ''))
+        interview_states.persist(state, answered + [next_turn], {"question_count": next_turn_number})
         
         return {"status": "active", **result}
     
+    def _schedule_evaluation(self, state: InterviewState, turn: Dict[str, Any]):
+        """Score an answered turn in the background; the result is stored with the turn"""
+        state.evaluations[turn['turn_number']] = asyncio.create_task(self._evaluate_turn(state, turn))
+
+    async def _evaluate_turn(self, state: InterviewState, turn: Dict[str, Any], background: bool = True) -> Optional[Dict[str, Any]]:
+        answer = turn.get('answer_text') or ''
+        prompt = InterviewPrompts.TURN_EVALUATION\
+            .replace('{{profile}}', state.profile)\
+            .replace('{{jd}}', state.jd)\
+            .replace('{{question}}', turn.get('question_text', ''))\
+            .replace('{{answer}}', answer)
+        try:
+            if background:
+                async with AIService._slots(_eval_slots, INTERVIEW_EVAL_CONCURRENCY):
+                    response = await AIService.chat(prompt, json_mode=True, max_tokens=1024, call_site="interview_evaluation")
+            else:
+                response = await AIService.chat(prompt, json_mode=True, max_tokens=1024, call_site="interview_evaluation")
+            evaluation = json.loads(response)
+        except Exception as e:
+            logger.error(f"Turn evaluation failed for session {self.session_id} turn {turn.get('turn_number')}: {e}")
+            return None
+        if turn.get('answer_text') != answer:
+            # Answer was resubmitted meanwhile; its own evaluation is running
+            return None
+        turn['evaluation'] = evaluation
+        interview_states.persist(state, [turn])
+        return evaluation
+
+    async def _ensure_evaluated(self, state: InterviewState, turn: Dict[str, Any]):
+        if turn.get('evaluation'):
+            return
+        task = state.evaluations.get(turn['turn_number'])
+        if task and await task:
+            return
+        # Failed, or answered before a restart: evaluate now
+        await self._evaluate_turn(state, turn, background=False)
+
     async def finalize_and_generate_report(self) -> Dict[str, Any]:
-        """Finalize interview and generate evaluation report"""
-        session = await self.get_session()
-        if not session:
-            raise ValueError(f"Session not found: {self.session_id}")
+        """Finalize interview: aggregate per-turn evaluations plus one short summary call"""
+        state = await self.get_state()
         
-        profile = (
-            session.get('resume_text')
-            or session.get('resume', {}).get('parsed_text', '')
-            or ''
-        )
-        turns = session.get('turns', [])
-        jd = session.get('job_description', '')
-        role = session.get('role_title', '')
-        if role:
-            jd = f"Role: {role}\n\n{jd}"
+        answered = [t for t in state.turns if t.get('answer_text')]
+        await asyncio.gather(*(self._ensure_evaluated(state, t) for t in answered))
+        result = aggregate_evaluations(state.turns)
         
-        transcript = "\n\n".join([
-            f"Q: {t.get('question_text', '')}\nA: {t.get('answer_text', '')}"
-            for t in turns if t.get('answer_text')
-        ])
+        prompt = InterviewPrompts.FINAL_SUMMARY\
+            .replace('{{role}}', state.session.get('role_title', '') or '')\
+            .replace('{{scores}}', json.dumps({"roleFit": result['roleFitScore'], **result['scores']}))\
+            .replace('{{strengths}}', "\n".join(f"- {x}" for x in result['strengths']) or "None")\
+            .replace('{{gaps}}', "\n".join(f"- {x}" for x in result['gaps']) or "None")\
+            .replace('{{phrases}}', "\n".join(f"- {p} ({n})" for p, n in result.pop('phrases')) or "None")
         
-        prompt = InterviewPrompts.FINAL_REPORT\
-            .replace('{{profile}}', profile)\
-            .replace('{{jd}}', jd)\
-            .replace('{{transcript}}', transcript)
-        
-        response = AIService.chat(prompt, json_mode=True)
-        result = json.loads(response)
+        response = await AIService.chat(prompt, json_mode=True, max_tokens=400)
+        result.update(json.loads(response))
         
         # Save report and mark session completed in Supabase
         report_id = str(__import__('uuid').uuid4())
@@ -338,13 +438,16 @@ class InterviewOrchestrator:
             "role_fit_score": result.get('roleFitScore', 0),
             "created_at": datetime.utcnow().isoformat()
         }
-        SupabaseService.insert_evaluation_report(report_data)
+        # The report is read back right away, so its writes don't go write-behind
+        await interview_states.flush(self.session_id)
+        await asyncio.to_thread(SupabaseService.insert_evaluation_report, report_data)
         
         # Mark session completed in Supabase
-        SupabaseService.update_interview_session(self.session_id, {
+        await asyncio.to_thread(SupabaseService.update_interview_session, self.session_id, {
             "status": "completed",
             "report_id": report_id
         })
+        interview_states.drop(self.session_id)
 
         
         result['id'] = report_id
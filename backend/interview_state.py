@@ -0,0 +1,171 @@
+"""
+Interview State - In-memory state of active interview sessions
+
+Every interview turn used to re-read the session, its resume and all of its
+turns from Supabase, then write the answered turn, the next turn and the
+session counters one after another around the LLM call. Active sessions now
+live here instead:
+
+- get(session_id) returns the cached state; on a miss (new worker, restart,
+  evicted) it is rehydrated from Supabase, session and turns in parallel
+- persist(state, turns, session_update) is write-behind: the changed turns go
+  out as one upsert plus one session update in a background task, serialized
+  per session and retried with backoff, so the request doesn't wait for them
+- Sessions idle for INTERVIEW_STATE_TTL_SECONDS are evicted (never with
+  writes still pending); flush() drains pending writes, e.g. on shutdown or
+  before a report is generated
+
+The cache is per process: requests of one interview are expected to reach the
+same worker (a stale worker would only miss turns written elsewhere until its
+entry expires).
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from supabase_service import SupabaseService
+
+logger = logging.getLogger(__name__)
+
+INTERVIEW_STATE_TTL_SECONDS = int(os.getenv("INTERVIEW_STATE_TTL_SECONDS", "1800"))
+WRITE_RETRIES = 3
+SWEEP_INTERVAL_SECONDS = 60
+
+
+class InterviewState:
+    """Session row, profile, JD and turn history of one interview"""
+
+    def __init__(self, session: Dict[str, Any], resume: Optional[Dict[str, Any]], turns: List[Dict[str, Any]]):
+        self.session = session
+        self.resume = resume
+        self.turns = turns
+        self.profile = session.get("resume_text") or (resume or {}).get("parsed_text", "") or ""
+        jd = session.get("job_description", "")
+        role = session.get("role_title", "")
+        self.jd = f"Role: {role}\n\n{jd}" if role else jd
+        self.last_access = time.monotonic()
+        self.writes: set = set()
+        # turn_number -> background evaluation task (InterviewOrchestrator)
+        self.evaluations: Dict[int, asyncio.Task] = {}
+        self.write_lock = asyncio.Lock()
+
+    def as_session(self) -> Dict[str, Any]:
+        """The session dict shape InterviewOrchestrator.get_session has always returned"""
+        return {**self.session, "resume": self.resume, "turns": self.turns}
+
+    def new_turn(self, turn_number: int, question_text: str) -> Dict[str, Any]:
+        # The id is assigned here so later writes of the same turn are upserts
+        turn = {
+            "id": str(uuid.uuid4()),
+            "session_id": self.session["id"],
+            "turn_number": turn_number,
+            "question_text": question_text,
+            "answer_text": None,
+            "created_at": datetime.utcnow().isoformat()
+        }
+        self.turns.append(turn)
+        return turn
+
+
+class InterviewStateCache:
+    def __init__(self, ttl: int = INTERVIEW_STATE_TTL_SECONDS):
+        self.ttl = ttl
+        self.states: Dict[str, InterviewState] = {}
+        self.tasks: set = set()
+        self.last_sweep = time.monotonic()
+        self.counters = {"hits": 0, "rehydrated": 0, "evicted": 0, "writes": 0, "write_failures": 0}
+
+    async def get(self, session_id: str) -> Optional[InterviewState]:
+        self._sweep()
+        state = self.states.get(session_id)
+        if state:
+            self.counters["hits"] += 1
+        else:
+            state = await self._rehydrate(session_id)
+            if not state:
+                return None
+            # Another request may have rehydrated it meanwhile
+            state = self.states.setdefault(session_id, state)
+        state.last_access = time.monotonic()
+        return state
+
+    async def _rehydrate(self, session_id: str) -> Optional[InterviewState]:
+        session, turns = await asyncio.gather(
+            asyncio.to_thread(SupabaseService.get_interview_session, session_id),
+            asyncio.to_thread(SupabaseService.get_interview_turns, session_id),
+        )
+        if not session:
+            return None
+        resume = None
+        if session.get("resume_id") and not session.get("resume_text"):
+            resume = await asyncio.to_thread(SupabaseService.get_interview_resume, session["resume_id"])
+        self.counters["rehydrated"] += 1
+        return InterviewState(session, resume, list(turns or []))
+
+    def persist(self, state: InterviewState, turns: List[Dict[str, Any]], session_update: Optional[Dict[str, Any]] = None):
+        """Write the given turns and session fields in the background (one batch)"""
+        if session_update:
+            state.session.update(session_update)
+        batch = [dict(turn) for turn in turns]
+        task = asyncio.create_task(self._write(state, batch, dict(session_update or {})))
+        for tasks in (self.tasks, state.writes):
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    async def _write(self, state: InterviewState, turns: List[Dict[str, Any]], session_update: Dict[str, Any]):
+        session_id = state.session["id"]
+        # write_lock keeps one session's batches in order
+        async with state.write_lock:
+            for attempt in range(WRITE_RETRIES):
+                try:
+                    writes = []
+                    if turns:
+                        writes.append(asyncio.to_thread(SupabaseService.upsert_interview_turns, turns))
+                    if session_update:
+                        writes.append(asyncio.to_thread(SupabaseService.update_interview_session, session_id, session_update))
+                    results = await asyncio.gather(*writes)
+                    # Writers return False when Supabase rejected the write
+                    if all(results):
+                        self.counters["writes"] += 1
+                        return
+                    raise RuntimeError("write rejected")
+                except Exception as e:
+                    if attempt == WRITE_RETRIES - 1:
+                        self.counters["write_failures"] += 1
+                        logger.error(f"Interview state write failed for {session_id}: {e}")
+                        return
+                    await asyncio.sleep(2 ** attempt)
+
+    async def flush(self, session_id: Optional[str] = None):
+        """Wait for pending writes (of one session, or all)"""
+        if session_id:
+            state = self.states.get(session_id)
+            tasks = list(state.writes) if state else []
+        else:
+            tasks = list(self.tasks)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def drop(self, session_id: str):
+        self.states.pop(session_id, None)
+
+    def _sweep(self):
+        now = time.monotonic()
+        if now - self.last_sweep < SWEEP_INTERVAL_SECONDS:
+            return
+        self.last_sweep = now
+        expired = [sid for sid, s in self.states.items() if not s.writes and now - s.last_access > self.ttl]
+        for session_id in expired:
+            del self.states[session_id]
+        self.counters["evicted"] += len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "active": len(self.states), "pending_writes": len(self.tasks)}
+
+
+interview_states = InterviewStateCache()
@@ -0,0 +1,10 @@
+-- ================================================================
+-- Interview turns: per-turn evaluation (see InterviewOrchestrator)
+-- Each answer is scored in the background when it is submitted;
+-- finalize aggregates these instead of re-reading the transcript.
+-- Run this in Supabase SQL Editor (safe to re-run — uses IF NOT EXISTS)
+-- ================================================================
+
+ALTER TABLE interview_turns ADD COLUMN IF NOT EXISTS evaluation JSONB;
+
+SELECT 'Interview turn evaluations ready ✅' AS result;
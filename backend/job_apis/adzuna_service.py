@@ -7,6 +7,7 @@ import logging
 import os
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+from source_health import provider_trace
 
 logger = logging.getLogger(__name__)
 
@@ -59,7 +60,7 @@ class AdzunaService:
                 
             logger.info(f"Fetching Adzuna jobs - Page {page}, Keyword: {keyword}, Location: {location}")
             
-            async with aiohttp.ClientSession() as session:
+            async with aiohttp.ClientSession(trace_configs=[provider_trace("adzuna")]) as session:
                 async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=15)) as response:
                     if response.status != 200:
                         logger.error(f"Adzuna API error: {response.status}")
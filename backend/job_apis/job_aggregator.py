@@ -4,7 +4,7 @@ Fetches, deduplicates, and stores jobs from multiple APIs
 """
 import asyncio
 import logging
-from typing import List, Dict, Any, Set
+from typing import List, Dict, Any, Set, Tuple, Optional
 from datetime import datetime
 from pymongo import MongoClient
 import os
@@ -14,11 +14,80 @@ from job_apis.jsearch_service import JSearchService
 from job_apis.usajobs_service import USAJobsService
 from job_apis.rss_service import RSSJobService
 from supabase_service import SupabaseService
+from job_spool import get_job_spool
+from source_health import source_health
+from raw_archive import raw_archive, capture_unit
+from feed_watermarks import PendingWatermarks, collect_watermarks
 
 import logging
 print("LOADED NEW JOB AGGREGATOR")
 logger = logging.getLogger(__name__)
 
+# Boards crawled directly from the ATS (greenhouse: 80+, lever: 30+, ashby: 25+)
+GREENHOUSE_BOARDS = [
+    "stripe", "openai", "anthropic", "scale", "databricks", 
+    "pinterest", "gusto", "notion", "airtable", "roblox",
+    "cruise", "twitch", "discord", "plaid", "brex", "ramp",
+    "benchling", "faire", "verkada", "kearney", "fivetran",
+    "grammarly", "lattice", "dbt", "coda", "webflow", "duolingo",
+    "lemonade", "chime", "affirm", "cloudflare", "dropbox",
+    # New additions
+    "anduril", "rippling", "wiz-inc", "vanta", "snyk",
+    "hashicorp", "gitlab", "datadog", "elastic", "confluent",
+    "cockroachlabs", "samsara", "toast", "bill", "marqeta",
+    "thoughtspot", "allbirds", "peloton-interactive", "rivian",
+    "lucid-motors", "joby-aviation", "relativity-space",
+    "flexport", "miro", "calendly", "zapier", "canva",
+    "supabase", "vercel", "netlify", "clickup", "asana",
+    "monday", "amplitude", "mixpanel", "segment",
+    "twilio", "sendgrid", "contentful", "auth0",
+    "retool", "airbyte", "dbt-labs", "stytch",
+]
+
+LEVER_BOARDS = [
+    "netflix", "atlassian", "lyft", "palantir", "figma",
+    "benchling", "plaid", "affirm", "box", "sprout-social",
+    "udemy", "eventbrite", "farfetch", "instacart",
+    # New additions
+    "postman", "sourcegraph", "render", "supabase",
+    "loom", "notion", "descript", "pitch",
+    "replit", "assembly", "sanity-io", "ghost",
+    "clerk", "neon", "turso", "railway",
+]
+
+ASHBY_BOARDS = [
+    "deel", "ramp", "remote", "notion", "airtable",
+    "webflow", "retell", "clay", "perplexity", "modal", "linear",
+    # New additions
+    "cursor", "cohere", "mistral", "together-ai",
+    "weights-biases", "labelbox", "runway", "stability-ai",
+    "descript", "jasper", "copy-ai", "writer",
+    "assembled", "ashby",
+]
+
+JSEARCH_QUERIES = [
+    "software engineer",
+    "full stack developer",
+    "frontend developer", 
+    "backend developer",
+    "data scientist",
+    "product manager",
+    "devops engineer",
+    "site reliability engineer",
+    "machine learning engineer",
+    "artificial intelligence engineer",
+    "marketing manager",
+    "sales representative",
+    "account executive",
+    "business analyst", 
+    "project manager",
+    "hr manager",
+    "recruiter"
+]
+
+# Parallel fetches within one aggregate_units() call
+CRAWL_UNIT_CONCURRENCY = int(os.getenv("CRAWL_UNIT_CONCURRENCY", "4"))
+
 class JobAggregator:
     def __init__(self):
         """
@@ -54,8 +123,10 @@ class JobAggregator:
         """
         logger.info("Starting job aggregation from multiple sources...")
         start_time = datetime.now()
+        await asyncio.to_thread(source_health.restore)
         
         all_jobs = []
+        watermarks = None
         stats = {
             "adzuna": 0,
             "jsearch": 0,
@@ -84,29 +155,9 @@ class JobAggregator:
         if use_jsearch:
             try:
                 logger.info("Fetching jobs from JSearch...")
-                popular_queries = [
-                    "software engineer",
-                    "full stack developer",
-                    "frontend developer", 
-                    "backend developer",
-                    "data scientist",
-                    "product manager",
-                    "devops engineer",
-                    "site reliability engineer",
-                    "machine learning engineer",
-                    "artificial intelligence engineer",
-                    "marketing manager",
-                    "sales representative",
-                    "account executive",
-                    "business analyst", 
-                    "project manager",
-                    "hr manager",
-                    "recruiter"
-                ]
-                jsearch_jobs = await self.jsearch.fetch_multiple_queries(
-                    queries=popular_queries[:max_jsearch_queries],
-                    pages_per_query=3
-                )
+                jsearch_jobs = []
+                for query in JSEARCH_QUERIES[:max_jsearch_queries]:
+                    jsearch_jobs.extend(await self.fetch_unit("jsearch", query))
                 all_jobs.extend(jsearch_jobs)
                 stats["jsearch"] = len(jsearch_jobs)
                 logger.info(f"Fetched {len(jsearch_jobs)} jobs from JSearch")
@@ -118,7 +169,7 @@ class JobAggregator:
         if use_usajobs:
             try:
                 logger.info("Fetching jobs from USAJobs.gov...")
-                usajobs_jobs = await self.usajobs.fetch_all_pages(max_results=20000)
+                usajobs_jobs = await self.fetch_unit("usajobs", "all")
                 all_jobs.extend(usajobs_jobs)
                 stats["usajobs"] = len(usajobs_jobs)
                 logger.info(f"Fetched {len(usajobs_jobs)} jobs from USAJobs.gov")
@@ -130,7 +181,8 @@ class JobAggregator:
         if use_rss:
             try:
                 logger.info("Fetching jobs from RSS feeds...")
-                rss_jobs = await self.rss.fetch_popular_usa_jobs()
+                with collect_watermarks() as watermarks:
+                    rss_jobs = await self.rss.fetch_popular_usa_jobs()
                 all_jobs.extend(rss_jobs)
                 stats["rss"] = len(rss_jobs)
                 logger.info(f"Fetched {len(rss_jobs)} jobs from RSS feeds")
@@ -141,28 +193,8 @@ class JobAggregator:
         # Fetch from Direct ATS (Greenhouse & Lever & Ashby)
         try:
             logger.info("Fetching jobs from Greenhouse & Lever & Ashby...")
-            from job_fetcher import fetch_greenhouse_jobs, fetch_lever_jobs, fetch_ashby_jobs
-            
             # 1. Greenhouse (expanded to 60+ companies)
-            gh_companies = [
-                "stripe", "openai", "anthropic", "scale", "databricks", 
-                "pinterest", "gusto", "notion", "airtable", "roblox",
-                "cruise", "twitch", "discord", "plaid", "brex", "ramp",
-                "benchling", "faire", "verkada", "kearney", "fivetran",
-                "grammarly", "lattice", "dbt", "coda", "webflow", "duolingo",
-                "lemonade", "chime", "affirm", "cloudflare", "dropbox",
-                # New additions
-                "anduril", "rippling", "wiz-inc", "vanta", "snyk",
-                "hashicorp", "gitlab", "datadog", "elastic", "confluent",
-                "cockroachlabs", "samsara", "toast", "bill", "marqeta",
-                "thoughtspot", "allbirds", "peloton-interactive", "rivian",
-                "lucid-motors", "joby-aviation", "relativity-space",
-                "flexport", "miro", "calendly", "zapier", "canva",
-                "supabase", "vercel", "netlify", "clickup", "asana",
-                "monday", "amplitude", "mixpanel", "segment",
-                "twilio", "sendgrid", "contentful", "auth0",
-                "retool", "airbyte", "dbt-labs", "stytch",
-            ]
+            gh_companies = list(GREENHOUSE_BOARDS)
             import random
             random.shuffle(gh_companies)
             target_gh = gh_companies[:25] # Fetch from 25 random companies
@@ -170,50 +202,33 @@ class JobAggregator:
             gh_jobs = []
             for company in target_gh:
                 try:
-                    jobs = await fetch_greenhouse_jobs(company)
+                    jobs = await self.fetch_unit("greenhouse", company)
                     gh_jobs.extend(jobs)
                 except Exception as e:
                     logger.error(f"Failed GH fetch for {company}: {e}")
 
             # 2. Lever (expanded to 30+ companies)
-            lev_companies = [
-                "netflix", "atlassian", "lyft", "palantir", "figma",
-                "benchling", "plaid", "affirm", "box", "sprout-social",
-                "udemy", "eventbrite", "farfetch", "instacart",
-                # New additions
-                "postman", "sourcegraph", "render", "supabase",
-                "loom", "notion", "descript", "pitch",
-                "replit", "assembly", "sanity-io", "ghost",
-                "clerk", "neon", "turso", "railway",
-            ]
+            lev_companies = list(LEVER_BOARDS)
             random.shuffle(lev_companies)
             target_lev = lev_companies[:15]
             
             lev_jobs = []
             for company in target_lev:
                 try:
-                    jobs = await fetch_lever_jobs(company)
+                    jobs = await self.fetch_unit("lever", company)
                     lev_jobs.extend(jobs)
                 except Exception as e:
                     logger.error(f"Failed Lever fetch for {company}: {e}")
 
             # 3. Ashby (expanded to 25+ companies)
-            ashby_companies = [
-                "deel", "ramp", "remote", "notion", "airtable",
-                "webflow", "retell", "clay", "perplexity", "modal", "linear",
-                # New additions
-                "cursor", "cohere", "mistral", "together-ai",
-                "weights-biases", "labelbox", "runway", "stability-ai",
-                "descript", "jasper", "copy-ai", "writer",
-                "assembled", "ashby",
-            ]
+            ashby_companies = list(ASHBY_BOARDS)
             random.shuffle(ashby_companies)
             target_ashby = ashby_companies[:15]
             
             ashby_jobs = []
             for company in target_ashby:
                 try:
-                    company_jobs = await fetch_ashby_jobs(company)
+                    company_jobs = await self.fetch_unit("ashby", company)
                     ashby_jobs.extend(company_jobs)
                 except Exception as e:
                     logger.error(f"Failed Ashby fetch for {company}: {e}")
@@ -231,9 +246,117 @@ class JobAggregator:
             logger.error(f"Error fetching ATS jobs: {e}")
             stats["errors"].append(f"ATS: {str(e)}")
                 
+        return await self._finish(all_jobs, stats, start_time, watermarks)
+
+    async def fetch_unit(self, provider: str, board: str, incremental: bool = True) -> List[Dict[str, Any]]:
+        """
+        Fetch a single crawl unit - one ATS board, RSS feed, JSearch query or
+        the USAJobs feed. Crawl shards (crawl_shards.py) are built from these,
+        and raw responses are archived per unit (raw_archive.py).
+        incremental=False ignores RSS watermarks (used by reprocess.py).
+        """
+        with capture_unit(provider, board):
+            return await self._fetch_unit(provider, board, incremental)
+
+    async def _fetch_unit(self, provider: str, board: str, incremental: bool) -> List[Dict[str, Any]]:
+        from job_fetcher import fetch_greenhouse_jobs, fetch_lever_jobs, fetch_ashby_jobs
+
+        if provider == "greenhouse":
+            return await fetch_greenhouse_jobs(board)
+        if provider == "lever":
+            return await fetch_lever_jobs(board)
+        if provider == "ashby":
+            return await fetch_ashby_jobs(board)
+        if provider == "rss":
+            return await self.rss.fetch_jobs_from_feed(self.rss.feeds[board], board, incremental=incremental)
+        if provider == "jsearch":
+            return await self.jsearch.fetch_multiple_queries(queries=[board], pages_per_query=3)
+        if provider == "usajobs":
+            return await self.usajobs.fetch_all_pages(max_results=20000)
+        raise ValueError(f"Unknown crawl provider: {provider}")
+
+    async def aggregate_units(
+        self,
+        units: List[Tuple[str, str]],
+        concurrency: int = CRAWL_UNIT_CONCURRENCY
+    ) -> Dict[str, Any]:
+        """
+        Fetch the given (provider, board) units, then run the shared
+        filter / dedupe / store stage. Jobs land in the same spool as
+        aggregate_all_jobs, keyed by the content-hash job_id, so results
+        from different shards merge there.
+        """
+        logger.info(f"Starting aggregation of {len(units)} crawl units...")
+        start_time = datetime.now()
+        await asyncio.to_thread(source_health.restore)
+        stats: Dict[str, Any] = {
+            "units": len(units),
+            "total_fetched": 0,
+            "total_unique": 0,
+            "total_stored": 0,
+            "errors": []
+        }
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+        async def fetch(provider: str, board: str) -> List[Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    return await self.fetch_unit(provider, board)
+                except Exception as e:
+                    logger.error(f"Failed {provider} fetch for {board}: {e}")
+                    stats["errors"].append(f"{provider}/{board}: {str(e)}")
+                    return []
+
+        with collect_watermarks() as watermarks:
+            results = await asyncio.gather(*(fetch(provider, board) for provider, board in units))
+
+        all_jobs = []
+        for (provider, _), jobs in zip(units, results):
+            all_jobs.extend(jobs)
+            stats[provider] = stats.get(provider, 0) + len(jobs)
+
+        return await self._finish(all_jobs, stats, start_time, watermarks)
+
+    async def _finish(self, all_jobs: List[Dict[str, Any]], stats: Dict[str, Any], start_time: datetime,
+                      watermarks: Optional[PendingWatermarks] = None) -> Dict[str, Any]:
+        """
+        Shared tail of every aggregation: exclusion filter, dedupe, store.
+        RSS watermarks are saved only once the jobs are in the spool.
+        """
         stats["total_fetched"] = len(all_jobs)
         logger.info(f"Total jobs fetched from all sources: {len(all_jobs)}")
 
+        filtered_jobs = self._filter_jobs(all_jobs)
+        logger.info(f"Filtered {len(all_jobs)} down to {len(filtered_jobs)} jobs after applying exclusion rules.")
+        all_jobs = filtered_jobs
+        
+        # Deduplicate jobs
+        unique_jobs = self._deduplicate_jobs(all_jobs)
+        stats["total_unique"] = len(unique_jobs)
+        logger.info(f"Unique jobs after deduplication: {len(unique_jobs)}")
+        
+        # Store in Supabase
+        stored_count = await self._store_jobs(unique_jobs)
+        stats["total_stored"] = stored_count
+        if watermarks:
+            await asyncio.to_thread(watermarks.commit)
+        
+        elapsed_time = (datetime.now() - start_time).total_seconds()
+        stats["elapsed_seconds"] = elapsed_time
+
+        try:
+            await asyncio.to_thread(source_health.persist)
+        except Exception as e:
+            logger.error(f"Error persisting source health: {e}")
+        await asyncio.to_thread(raw_archive.flush)
+        await asyncio.to_thread(raw_archive.prune)
+        
+        logger.info(f"Job aggregation completed in {elapsed_time:.1f}s. Stored {stored_count} jobs in Supabase.")
+        
+        return stats
+
+    def _filter_jobs(self, all_jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop excluded sources and likely LinkedIn Easy Apply postings"""
         # --- USER REQUESTED FILTERING ---
         # Exclude: Adzuna, ZipRecruiter, Monster, Dice, Indeed, "Easy Apply"
         # Keep: Greenhouse, Lever, Ashby, Company Career Sites, LinkedIn (Non-Easy Apply)
@@ -274,25 +397,8 @@ class JobAggregator:
 
             filtered_jobs.append(job)
             
-        logger.info(f"Filtered {len(all_jobs)} down to {len(filtered_jobs)} jobs after applying exclusion rules.")
-        all_jobs = filtered_jobs
-        
-        # Deduplicate jobs
-        unique_jobs = self._deduplicate_jobs(all_jobs)
-        stats["total_unique"] = len(unique_jobs)
-        logger.info(f"Unique jobs after deduplication: {len(unique_jobs)}")
-        
-        # Store in Supabase
-        stored_count = await self._store_jobs(unique_jobs)
-        stats["total_stored"] = stored_count
-        
-        elapsed_time = (datetime.now() - start_time).total_seconds()
-        stats["elapsed_seconds"] = elapsed_time
-        
-        logger.info(f"Job aggregation completed in {elapsed_time:.1f}s. Stored {stored_count} jobs in Supabase.")
-        
-        return stats
-        
+        return filtered_jobs
+
     def generate_hr_contacts(self, company_name: str) -> List[Dict[str, str]]:
         """Generate 2-3 deterministic mock HR contacts for a company"""
         import hashlib
@@ -359,15 +465,9 @@ class JobAggregator:
         
         return unique_jobs
         
-    async def _store_jobs(self, jobs: List[Dict[str, Any]]) -> int:
-        """
-        Store jobs in Supabase with smart deduplication and updates.
-        Preserves rich descriptions if new fetch returns snippets.
-        """
-        if not jobs:
-            return 0
-            
-        stored_count = 0
+    def _prepare_jobs(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Stamp timestamps, HR contacts and the cross-source content-hash job_id"""
+        prepared = []
         
         for job in jobs:
             try:
@@ -390,35 +490,36 @@ class JobAggregator:
                 # This ensures the same job from different sources results in a single entry
                 unique_string = f"{title}|{company}|{location}"
                 job['job_id'] = hashlib.md5(unique_string.encode()).hexdigest()[:24]
-                
-                # Check for existing job to perform smart update
-                job_id = job.get('job_id')
-                existing = SupabaseService.get_job_by_external_id(job_id) if job_id else None
-                
-                if existing:
-                    # SMART UPDATE LOGIC
-                    old_desc = existing.get("description", "") or ""
-                    new_desc = job.get("description", "") or ""
-                    
-                    # If existing has a long description and new is short
-                    # KEEP EXISTING description
-                    if len(old_desc) > len(new_desc) + 100:
-                        job["description"] = old_desc
                             
                 # Final cleanup
                 job.pop('createdAt', None)
                 job.pop('updatedAt', None)
                 job.pop('fullDescription', None)
-                            
-                # Upsert to Supabase
-                SupabaseService.upsert_job(job)
-                stored_count += 1
+                
+                prepared.append(job)
                 
             except Exception as e:
                 logger.error(f"Error processing job {job.get('title', 'Unknown')}: {e}")
                 continue
+
+        return prepared
+
+    async def _store_jobs(self, jobs: List[Dict[str, Any]]) -> int:
+        """
+        Spool jobs for Supabase with smart deduplication and updates.
+        Preserves rich descriptions if new fetch returns snippets (applied by
+        the spool flusher against the stored row).
+        """
+        if not jobs:
+            return 0
+            
+        prepared = self._prepare_jobs(jobs)
+        
+        # Write-behind: the spool flusher upserts to Supabase in batches. Sanitizing
+        # a large crawl takes seconds, so it runs off the event loop
+        stored_count = await asyncio.to_thread(get_job_spool().enqueue, prepared, preserve_description=True)
                 
-        logger.info(f"Stored {stored_count} jobs in Supabase")
+        logger.info(f"Spooled {stored_count} jobs for Supabase")
         return stored_count
         
     async def refresh_jobs_light(self) -> Dict[str, Any]:
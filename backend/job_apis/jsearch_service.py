@@ -7,6 +7,7 @@ import logging
 import os
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+from source_health import provider_trace
 
 logger = logging.getLogger(__name__)
 
@@ -52,7 +53,7 @@ class JSearchService:
             
             logger.info(f"Fetching JSearch jobs - Query: {query}, Location: {location}, Page: {page}")
             
-            async with aiohttp.ClientSession() as session:
+            async with aiohttp.ClientSession(trace_configs=[provider_trace("jsearch")]) as session:
                 async with session.get(
                     self.base_url,
                     headers=self.headers,
@@ -2,11 +2,12 @@
 RSS Job Service - Free & Unlimited
 Fetches jobs from RSS feeds (RemoteOK, Remotive, We Work Remotely, etc.)
 """
-import aiohttp
+import asyncio
 import logging
-import feedparser
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+from feed_watermarks import fetch_new_entries, stage_watermark
+from raw_archive import capture_unit
 import re
 
 logger = logging.getLogger(__name__)
@@ -28,9 +29,11 @@ class RSSJobService:
             "WWR_Other": "https://weworkremotely.com/categories/all-other-remote-jobs.rss"
         }
 
-    async def fetch_jobs_from_feed(self, url: str, source_name: str) -> List[Dict[str, Any]]:
+    async def fetch_jobs_from_feed(self, url: str, source_name: str, incremental: bool = True) -> List[Dict[str, Any]]:
         """
-        Fetch and parse jobs from a specific RSS feed URL
+        Fetch jobs from a specific RSS feed URL. Only entries newer than the
+        feed's watermark are normalised; the advanced watermark is staged for
+        the current collect_watermarks() run (see feed_watermarks.py).
         """
         try:
             logger.info(f"Fetching RSS feed: {url}")
@@ -40,39 +43,35 @@ class RSSJobService:
                 "Accept-Language": "en-US,en;q=0.9",
                 "Referer": "https://www.google.com/",
             }
-            async with aiohttp.ClientSession(headers=headers) as session:
-                async with session.get(url, timeout=aiohttp.ClientTimeout(total=20)) as response:
-                    if response.status != 200:
-                        logger.error(f"RSS feed error {response.status} for {url}")
-                        return []
-                    
-                    content = await response.read()
-                    feed = feedparser.parse(content)
-                    
-                    normalized_jobs = []
-                    for entry in feed.entries:
-                        # Normalize entry to job schema
-                        title_full = entry.get('title', 'Unknown Title')
-                        
-                        # Source-specific company/title extraction
-                        company, title = self._parse_title(title_full, source_name, entry)
-                        
-                        job = {
-                            "title": title,
-                            "company": company,
-                            "location": "Remote",
-                            "description": entry.get('summary', '') or entry.get('description', ''),
-                            "url": entry.get('link', ''),
-                            "salary": "", # RSS feeds rarely have salary
-                            "datePosted": entry.get('published', datetime.now().isoformat()),
-                            "source": f"RSS-{source_name}",
-                            "workType": "Remote",
-                            "sponsorship": "Unknown"
-                        }
-                        normalized_jobs.append(job)
-                        
-                    logger.info(f"Fetched {len(normalized_jobs)} jobs from {source_name} RSS")
-                    return normalized_jobs
+            feed = f"rss:{source_name}"
+            entries, watermark = await fetch_new_entries(feed, url, headers=headers, incremental=incremental)
+
+            normalized_jobs = []
+            for entry in entries:
+                # Normalize entry to job schema
+                title_full = entry.get('title', 'Unknown Title')
+                
+                # Source-specific company/title extraction
+                company, title = self._parse_title(title_full, source_name, entry)
+                
+                job = {
+                    "title": title,
+                    "company": company,
+                    "location": "Remote",
+                    "description": entry.get('summary', '') or entry.get('description', ''),
+                    "url": entry.get('link', ''),
+                    "salary": "", # RSS feeds rarely have salary
+                    "datePosted": entry.get('published', datetime.now().isoformat()),
+                    "source": f"RSS-{source_name}",
+                    "workType": "Remote",
+                    "sponsorship": "Unknown"
+                }
+                normalized_jobs.append(job)
+                
+            logger.info(f"Fetched {len(normalized_jobs)} new jobs from {source_name} RSS")
+            # Saved by JobAggregator once these jobs are spooled
+            stage_watermark(feed, watermark)
+            return normalized_jobs
                     
         except Exception as e:
             logger.error(f"Error fetching RSS feed {url}: {e}")
@@ -122,10 +121,11 @@ class RSSJobService:
 
     async def fetch_popular_usa_jobs(self) -> List[Dict[str, Any]]:
         """
-        Fetch jobs from all configured RSS feeds
+        Fetch jobs from all configured RSS feeds concurrently
         """
-        all_jobs = []
-        for name, url in self.feeds.items():
-            jobs = await self.fetch_jobs_from_feed(url, name)
-            all_jobs.extend(jobs)
-        return all_jobs
+        async def fetch(name: str, url: str) -> List[Dict[str, Any]]:
+            with capture_unit("rss", name):
+                return await self.fetch_jobs_from_feed(url, name)
+
+        results = await asyncio.gather(*(fetch(name, url) for name, url in self.feeds.items()))
+        return [job for jobs in results for job in jobs]
@@ -7,6 +7,7 @@ import logging
 import os
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+from source_health import provider_trace
 import xml.etree.ElementTree as ET
 
 logger = logging.getLogger(__name__)
@@ -57,7 +58,7 @@ class USAJobsService:
                 
             logger.info(f"Fetching USAJobs - Page {page}, Keyword: {keyword}, Location: {location}")
             
-            async with aiohttp.ClientSession() as session:
+            async with aiohttp.ClientSession(trace_configs=[provider_trace("usajobs")]) as session:
                 async with session.get(
                     self.base_url,
                     headers=self.headers,
@@ -0,0 +1,389 @@
+"""
+Job Facets - In-memory facet index for the jobs filter sidebar
+
+Every indexed job gets a compact ordinal, and every facet value keeps a bitmap
+(a Python int used as a bitset) of the ordinals that carry it. Counting
+"senior remote engineering jobs posted this week" is then a handful of ANDs
+plus int.bit_count(), which takes microseconds, instead of one count="exact"
+query per checkbox.
+
+Counts are disjunctive: each facet is counted with every *other* active filter
+applied, so ticking "Senior" still shows how many Mid/Entry jobs there are.
+
+The index covers the same FACET_RETENTION_HOURS freshness window as the
+/api/jobs list (SupabaseService.get_jobs fresh_only, cleanup_old_jobs), and
+counts only jobs still inside it, so the sidebar agrees with the list.
+
+The index is maintained incrementally:
+- SupabaseService.upsert_job / upsert_jobs feed written rows straight in;
+  deactivations (mark_jobs_inactive, update_job) and cleanup deletes remove
+  jobs
+- run() is a background task started with the app: it builds the index, then
+  refresh()es it every FACET_SYNC_SECONDS, pulling rows created since the last
+  sync (writes made by other processes) and rebuilding from scratch every
+  FACET_REBUILD_SECONDS (which also compacts ordinals and picks up other
+  processes' deactivations). Requests never build the index; until the first
+  build is done (`ready`) the endpoint waits briefly, then reports it is
+  warming up
+
+Free-text search and country are not indexed; facet counts ignore them.
+"""
+
+import re
+import time
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Iterable, Callable
+
+from salary_parser import parse_salary_filter
+from job_normalizer import (
+    SENIORITY_LABELS, REMOTE_TYPE_LABELS,
+    experience_filter_codes, remote_type_filter_codes,
+)
+from job_function_classifier import FUNCTION_LABELS, function_filter_codes
+
+logger = logging.getLogger(__name__)
+
+# Same window as the /api/jobs list (get_jobs fresh_only) and cleanup_old_jobs
+FACET_RETENTION_HOURS = 72
+FACET_SYNC_SECONDS = 300
+FACET_REBUILD_SECONDS = 3600
+# How long /api/jobs/facets waits for the first build before answering 503
+FACET_WARMUP_WAIT_SECONDS = 5
+FACET_TOP_CITIES = 25
+
+FACET_COLUMNS = "id, created_at, is_active, source, location, categories, seniority, remote_type, function_codes, salary_max_usd"
+
+# Mirrors get_jobs; 7d and 30d cover the whole retention window, as they do in the list
+DATE_WINDOWS = {"24h": 24, "7d": 168, "30d": 720}
+SALARY_THRESHOLDS = {"50k": 50_000, "100k": 100_000, "150k": 150_000, "200k": 200_000}
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _city_key(location: Optional[str]) -> Optional[str]:
+    """'San Francisco, CA, United States' -> 'san francisco'"""
+    city = re.split(r"[,;/(|]", location or "")[0].strip().lower()
+    if not city or city in ("remote", "unknown", "anywhere", "multiple locations"):
+        return None
+    return city
+
+
+class FacetIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        # Set once the first rebuild finished
+        self.ready = threading.Event()
+        self._reset()
+        self.last_sync: Optional[float] = None
+        self.last_rebuild: Optional[float] = None
+        self.sync_high_water: Optional[str] = None
+
+    def _reset(self):
+        self.ordinals: Dict[str, int] = {}
+        self.next_ordinal = 0
+        self.alive = 0
+        self.live = 0
+        # facet -> value -> bitmap
+        self.bitmaps: Dict[str, Dict[str, int]] = {
+            "job_functions": {},
+            "experience": {},
+            "type": {},
+            "cities": {},
+            "visa": {},
+            "salary": {},
+            # Not a sidebar facet: lets mark_jobs_inactive drop a source's jobs
+            "sources": {},
+        }
+        # hour bucket (epoch hours) -> bitmap
+        self.hours: Dict[int, int] = {}
+        # ordinal -> salary_max_usd, for filter values outside SALARY_THRESHOLDS
+        self.salaries: Dict[int, int] = {}
+        self.city_names: Dict[str, str] = {}
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def _set(self, facet: str, value: Optional[str], bit: int):
+        if value:
+            values = self.bitmaps[facet]
+            values[value] = values.get(value, 0) | bit
+
+    def _remove_ordinal(self, ordinal: int):
+        mask = ~(1 << ordinal)
+        self.live &= mask
+        for values in self.bitmaps.values():
+            for value in list(values):
+                values[value] &= mask
+                if not values[value]:
+                    del values[value]
+        for hour in list(self.hours):
+            self.hours[hour] &= mask
+            if not self.hours[hour]:
+                del self.hours[hour]
+        self.salaries.pop(ordinal, None)
+        self.alive -= 1
+
+    def _add_locked(self, job: Dict[str, Any]):
+        job_id = job.get("id")
+        created_at = _parse_timestamp(job.get("created_at"))
+        if not job_id or not created_at:
+            return
+        if job_id in self.ordinals:
+            self._remove_ordinal(self.ordinals.pop(job_id))
+        if job.get("is_active") is False:
+            return
+        if created_at < datetime.now(timezone.utc) - timedelta(hours=FACET_RETENTION_HOURS):
+            return
+
+        ordinal = self.next_ordinal
+        self.next_ordinal += 1
+        self.ordinals[job_id] = ordinal
+        self.alive += 1
+        bit = 1 << ordinal
+        self.live |= bit
+
+        for code in job.get("function_codes") or []:
+            self._set("job_functions", code, bit)
+        self._set("experience", job.get("seniority"), bit)
+        self._set("type", job.get("remote_type"), bit)
+        self._set("sources", job.get("source"), bit)
+        if "sponsoring" in (job.get("categories") or []):
+            self._set("visa", "sponsoring", bit)
+
+        city = _city_key(job.get("location"))
+        if city:
+            self._set("cities", city, bit)
+            self.city_names.setdefault(city, re.split(r"[,;/(|]", job["location"])[0].strip())
+
+        hour = int(created_at.timestamp() // 3600)
+        self.hours[hour] = self.hours.get(hour, 0) | bit
+
+        if job.get("salary_max_usd"):
+            salary = int(job["salary_max_usd"])
+            self.salaries[ordinal] = salary
+            for key, amount in SALARY_THRESHOLDS.items():
+                if salary >= amount:
+                    self._set("salary", key, bit)
+
+    def add_jobs(self, jobs: Iterable[Dict[str, Any]]):
+        """Index (or re-index) stored job rows; rows must include id and created_at"""
+        with self.lock:
+            for job in jobs:
+                self._add_locked(job)
+
+    def remove_jobs(self, job_ids: Iterable[str]):
+        """Drop deleted or deactivated jobs (by id)"""
+        with self.lock:
+            for job_id in job_ids:
+                if job_id in self.ordinals:
+                    self._remove_ordinal(self.ordinals.pop(job_id))
+
+    def remove_sources(self, sources: Iterable[str]):
+        """Drop every job of deactivated sources"""
+        with self.lock:
+            bitmap = self._union("sources", sources)
+            for job_id, ordinal in list(self.ordinals.items()):
+                if bitmap >> ordinal & 1:
+                    self._remove_ordinal(ordinal)
+                    del self.ordinals[job_id]
+
+    def _load(self, fetch_batch: Callable[..., List[Dict[str, Any]]], created_after: str) -> int:
+        loaded = 0
+        last_id = None
+        while True:
+            rows = fetch_batch(after_id=last_id, limit=1000, columns=FACET_COLUMNS, created_after=created_after)
+            if not rows:
+                break
+            last_id = rows[-1]["id"]
+            self.add_jobs(rows)
+            loaded += len(rows)
+            for row in rows:
+                if row.get("created_at") and (not self.sync_high_water or row["created_at"] > self.sync_high_water):
+                    self.sync_high_water = row["created_at"]
+        return loaded
+
+    def rebuild(self, fetch_batch: Callable[..., List[Dict[str, Any]]]) -> int:
+        """Reload the retention window from the database into a fresh index"""
+        start = time.time()
+        fresh = FacetIndex()
+        cutoff = (datetime.utcnow() - timedelta(hours=FACET_RETENTION_HOURS)).isoformat()
+        loaded = fresh._load(fetch_batch, cutoff)
+        with self.lock:
+            self.ordinals, self.next_ordinal = fresh.ordinals, fresh.next_ordinal
+            self.alive, self.live = fresh.alive, fresh.live
+            self.bitmaps, self.hours, self.salaries = fresh.bitmaps, fresh.hours, fresh.salaries
+            self.city_names = fresh.city_names
+            self.sync_high_water = fresh.sync_high_water
+            self.last_rebuild = self.last_sync = time.time()
+        self.ready.set()
+        logger.info(f"📊 Facet index rebuilt: {loaded} jobs in {time.time() - start:.1f}s")
+        return loaded
+
+    def refresh(self, fetch_batch: Callable[..., List[Dict[str, Any]]]):
+        """Rebuild or incrementally sync if the index is stale (no-op if a refresh is running)"""
+        if not self.refresh_lock.acquire(blocking=False):
+            return
+        try:
+            now = time.time()
+            if not self.last_rebuild or now - self.last_rebuild > FACET_REBUILD_SECONDS:
+                self.rebuild(fetch_batch)
+            elif now - (self.last_sync or 0) > FACET_SYNC_SECONDS:
+                loaded = self._load(fetch_batch, self.sync_high_water)
+                self.last_sync = now
+                if loaded:
+                    logger.info(f"📊 Facet index synced {loaded} new jobs")
+        finally:
+            self.refresh_lock.release()
+
+    async def run(self, fetch_batch: Callable[..., List[Dict[str, Any]]]):
+        """Background task: first build right away, then refresh every FACET_SYNC_SECONDS"""
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh, fetch_batch)
+            except Exception as e:
+                logger.error(f"Facet index refresh failed: {e}")
+            await asyncio.sleep(FACET_SYNC_SECONDS)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _union(self, facet: str, values: Iterable[str]) -> int:
+        bitmap = 0
+        for value in values:
+            bitmap |= self.bitmaps[facet].get(value, 0)
+        return bitmap
+
+    def _window(self, hours: int) -> int:
+        start = int(time.time() // 3600) - hours
+        bitmap = 0
+        for hour, bits in self.hours.items():
+            if hour >= start:
+                bitmap |= bits
+        return bitmap
+
+    def _salary_at_least(self, amount: int) -> int:
+        for key, threshold in SALARY_THRESHOLDS.items():
+            if threshold == amount:
+                return self.bitmaps["salary"].get(key, 0)
+        bitmap = 0
+        for ordinal, salary in self.salaries.items():
+            if salary >= amount:
+                bitmap |= 1 << ordinal
+        return bitmap
+
+    def _filter_bitmaps(
+        self,
+        job_functions: Optional[str],
+        experience: Optional[str],
+        job_type: Optional[str],
+        cities: Optional[str],
+        visa: bool,
+        date_posted: Optional[str],
+        salary: Optional[str],
+    ) -> Dict[str, int]:
+        """Active filter -> bitmap of matching ordinals (mirrors SupabaseService.get_jobs)"""
+        filters: Dict[str, int] = {}
+        if job_functions:
+            codes = function_filter_codes(job_functions)
+            if codes:
+                filters["job_functions"] = self._union("job_functions", codes)
+        if experience:
+            codes = experience_filter_codes(experience)
+            if codes:
+                filters["experience"] = self._union("experience", codes)
+        if job_type and job_type != "all":
+            codes = remote_type_filter_codes(job_type)
+            if codes:
+                filters["type"] = self._union("type", codes)
+        if cities:
+            wanted = [c.strip().lower() for c in cities.split(",") if c.strip()]
+            filters["cities"] = self._union(
+                "cities", [city for city in self.bitmaps["cities"] if any(w in city for w in wanted)]
+            )
+        if visa:
+            filters["visa"] = self.bitmaps["visa"].get("sponsoring", 0)
+        if date_posted in DATE_WINDOWS:
+            filters["date_posted"] = self._window(DATE_WINDOWS[date_posted])
+        min_salary = parse_salary_filter(salary)
+        if min_salary:
+            filters["salary"] = self._salary_at_least(min_salary)
+        return filters
+
+    def counts(
+        self,
+        job_functions: Optional[str] = None,
+        experience: Optional[str] = None,
+        job_type: Optional[str] = None,
+        cities: Optional[str] = None,
+        visa: bool = False,
+        date_posted: Optional[str] = None,
+        salary: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Facet counts for the sidebar, each conditioned on all other active filters"""
+        with self.lock:
+            filters = self._filter_bitmaps(job_functions, experience, job_type, cities, visa, date_posted, salary)
+
+            # Jobs age out of the window between rebuilds
+            fresh = self.live & self._window(FACET_RETENTION_HOURS)
+
+            def base(excluding: str) -> int:
+                bitmap = fresh
+                for name, bits in filters.items():
+                    if name != excluding:
+                        bitmap &= bits
+                return bitmap
+
+            def value_counts(facet: str, labels: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+                scope = base(facet)
+                result = []
+                for value, bits in self.bitmaps[facet].items():
+                    count = (bits & scope).bit_count()
+                    if count:
+                        label = (labels or {}).get(value) or self.city_names.get(value, value)
+                        result.append({"value": value, "label": label, "count": count})
+                result.sort(key=lambda item: item["count"], reverse=True)
+                return result
+
+            date_scope = base("date_posted")
+            salary_scope = base("salary")
+            return {
+                "total": base("").bit_count(),
+                "facets": {
+                    "job_functions": value_counts("job_functions", FUNCTION_LABELS),
+                    "experience": value_counts("experience", SENIORITY_LABELS),
+                    "type": value_counts("type", REMOTE_TYPE_LABELS),
+                    "cities": value_counts("cities")[:FACET_TOP_CITIES],
+                    "visa": [{
+                        "value": "sponsoring",
+                        "label": "Visa sponsorship",
+                        "count": (self.bitmaps["visa"].get("sponsoring", 0) & base("visa")).bit_count(),
+                    }],
+                    "date_posted": [
+                        {"value": key, "count": (self._window(hours) & date_scope).bit_count()}
+                        for key, hours in DATE_WINDOWS.items()
+                    ],
+                    "salary": [
+                        {"value": key, "count": (self.bitmaps["salary"].get(key, 0) & salary_scope).bit_count()}
+                        for key in SALARY_THRESHOLDS
+                    ],
+                },
+                "indexedJobs": self.alive,
+                "lastSync": datetime.fromtimestamp(self.last_sync, timezone.utc).isoformat() if self.last_sync else None,
+            }
+
+
+facet_index = FacetIndex()
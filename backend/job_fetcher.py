@@ -13,12 +13,14 @@ import aiohttp
 import asyncio
 import os
 import logging
-import feedparser
 import hashlib
 import html
 from datetime import datetime, timezone, timedelta
 from typing import List, Dict, Any, Optional
-from supabase_service import SupabaseService
+from job_spool import get_job_spool
+from source_health import provider_trace, source_health
+from feed_watermarks import fetch_new_entries, stage_watermark
+from detail_cache import get_detail_cache, listing_signature
 import re
 import json
 
@@ -318,7 +320,7 @@ async def fetch_jobs_from_adzuna(
         params["where"] = where
     
     try:
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[provider_trace("adzuna")]) as session:
             async with session.get(url, params=params, timeout=30) as response:
                 if response.status != 200:
                     logger.error(f"Adzuna API error: {response.status}")
@@ -399,7 +401,7 @@ async def fetch_jobs_from_remoteok() -> List[Dict[str, Any]]:
             "User-Agent": "NovaNinjas/1.0 (Job Aggregator)"
         }
         
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[provider_trace("remoteok")]) as session:
             async with session.get(REMOTEOK_API_URL, headers=headers, timeout=30) as response:
                 if response.status != 200:
                     logger.error(f"RemoteOK API error: {response.status}")
@@ -510,7 +512,7 @@ async def fetch_jobs_from_remotive(category: str = None, limit: int = 500) -> Li
         if category:
             params["category"] = category
         
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[provider_trace("remotive")]) as session:
             async with session.get(REMOTIVE_API_URL, params=params, timeout=30) as response:
                 if response.status != 200:
                     logger.error(f"Remotive API error: {response.status}")
@@ -636,7 +638,7 @@ async def fetch_jobs_from_jobicy(count: int = 50, geo: str = None, industry: str
         if industry:
             params["industry"] = industry
         
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[provider_trace("jobicy")]) as session:
             async with session.get(JOBICY_API_URL, params=params, timeout=30) as response:
                 if response.status != 200:
                     logger.error(f"Jobicy API error: {response.status}")
@@ -731,16 +733,17 @@ async def fetch_jobs_from_jobicy(count: int = 50, geo: str = None, industry: str
 # API 6: Y Combinator Jobs RSS (FREE - Startup Jobs!)
 # =============================================================================
 
-async def fetch_jobs_from_yc_rss() -> List[Dict[str, Any]]:
+async def fetch_jobs_from_yc_rss(incremental: bool = True) -> List[Dict[str, Any]]:
     """
     Fetch startup jobs from Y Combinator RSS feed
     FREE - No authentication required!
+    Only entries past the feed watermark are returned unless incremental=False.
     """
     try:
-        feed = feedparser.parse(YC_JOBS_RSS_URL)
+        entries, watermark = await fetch_new_entries("yc_rss", YC_JOBS_RSS_URL, incremental=incremental)
         jobs = []
         
-        for entry in feed.entries:
+        for entry in entries:
             title_parts = entry.title.split(' at ')
             if len(title_parts) >= 2:
                 title = title_parts[0]
@@ -791,7 +794,8 @@ async def fetch_jobs_from_yc_rss() -> List[Dict[str, Any]]:
             }
             jobs.append(job_data)
             
-        logger.info(f"✅ Y Combinator: Fetched {len(jobs)} startup jobs")
+        logger.info(f"✅ Y Combinator: Fetched {len(jobs)} new startup jobs")
+        stage_watermark("yc_rss", watermark)
         return jobs
         
     except Exception as e:
@@ -810,7 +814,7 @@ async def fetch_greenhouse_jobs(company_id: str) -> List[Dict[str, Any]]:
     url = f"https://boards-api.greenhouse.io/v1/boards/{company_id}/jobs?content=true"
     
     try:
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[provider_trace("greenhouse")]) as session:
             async with session.get(url, timeout=30) as response:
                 if response.status != 200:
                     logger.warning(f"Greenhouse board not found for {company_id}")
@@ -867,7 +871,7 @@ async def fetch_lever_jobs(company_id: str) -> List[Dict[str, Any]]:
     url = f"https://api.lever.co/v0/postings/{company_id}?mode=json"
     
     try:
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[provider_trace("lever")]) as session:
             async with session.get(url, timeout=30) as response:
                 if response.status != 200:
                     logger.warning(f"Lever board not found for {company_id}")
@@ -927,172 +931,188 @@ async def fetch_lever_jobs(company_id: str) -> List[Dict[str, Any]]:
 # NEW: Ashby Scrapers (No API Key!)
 # =============================================================================
 
+ASHBY_GRAPHQL_URL = "https://jobs.ashbyhq.com/api/non-user-graphql?op=ApiJobBoardWithTeams"
+ASHBY_DETAIL_CONCURRENCY = 10
+ASHBY_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "application/json",
+    "Accept-Encoding": "gzip, deflate", # No brotli
+    "Content-Type": "application/json"
+}
+ASHBY_BOARD_QUERY = """
+query ApiJobBoardWithTeams($organizationHostedJobsPageName: String!) {
+  jobBoard: jobBoardWithTeams(
+    organizationHostedJobsPageName: $organizationHostedJobsPageName
+  ) {
+    jobPostings {
+      id
+      title
+      locationName
+      employmentType
+      secondaryLocations {
+        locationName
+      }
+      compensationTierSummary
+    }
+  }
+}
+"""
+_ASHBY_APP_DATA = "window.__appData"
+_ASHBY_DESCRIPTION_KEYS = [
+    re.compile(r'"descriptionHtml"\s*:\s*'),
+    re.compile(r'"descriptionPlainText"\s*:\s*'),
+]
+
+
+def extract_ashby_description(page: str) -> Optional[str]:
+    """
+    Pull the posting description out of an Ashby job page.
+    Decodes only the descriptionHtml string inside window.__appData instead of
+    parsing the whole app state.
+    """
+    start = page.find(_ASHBY_APP_DATA)
+    if start == -1:
+        return None
+    decoder = json.JSONDecoder()
+    for key in _ASHBY_DESCRIPTION_KEYS:
+        match = key.search(page, start)
+        if not match:
+            continue
+        try:
+            value, _ = decoder.raw_decode(page, match.end())
+        except ValueError:
+            continue
+        if isinstance(value, str) and value.strip():
+            return value
+    return None
+
+
+def _ashby_signature(posting: Dict[str, Any]) -> str:
+    # The public board query has no updatedAt; use it when Ashby sends one,
+    # otherwise the listing fields that change with an edited posting
+    return listing_signature(
+        posting.get("updatedAt"), posting.get("title"), posting.get("locationName"),
+        posting.get("employmentType"), posting.get("compensationTierSummary")
+    )
+
+
 async def fetch_ashby_jobs(company_id: str) -> List[Dict[str, Any]]:
     """
     Fetch jobs from Ashby:
-    1. Get list via GraphQL (fast)
-    2. Concurrently fetch HTML for each job to get full description (slow but necessary)
+    1. List postings via the public GraphQL board query
+    2. Fetch the job page only for postings that are new or changed since the
+       last crawl (detail_cache.py); cached descriptions are reused
     """
-    gql_url = "https://jobs.ashbyhq.com/api/non-user-graphql?op=ApiJobBoardWithTeams"
-    
-    # 1. Fetch List
-    jobs_list = []
-    try:
-        payload = {
-            "operationName": "ApiJobBoardWithTeams",
-            "variables": { "organizationHostedJobsPageName": company_id },
-            "query": """
-            query ApiJobBoardWithTeams($organizationHostedJobsPageName: String!) {
-              jobBoard: jobBoardWithTeams(
-                organizationHostedJobsPageName: $organizationHostedJobsPageName
-              ) {
-                jobPostings {
-                  id
-                  title
-                  locationName
-                  employmentType
-                  secondaryLocations {
-                    locationName
-                  }
-                  compensationTierSummary
-                }
-              }
-            }
-            """
-        }
-        
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "application/json",
-            "Accept-Encoding": "gzip, deflate",
-            "Content-Type": "application/json"
-        }
+    payload = {
+        "operationName": "ApiJobBoardWithTeams",
+        "variables": { "organizationHostedJobsPageName": company_id },
+        "query": ASHBY_BOARD_QUERY
+    }
+    cache = get_detail_cache()
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(gql_url, json=payload, headers=headers) as response:
+    try:
+        async with aiohttp.ClientSession(trace_configs=[provider_trace("ashby")]) as session:
+            async with session.post(ASHBY_GRAPHQL_URL, json=payload, headers=ASHBY_HEADERS, timeout=30) as response:
                 if response.status != 200:
-                    logger.warning(f"Ashby GraphQL failed for {company_id}: {response.status}")
+                    logger.warning(f"Ashby API failed for {company_id}: {response.status}")
                     return []
-                
+
                 data = await response.json()
-                job_board = data.get("data", {}).get("jobBoard")
+                if data.get("errors"):
+                    source_health.report_failure("ashby", ASHBY_GRAPHQL_URL, f"GraphQL: {str(data['errors'])[:200]}")
+                job_board = (data.get("data") or {}).get("jobBoard")
                 if not job_board:
                     return []
-                jobs_list = job_board.get("jobPostings", [])
-                
-    except Exception as e:
-        logger.error(f"Error fetching Ashby list for {company_id}: {e}")
-        return []
+                postings = [p for p in job_board.get("jobPostings", []) if p.get("id")]
+
+            signatures = {p["id"]: _ashby_signature(p) for p in postings}
+            descriptions = await asyncio.to_thread(cache.lookup, "ashby", company_id, signatures)
+            stale = [p for p in postings if p["id"] not in descriptions]
+            if stale:
+                logger.info(f"Ashby: Fetching details for {len(stale)}/{len(postings)} new or changed jobs from {company_id}...")
+
+            sem = asyncio.Semaphore(ASHBY_DETAIL_CONCURRENCY)
+
+            async def fetch_detail(posting: Dict[str, Any]) -> Optional[Dict[str, str]]:
+                job_url = f"https://jobs.ashbyhq.com/{company_id}/{posting['id']}"
+                async with sem:
+                    try:
+                        async with session.get(job_url, headers={"User-Agent": ASHBY_HEADERS["User-Agent"]}, timeout=20) as resp:
+                            if resp.status != 200:
+                                return None
+                            page = await resp.text()
+                    except Exception as e:
+                        logger.debug(f"Ashby detail failed for {job_url}: {e}")
+                        return None
+                description = extract_ashby_description(page)
+                if not description:
+                    return None
+                return {"posting_id": posting["id"], "signature": signatures[posting["id"]], "description": description}
+
+            fetched = [d for d in await asyncio.gather(*[fetch_detail(p) for p in stale]) if d]
+
+        descriptions.update({d["posting_id"]: d["description"] for d in fetched})
+        await asyncio.to_thread(cache.store, "ashby", company_id, fetched)
+        await asyncio.to_thread(cache.retain, "ashby", company_id, signatures.keys())
 
-    # 2. Fetch Details (HTML Scraping)
-    if not jobs_list:
+    except Exception as e:
+        logger.error(f"Error fetching Ashby jobs for {company_id}: {e}")
         return []
 
-    logger.info(f"Ashby: Fetching details for {len(jobs_list)} jobs from {company_id}...")
-    sem = asyncio.Semaphore(10) # Limit concurrency
-    
-    import re
-    import json
-    from bs4 import BeautifulSoup
-    
-    async def fetch_detail(job_summary):
-        job_id = job_summary.get("id")
-        title = job_summary.get("title")
+    jobs = []
+    for posting in postings:
+        job_id = posting["id"]
+        title = posting.get("title")
         job_url = f"https://jobs.ashbyhq.com/{company_id}/{job_id}"
-        
-        full_desc = "See full job post"
-        desc_text = title
-        
-        async with sem:
-            try:
-                # Reuse session? Better to create one or pass it. Creating one for simplicity/isolation
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(job_url, headers={"User-Agent": headers["User-Agent"]}, timeout=20) as resp:
-                        if resp.status == 200:
-                            html = await resp.text()
-                            
-                            # Extract JSON
-                            pattern = re.compile(r'window\.__appData\s*=\s*({.+?});', re.DOTALL)
-                            match = pattern.search(html)
-                            if match:
-                                try:
-                                    data = json.loads(match.group(1))
-                                    
-                                    # Recursive find description
-                                    def find_key(obj, key):
-                                        if isinstance(obj, dict):
-                                            if key in obj: return obj[key]
-                                            for k, v in obj.items():
-                                                res = find_key(v, key)
-                                                if res: return res
-                                        elif isinstance(obj, list):
-                                            for item in obj:
-                                                res = find_key(item, key)
-                                                if res: return res
-                                        return None
-
-                                    html_desc = find_key(data, "descriptionHtml")
-                                    if html_desc:
-                                        full_desc = html_desc
-                                        # Parse text from HTML for snippet
-                                        soup = BeautifulSoup(html_desc, 'html.parser')
-                                        desc_text = soup.get_text()[:500] + "..."
-                                    else:
-                                        plain_desc = find_key(data, "description")
-                                        if plain_desc:
-                                            full_desc = plain_desc
-                                            desc_text = plain_desc[:500] + "..."
-                                            
-                                except:
-                                    pass # JSON parse fail, keep defaults
-            except Exception as e:
-                # logger.warning(f"Failed to fetch details for {job_id}: {e}")
-                pass
-        
-        # Merge data
-        loc_name = job_summary.get("locationName", "")
-        sec_locs = job_summary.get("secondaryLocations", [])
-        if sec_locs:
-            loc_extras = [l["locationName"] for l in sec_locs if l.get("locationName")]
-            if loc_extras:
-                loc_name += f" (+ {', '.join(loc_extras)})"
-                
-        salary = job_summary.get("compensationTierSummary") or "Competitive"
-        
-        # Parse sections
-        sections = parse_job_sections(full_desc)
-        is_visa = detect_visa_sponsorship(full_desc)
+
+        loc_name = posting.get("locationName") or ""
+        sec_locs = posting.get("secondaryLocations") or []
+        loc_extras = [l["locationName"] for l in sec_locs if l.get("locationName")]
+        if loc_extras:
+            loc_name += f" (+ {', '.join(loc_extras)})"
+
+        salary = posting.get("compensationTierSummary") or "Competitive"
+        full_desc = descriptions.get(job_id)
+
+        if full_desc:
+            sections = parse_job_sections(full_desc)
+            is_visa = detect_visa_sponsorship(full_desc)
+            snippet = re.sub(r'\s+', ' ', re.sub(r'<[^>]+>', ' ', html.unescape(full_desc))).strip()
+            description = snippet[:500] + "..." if len(snippet) > 500 else snippet
+        else:
+            # Detail page unavailable: listing-only record, filled in on a later crawl
+            sections = {"responsibilities": "See full job post", "qualifications": "See full job post", "benefits": "See full job post"}
+            is_visa = False
+            description = title
+            full_desc = f"Apply at: {job_url}"
+
         work_type = "remote" if "remote" in loc_name.lower() else "onsite"
-        
-        return {
+        jobs.append({
             "externalId": f"ashby-{company_id}-{job_id}",
             "title": title,
             "company": company_id.capitalize(),
             "location": loc_name,
-            "description": sanitize_description(desc_text),
+            "description": sanitize_description(description),
             "responsibilities": sanitize_description(sections["responsibilities"]),
             "qualifications": sanitize_description(sections["qualifications"]),
             "benefits": sanitize_description(sections["benefits"]),
-            "fullDescription": sanitize_description(full_desc), # Store FULL HTML
+            "fullDescription": sanitize_description(full_desc),
             "salaryRange": salary,
             "sourceUrl": job_url,
             "source": "ashby",
             "type": work_type,
             "visaTags": ["visa-sponsoring"] if is_visa else [],
-            "categoryTags": build_job_tags({"visaTags": is_visa, "type": work_type}),
+            "categoryTags": ["startup", "ashby"] + build_job_tags({"visaTags": is_visa, "type": work_type}),
             "createdAt": datetime.now(timezone.utc),
             "updatedAt": datetime.now(timezone.utc),
-            "isActive": True
-        }
+            "isActive": True,
+            # Placeholder sections; reprocess.py must not overwrite a stored job with this
+            "detailUnavailable": not descriptions.get(job_id)
+        })
+
+    logger.info(f"✅ Ashby: Fetched {len(jobs)} jobs for {company_id} ({len(fetched)} details fetched, {len(postings) - len(stale)} cached)")
+    return jobs
 
-    # Run concurrent fetches
-    tasks = [fetch_detail(job) for job in jobs_list]
-    results = await asyncio.gather(*tasks)
-    
-    # Filter nones
-    valid_jobs = [j for j in results if j]
-    logger.info(f"✅ Ashby: Fetched {len(valid_jobs)} jobs with details for {company_id}")
-    return valid_jobs
 
 # =============================================================================
 # NEW: Workday Scraper (Internal API)
@@ -1106,7 +1126,7 @@ async def fetch_workday_jobs(tenant: str, site: str) -> List[Dict[str, Any]]:
     base_url = f"https://{tenant}.wd1.myworkdayjobs.com/wday/cxs/{tenant}/{site}/jobs"
     
     try:
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[provider_trace("workday")]) as session:
             # Payload to get all jobs, US only if possible
             payload = {
                 "appliedFacets": {"locationCountry": ["bc33aa3152ec42d4995f4791a106ed09"]}, # US Country ID (often standard)
@@ -1175,107 +1195,6 @@ async def fetch_workday_jobs(tenant: str, site: str) -> List[Dict[str, Any]]:
         logger.error(f"Error fetching Workday jobs for {tenant}: {e}")
         return []
 
-# =============================================================================
-# NEW: Paylocity Scraper (Custom Wrapper)
-# =============================================================================
-
-async def fetch_ashby_jobs(company_id: str) -> List[Dict[str, Any]]:
-    """
-    Fetch jobs from Ashby using their public GraphQL API.
-    Endpoint: https://jobs.ashbyhq.com/api/non-user-graphql?op=ApiJobBoardWithTeams
-    """
-    url = "https://jobs.ashbyhq.com/api/non-user-graphql?op=ApiJobBoardWithTeams"
-    payload = {
-        "operationName": "ApiJobBoardWithTeams",
-        "variables": { "organizationHostedJobsPageName": company_id },
-        "query": """
-        query ApiJobBoardWithTeams($organizationHostedJobsPageName: String!) {
-          jobBoard: jobBoardWithTeams(
-            organizationHostedJobsPageName: $organizationHostedJobsPageName
-          ) {
-            jobPostings {
-              id
-              title
-              locationName
-              employmentType
-              secondaryLocations {
-                locationName
-              }
-              compensationTierSummary
-            }
-          }
-        }
-        """
-    }
-    
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Accept": "application/json",
-        "Accept-Encoding": "gzip, deflate", # No brotli
-        "Content-Type": "application/json"
-    }
-
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload, headers=headers) as response:
-                if response.status != 200:
-                    logger.warning(f"Ashby API failed for {company_id}: {response.status}")
-                    return []
-                
-                data = await response.json()
-                job_board = data.get("data", {}).get("jobBoard")
-                if not job_board:
-                    return []
-                    
-                raw_jobs = job_board.get("jobPostings", [])
-                jobs = []
-                
-                for job in raw_jobs:
-                    job_id = job.get("id")
-                    title = job.get("title")
-                    loc_name = job.get("locationName", "")
-                    
-                    # Handle secondary locations
-                    sec_locs = job.get("secondaryLocations", [])
-                    if sec_locs:
-                        loc_extras = [l["locationName"] for l in sec_locs if l.get("locationName")]
-                        if loc_extras:
-                            loc_name += f" (+ {', '.join(loc_extras)})"
-                            
-                    salary = job.get("compensationTierSummary") or "Competitive"
-                    emp_type = job.get("employmentType", "Full Time")
-                    
-                    job_url = f"https://jobs.ashbyhq.com/{company_id}/{job_id}"
-                    
-                    job_data = {
-                        "externalId": f"ashby-{company_id}-{job_id}",
-                        "title": title,
-                        "company": company_id.capitalize(),
-                        "location": loc_name,
-                        "description": title, # Description is detailed in individual job query, keep simple here
-                        "responsibilities": "See full job post",
-                        "qualifications": "See full job post",
-                        "benefits": "See full job post",
-                        "fullDescription": f"Apply at: {job_url}",
-                        "salaryRange": salary,
-                        "sourceUrl": job_url,
-                        "source": "ashby",
-                        "type": "remote" if "remote" in loc_name.lower() else "onsite",
-                        "visaTags": [],
-                        "categoryTags": ["startup", "ashby"],
-                        "createdAt": datetime.now(timezone.utc),
-                        "updatedAt": datetime.now(timezone.utc),
-                        "isActive": True
-                    }
-                    jobs.append(job_data)
-                
-                logger.info(f"✅ Ashby: Fetched {len(jobs)} jobs for {company_id}")
-                return jobs
-
-    except Exception as e:
-        logger.error(f"Error fetching Ashby jobs for {company_id}: {e}")
-        return [] 
-
 # =============================================================================
 # EXPORTED FUNCTIONS: Main Orchestration
 # =============================================================================
@@ -1325,7 +1244,8 @@ async def fetch_all_job_categories() -> List[Dict[str, Any]]:
         
     # 6. Fetch from YC RSS
     try:
-        yc_jobs = await fetch_jobs_from_yc_rss()
+        # Full read: update_jobs_in_database deactivates the source before re-adding it
+        yc_jobs = await fetch_jobs_from_yc_rss(incremental=False)
         all_jobs.extend(yc_jobs)
     except Exception as e:
         logger.error(f"Failed to fetch YC jobs: {e}")
@@ -1423,8 +1343,9 @@ async def update_jobs_in_database(jobs: List[Dict[str, Any]]) -> int:
         # Get all sources from jobs
         sources = list(set(job.get("source", "unknown") for job in jobs))
         
-        # Mark old jobs from these sources as inactive
-        SupabaseService.mark_jobs_inactive(sources)
+        # Mark old jobs from these sources as inactive (spooled, applied before the upserts below)
+        spool = get_job_spool()
+        spool.enqueue_deactivation(sources)
         
         # Format jobs for Supabase (ensure job_id and ISO dates)
         import hashlib
@@ -1445,10 +1366,10 @@ async def update_jobs_in_database(jobs: List[Dict[str, Any]]) -> int:
             if isinstance(job.get("updatedAt"), datetime):
                 job["updatedAt"] = job["updatedAt"].isoformat()
 
-        # Bulk upsert
-        count = SupabaseService.upsert_jobs(jobs)
+        # Spool for the write-behind flusher (see job_spool.py), off the event loop
+        count = await asyncio.to_thread(spool.enqueue, jobs)
         
-        logger.info(f"💾 Supabase update complete: {count} jobs inserted/updated")
+        logger.info(f"💾 Spooled {count} jobs for Supabase")
         return count
         
     except Exception as e:
@@ -0,0 +1,180 @@
+"""
+Job Function Classifier - Maps a job to one or more function codes at ingest
+
+Title rules are tried first (they are precise: "Account Executive" is sales no
+matter what the description says). Only when no title rule fires do we fall
+back to the shared KeywordTagger over the description, and then only for
+functions with enough hits to be meaningful.
+
+The codes are stored in jobs.function_codes (TEXT[] + GIN index), so the
+/api/jobs `job_functions` filter becomes a single array-overlap predicate
+instead of a title/description ilike pair per requested role.
+
+Evaluate against the labelled sample:
+    python job_function_classifier.py [job_function_labels.json]
+"""
+
+import os
+import re
+import json
+import logging
+from typing import Dict, Any, List, Optional
+
+from keyword_tagger import KeywordTagger
+
+logger = logging.getLogger(__name__)
+
+# Bump when rules change so stored codes can be recomputed by the backfill
+CLASSIFIER_VERSION = 1
+
+MAX_FUNCTIONS = 3
+DESCRIPTION_MIN_HITS = 3
+
+FUNCTION_LABELS = {
+    "engineering": "Engineering",
+    "data": "Data & Analytics",
+    "ai_ml": "AI / Machine Learning",
+    "product": "Product",
+    "design": "Design",
+    "devops": "DevOps & Infrastructure",
+    "security": "Security",
+    "qa": "QA & Testing",
+    "it": "IT",
+    "sales": "Sales",
+    "marketing": "Marketing",
+    "customer_success": "Customer Success & Support",
+    "operations": "Operations",
+    "finance": "Finance & Accounting",
+    "people": "People & HR",
+    "legal": "Legal & Compliance",
+    "healthcare": "Healthcare",
+    "education": "Education",
+}
+
+# Ordered (code, pattern) rules matched against the title. Several may match
+# ("Data Engineer" -> data + engineering); order decides the primary code.
+TITLE_RULES = [
+    ("ai_ml", r"\b(machine learning|ml|ai|artificial intelligence|deep learning|nlp|computer vision|llm|applied scientist|research scientist)\b"),
+    ("data", r"\b(data|analytics|analyst|business intelligence|bi|etl|statistician|quantitative)\b"),
+    ("security", r"\b(security|cyber ?security|infosec|penetration|soc analyst|appsec)\b"),
+    ("devops", r"\b(devops|sre|site reliability|platform engineer|infrastructure|cloud engineer|cloud architect|systems engineer)\b"),
+    ("qa", r"\b(qa|quality assurance|test engineer|sdet|automation tester|tester)\b"),
+    ("product", r"\b(product manager|product owner|product lead|head of product|vp,? product|director,? product|product management|pm)\b"),
+    ("design", r"\b(designer|design lead|ux|ui|user experience|user research(er)?|creative director|illustrator)\b"),
+    ("engineering", r"\b(engineer(ing)?|developer|programmer|software|swe|front[- ]?end|back[- ]?end|full[- ]?stack|architect|mobile|ios|android|firmware|embedded)\b"),
+    ("it", r"\b(it support|it specialist|it manager|help ?desk|desktop support|system administrator|sysadmin|network administrator|technical support)\b"),
+    ("sales", r"\b(sales|account executive|account manager|business development|bdr|sdr|partnerships?|solutions? consultant|pre-?sales)\b"),
+    ("marketing", r"\b(marketing|growth|seo|sem|content|brand|communications|social media|copywriter|demand generation|public relations|pr manager)\b"),
+    ("customer_success", r"\b(customer success|customer support|customer service|support specialist|support engineer|client services|customer experience|onboarding specialist|implementation)\b"),
+    ("finance", r"\b(finance|financial|accountant|accounting|controller|fp&a|treasury|tax|audit(or)?|payroll|bookkeeper|billing)\b"),
+    ("people", r"\b(recruit(er|ing|ment)|talent|human resources|hr|people (partner|operations|ops)|hrbp|compensation|benefits)\b"),
+    ("legal", r"\b(legal|counsel|attorney|lawyer|paralegal|compliance|privacy|regulatory)\b"),
+    ("operations", r"\b(operations|ops|supply chain|logistics|procurement|program manager|project manager|chief of staff|office manager|business analyst|strategy)\b"),
+    ("healthcare", r"\b(nurse|nursing|physician|clinical|clinician|pharmacist|therapist|medical|health(care)?|dental|patient)\b"),
+    ("education", r"\b(teacher|tutor|instructor|professor|lecturer|curriculum|education)\b"),
+]
+_TITLE_RULES = [(code, re.compile(pattern, re.IGNORECASE)) for code, pattern in TITLE_RULES]
+
+# Weaker, description-only signals for titles that are too generic to classify
+DESCRIPTION_VOCABULARY = {
+    "engineering": ["software development", "codebase", "pull request", "code review", "microservices", "rest api", "backend", "frontend", "full stack"],
+    "data": ["sql", "data pipeline", "etl", "dashboards", "data warehouse", "tableau", "power bi", "looker", "dbt", "snowflake"],
+    "ai_ml": ["machine learning", "deep learning", "pytorch", "tensorflow", "llm", "model training", "nlp", "computer vision"],
+    "product": ["product roadmap", "product requirements", "prd", "user stories", "product strategy", "product discovery"],
+    "design": ["figma", "wireframes", "prototypes", "design system", "user research", "usability testing"],
+    "devops": ["kubernetes", "terraform", "ci/cd", "docker", "observability", "on-call", "infrastructure as code"],
+    "security": ["vulnerability", "threat", "siem", "incident response", "penetration testing", "soc 2"],
+    "sales": ["quota", "pipeline generation", "closing deals", "prospecting", "crm", "salesforce", "cold outreach"],
+    "marketing": ["campaigns", "seo", "brand awareness", "content strategy", "demand generation", "hubspot", "paid acquisition"],
+    "customer_success": ["customer satisfaction", "support tickets", "zendesk", "renewals", "churn", "customer onboarding"],
+    "finance": ["financial statements", "reconciliation", "gaap", "forecasting", "budgeting", "accounts payable", "general ledger"],
+    "people": ["recruiting", "sourcing candidates", "employee relations", "onboarding new hires", "hris", "workday"],
+    "legal": ["contracts", "litigation", "regulatory compliance", "legal advice", "gdpr"],
+    "operations": ["process improvement", "vendor management", "supply chain", "logistics", "cross-functional operations"],
+    "healthcare": ["patient care", "clinical", "ehr", "hipaa", "licensed nurse"],
+    "education": ["lesson plans", "classroom", "curriculum", "students"],
+}
+DESCRIPTION_TAGGER = KeywordTagger(DESCRIPTION_VOCABULARY)
+
+
+def classify_title(title: Optional[str]) -> List[str]:
+    """Function codes implied by a title alone, in rule order"""
+    if not title:
+        return []
+    return [code for code, pattern in _TITLE_RULES if pattern.search(title)]
+
+
+def classify_functions(title: Optional[str], description: Optional[str] = None) -> List[str]:
+    """Classify a job into up to MAX_FUNCTIONS function codes"""
+    codes = classify_title(title)
+    if not codes and description:
+        codes = DESCRIPTION_TAGGER.tags(description, min_count=DESCRIPTION_MIN_HITS)
+    return codes[:MAX_FUNCTIONS]
+
+
+def function_filter_codes(job_functions: Optional[str]) -> List[str]:
+    """
+    Map the comma-separated `job_functions` filter (free-text roles like
+    "AI Engineer" or codes like "data") to function codes
+    """
+    codes: List[str] = []
+    for value in (job_functions or "").split(","):
+        value = value.strip()
+        if not value:
+            continue
+        # A free-text role maps to its primary (most specific) code only, so
+        # "AI Engineer" overlaps ai_ml jobs rather than every engineering job
+        matched = [value.lower()] if value.lower() in FUNCTION_LABELS else classify_title(value)[:1]
+        for code in matched:
+            if code not in codes:
+                codes.append(code)
+    return codes
+
+
+def evaluate(sample_path: str) -> Dict[str, Any]:
+    """
+    Score the classifier against a labelled sample.
+
+    The sample is a JSON list of {"title", "description"?, "functions": [...]}.
+    Returns micro precision/recall plus per-code precision.
+    """
+    with open(sample_path, "r", encoding="utf-8") as f:
+        samples = json.load(f)
+
+    tp = fp = fn = 0
+    per_code: Dict[str, Dict[str, int]] = {}
+    mistakes = []
+    for sample in samples:
+        predicted = set(classify_functions(sample.get("title"), sample.get("description")))
+        expected = set(sample.get("functions", []))
+        tp += len(predicted & expected)
+        fp += len(predicted - expected)
+        fn += len(expected - predicted)
+        for code in predicted:
+            stats = per_code.setdefault(code, {"tp": 0, "fp": 0})
+            stats["tp" if code in expected else "fp"] += 1
+        if predicted != expected:
+            mistakes.append({"title": sample.get("title"), "expected": sorted(expected), "predicted": sorted(predicted)})
+
+    return {
+        "samples": len(samples),
+        "precision": round(tp / (tp + fp), 3) if tp + fp else 0.0,
+        "recall": round(tp / (tp + fn), 3) if tp + fn else 0.0,
+        "per_code_precision": {
+            code: round(s["tp"] / (s["tp"] + s["fp"]), 3) for code, s in sorted(per_code.items())
+        },
+        "mistakes": mistakes,
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    default_sample = os.path.join(os.path.dirname(os.path.abspath(__file__)), "job_function_labels.json")
+    report = evaluate(sys.argv[1] if len(sys.argv) > 1 else default_sample)
+    print(f"Samples:   {report['samples']}")
+    print(f"Precision: {report['precision']}")
+    print(f"Recall:    {report['recall']}")
+    for code, precision in report["per_code_precision"].items():
+        print(f"  {code:<18} {precision}")
+    for miss in report["mistakes"]:
+        print(f"  MISS {miss['title']!r}: expected {miss['expected']}, got {miss['predicted']}")
@@ -0,0 +1,141 @@
+"""
+Job Normalizer - Derives structured, filterable columns from a raw job at ingest
+
+Every write path (JobAggregator._store_jobs, update_jobs_in_database,
+JobSyncService._save_job) ends in SupabaseService._sanitize_job_data, which
+calls normalize_job() once per job. The classifiers from company_enrichment
+therefore run once at ingestion instead of on every read, and their results
+are stored as compact enum columns that /api/jobs can filter with indexed
+equality / IN predicates:
+
+- seniority         intern | entry | mid | senior | staff | director | executive
+- experience_years  minimum years of experience (SMALLINT)
+- remote_type       remote | hybrid | onsite
+- function_codes    engineering, data, product, ... (see job_function_classifier)
+- salary_min_usd / salary_max_usd (see salary_parser)
+"""
+
+import re
+import logging
+from typing import Optional, Dict, Any, List
+
+from company_enrichment import infer_seniority, infer_experience_years, infer_remote_type
+from salary_parser import extract_salary_usd
+from job_function_classifier import classify_functions
+
+logger = logging.getLogger(__name__)
+
+# company_enrichment labels -> stored codes
+SENIORITY_CODES = {
+    "Intern": "intern",
+    "Entry Level": "entry",
+    "Mid Level": "mid",
+    "Senior": "senior",
+    "Staff": "staff",
+    "Director": "director",
+    "Executive": "executive",
+}
+SENIORITY_LABELS = {code: label for label, code in SENIORITY_CODES.items()}
+
+REMOTE_TYPE_CODES = {
+    "remote": "remote",
+    "hybrid": "hybrid",
+    "onsite": "onsite",
+    "on-site": "onsite",
+    "on site": "onsite",
+    "in-office": "onsite",
+}
+REMOTE_TYPE_LABELS = {"remote": "Remote", "hybrid": "Hybrid", "onsite": "On-site"}
+
+# /api/jobs `experience` filter values (Jobs.jsx checkboxes and the
+# recommended level tags) -> seniority codes
+EXPERIENCE_FILTER_CODES = {
+    "intern": ["intern"],
+    "internship": ["intern"],
+    "entry": ["entry"],
+    "entry level": ["entry"],
+    "associate": ["entry"],
+    "junior": ["entry"],
+    "mid": ["mid"],
+    "mid level": ["mid"],
+    "mid-senior": ["mid", "senior"],
+    "senior": ["senior", "staff"],
+    "staff": ["staff"],
+    "lead": ["senior", "staff"],
+    "director": ["director", "executive"],
+    "executive": ["executive"],
+}
+
+CLASSIFIED_COLUMNS = ("seniority", "experience_years", "remote_type", "function_codes")
+
+
+def _job_text(job: Dict[str, Any]) -> str:
+    return job.get("description") or job.get("fullDescription") or ""
+
+
+def classify_remote_type(job: Dict[str, Any]) -> str:
+    """Use the provider's explicit work type when present, else infer from text"""
+    for field in ("remote_type", "type", "workType", "remoteType"):
+        code = REMOTE_TYPE_CODES.get(str(job.get(field) or "").strip().lower())
+        if code:
+            return code
+    label = infer_remote_type(job.get("title") or "", job.get("location") or "", _job_text(job))
+    return REMOTE_TYPE_CODES.get(label.lower(), "onsite")
+
+
+def parse_experience_years(label: str) -> Optional[int]:
+    """Turn an infer_experience_years label ("5+ years exp", "0-2 years exp") into a number"""
+    if label == "Student":
+        return 0
+    match = re.match(r"(\d+)", label or "")
+    return min(int(match.group(1)), 40) if match else None
+
+
+def classify_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Run the seniority / experience / remote-type / function classifiers for one job"""
+    title = job.get("title") or ""
+    description = _job_text(job)
+    return {
+        "seniority": SENIORITY_CODES.get(infer_seniority(title), "mid"),
+        "experience_years": parse_experience_years(infer_experience_years(title, description)),
+        "remote_type": classify_remote_type(job),
+        "function_codes": classify_functions(title, description),
+    }
+
+
+def normalize_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Add derived columns to a job dict in place (and return it).
+
+    Values that are already present are kept, so re-normalizing a stored row
+    is cheap and idempotent.
+    """
+    if "salary_min_usd" not in job and "salary_max_usd" not in job:
+        job["salary_min_usd"], job["salary_max_usd"] = extract_salary_usd(job)
+
+    if any(job.get(col) is None for col in CLASSIFIED_COLUMNS):
+        for col, value in classify_job(job).items():
+            if job.get(col) is None:
+                job[col] = value
+
+    return job
+
+
+def experience_filter_codes(experience: Optional[str]) -> List[str]:
+    """Map a comma-separated `experience` filter to seniority codes"""
+    codes: List[str] = []
+    for level in (experience or "").split(","):
+        for code in EXPERIENCE_FILTER_CODES.get(level.strip().lower(), []):
+            if code not in codes:
+                codes.append(code)
+    return codes
+
+
+def remote_type_filter_codes(job_type: Optional[str]) -> List[str]:
+    """Map a comma-separated `type` filter to remote_type codes"""
+    codes: List[str] = []
+    for value in (job_type or "").split(","):
+        code = REMOTE_TYPE_CODES.get(value.strip().lower())
+        if code and code not in codes:
+            codes.append(code)
+    return codes
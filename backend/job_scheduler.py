@@ -0,0 +1,347 @@
+"""
+Job Scheduler - Lease-based single-run scheduler for background jobs
+
+Replaces the APScheduler interval jobs and job_fetch_background_task, which
+ran their own crawl in every uvicorn worker / replica. Each scheduled job has
+one lease row; every instance polls it, and only the instance that claims the
+lease when the job is due runs it:
+
+- Exactly one run per interval across all instances (claim is atomic)
+- A crashed holder's lease expires after lease_seconds; a heartbeat renews
+  it while a long run is still going
+- Overlapping requests coalesce: triggering a job that is already running
+  schedules a single follow-up run instead of a second concurrent crawl
+- status() exposes holder, last run and next run per job
+
+A process that never calls start() (the API when ingestion runs in
+worker.py) can still trigger() jobs: the request is written to the lease row
+and picked up by whichever worker polls it next.
+
+Lease backends:
+- SupabaseLeaseStore: scheduler_leases table + RPCs (scheduler_leases_schema.sql)
+- FileLeaseStore: JSON file guarded by flock, for local dev / single host
+
+SCHEDULER_LEASE_BACKEND=supabase|file picks one explicitly; by default
+Supabase is used when configured.
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to an in-process lock only
+    fcntl = None
+
+from supabase_service import SupabaseService
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_POLL_SECONDS = float(os.getenv("SCHEDULER_POLL_SECONDS", "30"))
+LEASE_FILE_PATH = os.getenv(
+    "SCHEDULER_LEASE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "scheduler_leases.json")
+)
+
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+# Jobs registered without an interval only run when triggered
+TRIGGER_ONLY_INTERVAL_SECONDS = 10 * 365 * 24 * 3600
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _parse(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")) if value else None
+
+
+class FileLeaseStore:
+    """Lease rows in a local JSON file; flock makes it safe across workers on one host"""
+
+    def __init__(self, path: str = LEASE_FILE_PATH):
+        self.path = path
+        self.thread_lock = threading.Lock()
+
+    def _mutate(self, fn: Callable[[Dict[str, Any]], Any]) -> Any:
+        with self.thread_lock, open(self.path + ".lock", "a+") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                leases = {}
+                if os.path.exists(self.path):
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        leases = json.load(f) or {}
+                result = fn(leases)
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(leases, f, indent=2)
+                os.replace(tmp_path, self.path)
+                return result
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def ensure(self, name: str, first_run_at: datetime):
+        def fn(leases):
+            leases.setdefault(name, {"name": name, "next_run_at": first_run_at.isoformat(), "run_requested": False})
+        self._mutate(fn)
+
+    def claim(self, name: str, holder: str, ttl_seconds: int) -> bool:
+        def fn(leases):
+            row = leases.get(name)
+            now = _now()
+            if not row:
+                return False
+            due = row.get("run_requested") or _parse(row["next_run_at"]) <= now
+            free = not row.get("holder") or _parse(row.get("expires_at")) < now
+            if not (due and free):
+                return False
+            row.update(holder=holder, expires_at=(now + timedelta(seconds=ttl_seconds)).isoformat(), run_requested=False)
+            return True
+        return self._mutate(fn)
+
+    def renew(self, name: str, holder: str, ttl_seconds: int) -> bool:
+        def fn(leases):
+            row = leases.get(name)
+            if not row or row.get("holder") != holder:
+                return False
+            row["expires_at"] = (_now() + timedelta(seconds=ttl_seconds)).isoformat()
+            return True
+        return self._mutate(fn)
+
+    def complete(self, name: str, holder: str, interval_seconds: int, status: str, duration: float):
+        def fn(leases):
+            row = leases.get(name)
+            if not row or row.get("holder") != holder:
+                return
+            now = _now()
+            next_run = now if row.get("run_requested") else now + timedelta(seconds=interval_seconds)
+            row.update(
+                holder=None, expires_at=None, run_requested=False,
+                last_run_at=now.isoformat(), last_holder=holder, last_status=status,
+                last_duration_seconds=round(duration, 1), next_run_at=next_run.isoformat(),
+            )
+        self._mutate(fn)
+
+    def request_run(self, name: str):
+        def fn(leases):
+            if name in leases:
+                leases[name]["run_requested"] = True
+        self._mutate(fn)
+
+    def get_all(self) -> Dict[str, Dict[str, Any]]:
+        return self._mutate(lambda leases: json.loads(json.dumps(leases)))
+
+
+class SupabaseLeaseStore:
+    """Lease rows in the scheduler_leases table; claims go through plpgsql RPCs"""
+
+    TABLE = "scheduler_leases"
+
+    def __init__(self, client):
+        self.client = client
+
+    def ensure(self, name: str, first_run_at: datetime):
+        self.client.table(self.TABLE).upsert(
+            {"name": name, "next_run_at": first_run_at.isoformat()},
+            on_conflict="name", ignore_duplicates=True
+        ).execute()
+
+    def claim(self, name: str, holder: str, ttl_seconds: int) -> bool:
+        res = self.client.rpc("claim_scheduler_lease", {
+            "p_name": name, "p_holder": holder, "p_ttl_seconds": ttl_seconds
+        }).execute()
+        return bool(res.data)
+
+    def renew(self, name: str, holder: str, ttl_seconds: int) -> bool:
+        res = self.client.rpc("renew_scheduler_lease", {
+            "p_name": name, "p_holder": holder, "p_ttl_seconds": ttl_seconds
+        }).execute()
+        return bool(res.data)
+
+    def complete(self, name: str, holder: str, interval_seconds: int, status: str, duration: float):
+        self.client.rpc("complete_scheduler_lease", {
+            "p_name": name, "p_holder": holder, "p_interval_seconds": interval_seconds,
+            "p_status": status, "p_duration_seconds": round(duration, 1)
+        }).execute()
+
+    def request_run(self, name: str):
+        self.client.table(self.TABLE).update({"run_requested": True}).eq("name", name).execute()
+
+    def get_all(self) -> Dict[str, Dict[str, Any]]:
+        res = self.client.table(self.TABLE).select("*").execute()
+        return {row["name"]: row for row in res.data or []}
+
+
+def default_lease_store():
+    backend = os.getenv("SCHEDULER_LEASE_BACKEND", "").lower()
+    client = SupabaseService.get_client() if backend != "file" else None
+    if client and backend != "file":
+        return SupabaseLeaseStore(client)
+    if backend == "supabase":
+        logger.warning("SCHEDULER_LEASE_BACKEND=supabase but Supabase is not configured; using file leases")
+    return FileLeaseStore()
+
+
+class ScheduledJob:
+    def __init__(self, name: str, func: Callable[[], Awaitable[Any]], interval_seconds: Optional[int],
+                 initial_delay_seconds: int, lease_seconds: int):
+        self.name = name
+        self.func = func
+        self.trigger_only = interval_seconds is None
+        self.interval_seconds = TRIGGER_ONLY_INTERVAL_SECONDS if self.trigger_only else interval_seconds
+        self.initial_delay_seconds = self.interval_seconds if self.trigger_only else initial_delay_seconds
+        self.lease_seconds = lease_seconds
+        self.running = False
+        self.rerun_requested = False
+        self.wake = asyncio.Event()
+        self.local_runs = 0
+
+
+class LeasedScheduler:
+    def __init__(self, store=None, poll_seconds: float = SCHEDULER_POLL_SECONDS,
+                 instance_id: str = INSTANCE_ID, max_concurrent_jobs: int = 1):
+        self.store = store
+        self.poll_seconds = poll_seconds
+        self.instance_id = instance_id
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self.tasks: List[asyncio.Task] = []
+        self.accepting = True
+        self.active = 0
+
+    def add_job(self, name: str, func: Callable[[], Awaitable[Any]], interval_seconds: Optional[int],
+                initial_delay_seconds: int = 30, lease_seconds: int = 2 * 3600):
+        """Register an async job (interval_seconds=None: trigger-only); call before start()"""
+        self.jobs[name] = ScheduledJob(name, func, interval_seconds, initial_delay_seconds, lease_seconds)
+
+    def _get_store(self):
+        if self.store is None:
+            self.store = default_lease_store()
+        return self.store
+
+    def stop_accepting(self):
+        """Stop claiming new runs (runs in progress finish normally)"""
+        self.accepting = False
+
+    def start(self):
+        """Start one polling loop per job on the running event loop"""
+        self._get_store()
+        for job in self.jobs.values():
+            self.tasks.append(asyncio.create_task(self._loop(job)))
+        logger.info(
+            f"📅 Leased scheduler started as {self.instance_id} "
+            f"({type(self.store).__name__}): {', '.join(self.jobs)}"
+        )
+
+    async def _loop(self, job: ScheduledJob):
+        first_run_at = _now() + timedelta(seconds=job.initial_delay_seconds)
+        try:
+            await asyncio.to_thread(self.store.ensure, job.name, first_run_at)
+        except Exception as e:
+            logger.error(f"Scheduler could not initialise lease for {job.name}: {e}")
+        while True:
+            try:
+                await self._tick(job)
+            except Exception as e:
+                logger.error(f"Scheduler tick failed for {job.name}: {e}")
+            try:
+                await asyncio.wait_for(job.wake.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            job.wake.clear()
+
+    async def _heartbeat(self, job: ScheduledJob):
+        while True:
+            await asyncio.sleep(max(job.lease_seconds / 3, 1))
+            try:
+                await asyncio.to_thread(self.store.renew, job.name, self.instance_id, job.lease_seconds)
+            except Exception as e:
+                logger.warning(f"Lease renewal failed for {job.name}: {e}")
+
+    async def _tick(self, job: ScheduledJob):
+        if job.running or not self.accepting or self.active >= self.max_concurrent_jobs:
+            return
+        # Reserve the slot before awaiting the claim so concurrent ticks respect the cap
+        self.active += 1
+        try:
+            claimed = await asyncio.to_thread(self.store.claim, job.name, self.instance_id, job.lease_seconds)
+        except Exception:
+            self.active -= 1
+            raise
+        if not claimed:
+            self.active -= 1
+            return
+
+        job.running = True
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        start = time.time()
+        status = "success"
+        logger.info(f"⏰ {self.instance_id} running {job.name}")
+        try:
+            await job.func()
+        except Exception as e:
+            status = f"error: {str(e)[:200]}"
+            logger.error(f"❌ Scheduled job {job.name} failed: {e}")
+        finally:
+            heartbeat.cancel()
+            job.running = False
+            self.active -= 1
+            job.local_runs += 1
+            if job.rerun_requested:
+                job.rerun_requested = False
+                await asyncio.to_thread(self.store.request_run, job.name)
+            await asyncio.to_thread(
+                self.store.complete, job.name, self.instance_id, job.interval_seconds, status, time.time() - start
+            )
+            logger.info(f"✅ {job.name} finished ({status}) in {time.time() - start:.1f}s")
+
+    async def trigger(self, name: str) -> str:
+        """
+        Ask for a run as soon as possible. If the job is already running here
+        the request is coalesced into one follow-up run. Jobs not registered
+        here are requested on the lease row for whichever worker owns them.
+        """
+        job = self.jobs.get(name)
+        if job and job.running:
+            job.rerun_requested = True
+            return "coalesced"
+        await asyncio.to_thread(self._get_store().request_run, name)
+        if job:
+            job.wake.set()
+        return "scheduled"
+
+    def status(self) -> Dict[str, Any]:
+        leases = self._get_store().get_all()
+        jobs = {}
+        for name, job in self.jobs.items():
+            lease = leases.get(name, {})
+            jobs[name] = {
+                "interval_seconds": None if job.trigger_only else job.interval_seconds,
+                "holder": lease.get("holder"),
+                "lease_expires_at": lease.get("expires_at"),
+                "running_here": job.running,
+                "run_requested": bool(lease.get("run_requested")) or job.rerun_requested,
+                "last_run_at": lease.get("last_run_at"),
+                "last_holder": lease.get("last_holder"),
+                "last_status": lease.get("last_status"),
+                "last_duration_seconds": lease.get("last_duration_seconds"),
+                "next_run_at": lease.get("next_run_at"),
+                "runs_by_this_instance": job.local_runs,
+            }
+        return {
+            "instance_id": self.instance_id,
+            "backend": type(self.store).__name__,
+            "running_here": bool(self.tasks),
+            "jobs": jobs,
+        }
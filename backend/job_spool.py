@@ -0,0 +1,349 @@
+"""
+Job Spool - Durable local write-behind queue for job ingestion
+
+Ingestion (JobAggregator._store_jobs, update_jobs_in_database,
+JobSyncService._save_job) no longer writes to Supabase inline. Normalized rows
+are written to a local SQLite spool first, which is a single fast local
+transaction. A separate flusher drains the spool to Supabase in large batches:
+
+- Idempotent: rows are keyed by job_id and upserted on job_id, so re-flushing
+  after a partial failure is harmless, and a job re-fetched before it was
+  flushed simply replaces its pending payload
+- Retries with exponential backoff when Supabase is slow or down; nothing
+  that was fetched is lost, and a restart resumes from the spool file
+- When Supabase rejects a batch because of its rows (a Postgres data or
+  constraint error), the batch is bisected until the rejected rows are
+  isolated, so the rest of it is written and only those rows are retried.
+  Connection errors and timeouts back the whole batch off unsplit
+- A row or deactivation that fails JOB_SPOOL_MAX_ATTEMPTS times in a row (about
+  an hour of backoff) is dead-lettered: kept in the file with its last error
+  but no longer retried, so one poison row cannot block the spool forever.
+  requeue_dead_letters() puts them back once the cause is fixed
+- Source deactivations (mark_jobs_inactive) are spooled too and applied
+  before the jobs enqueued with them, preserving the old ordering
+- stats() exposes the lag (age of the oldest unflushed row) and dead letters
+
+The spool file (JOB_SPOOL_PATH, default backend/job_spool.db) must live on a
+persistent volume in production: on ephemeral container disk, fetched jobs
+that were not flushed yet are lost on redeploy or restart.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from supabase_service import SupabaseService
+
+logger = logging.getLogger(__name__)
+
+SPOOL_PATH = os.getenv(
+    "JOB_SPOOL_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "job_spool.db")
+)
+FLUSH_BATCH_SIZE = int(os.getenv("JOB_SPOOL_BATCH_SIZE", "500"))
+FLUSH_INTERVAL_SECONDS = float(os.getenv("JOB_SPOOL_FLUSH_INTERVAL", "5"))
+BASE_BACKOFF_SECONDS = 5
+MAX_BACKOFF_SECONDS = 600
+MAX_ATTEMPTS = int(os.getenv("JOB_SPOOL_MAX_ATTEMPTS", "12"))
+# SQLSTATE / PostgREST code prefixes that blame the database, not the rows
+# (connection, resources, operator intervention such as statement timeouts)
+TRANSIENT_ERROR_CODES = ("08", "53", "57", "PGRST00")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending_jobs (
+    job_id               TEXT PRIMARY KEY,
+    payload              TEXT NOT NULL,
+    preserve_description INTEGER NOT NULL DEFAULT 0,
+    version              INTEGER NOT NULL DEFAULT 1,
+    enqueued_at          REAL NOT NULL,
+    attempts             INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at      REAL NOT NULL DEFAULT 0,
+    last_error           TEXT,
+    dead_at              REAL
+);
+CREATE INDEX IF NOT EXISTS pending_jobs_due_idx ON pending_jobs(next_attempt_at, enqueued_at);
+
+CREATE TABLE IF NOT EXISTS pending_deactivations (
+    seq             INTEGER PRIMARY KEY AUTOINCREMENT,
+    sources         TEXT NOT NULL,
+    enqueued_at     REAL NOT NULL,
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    dead_at         REAL
+);
+"""
+
+# Columns added after the first release; ALTERed into existing spool files
+MIGRATIONS = {
+    "pending_jobs": {"dead_at": "REAL"},
+    "pending_deactivations": {"dead_at": "REAL"},
+}
+
+
+def _backoff(attempts: int) -> float:
+    return min(BASE_BACKOFF_SECONDS * (2 ** attempts), MAX_BACKOFF_SECONDS)
+
+
+def _is_row_error(error: Exception) -> bool:
+    """True if Supabase answered and rejected the rows (worth bisecting the batch)"""
+    code = getattr(error, "code", None)
+    return isinstance(code, str) and bool(code) and not code.startswith(TRANSIENT_ERROR_CODES)
+
+
+class JobSpool:
+    def __init__(self, path: str = SPOOL_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        for table, columns in MIGRATIONS.items():
+            existing = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+            for column, ddl in columns.items():
+                if column not in existing:
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+        self.counters = {
+            "enqueued": 0,
+            "flushed": 0,
+            "failed_batches": 0,
+            "dead_lettered": 0,
+            "last_flush_at": None,
+            "last_error": None,
+        }
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+
+    def enqueue(self, jobs: List[Dict[str, Any]], preserve_description: bool = False) -> int:
+        """
+        Normalize and spool jobs for the flusher. Returns the number spooled.
+
+        preserve_description keeps an existing longer description in the DB
+        when the new fetch only returned a snippet.
+        """
+        now = time.time()
+        rows = []
+        for job in jobs:
+            sanitized = SupabaseService._sanitize_job_data(dict(job))
+            job_id = sanitized.get("job_id")
+            if not job_id:
+                logger.warning(f"Skipping job without job_id: {job.get('title', 'Unknown')}")
+                continue
+            rows.append((job_id, json.dumps(sanitized, default=str), int(preserve_description), now))
+
+        if not rows:
+            return 0
+        with self.lock:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                """
+                INSERT INTO pending_jobs (job_id, payload, preserve_description, enqueued_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(job_id) DO UPDATE SET
+                    payload = excluded.payload,
+                    preserve_description = excluded.preserve_description,
+                    version = pending_jobs.version + 1,
+                    attempts = 0,
+                    next_attempt_at = 0,
+                    last_error = NULL,
+                    dead_at = NULL
+                """,
+                rows
+            )
+            self.conn.execute("COMMIT")
+            self.counters["enqueued"] += len(rows)
+        return len(rows)
+
+    def enqueue_deactivation(self, sources: List[str]):
+        """Spool a mark_jobs_inactive(sources); applied before later-enqueued jobs are flushed"""
+        if not sources:
+            return
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO pending_deactivations (sources, enqueued_at) VALUES (?, ?)",
+                (json.dumps(sorted(sources)), time.time())
+            )
+
+    # ------------------------------------------------------------------
+    # Flusher side
+    # ------------------------------------------------------------------
+
+    def _flush_deactivations(self) -> bool:
+        """Apply pending deactivations in order. False if one is still failing."""
+        with self.lock:
+            pending = self.conn.execute(
+                "SELECT seq, sources, attempts, next_attempt_at FROM pending_deactivations "
+                "WHERE dead_at IS NULL ORDER BY seq"
+            ).fetchall()
+        for seq, sources, attempts, next_attempt_at in pending:
+            if next_attempt_at > time.time():
+                return False
+            if SupabaseService.mark_jobs_inactive(json.loads(sources)):
+                with self.lock:
+                    self.conn.execute("DELETE FROM pending_deactivations WHERE seq = ?", (seq,))
+            elif attempts + 1 >= MAX_ATTEMPTS:
+                with self.lock:
+                    self.conn.execute("UPDATE pending_deactivations SET attempts = ?, dead_at = ? WHERE seq = ?",
+                                      (attempts + 1, time.time(), seq))
+                    self.counters["dead_lettered"] += 1
+                logger.error(f"☠️ Deactivation of {sources} failed {attempts + 1} times; dead-lettered")
+            else:
+                with self.lock:
+                    self.conn.execute(
+                        "UPDATE pending_deactivations SET attempts = ?, next_attempt_at = ? WHERE seq = ?",
+                        (attempts + 1, time.time() + _backoff(attempts), seq)
+                    )
+                return False
+        return True
+
+    def _claim_batch(self, batch_size: int) -> List[tuple]:
+        with self.lock:
+            return self.conn.execute(
+                """
+                SELECT job_id, payload, preserve_description, version, attempts
+                FROM pending_jobs
+                WHERE next_attempt_at <= ? AND dead_at IS NULL
+                ORDER BY enqueued_at
+                LIMIT ?
+                """,
+                (time.time(), batch_size)
+            ).fetchall()
+
+    def _upsert(self, batch: List[tuple], jobs: List[Dict[str, Any]]) -> List[Tuple[tuple, str]]:
+        """Upsert a batch, bisecting on row errors. Returns (row, error) for rows not written."""
+        try:
+            SupabaseService.upsert_jobs(jobs, raise_errors=True)
+            return []
+        except Exception as e:
+            if len(batch) == 1 or not _is_row_error(e):
+                error = str(e)[:500]
+                return [(row, error) for row in batch]
+        # Upserts are idempotent, so rewriting rows of a half that had partly landed is harmless
+        mid = len(batch) // 2
+        return self._upsert(batch[:mid], jobs[:mid]) + self._upsert(batch[mid:], jobs[mid:])
+
+    def flush(self, batch_size: int = FLUSH_BATCH_SIZE, max_batches: Optional[int] = None) -> int:
+        """Drain due rows to Supabase. Returns the number of rows flushed."""
+        if not self._flush_deactivations():
+            return 0
+
+        flushed = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            batch = self._claim_batch(batch_size)
+            if not batch:
+                break
+            batches += 1
+
+            jobs = [json.loads(payload) for _, payload, _, _, _ in batch]
+            preserve_ids = [job_id for job_id, _, preserve, _, _ in batch if preserve]
+            if preserve_ids:
+                existing = SupabaseService.get_job_descriptions(preserve_ids)
+                for job in jobs:
+                    old_desc = existing.get(job["job_id"], "")
+                    if len(old_desc) > len(job.get("description") or "") + 100:
+                        job["description"] = old_desc
+
+            failed = self._upsert(batch, jobs)
+            now = time.time()
+            failed_ids = {row[0] for row, _ in failed}
+            written = [(job_id, version) for job_id, _, _, version, _ in batch if job_id not in failed_ids]
+            dead = [row for row, _ in failed if row[4] + 1 >= MAX_ATTEMPTS]
+
+            # Only delete the versions we wrote; a row re-enqueued mid-flush stays pending
+            with self.lock:
+                self.conn.execute("BEGIN")
+                self.conn.executemany("DELETE FROM pending_jobs WHERE job_id = ? AND version = ?", written)
+                self.conn.executemany(
+                    """
+                    UPDATE pending_jobs SET attempts = ?, next_attempt_at = ?, last_error = ?,
+                        dead_at = CASE WHEN ? >= ? THEN ? END
+                    WHERE job_id = ? AND version = ?
+                    """,
+                    [(attempts + 1, now + _backoff(attempts), error, attempts + 1, MAX_ATTEMPTS, now, job_id, version)
+                     for (job_id, _, _, version, attempts), error in failed]
+                )
+                self.conn.execute("COMMIT")
+                self.counters["flushed"] += len(written)
+                if written:
+                    self.counters["last_flush_at"] = now
+                if failed:
+                    self.counters["failed_batches"] += 1
+                    self.counters["dead_lettered"] += len(dead)
+                    self.counters["last_error"] = failed[-1][1]
+            flushed += len(written)
+
+            if failed:
+                logger.warning(f"⚠️ Spool flush failed for {len(failed)} of {len(batch)} jobs, will retry: {failed[-1][1]}")
+            if dead:
+                logger.error(f"☠️ {len(dead)} spooled jobs failed {MAX_ATTEMPTS} times; dead-lettered")
+            if not written:
+                # Supabase is down or rejecting everything; wait for the backoff
+                break
+
+        if flushed:
+            logger.info(f"💾 Spool flushed {flushed} jobs to Supabase")
+        return flushed
+
+    def requeue_dead_letters(self) -> int:
+        """Retry every dead-lettered row and deactivation from scratch; returns how many"""
+        with self.lock:
+            self.conn.execute("BEGIN")
+            jobs = self.conn.execute(
+                "UPDATE pending_jobs SET dead_at = NULL, attempts = 0, next_attempt_at = 0 WHERE dead_at IS NOT NULL"
+            ).rowcount
+            deactivations = self.conn.execute(
+                "UPDATE pending_deactivations SET dead_at = NULL, attempts = 0, next_attempt_at = 0 WHERE dead_at IS NOT NULL"
+            ).rowcount
+            self.conn.execute("COMMIT")
+        return jobs + deactivations
+
+    def stats(self) -> Dict[str, Any]:
+        """Backlog size and lag for monitoring"""
+        with self.lock:
+            pending, retrying, oldest = self.conn.execute(
+                "SELECT COUNT(*), SUM(attempts > 0), MIN(enqueued_at) FROM pending_jobs WHERE dead_at IS NULL"
+            ).fetchone()
+            dead = self.conn.execute("SELECT COUNT(*) FROM pending_jobs WHERE dead_at IS NOT NULL").fetchone()[0]
+            deactivations, dead_deactivations = self.conn.execute(
+                "SELECT SUM(dead_at IS NULL), SUM(dead_at IS NOT NULL) FROM pending_deactivations"
+            ).fetchone()
+        return {
+            "pending": pending,
+            "retrying": retrying or 0,
+            "dead_letters": dead,
+            "pending_deactivations": deactivations or 0,
+            "dead_deactivations": dead_deactivations or 0,
+            "lag_seconds": round(time.time() - oldest, 1) if oldest else 0.0,
+            **self.counters,
+        }
+
+
+_spool: Optional[JobSpool] = None
+
+
+def get_job_spool() -> JobSpool:
+    """Process-wide spool, opened on first use"""
+    global _spool
+    if _spool is None:
+        _spool = JobSpool()
+    return _spool
+
+
+async def run_spool_flusher(interval: float = FLUSH_INTERVAL_SECONDS):
+    """Background task: drain the spool forever without blocking the event loop"""
+    spool = get_job_spool()
+    logger.info(f"🚚 Job spool flusher started ({spool.path})")
+    while True:
+        try:
+            await asyncio.to_thread(spool.flush)
+        except Exception as e:
+            logger.error(f"❌ Job spool flusher error: {e}")
+        await asyncio.sleep(interval)
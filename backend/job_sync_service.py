@@ -11,9 +11,16 @@ from typing import List, Dict, Optional
 import logging
 
 from supabase_service import SupabaseService
+from job_facets import facet_index
+from job_spool import get_job_spool
+from source_health import provider_trace
 
 logger = logging.getLogger(__name__)
 
+# What the daily cleanup_old_jobs does with jobs past the 72h window:
+# "deactivate" (default, is_active=False), "delete" or "off" (not scheduled)
+JOB_CLEANUP_MODE = os.getenv("JOB_CLEANUP_MODE", "deactivate").strip().lower()
+
 class JobSyncService:
     def __init__(self, db=None):
         # db is kept for legacy signature but ignored in favor of SupabaseService
@@ -40,7 +47,7 @@ class JobSyncService:
             
             total_jobs_added = 0
             
-            async with aiohttp.ClientSession() as session:
+            async with aiohttp.ClientSession(trace_configs=[provider_trace("adzuna")]) as session:
                 for q in queries:
                     try:
                         url = "https://api.adzuna.com/v1/api/jobs/us/search/1"
@@ -122,7 +129,7 @@ class JobSyncService:
                 "country": "us"
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with aiohttp.ClientSession(trace_configs=[provider_trace("jsearch")]) as session:
                 async with session.get(url, headers=headers, params=params, timeout=30) as response:
                     response.raise_for_status()
                     data = await response.json()
@@ -304,10 +311,9 @@ class JobSyncService:
         return job
     
     async def _save_job(self, job: Dict) -> bool:
-        """Save job to Supabase with deduplication via upsert"""
+        """Spool job for Supabase (deduplicated via job_id upsert on flush)"""
         try:
-            res = SupabaseService.upsert_job(job)
-            return True if res else False
+            return get_job_spool().enqueue([job]) > 0
         except Exception as e:
             logger.error(f"Error saving job: {str(e)}")
             return False
@@ -328,22 +334,27 @@ class JobSyncService:
             "jobs_last_hour": 0 # Not easily available without separate count
         }
     
-    async def cleanup_old_jobs(self) -> int:
-        """Remove jobs older than 72 hours from Supabase"""
+    async def cleanup_old_jobs(self, mode: str = JOB_CLEANUP_MODE) -> int:
+        """Deactivate (or, with mode="delete", hard-delete) jobs older than 72 hours"""
         try:
             client = SupabaseService.get_client()
             if not client: return 0
             
             cutoff_date = (datetime.utcnow() - timedelta(hours=72)).isoformat()
-            res = client.table("jobs").delete().lt("created_at", cutoff_date).execute()
+            if mode == "delete":
+                res = client.table("jobs").delete().lt("created_at", cutoff_date).execute()
+            else:
+                res = client.table("jobs").update({"is_active": False}).lt("created_at", cutoff_date).eq("is_active", True).execute()
             
             deleted_count = len(res.data) if res.data else 0
+            facet_index.remove_jobs(row["id"] for row in res.data or [])
             
-            logger.info(f"Cleanup completed: {deleted_count} old jobs removed (older than 72 hours)")
+            action = "removed" if mode == "delete" else "deactivated"
+            logger.info(f"Cleanup completed: {deleted_count} old jobs {action} (older than 72 hours)")
             
             SupabaseService.update_job_sync_status("cleanup", {
                 "last_sync": datetime.utcnow().isoformat(),
-                "jobs_deleted": deleted_count,
+                "jobs_deleted" if mode == "delete" else "jobs_deactivated": deleted_count,
                 "status": "success"
             })
             
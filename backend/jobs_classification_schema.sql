@@ -0,0 +1,29 @@
+-- ================================================================
+-- Jobs: ingest-time classification columns
+-- Populated by job_normalizer.normalize_job (via _sanitize_job_data);
+-- existing rows are filled by `python backfill_job_metadata.py`.
+-- Run this in Supabase SQL Editor (safe to re-run)
+-- ================================================================
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'job_seniority') THEN
+        CREATE TYPE job_seniority AS ENUM
+            ('intern', 'entry', 'mid', 'senior', 'staff', 'director', 'executive');
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'job_remote_type') THEN
+        CREATE TYPE job_remote_type AS ENUM ('remote', 'hybrid', 'onsite');
+    END IF;
+END $$;
+
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS seniority        job_seniority;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS experience_years SMALLINT;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS remote_type      job_remote_type;
+
+-- /api/jobs?experience=Senior,Director -> seniority IN (...)
+-- /api/jobs?type=remote               -> remote_type IN (...)
+CREATE INDEX IF NOT EXISTS jobs_seniority_created_idx   ON jobs(seniority, created_at DESC);
+CREATE INDEX IF NOT EXISTS jobs_remote_type_created_idx ON jobs(remote_type, created_at DESC);
+CREATE INDEX IF NOT EXISTS jobs_experience_years_idx    ON jobs(experience_years);
+
+SELECT 'Jobs classification columns ready ✅' AS result;
@@ -0,0 +1,16 @@
+-- ================================================================
+-- Jobs: function taxonomy column
+-- Populated at ingest by job_function_classifier.classify_functions
+-- (via job_normalizer / _sanitize_job_data); existing rows are filled
+-- by `python backfill_job_metadata.py`.
+-- Run this in Supabase SQL Editor (safe to re-run)
+-- ================================================================
+
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS function_codes TEXT[];
+
+-- /api/jobs?job_functions=AI Engineer,Data Analyst
+--   -> function_codes && '{ai_ml,engineering,data}'
+CREATE INDEX IF NOT EXISTS jobs_function_codes_gin_idx
+    ON jobs USING GIN (function_codes);
+
+SELECT 'Jobs function_codes column ready ✅' AS result;
@@ -0,0 +1,20 @@
+-- ================================================================
+-- Jobs: structured salary columns (annual USD)
+-- Populated at ingest by salary_parser.extract_salary_usd via
+-- SupabaseService._sanitize_job_data.
+-- Run this in Supabase SQL Editor (safe to re-run — uses IF NOT EXISTS)
+-- ================================================================
+
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS salary_min_usd INT;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS salary_max_usd INT;
+
+-- /api/jobs?salary=100k becomes `salary_max_usd >= 100000`.
+-- Partial index: most postings have no salary, so keep the index small.
+CREATE INDEX IF NOT EXISTS jobs_salary_max_usd_idx
+    ON jobs(salary_max_usd, created_at DESC)
+    WHERE salary_max_usd IS NOT NULL;
+CREATE INDEX IF NOT EXISTS jobs_salary_min_usd_idx
+    ON jobs(salary_min_usd)
+    WHERE salary_min_usd IS NOT NULL;
+
+SELECT 'Jobs salary columns ready ✅' AS result;
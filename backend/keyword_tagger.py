@@ -0,0 +1,53 @@
+"""
+Keyword Tagger - Fast whole-word keyword tagging shared across features
+
+A vocabulary maps a tag to the phrases that signal it. All phrases are
+compiled into a single case-insensitive alternation, so tagging a document
+is one regex pass regardless of vocabulary size (instead of one `in` check
+or ilike per keyword).
+"""
+
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+
+class KeywordTagger:
+    def __init__(self, vocabulary: Dict[str, Iterable[str]]):
+        """
+        Args:
+            vocabulary: tag -> phrases, e.g. {"data": ["data scientist", "etl"]}
+        """
+        self.phrase_to_tag: Dict[str, str] = {}
+        for tag, phrases in vocabulary.items():
+            for phrase in phrases:
+                self.phrase_to_tag[phrase.lower()] = tag
+
+        # Longest phrases first so "machine learning engineer" beats "engineer"
+        alternation = "|".join(
+            re.escape(p) for p in sorted(self.phrase_to_tag, key=len, reverse=True)
+        )
+        self.pattern = re.compile(rf"(?<![\w+#])(?:{alternation})(?![\w+#])", re.IGNORECASE)
+
+    def tag_counts(self, text: Optional[str]) -> Counter:
+        """Count keyword hits per tag"""
+        counts: Counter = Counter()
+        if not text:
+            return counts
+        for match in self.pattern.finditer(text):
+            counts[self.phrase_to_tag[match.group(0).lower()]] += 1
+        return counts
+
+    def tags(self, text: Optional[str], min_count: int = 1) -> List[str]:
+        """Tags with at least `min_count` hits, most frequent first"""
+        return [tag for tag, n in self.tag_counts(text).most_common() if n >= min_count]
+
+    def keywords(self, text: Optional[str]) -> List[str]:
+        """Distinct matched phrases, in order of first appearance"""
+        if not text:
+            return []
+        seen: Dict[str, None] = {}
+        for match in self.pattern.finditer(text):
+            seen.setdefault(match.group(0).lower(), None)
+        return list(seen)
+
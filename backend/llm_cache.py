@@ -0,0 +1,187 @@
+"""
+LLM Cache - Content-addressed, disk-backed LRU cache of LLM responses
+
+Users re-scan the same resume against the same JD, re-open the same job and
+re-run the same decoder, so identical prompts reach the model over and over.
+llm_gateway.chat() looks responses up here by
+
+    sha256(provider, model, normalized messages, max_tokens, temperature, response_format)
+
+before calling the provider. Messages are normalized by collapsing
+whitespace runs, so re-indented f-string prompts hash the same.
+
+- Per-call-site TTLs (CALL_SITE_TTLS); call sites not listed are never
+  cached, and LLM_CACHE_DISABLED_SITES / LLM_CACHE_ENABLED opt sites (or
+  everything) out without a deploy
+- Size-bounded: once the stored responses exceed LLM_CACHE_MAX_MB the least
+  recently used entries are evicted
+- stats(): hits / misses per call site and the upstream seconds saved (each
+  entry remembers how long the original call took)
+
+SQLite in WAL mode, like the other local stores; the cache is per instance.
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() != "false"
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.db")
+)
+LLM_CACHE_MAX_BYTES = int(float(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024)
+LLM_CACHE_DISABLED_SITES = {s.strip() for s in os.getenv("LLM_CACHE_DISABLED_SITES", "").split(",") if s.strip()}
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# call site -> TTL in seconds
+CALL_SITE_TTLS = {
+    "analyze_resume": 7 * DAY,
+    "cover_letter": DAY,
+    "scrape_job_description": DAY,
+    "job_decoder": 7 * DAY,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_responses (
+    key         TEXT PRIMARY KEY,
+    call_site   TEXT NOT NULL,
+    response    TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    latency_ms  REAL NOT NULL,
+    created_at  REAL NOT NULL,
+    expires_at  REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_responses_lru_idx ON llm_responses(last_access);
+"""
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def cache_ttl(call_site: str) -> Optional[int]:
+    """TTL for a call site, or None when its responses must not be cached"""
+    if not LLM_CACHE_ENABLED or call_site in LLM_CACHE_DISABLED_SITES:
+        return None
+    return CALL_SITE_TTLS.get(call_site)
+
+
+def cache_key(provider: str, model: str, messages: List[Dict[str, Any]], params: Dict[str, Any]) -> str:
+    normalized = [
+        {"role": m.get("role"), "content": _WHITESPACE.sub(" ", str(m.get("content") or "")).strip()}
+        for m in messages
+    ]
+    material = json.dumps([provider, model, normalized, params], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    def __init__(self, path: str = LLM_CACHE_PATH, max_bytes: int = LLM_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "saved_seconds": 0.0}
+        self.sites: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+    def get(self, key: str, call_site: str) -> Optional[Tuple[str, float]]:
+        """(response, original latency ms) or None"""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT response, latency_ms, expires_at, size FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and row[2] <= now:
+                self.conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                self.total_bytes -= row[3]
+                row = None
+            if row:
+                self.conn.execute("UPDATE llm_responses SET last_access = ? WHERE key = ?", (now, key))
+                self.counters["hits"] += 1
+                self.counters["saved_seconds"] += row[1] / 1000
+                self.sites[call_site]["hits"] += 1
+                return row[0], row[1]
+            self.counters["misses"] += 1
+            self.sites[call_site]["misses"] += 1
+            return None
+
+    def put(self, key: str, call_site: str, response: str, ttl: int, latency_ms: float):
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            old = self.conn.execute("SELECT size FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_responses "
+                "(key, call_site, response, size, latency_ms, created_at, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, call_site, response, size, latency_ms, now, now + ttl, now)
+            )
+            self.total_bytes += size - (old[0] if old else 0)
+            self.counters["stores"] += 1
+            if self.total_bytes > self.max_bytes:
+                self._evict_locked()
+
+    def _evict_locked(self):
+        # Expired first, then least recently used until 90% of the budget
+        now = time.time()
+        target = int(self.max_bytes * 0.9)
+        expired = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses WHERE expires_at <= ?", (now,)
+        ).fetchone()
+        self.conn.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (now,))
+        self.total_bytes -= expired[1]
+        self.counters["evictions"] += expired[0]
+        if self.total_bytes <= target:
+            return
+        victims = []
+        freed = 0
+        for key, size in self.conn.execute("SELECT key, size FROM llm_responses ORDER BY last_access"):
+            if self.total_bytes - freed <= target:
+                break
+            victims.append((key,))
+            freed += size
+        self.conn.executemany("DELETE FROM llm_responses WHERE key = ?", victims)
+        self.total_bytes -= freed
+        self.counters["evictions"] += len(victims)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "saved_seconds": round(self.counters["saved_seconds"], 1),
+            "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "sites": dict(self.sites),
+        }
+
+
+_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Process-wide cache, opened on first use"""
+    global _cache
+    if _cache is None:
+        _cache = LLMResponseCache()
+    return _cache
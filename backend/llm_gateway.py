@@ -0,0 +1,569 @@
+"""
+LLM Gateway - Single entry point for chat-completion calls
+
+Groq and OpenAI both speak the OpenAI chat-completions wire format, so every
+text-generation call (resume_analyzer.call_groq_api / unified_api_call, the
+Nova chat and answer endpoints) goes through llm_gateway.chat(), which owns:
+
+- A key pool per provider (GROQ_API_KEY, GROQ_API_KEY_1..10; OPENAI_API_KEY).
+  Every response carries x-ratelimit-remaining-{requests,tokens} and
+  x-ratelimit-reset-{requests,tokens}; the pool records them per key and
+  routes each call to the key with the most headroom, counting the requests
+  and tokens already reserved by calls in flight.
+- Queueing instead of sleeping: when every key is saturated or cooling down
+  after a 429 (Retry-After), callers wait on the pool until a key is
+  released or its window resets, and are served as soon as one has room.
+  Waiting is bounded by LLM_QUEUE_TIMEOUT_SECONDS.
+- Bring-your-own keys (api_key=...) get the same treatment: each one keeps
+  a KeyState (last BYOK_KEY_STATES keys), so its 429 cooldown and limits
+  are honoured across attempts and calls.
+- A global concurrency cap (LLM_MAX_CONCURRENCY) on upstream requests across
+  all providers, taken only once a key is reserved: calls queued for a key or
+  backing off between attempts don't hold a slot.
+- One shared aiohttp session per event loop instead of one per call.
+- The response cache (llm_cache.py) for call sites that opt in.
+- Token streaming (stream()) for the SSE endpoints, with time-to-first-token
+  samples per call site in stats().
+- Per-call telemetry (llm_telemetry.py): tokens, queue wait, upstream
+  latency, retries, 429s and key per call site.
+
+A 401 disables the key for the life of the process. Connection errors and
+5xx are retried on another key with a short fixed backoff.
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+import logging
+import weakref
+from collections import defaultdict, deque
+from typing import Dict, Any, List, Optional, Callable, AsyncIterator
+
+import aiohttp
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from llm_cache import get_llm_cache, cache_key, cache_ttl
+from llm_telemetry import llm_telemetry, LLMCall, key_id
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "60"))
+LLM_REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "120"))
+RETRY_BACKOFF_SECONDS = 1.0
+DEFAULT_RATE_LIMIT_COOLDOWN_SECONDS = 10.0
+BYOK_KEY_STATES = 256
+TTFT_SAMPLES = 500
+# Same variables (and defaults) as the Groq / OpenAI SDKs; point both at llm_stub.py for load tests
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com").rstrip("/")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+
+PROVIDERS = {
+    "groq": {
+        "url": f"{GROQ_BASE_URL}/openai/v1/chat/completions",
+        "model": "llama-3.3-70b-versatile",
+    },
+    "openai": {
+        "url": f"{OPENAI_BASE_URL}/chat/completions",
+        "model": "gpt-4o-mini",
+        # Streams only report usage (on a final chunk) when asked to
+        "stream_options": {"include_usage": True},
+    },
+}
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def groq_keys() -> List[str]:
+    """GROQ_API_KEY plus GROQ_API_KEY_1 .. GROQ_API_KEY_10"""
+    keys = [os.environ.get("GROQ_API_KEY")] + [os.environ.get(f"GROQ_API_KEY_{i}") for i in range(1, 11)]
+    return [key for key in dict.fromkeys(keys) if key]
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """Seconds until a rate-limit window resets ("1m26.4s", "7.66s", "120ms", "2")"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    scale = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    return sum(float(amount) * scale[unit] for amount, unit in parts)
+
+
+def _percentile(samples, pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))], 1)
+
+
+def estimate_tokens(messages: List[Dict[str, Any]], max_tokens: int) -> int:
+    """Rough reservation against the key's token window (~4 chars per token)"""
+    return sum(len(str(m.get("content") or "")) for m in messages) // 4 + max_tokens
+
+
+def _record_usage(call: LLMCall, usage: Optional[Dict[str, Any]], messages: List[Dict[str, Any]], completion: str):
+    """Token counts from the provider's usage block, else the same rough estimate as reservations"""
+    if usage:
+        call.prompt_tokens = int(usage.get("prompt_tokens") or 0)
+        call.completion_tokens = int(usage.get("completion_tokens") or 0)
+    else:
+        call.prompt_tokens = estimate_tokens(messages, 0)
+        call.completion_tokens = len(completion) // 4
+        call.tokens_estimated = True
+
+
+class KeyState:
+    def __init__(self, provider: str, key: str):
+        self.provider = provider
+        self.key = key
+        self.key_id = key_id(key)
+        self.remaining_requests: Optional[int] = None
+        self.remaining_tokens: Optional[int] = None
+        self.requests_reset_at = 0.0
+        self.tokens_reset_at = 0.0
+        self.cooldown_until = 0.0
+        self.disabled = False
+        self.in_flight = 0
+        self.reserved_tokens = 0
+
+    @property
+    def label(self) -> str:
+        return f"{self.provider}:…{self.key[-4:]}"
+
+    def headroom(self, now: float) -> tuple:
+        """(requests, tokens) still available after in-flight reservations; inf when unknown"""
+        requests = float("inf") if self.remaining_requests is None or now >= self.requests_reset_at \
+            else self.remaining_requests
+        tokens = float("inf") if self.remaining_tokens is None or now >= self.tokens_reset_at \
+            else self.remaining_tokens
+        return requests - self.in_flight, tokens - self.reserved_tokens
+
+    def can_take(self, tokens: int, now: float) -> bool:
+        if self.disabled or now < self.cooldown_until:
+            return False
+        free_requests, free_tokens = self.headroom(now)
+        if free_requests < 1:
+            return False
+        # A request larger than the whole window still goes out when the key is idle
+        return free_tokens >= tokens or self.reserved_tokens == 0 and free_tokens > 0
+
+    def next_ready_at(self, now: float) -> float:
+        candidates = [t for t in (self.cooldown_until, self.requests_reset_at, self.tokens_reset_at) if t > now]
+        return min(candidates) if candidates else now
+
+    def update_limits(self, headers: Any, now: float):
+        remaining_requests = headers.get("x-ratelimit-remaining-requests")
+        remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+        if remaining_requests is not None:
+            self.remaining_requests = int(float(remaining_requests))
+            self.requests_reset_at = now + (parse_reset(headers.get("x-ratelimit-reset-requests")) or 60)
+        if remaining_tokens is not None:
+            self.remaining_tokens = int(float(remaining_tokens))
+            self.tokens_reset_at = now + (parse_reset(headers.get("x-ratelimit-reset-tokens")) or 60)
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        free_requests, free_tokens = self.headroom(now)
+        return {
+            "key": self.label,
+            "disabled": self.disabled,
+            "cooling_down_s": round(max(0.0, self.cooldown_until - now), 1),
+            "in_flight": self.in_flight,
+            "free_requests": None if free_requests == float("inf") else free_requests,
+            "free_tokens": None if free_tokens == float("inf") else free_tokens,
+        }
+
+
+class _LoopState:
+    """asyncio primitives and the HTTP session are bound to one event loop"""
+
+    def __init__(self):
+        self.semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        self.condition = asyncio.Condition()
+        self.session: Optional[aiohttp.ClientSession] = None
+
+
+class LLMGateway:
+    def __init__(self):
+        self.pools: Dict[str, List[KeyState]] = {}
+        # (provider, key) -> KeyState for bring-your-own keys, least recently used first
+        self.byok: Dict[tuple, KeyState] = {}
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = weakref.WeakKeyDictionary()
+        self.ttft_ms: Dict[str, deque] = defaultdict(lambda: deque(maxlen=TTFT_SAMPLES))
+        self.reload_keys()
+
+    def reload_keys(self):
+        keys = {"groq": groq_keys(), "openai": [os.environ.get("OPENAI_API_KEY")]}
+        self.pools = {
+            provider: [KeyState(provider, key) for key in provider_keys if key]
+            for provider, provider_keys in keys.items()
+        }
+
+    def available(self, provider: str = "groq") -> bool:
+        return any(not state.disabled for state in self.pools.get(provider, []))
+
+    def _state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        state = self._loops.get(loop)
+        if state is None:
+            state = self._loops[loop] = _LoopState()
+        return state
+
+    async def session(self) -> aiohttp.ClientSession:
+        """Shared HTTP session for LLM providers on the running loop"""
+        state = self._state()
+        if state.session is None or state.session.closed:
+            state.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=LLM_REQUEST_TIMEOUT_SECONDS))
+        return state.session
+
+    async def close(self):
+        state = self._loops.get(asyncio.get_running_loop())
+        if state and state.session and not state.session.closed:
+            await state.session.close()
+
+    def _byok_state(self, provider: str, api_key: str) -> KeyState:
+        state = self.byok.pop((provider, api_key), None) or KeyState(provider, api_key)
+        self.byok[(provider, api_key)] = state
+        while len(self.byok) > BYOK_KEY_STATES:
+            del self.byok[next(iter(self.byok))]
+        return state
+
+    async def _acquire_key(self, provider: str, tokens: int, api_key: Optional[str] = None) -> Optional[KeyState]:
+        """
+        Reserve the key with the most headroom, queueing while all are saturated.
+        With api_key, that key is the only candidate (waits out its cooldown).
+        """
+        condition = self._state().condition
+        deadline = time.monotonic() + LLM_QUEUE_TIMEOUT_SECONDS
+        async with condition:
+            while True:
+                now = time.monotonic()
+                keys = [self._byok_state(provider, api_key)] if api_key else self.pools.get(provider, [])
+                pool = [state for state in keys if not state.disabled]
+                if not pool:
+                    return None
+                ready = [state for state in pool if state.can_take(tokens, now)]
+                if ready:
+                    best = max(ready, key=lambda s: (*reversed(s.headroom(now)), -s.in_flight))
+                    best.in_flight += 1
+                    best.reserved_tokens += tokens
+                    return best
+                if now >= deadline:
+                    logger.warning(f"LLM queue timeout: {'BYOK key' if api_key else f'all {provider} keys'} saturated")
+                    return None
+                wake_at = min(state.next_ready_at(now) for state in pool)
+                timeout = min(max(wake_at - now, 0.05), deadline - now)
+                try:
+                    await asyncio.wait_for(condition.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _release_key(self, state: KeyState, tokens: int):
+        condition = self._state().condition
+        async with condition:
+            state.in_flight -= 1
+            state.reserved_tokens -= tokens
+            condition.notify_all()
+
+    async def chat(
+        self,
+        messages: List[Dict[str, Any]],
+        model: Optional[str] = None,
+        max_tokens: int = 4000,
+        temperature: float = 0.1,
+        provider: str = "groq",
+        response_format: Optional[Dict[str, Any]] = None,
+        max_retries: int = 3,
+        api_key: Optional[str] = None,
+        call_site: str = "default",
+        cache: bool = True,
+        cache_if: Optional[Callable[[str], bool]] = None,
+    ) -> Optional[str]:
+        """
+        Chat completion through the provider's key pool. Returns the message
+        content, or None when the call failed (errors are logged).
+        api_key replaces the pool with that one key (bring-your-own-key callers).
+
+        Responses of call sites with a TTL in llm_cache.CALL_SITE_TTLS are
+        served from / stored in the response cache; cache=False skips it for
+        one call, and cache_if rejects responses that must not be cached
+        (e.g. JSON that doesn't parse).
+        """
+        config = PROVIDERS[provider]
+        payload: Dict[str, Any] = {
+            "model": model or config["model"],
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+        if response_format:
+            payload["response_format"] = response_format
+
+        call = LLMCall(call_site, provider, payload["model"])
+        try:
+            ttl = cache_ttl(call_site) if cache else None
+            if ttl:
+                key = cache_key(provider, payload["model"], messages, {
+                    "max_tokens": max_tokens, "temperature": temperature, "response_format": response_format
+                })
+                hit = await asyncio.to_thread(get_llm_cache().get, key, call_site)
+                if hit:
+                    call.cache_hit = call.ok = True
+                    return hit[0]
+
+            started = time.monotonic()
+            result = await self._complete(provider, payload, max_retries, api_key, call)
+            call.ok = result is not None
+            if ttl and result and (cache_if is None or cache_if(result)):
+                latency_ms = (time.monotonic() - started) * 1000
+                await asyncio.to_thread(get_llm_cache().put, key, call_site, result, ttl, latency_ms)
+            return result
+        finally:
+            llm_telemetry.record(call)
+
+    async def _complete(self, provider: str, payload: Dict[str, Any], max_retries: int,
+                        api_key: Optional[str], call: LLMCall) -> Optional[str]:
+        url = PROVIDERS[provider]["url"]
+        tokens = estimate_tokens(payload["messages"], payload["max_tokens"])
+
+        semaphore = self._state().semaphore
+        session = await self.session()
+        for attempt in range(max_retries):
+            queued = time.monotonic()
+            state = await self._acquire_key(provider, tokens, api_key)
+            if state is None:
+                call.queue_wait_ms += (time.monotonic() - queued) * 1000
+                logger.error(f"No usable {provider} API key for {payload['model']}")
+                return None
+            call.key_id = state.key_id
+            try:
+                # The global slot is held only for the request itself, so calls
+                # waiting on a key or backing off never starve other traffic
+                async with semaphore:
+                    call.queue_wait_ms += (time.monotonic() - queued) * 1000
+                    result = await self._post(session, url, state, payload, call)
+            except _Retry as retry:
+                # Rate-limited / revoked keys are skipped by the pool, no need to wait here
+                if retry.backoff and attempt < max_retries - 1:
+                    await asyncio.sleep(RETRY_BACKOFF_SECONDS)
+                continue
+            finally:
+                await self._release_key(state, tokens)
+            return result
+        logger.error(f"{provider} call failed after {max_retries} attempts ({payload['model']})")
+        return None
+
+    async def _post(self, session: aiohttp.ClientSession, url: str, state: KeyState,
+                    payload: Dict[str, Any], call: LLMCall) -> Optional[str]:
+        call.attempts += 1
+        sent = time.monotonic()
+        try:
+            async with session.post(url, headers=self._headers(state), json=payload) as response:
+                state.update_limits(response.headers, time.monotonic())
+                if response.status != 200:
+                    await self._raise_for_status(response, state, call)
+                    return None
+                data = await response.json()
+                choices = data.get("choices") or []
+                if not choices:
+                    logger.error(f"Empty choices in {state.provider} response: {data}")
+                    return None
+                content = choices[0]["message"]["content"]
+                _record_usage(call, data.get("usage"), payload["messages"], content or "")
+                return content
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Error calling {state.provider} API with {state.label}: {e}")
+            raise _Retry()
+        finally:
+            call.upstream_ms += (time.monotonic() - sent) * 1000
+
+    @staticmethod
+    def _headers(state: KeyState) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {state.key}", "Content-Type": "application/json"}
+
+    @staticmethod
+    async def _raise_for_status(response: aiohttp.ClientResponse, state: KeyState, call: LLMCall):
+        """Handle a non-200: raises _Retry when another key / attempt may succeed"""
+        if response.status == 429:
+            call.rate_limited += 1
+            retry_after = parse_reset(response.headers.get("retry-after")) or DEFAULT_RATE_LIMIT_COOLDOWN_SECONDS
+            state.cooldown_until = time.monotonic() + retry_after
+            logger.warning(f"{state.label} rate limited (429), cooling down {retry_after:.1f}s")
+            raise _Retry(backoff=False)
+        if response.status == 401:
+            state.disabled = True
+            logger.error(f"{state.label} authentication failed (401); key disabled")
+            raise _Retry(backoff=False)
+        error_text = await response.text()
+        logger.error(f"{state.provider} API error {response.status}: {error_text[:500]}")
+        if response.status >= 500:
+            raise _Retry()
+
+    async def stream(
+        self,
+        messages: List[Dict[str, Any]],
+        model: Optional[str] = None,
+        max_tokens: int = 4000,
+        temperature: float = 0.1,
+        provider: str = "groq",
+        max_retries: int = 3,
+        api_key: Optional[str] = None,
+        call_site: str = "default",
+        cache: bool = True,
+    ) -> AsyncIterator[str]:
+        """
+        Streaming chat completion: yields content deltas as they arrive.
+
+        Retries (other key / backoff) only happen before the first token;
+        raises LLMError if no completion could be started or the upstream
+        stream breaks. Cancelling the consumer (client disconnect) closes the
+        upstream connection and releases the key. The upstream body is only
+        read as fast as the consumer pulls, so a slow client backs up into
+        the provider connection instead of into memory.
+
+        Cached responses (same rules as chat()) are replayed as one delta,
+        and completed streams are stored in the cache.
+        """
+        model = model or PROVIDERS[provider]["model"]
+        payload: Dict[str, Any] = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": True,
+        }
+        if PROVIDERS[provider].get("stream_options"):
+            payload["stream_options"] = PROVIDERS[provider]["stream_options"]
+        started = time.monotonic()
+        call = LLMCall(call_site, provider, model)
+        call.streamed = True
+        try:
+            ttl = cache_ttl(call_site) if cache else None
+            if ttl:
+                key = cache_key(provider, model, messages, {
+                    "max_tokens": max_tokens, "temperature": temperature, "response_format": None
+                })
+                hit = await asyncio.to_thread(get_llm_cache().get, key, call_site)
+                if hit:
+                    call.cache_hit = call.ok = True
+                    self._record_ttft(call_site, started)
+                    yield hit[0]
+                    return
+
+            tokens = estimate_tokens(messages, max_tokens)
+            parts: List[str] = []
+            usage: Dict[str, Any] = {}
+            semaphore = self._state().semaphore
+            session = await self.session()
+            for attempt in range(max_retries):
+                queued = time.monotonic()
+                state = await self._acquire_key(provider, tokens, api_key)
+                if state is None:
+                    call.queue_wait_ms += (time.monotonic() - queued) * 1000
+                    raise LLMError(f"No usable {provider} API key for {model}")
+                call.key_id = state.key_id
+                sent = time.monotonic()
+                try:
+                    # As in _complete, the global slot covers only the upstream request
+                    async with semaphore:
+                        call.queue_wait_ms += (time.monotonic() - queued) * 1000
+                        call.attempts += 1
+                        sent = time.monotonic()
+                        async with session.post(PROVIDERS[provider]["url"], headers=self._headers(state), json=payload) as response:
+                            state.update_limits(response.headers, time.monotonic())
+                            if response.status != 200:
+                                await self._raise_for_status(response, state, call)
+                                raise LLMError(f"{provider} API error {response.status}")
+                            async for delta in self._read_deltas(response, usage):
+                                if not parts:
+                                    self._record_ttft(call_site, started)
+                                parts.append(delta)
+                                yield delta
+                    break
+                except _Retry as retry:
+                    if retry.backoff and attempt < max_retries - 1:
+                        await asyncio.sleep(RETRY_BACKOFF_SECONDS)
+                    continue
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    logger.error(f"Error streaming from {provider} with {state.label}: {e}")
+                    if parts:
+                        raise LLMError(f"{provider} stream interrupted: {e}") from e
+                    if attempt < max_retries - 1:
+                        await asyncio.sleep(RETRY_BACKOFF_SECONDS)
+                    continue
+                finally:
+                    call.upstream_ms += (time.monotonic() - sent) * 1000
+                    await self._release_key(state, tokens)
+            else:
+                raise LLMError(f"{provider} call failed after {max_retries} attempts ({model})")
+
+            call.ok = True
+            _record_usage(call, usage, messages, "".join(parts))
+            if ttl and parts:
+                latency_ms = (time.monotonic() - started) * 1000
+                await asyncio.to_thread(get_llm_cache().put, key, call_site, "".join(parts), ttl, latency_ms)
+        finally:
+            llm_telemetry.record(call)
+
+    @staticmethod
+    async def _read_deltas(response: aiohttp.ClientResponse, usage: Dict[str, Any]) -> AsyncIterator[str]:
+        """Content deltas from an OpenAI-style SSE body; a usage block, if sent, is copied into usage"""
+        async for raw_line in response.content:
+            line = raw_line.decode("utf-8", errors="replace").strip()
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                return
+            try:
+                chunk = json.loads(data)
+            except ValueError:
+                # A garbled chunk loses at most one delta; don't kill the stream
+                logger.warning(f"Skipping malformed stream chunk: {data[:200]!r}")
+                continue
+            # OpenAI puts usage on the last chunk, Groq under x_groq
+            usage.update(chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage") or {})
+            choices = chunk.get("choices") or []
+            delta = (choices[0].get("delta") or {}).get("content") if choices else None
+            if delta:
+                yield delta
+
+    def _record_ttft(self, call_site: str, started: float):
+        self.ttft_ms[call_site].append((time.monotonic() - started) * 1000)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "max_concurrency": LLM_MAX_CONCURRENCY,
+            "keys": {provider: [state.snapshot(now) for state in pool] for provider, pool in self.pools.items()},
+            "byok_keys": len(self.byok),
+            "cache": get_llm_cache().stats(),
+            "ttft_ms": {
+                site: {"count": len(samples), "p50": _percentile(samples, 50), "p95": _percentile(samples, 95)}
+                for site, samples in self.ttft_ms.items()
+            },
+        }
+
+
+class LLMError(Exception):
+    """A streaming completion could not be started or was interrupted"""
+
+
+class _Retry(Exception):
+    """Attempt failed in a way another key / attempt may fix"""
+
+    def __init__(self, backoff: bool = True):
+        super().__init__()
+        self.backoff = backoff
+
+
+llm_gateway = LLMGateway()
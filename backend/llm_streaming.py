@@ -0,0 +1,60 @@
+"""
+LLM Streaming - Server-sent events for token-streamed AI endpoints
+
+Endpoints that generate long text accept ?stream=true and return
+sse_response(llm_gateway.stream(...), finalize) instead of waiting for the
+whole completion. The event stream is:
+
+    data: {"delta": "..."}              one per content delta
+    event: done / data: {...}           finalize(full_text): the same body the
+                                        non-streaming endpoint returns
+    event: error / data: {"detail"}     the completion failed or broke off
+
+Backpressure and cancellation come from the pull model: Starlette sends each
+event before asking for the next one, llm_gateway.stream() reads the
+provider body only when asked, and when the client disconnects the
+generators are closed, which closes the upstream request and frees its key.
+"""
+
+import json
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from fastapi.responses import StreamingResponse
+
+from llm_gateway import LLMError
+
+logger = logging.getLogger(__name__)
+
+
+def sse_event(data: Any, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def sse_response(chunks: AsyncIterator[str], finalize: Callable[[str], Dict[str, Any]]) -> StreamingResponse:
+    """Stream content deltas as SSE, then finalize(full_text) as the done event"""
+
+    async def events():
+        parts = []
+        try:
+            async for delta in chunks:
+                parts.append(delta)
+                yield sse_event({"delta": delta})
+            yield sse_event(finalize("".join(parts)), event="done")
+        except LLMError as e:
+            logger.error(f"LLM stream failed: {e}")
+            yield sse_event({"detail": str(e)}, event="error")
+        except Exception as e:
+            # Anything else (bad upstream data, finalize errors) still ends with an error event
+            logger.exception(f"LLM stream failed unexpectedly: {e}")
+            yield sse_event({"detail": "Streaming failed"}, event="error")
+        finally:
+            await chunks.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # X-Accel-Buffering: don't let a proxy buffer the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
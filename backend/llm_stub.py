@@ -0,0 +1,465 @@
+"""
+LLM Stub - Local Groq/OpenAI-compatible server for load tests
+
+Speaks the two wire formats the app uses, so the real pipelines
+(analyze_resume, generate_expert_documents, scrape_job_description, the
+interview flow) run unchanged without spending Groq/OpenAI quota:
+
+- POST /openai/v1/chat/completions (Groq) and /v1/chat/completions (OpenAI),
+  plain or streamed ("stream": true -> SSE chunks, usage under x_groq on
+  the last one, then [DONE]); every response carries a usage block
+- POST /openai/v1/audio/transcriptions and /v1/audio/transcriptions
+  (multipart; response_format "text" or JSON)
+- GET /jobs/{id}: a job posting page for scrape_job_description
+
+Responses come from rules: the first rule whose `match` substring is in the
+prompt wins; `content` is a string or JSON value, with {{n}} (request
+number) and {{model}} filled in. DEFAULT_RULES cover every pipeline prompt;
+a JSON file of extra rules (same shape) is checked first.
+
+Latency is a distribution ("800" fixed, "800,2500" uniform,
+"lognormal:900,0.6" median ms and sigma) plus a per-chunk delay when
+streaming. Rate limits are injected either at random (rate_limit_p) or per
+API key from rpm / tpm windows, with the x-ratelimit-* and retry-after
+headers the gateway schedules on.
+
+    # Standalone; point the app at it with GROQ_BASE_URL / OPENAI_BASE_URL
+    python llm_stub.py --port 8099 --latency lognormal:900,0.6 --rpm 30
+
+    # In-process (benchmarks): served from its own thread and event loop
+    stub = LLMStub(latency="800,2500"); base_url = stub.start()
+"""
+
+import re
+import json
+import math
+import time
+import random
+import asyncio
+import logging
+import argparse
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETRY_AFTER_SECONDS = 2.0
+RATE_LIMIT_WINDOW_SECONDS = 60.0
+TRANSCRIPT = "I led the migration of our reporting pipeline to async workers and cut p95 latency by 40 percent."
+
+ANALYSIS = {
+    "matchScore": 72,
+    "summary": "Strong backend background. Missing some of the cloud tooling the role asks for.",
+    "searchability": {"score": 80, "hasEmail": True, "hasPhone": True, "hasLinkedIn": True, "hasSummary": True,
+                      "hasEducation": True, "hasExperience": True, "issues": ["No job title at the top"]},
+    "hardSkills": {
+        "score": 68,
+        "matched": [{"skill": "Python", "resumeCount": 6, "jobCount": 4},
+                    {"skill": "PostgreSQL", "resumeCount": 2, "jobCount": 2}],
+        "missing": [{"skill": "Kubernetes", "jobCount": 3, "importance": "required"},
+                    {"skill": "Terraform", "jobCount": 1, "importance": "preferred"}],
+    },
+    "softSkills": {"score": 75, "matched": [{"skill": "Leadership", "resumeCount": 2, "jobCount": 1}],
+                   "missing": [{"skill": "Mentoring", "jobCount": 1}]},
+    "experience": {"score": 80, "yearsRequired": "5+", "yearsFound": "6", "levelMatch": True,
+                   "feedback": "Seniority matches."},
+    "education": {"score": 90, "required": "BS Computer Science", "found": "BS Computer Science", "match": True},
+    "jobTitleMatch": {"score": 70, "targetTitle": "Senior Backend Engineer", "resumeTitles": ["Backend Engineer"],
+                      "match": False, "feedback": "Use the target title in the summary."},
+    "recruiterTips": {
+        "measurableResults": {"count": 4, "feedback": "Add metrics to the older roles."},
+        "resumeTone": {"status": "positive", "weakWords": ["helped"], "feedback": "Mostly strong verbs."},
+        "wordCount": {"count": 520, "status": "good", "feedback": "Good length."},
+    },
+    "suggestions": ["Add Kubernetes experience if you have it", "Lead with the target title",
+                    "Quantify the 2019 role", "Mention Terraform", "Move skills above education"],
+    "keywordsToAdd": ["Kubernetes", "Terraform", "distributed systems", "gRPC", "observability"],
+}
+
+FACTS = {
+    "name": "Alex Rivera",
+    "location": "Austin, TX",
+    "email": "alex@example.com",
+    "phone": "555-0100",
+    "links": {"linkedin": "linkedin.com/in/alex", "github": "", "portfolio": ""},
+    "summary_original": "Backend engineer with 6 years of Python.",
+    "employers": [
+        {"company": "Acme Corp", "title": "Backend Engineer", "location": "Austin, TX", "start": "2019", "end": "Present",
+         "bullets": ["Moved reporting to async workers, cutting p95 latency by 40%",
+                     "Built the billing API serving 2M requests a day"]},
+        {"company": "Initech", "title": "Software Engineer", "location": "Remote", "start": "2017", "end": "2019",
+         "bullets": ["Maintained the Postgres data layer"]},
+    ],
+    "projects": [{"name": "Queue Monitor", "bullets": ["Dashboard for worker backlogs"], "tools": ["Python"], "metrics": []}],
+    "education": [{"degree": "BS", "major": "Computer Science", "university": "UT Austin", "year": "2017"}],
+    "skills": {"technical": ["Python", "PostgreSQL", "Redis", "AWS"], "soft": ["Leadership"], "certifications": []},
+    "metrics_explicit": ["40%", "2M requests a day"],
+}
+
+DRAFT = {
+    "jd_extraction": {"job_title": "Senior Backend Engineer",
+                      "top_5_keywords": ["Python", "Kubernetes", "APIs", "PostgreSQL", "observability"],
+                      "core_mission": "Scale the platform APIs", "persona": "Senior engineer"},
+    "tailored_resume": {
+        "name": "Alex Rivera",
+        "contact": {"location": "Austin, TX", "email": "alex@example.com", "phone": "555-0100"},
+        "summary": ["Senior Backend Engineer with 6 years of Python.", "Scales APIs and async pipelines."],
+        "skills": {"Languages & APIs": ["Python", "SQL", "REST"], "Cloud & Infrastructure": ["AWS", "Kubernetes"]},
+        "experience": [
+            {"company": "Acme Corp", "title": "Backend Engineer", "location": "Austin, TX", "dates": "2019 - Present",
+             "bullets": ["Moved reporting to async workers, cutting p95 latency by 40%",
+                         "Designed and implemented the billing API serving 2M requests a day"]},
+            {"company": "Initech", "title": "Software Engineer", "location": "Remote", "dates": "2017 - 2019",
+             "bullets": ["Maintained the Postgres data layer"]},
+        ],
+        "projects": [{"name": "Queue Monitor", "tech": "Python", "bullets": ["Dashboard for worker backlogs"]}],
+        "education": [{"degree": "BS Computer Science", "school": "UT Austin"}],
+    },
+    "changes": [{"section": "summary", "company_or_project": "", "type": "rewritten",
+                 "original": "Backend engineer with 6 years of Python.",
+                 "updated": "Senior Backend Engineer with 6 years of Python.", "jd_reason": "Job title"}],
+    "skills_added": ["Kubernetes"],
+    "self_check_passed": True,
+}
+
+COVER_LETTER = (
+    "Dear Hiring Manager,\n\n"
+    "I am excited to apply for this role. At Acme Corp I moved our reporting pipeline to async workers, "
+    "cutting p95 latency by 40%, and built a billing API that serves two million requests a day.\n\n"
+    "I would bring the same focus on reliable, measurable improvements to your team.\n\n"
+    "Thank you for your consideration.\n\nAlex Rivera"
+)
+
+RESUME_TEXT = (
+    "ALEX RIVERA\nAustin, TX | alex@example.com | 555-0100\n\nSUMMARY\nBackend engineer with 6 years of Python.\n\n"
+    "EXPERIENCE\nAcme Corp - Backend Engineer (2019 - Present)\n"
+    "- Moved reporting to async workers, cutting p95 latency by 40%\n"
+    "- Built the billing API serving 2M requests a day\n\n"
+    "EDUCATION\nBS Computer Science, UT Austin, 2017"
+)
+
+# (name, match, content), first match wins
+DEFAULT_RULES: List[Dict[str, Any]] = [
+    {"name": "interview_evaluation", "match": "scoring one answer", "content": {
+        "scores": {"communication": 80, "technical": 70, "behavioral": 75, "confidence": 80},
+        "roleFit": 75, "strengths": ["Clear structure"], "gaps": ["Few metrics"],
+        "phrases": ["at the end of the day"], "improvedAnswer": "I led the migration, cutting p95 latency by 40%.",
+    }},
+    {"name": "interview_summary", "match": "wrapping up a mock interview", "content": {
+        "summary": "Solid answers overall.", "repetition": "Leans on 'at the end of the day'.",
+    }},
+    {"name": "interview_first_question", "match": "FIRST mock interview question", "content": {
+        "intro": "Hi, I'm your AI mock interviewer.", "question": "Tell me about yourself.",
+        "intent": "motivation", "hint": "A two-minute story tied to this role.",
+    }},
+    {"name": "interview_next_question", "match": "ask a follow-up question or move to the next topic", "content": {
+        "question": "Tell me about project #{{n}}?", "intent": "skill_drill", "hint": "Specifics and metrics.",
+    }},
+    {"name": "compliance_facts", "match": "precision fact extractor", "content": FACTS},
+    {"name": "expert_draft", "match": "\"tailored_resume\"", "content": DRAFT},
+    {"name": "analyze_resume", "match": "Analyze this resume against the job description", "content": ANALYSIS},
+    {"name": "scrape_job_description", "match": "Extract job details from the following raw text", "content": {
+        "success": True, "jobTitle": "Senior Backend Engineer", "company": "Example Labs",
+        "description": "Build and scale APIs.\nRequirements: 5+ years of Python, PostgreSQL, Kubernetes.",
+        "location": "Remote (US)", "salary": "$150,000 - $180,000",
+    }},
+    {"name": "extract_resume_data", "match": "Extract structured data from this resume text", "content": {
+        "person": {"fullName": "Alex Rivera", "firstName": "Alex", "lastName": "Rivera",
+                   "email": "alex@example.com", "phone": "555-0100", "location": "Austin, TX"},
+        "experience": [{"company": "Acme Corp", "title": "Backend Engineer", "startDate": "2019", "endDate": "Present"}],
+        "skills": ["Python", "PostgreSQL", "Redis", "AWS"],
+    }},
+    {"name": "cover_letter", "match": "compelling cover letter", "content": COVER_LETTER},
+    {"name": "simple_resume", "match": "expert resume writer", "content": RESUME_TEXT},
+]
+
+FALLBACK_TEXT = "OK"
+FALLBACK_JSON = {"result": "ok", "n": "{{n}}"}
+
+JOB_PAGE = """<!DOCTYPE html>
+<html><head><title>Senior Backend Engineer - Example Labs</title></head>
+<body><main>
+<h1>Senior Backend Engineer</h1>
+<p>Example Labs - Remote (US) - $150,000 - $180,000</p>
+<h2>About the role</h2>
+<p>We are looking for a Senior Backend Engineer to build and scale the APIs behind our hiring platform.
+You will own services end to end, from design reviews to on-call, and work closely with product and data.</p>
+<h2>Responsibilities</h2>
+<ul><li>Design, build and operate Python services handling millions of requests a day</li>
+<li>Move slow synchronous work to queues and async workers</li>
+<li>Own observability: metrics, tracing and alerting for your services</li>
+<li>Mentor engineers and lead technical design reviews</li></ul>
+<h2>Requirements</h2>
+<ul><li>5+ years of backend development in Python</li>
+<li>Production experience with PostgreSQL and Redis</li>
+<li>Kubernetes and Terraform on AWS</li>
+<li>Clear written communication</li></ul>
+<h2>Equal opportunity</h2>
+<p>Example Labs is an equal opportunity employer. Posting {job_id}.</p>
+</main></body></html>
+"""
+
+_CHUNK = re.compile(r"\S+\s*|\s+")
+
+
+def count_tokens(text: str) -> int:
+    """Same rough estimate as the gateway's reservations (~4 chars per token)"""
+    return max(1, len(text) // 4) if text else 0
+
+
+class Latency:
+    """Latency distribution in ms: "800", "800,2500" (uniform) or "lognormal:<median>,<sigma>" """
+
+    def __init__(self, spec: str = "0"):
+        self.spec = str(spec)
+        kind, _, params = self.spec.partition(":") if ":" in self.spec else ("", "", self.spec)
+        values = [float(v) for v in params.split(",") if v.strip()] or [0.0]
+        if kind == "lognormal":
+            median, sigma = values[0], values[1] if len(values) > 1 else 0.5
+            self._sample = lambda: random.lognormvariate(math.log(max(median, 1.0)), sigma)
+        elif kind:
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        elif len(values) > 1:
+            self._sample = lambda: random.uniform(values[0], values[1])
+        else:
+            self._sample = lambda: values[0]
+
+    def seconds(self) -> float:
+        return max(0.0, self._sample()) / 1000
+
+
+class _KeyWindow:
+    """Requests and tokens used by one API key in the current window"""
+
+    def __init__(self, now: float):
+        self.started = now
+        self.requests = 0
+        self.tokens = 0
+
+    def reset_in(self, now: float) -> float:
+        return max(0.0, self.started + RATE_LIMIT_WINDOW_SECONDS - now)
+
+
+class LLMStub:
+    def __init__(self, latency: str = "0", chunk_latency: str = "0", rate_limit_p: float = 0.0,
+                 rpm: int = 0, tpm: int = 0, retry_after: float = DEFAULT_RETRY_AFTER_SECONDS,
+                 rules: Optional[List[Dict[str, Any]]] = None):
+        self.latency = Latency(latency)
+        self.chunk_latency = Latency(chunk_latency)
+        self.rate_limit_p = rate_limit_p
+        self.rpm = rpm
+        self.tpm = tpm
+        self.retry_after = retry_after
+        self.rules = (rules or []) + DEFAULT_RULES
+        self.windows: Dict[str, _KeyWindow] = {}
+        self.counters: Counter = Counter()
+        self.by_rule: Counter = Counter()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.port: Optional[int] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.ready = threading.Event()
+
+    # -- responses -----------------------------------------------------------
+
+    def _respond(self, body: Dict[str, Any]) -> Tuple[str, str]:
+        """(rule name, completion text) for a chat request"""
+        messages = body.get("messages") or []
+        prompt = "\n".join(str(m.get("content") or "") for m in messages)
+        n = str(self.counters["chat"])
+        for rule in self.rules:
+            if rule["match"] in prompt:
+                name, content = rule.get("name") or rule["match"], rule["content"]
+                break
+        else:
+            json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+            name, content = "fallback", FALLBACK_JSON if json_mode else FALLBACK_TEXT
+        text = content if isinstance(content, str) else json.dumps(content)
+        return name, text.replace("{{n}}", n).replace("{{model}}", str(body.get("model") or ""))
+
+    def _limit(self, request: web.Request, tokens: int) -> Tuple[Optional[web.Response], Dict[str, str]]:
+        """(429 response or None, x-ratelimit headers) for this request's API key"""
+        if self.rate_limit_p and random.random() < self.rate_limit_p:
+            self.counters["rate_limited"] += 1
+            return self._rate_limited(self.retry_after), {}
+        if not (self.rpm or self.tpm):
+            return None, {}
+
+        now = time.monotonic()
+        key = request.headers.get("Authorization", "")
+        window = self.windows.get(key)
+        if window is None or window.reset_in(now) == 0:
+            window = self.windows[key] = _KeyWindow(now)
+        reset_in = window.reset_in(now)
+        if (self.rpm and window.requests + 1 > self.rpm) or (self.tpm and window.tokens + tokens > self.tpm):
+            self.counters["rate_limited"] += 1
+            return self._rate_limited(reset_in), {}
+        window.requests += 1
+        window.tokens += tokens
+        headers = {}
+        if self.rpm:
+            headers["x-ratelimit-remaining-requests"] = str(self.rpm - window.requests)
+            headers["x-ratelimit-reset-requests"] = f"{reset_in:.2f}s"
+        if self.tpm:
+            headers["x-ratelimit-remaining-tokens"] = str(self.tpm - window.tokens)
+            headers["x-ratelimit-reset-tokens"] = f"{reset_in:.2f}s"
+        return None, headers
+
+    @staticmethod
+    def _rate_limited(retry_after: float) -> web.Response:
+        return web.json_response(
+            {"error": {"message": "Rate limit reached (stub)", "type": "tokens", "code": "rate_limit_exceeded"}},
+            status=429, headers={"retry-after": f"{max(retry_after, 0.05):.2f}"}
+        )
+
+    def _enter(self):
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    async def completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.counters["chat"] += 1
+        prompt_tokens = sum(count_tokens(str(m.get("content") or "")) for m in body.get("messages") or [])
+        limited, headers = self._limit(request, prompt_tokens + int(body.get("max_tokens") or 0))
+        if limited:
+            return limited
+
+        name, text = self._respond(body)
+        self.by_rule[name] += 1
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": count_tokens(text),
+                 "total_tokens": prompt_tokens + count_tokens(text)}
+        model = body.get("model") or "stub"
+        created = int(time.time())
+        self._enter()
+        try:
+            await asyncio.sleep(self.latency.seconds())
+            if not body.get("stream"):
+                return web.json_response({
+                    "id": f"chatcmpl-stub-{self.counters['chat']}", "object": "chat.completion",
+                    "created": created, "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                    "usage": usage,
+                }, headers=headers)
+
+            self.counters["streams"] += 1
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream", **headers})
+            await response.prepare(request)
+            chunks = _CHUNK.findall(text)
+            for i, piece in enumerate(chunks):
+                chunk: Dict[str, Any] = {
+                    "id": f"chatcmpl-stub-{self.counters['chat']}", "object": "chat.completion.chunk",
+                    "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                }
+                if i == len(chunks) - 1:
+                    chunk["choices"][0]["finish_reason"] = "stop"
+                    chunk["x_groq"] = {"usage": usage}
+                await response.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                await asyncio.sleep(self.chunk_latency.seconds())
+            await response.write(b"data: [DONE]\n\n")
+            await response.write_eof()
+            return response
+        finally:
+            self.in_flight -= 1
+
+    async def transcriptions(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        self.counters["transcriptions"] += 1
+        limited, headers = self._limit(request, 0)
+        if limited:
+            return limited
+        self._enter()
+        try:
+            await asyncio.sleep(self.latency.seconds())
+        finally:
+            self.in_flight -= 1
+        if form.get("response_format") == "text":
+            return web.Response(text=TRANSCRIPT, headers=headers)
+        return web.json_response({"text": TRANSCRIPT}, headers=headers)
+
+    async def job_page(self, request: web.Request) -> web.Response:
+        self.counters["job_pages"] += 1
+        return web.Response(text=JOB_PAGE.format(job_id=request.match_info["job_id"]), content_type="text/html")
+
+    # -- serving -------------------------------------------------------------
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=32 * 1024 * 1024)
+        for prefix in ("/openai/v1", "/v1"):
+            app.router.add_post(f"{prefix}/chat/completions", self.completions)
+            app.router.add_post(f"{prefix}/audio/transcriptions", self.transcriptions)
+        app.router.add_get("/jobs/{job_id}", self.job_page)
+        return app
+
+    def _serve(self, host: str, port: int):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        runner = web.AppRunner(self.app())
+        self.loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, host, port)
+        self.loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.ready.set()
+        self.loop.run_forever()
+        self.loop.run_until_complete(runner.cleanup())
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve from a daemon thread with its own loop (stub latency never touches the caller's loop)"""
+        threading.Thread(target=self._serve, args=(host, port), daemon=True, name="llm-stub").start()
+        self.ready.wait()
+        return f"http://{host}:{self.port}"
+
+    def stop(self):
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def reset(self):
+        """Zero the counters and rate-limit windows between benchmark scenarios"""
+        self.counters.clear()
+        self.by_rule.clear()
+        self.windows.clear()
+        self.peak_in_flight = self.in_flight
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **{key: self.counters[key] for key in ("chat", "streams", "transcriptions", "job_pages", "rate_limited")},
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "by_rule": dict(self.by_rule),
+        }
+
+
+def load_rules(path: Optional[str]) -> List[Dict[str, Any]]:
+    """Extra rules from a JSON file: [{"name": ..., "match": ..., "content": ...}, ...]"""
+    if not path:
+        return []
+    with open(path) as f:
+        rules = json.load(f)
+    for rule in rules:
+        if "match" not in rule or "content" not in rule:
+            raise ValueError(f"Rule needs 'match' and 'content': {rule}")
+    return rules
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Groq/OpenAI-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", default="800,2500", help='Completion latency in ms: "800", "800,2500" or "lognormal:900,0.6"')
+    parser.add_argument("--chunk-latency", default="15", help="Delay between streamed chunks in ms (same formats)")
+    parser.add_argument("--rate-limit-p", type=float, default=0.0, help="Probability of answering 429")
+    parser.add_argument("--rpm", type=int, default=0, help="Requests per minute per API key (0 = unlimited)")
+    parser.add_argument("--tpm", type=int, default=0, help="Tokens per minute per API key (0 = unlimited)")
+    parser.add_argument("--retry-after", type=float, default=DEFAULT_RETRY_AFTER_SECONDS)
+    parser.add_argument("--rules", help="JSON file of extra response rules")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    stub = LLMStub(args.latency, args.chunk_latency, args.rate_limit_p, args.rpm, args.tpm,
+                   args.retry_after, load_rules(args.rules))
+    print(f"LLM stub on http://{args.host}:{args.port}; set GROQ_BASE_URL=http://{args.host}:{args.port} "
+          f"and OPENAI_BASE_URL=http://{args.host}:{args.port}/v1")
+    web.run_app(stub.app(), host=args.host, port=args.port, print=None)
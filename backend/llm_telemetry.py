@@ -0,0 +1,254 @@
+"""
+LLM Telemetry - Per-call metrics for every model call
+
+llm_gateway.chat() / stream() (and Whisper transcription) record one
+LLMCall per call, so spend and latency can be broken down by feature:
+
+- call_site (the feature: "analyze_resume", "interview", ...), provider, model
+- prompt / completion tokens (from the provider's usage block; estimated
+  when a stream doesn't report usage, flagged tokens_estimated)
+- queue_wait_ms: waiting for a gateway slot and a key with headroom
+- upstream_ms: time spent in provider HTTP calls; latency_ms: the whole call
+- retries, rate_limited (429s seen), key_id (sha256 prefix, never the key)
+- cache_hit (served from llm_cache, no upstream call)
+
+Each call is logged as one `llm_call {json}` line (replacing the old
+ai_debug.log file) and aggregated into counters and fixed-bucket histograms
+per (call_site, model) and counters per key. snapshot() is the JSON view
+(/api/admin/llm/metrics), prometheus() the text exposition (/metrics), and
+slowest_call_sites() ranks call sites by p95 latency over the last
+LLM_TELEMETRY_WINDOW_SECONDS.
+
+Counters live in process memory and reset on restart.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import defaultdict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LLM_TELEMETRY_WINDOW_SECONDS = int(os.getenv("LLM_TELEMETRY_WINDOW_SECONDS", "900"))
+LLM_TELEMETRY_TOP_N = int(os.getenv("LLM_TELEMETRY_TOP_N", "5"))
+WINDOW_SAMPLES = 5000
+
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 20000, 40000, 80000)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+
+def key_id(key: Optional[str]) -> Optional[str]:
+    """Stable, non-reversible id of an API key for per-key metrics"""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:12] if key else None
+
+
+def _percentile(samples: List[float], pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))], 1)
+
+
+class LLMCall:
+    """What one model call cost; filled in along the gateway path, then record()ed"""
+
+    def __init__(self, call_site: str, provider: str, model: str):
+        self.call_site = call_site
+        self.provider = provider
+        self.model = model
+        self.started = time.monotonic()
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.tokens_estimated = False
+        self.queue_wait_ms = 0.0
+        self.upstream_ms = 0.0
+        self.attempts = 0
+        self.rate_limited = 0
+        self.key_id: Optional[str] = None
+        self.cache_hit = False
+        self.streamed = False
+        self.ok = False
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "call_site": self.call_site,
+            "provider": self.provider,
+            "model": self.model,
+            "ok": self.ok,
+            "cache_hit": self.cache_hit,
+            "streamed": self.streamed,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "tokens_estimated": self.tokens_estimated,
+            "latency_ms": round((time.monotonic() - self.started) * 1000, 1),
+            "queue_wait_ms": round(self.queue_wait_ms, 1),
+            "upstream_ms": round(self.upstream_ms, 1),
+            "retries": max(0, self.attempts - 1),
+            "rate_limited": self.rate_limited,
+            "key_id": self.key_id,
+        }
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, count) pairs, Prometheus style"""
+        total = 0
+        pairs = []
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"count": self.count, "sum": round(self.sum, 1), "buckets": dict(self.cumulative())}
+
+
+class _SiteMetrics:
+    COUNTERS = ("calls", "errors", "cache_hits", "retries", "rate_limited", "prompt_tokens", "completion_tokens")
+
+    def __init__(self):
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.queue_wait_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.upstream_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.prompt_tokens = Histogram(TOKEN_BUCKETS)
+
+
+class LLMTelemetry:
+    def __init__(self, window_seconds: int = LLM_TELEMETRY_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drop every counter and sample (benchmarks measure scenarios one at a time)"""
+        with self.lock:
+            self.sites: Dict[Tuple[str, str], _SiteMetrics] = defaultdict(_SiteMetrics)
+            self.keys: Dict[str, Dict[str, int]] = defaultdict(
+                lambda: {"calls": 0, "rate_limited": 0, "prompt_tokens": 0, "completion_tokens": 0}
+            )
+            # (monotonic ts, call_site, latency_ms, queue_wait_ms) of recent upstream calls
+            self.window: deque = deque(maxlen=WINDOW_SAMPLES)
+
+    def record(self, call: LLMCall):
+        data = call.as_dict()
+        logger.info(f"llm_call {json.dumps(data)}")
+        with self.lock:
+            site = self.sites[(call.call_site, call.model)]
+            counters = site.counters
+            counters["calls"] += 1
+            counters["errors"] += 0 if call.ok else 1
+            counters["cache_hits"] += call.cache_hit
+            counters["retries"] += data["retries"]
+            counters["rate_limited"] += call.rate_limited
+            counters["prompt_tokens"] += call.prompt_tokens
+            counters["completion_tokens"] += call.completion_tokens
+            site.latency_ms.observe(data["latency_ms"])
+            if call.cache_hit:
+                return
+            site.queue_wait_ms.observe(data["queue_wait_ms"])
+            site.upstream_ms.observe(data["upstream_ms"])
+            site.prompt_tokens.observe(call.prompt_tokens)
+            if call.key_id:
+                key = self.keys[call.key_id]
+                key["calls"] += 1
+                key["rate_limited"] += call.rate_limited
+                key["prompt_tokens"] += call.prompt_tokens
+                key["completion_tokens"] += call.completion_tokens
+            self.window.append((time.monotonic(), call.call_site, data["latency_ms"], data["queue_wait_ms"]))
+
+    def slowest_call_sites(self, n: int = LLM_TELEMETRY_TOP_N) -> List[Dict[str, Any]]:
+        """Call sites by p95 latency over the rolling window (cache hits excluded)"""
+        cutoff = time.monotonic() - self.window_seconds
+        latencies: Dict[str, List[float]] = defaultdict(list)
+        waits: Dict[str, List[float]] = defaultdict(list)
+        with self.lock:
+            for ts, call_site, latency_ms, queue_wait_ms in self.window:
+                if ts >= cutoff:
+                    latencies[call_site].append(latency_ms)
+                    waits[call_site].append(queue_wait_ms)
+        ranked = [
+            {
+                "call_site": call_site,
+                "calls": len(samples),
+                "p50_ms": _percentile(samples, 50),
+                "p95_ms": _percentile(samples, 95),
+                "max_ms": round(max(samples), 1),
+                "queue_wait_p95_ms": _percentile(waits[call_site], 95),
+            }
+            for call_site, samples in latencies.items()
+        ]
+        ranked.sort(key=lambda site: site["p95_ms"], reverse=True)
+        return ranked[:n]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            sites = [
+                {
+                    "call_site": call_site,
+                    "model": model,
+                    **metrics.counters,
+                    "latency_ms": metrics.latency_ms.snapshot(),
+                    "queue_wait_ms": metrics.queue_wait_ms.snapshot(),
+                    "upstream_ms": metrics.upstream_ms.snapshot(),
+                    "prompt_tokens_histogram": metrics.prompt_tokens.snapshot(),
+                }
+                for (call_site, model), metrics in sorted(self.sites.items())
+            ]
+            keys = {kid: dict(counters) for kid, counters in self.keys.items()}
+        return {
+            "window_seconds": self.window_seconds,
+            "slowest_call_sites": self.slowest_call_sites(),
+            "call_sites": sites,
+            "keys": keys,
+        }
+
+    def prometheus(self) -> str:
+        """Text exposition format (counters and histograms by call_site/model, counters by key)"""
+        lines = []
+        with self.lock:
+            items = sorted(self.sites.items())
+            for counter in _SiteMetrics.COUNTERS:
+                name = f"llm_{counter}_total"
+                lines.append(f"# TYPE {name} counter")
+                for (call_site, model), metrics in items:
+                    lines.append(f'{name}{{call_site="{call_site}",model="{model}"}} {metrics.counters[counter]}')
+            for histogram in ("latency_ms", "queue_wait_ms", "upstream_ms"):
+                name = f"llm_{histogram}"
+                lines.append(f"# TYPE {name} histogram")
+                for (call_site, model), metrics in items:
+                    labels = f'call_site="{call_site}",model="{model}"'
+                    h = getattr(metrics, histogram)
+                    for bound, count in h.cumulative():
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                    lines.append(f"{name}_sum{{{labels}}} {round(h.sum, 1)}")
+                    lines.append(f"{name}_count{{{labels}}} {h.count}")
+            for counter in ("calls", "rate_limited", "prompt_tokens", "completion_tokens"):
+                name = f"llm_key_{counter}_total"
+                lines.append(f"# TYPE {name} counter")
+                for kid, counters in sorted(self.keys.items()):
+                    lines.append(f'{name}{{key_id="{kid}"}} {counters[counter]}')
+        return "\n".join(lines) + "\n"
+
+
+llm_telemetry = LLMTelemetry()
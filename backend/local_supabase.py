@@ -0,0 +1,181 @@
+"""
+Local Supabase - SQLite stand-in for the Supabase client (benchmarks/replay)
+
+Implements the slice of the supabase-py query builder that the ingestion
+write path uses (table().select/insert/upsert/update/delete with eq, in_,
+gte, lt, order, limit, range, execute). Rows are stored as JSON documents in
+one SQLite table, so it needs no schema and survives between runs.
+
+    SupabaseService._instance = LocalSupabaseClient("bench.db")
+"""
+
+import json
+import uuid
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+DEFAULT_CONFLICT_KEYS = {"jobs": "job_id"}
+
+
+class LocalResponse:
+    def __init__(self, data: List[Dict[str, Any]], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class LocalQuery:
+    def __init__(self, client: "LocalSupabaseClient", table: str):
+        self.client = client
+        self.table = table
+        self.action = "select"
+        self.columns: Optional[List[str]] = None
+        self.count_mode: Optional[str] = None
+        self.payload: Any = None
+        self.on_conflict: Optional[str] = None
+        self.filters: List[Any] = []
+        self.order_by: Optional[tuple] = None
+        self.offset = 0
+        self.row_limit: Optional[int] = None
+
+    # --- actions ---
+    def select(self, columns: str = "*", count: Optional[str] = None):
+        self.action = "select"
+        self.columns = None if columns.strip() == "*" else [c.strip() for c in columns.split(",")]
+        self.count_mode = count
+        return self
+
+    def insert(self, rows):
+        self.action, self.payload = "upsert", rows
+        return self
+
+    def upsert(self, rows, on_conflict: Optional[str] = None):
+        self.action, self.payload, self.on_conflict = "upsert", rows, on_conflict
+        return self
+
+    def update(self, values: Dict[str, Any]):
+        self.action, self.payload = "update", values
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    # --- filters ---
+    def eq(self, column, value):
+        self.filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        wanted = set(values)
+        self.filters.append(lambda r: r.get(column) in wanted)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda r: r.get(column) is not None and str(r.get(column)) >= str(value))
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda r: r.get(column) is not None and str(r.get(column)) > str(value))
+        return self
+
+    def lt(self, column, value):
+        self.filters.append(lambda r: r.get(column) is not None and str(r.get(column)) < str(value))
+        return self
+
+    def order(self, column, desc: bool = False):
+        self.order_by = (column, desc)
+        return self
+
+    def limit(self, n: int):
+        self.row_limit = n
+        return self
+
+    def range(self, start: int, end: int):
+        self.offset, self.row_limit = start, end - start + 1
+        return self
+
+    def execute(self) -> LocalResponse:
+        return self.client._execute(self)
+
+
+class LocalSupabaseClient:
+    def __init__(self, path: str = ":memory:"):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents (tbl TEXT, id TEXT, doc TEXT, PRIMARY KEY (tbl, id))"
+        )
+        self.stats = {"calls": 0, "rows_written": 0}
+
+    def table(self, name: str) -> LocalQuery:
+        return LocalQuery(self, name)
+
+    def _rows(self, table: str) -> List[Dict[str, Any]]:
+        return [json.loads(doc) for (doc,) in self.conn.execute("SELECT doc FROM documents WHERE tbl = ?", (table,))]
+
+    def _find(self, table: str, key: str, values: List[Any]) -> Dict[Any, Dict[str, Any]]:
+        """Existing rows whose `key` is in values (conflict lookup for upserts)"""
+        values = [v for v in values if v is not None]
+        if not values:
+            return {}
+        placeholders = ",".join("?" * len(values))
+        if key == "id":
+            sql = f"SELECT doc FROM documents WHERE tbl = ? AND id IN ({placeholders})"
+        else:
+            sql = f"SELECT doc FROM documents WHERE tbl = ? AND json_extract(doc, '$.{key}') IN ({placeholders})"
+        rows = (json.loads(doc) for (doc,) in self.conn.execute(sql, (table, *values)))
+        return {row.get(key): row for row in rows}
+
+    def _save(self, table: str, rows: List[Dict[str, Any]]):
+        self.conn.execute("BEGIN")
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO documents (tbl, id, doc) VALUES (?, ?, ?)",
+            [(table, row["id"], json.dumps(row, default=str)) for row in rows]
+        )
+        self.conn.execute("COMMIT")
+        self.stats["rows_written"] += len(rows)
+
+    def _execute(self, q: LocalQuery) -> LocalResponse:
+        with self.lock:
+            self.stats["calls"] += 1
+            if q.action == "upsert":
+                return LocalResponse(self._upsert(q))
+
+            rows = [r for r in self._rows(q.table) if all(f(r) for f in q.filters)]
+            if q.action == "update":
+                for row in rows:
+                    row.update(q.payload)
+                self._save(q.table, rows)
+                return LocalResponse(rows)
+            if q.action == "delete":
+                self.conn.executemany(
+                    "DELETE FROM documents WHERE tbl = ? AND id = ?", [(q.table, r["id"]) for r in rows]
+                )
+                return LocalResponse(rows)
+
+            total = len(rows)
+            if q.order_by:
+                column, desc = q.order_by
+                rows.sort(key=lambda r: str(r.get(column) or ""), reverse=desc)
+            rows = rows[q.offset:q.offset + q.row_limit] if q.row_limit is not None else rows[q.offset:]
+            if q.columns:
+                rows = [{c: r.get(c) for c in q.columns} for r in rows]
+            return LocalResponse(rows, total if q.count_mode else None)
+
+    def _upsert(self, q: LocalQuery) -> List[Dict[str, Any]]:
+        incoming = q.payload if isinstance(q.payload, list) else [q.payload]
+        key = q.on_conflict or DEFAULT_CONFLICT_KEYS.get(q.table, "id")
+        existing = self._find(q.table, key, [row.get(key) for row in incoming])
+        saved = []
+        now = datetime.utcnow().isoformat()
+        for row in incoming:
+            current = existing.get(row.get(key))
+            merged = {**(current or {}), **row}
+            merged.setdefault("id", str(uuid.uuid4()))
+            merged.setdefault("created_at", now)
+            saved.append(merged)
+        self._save(q.table, saved)
+        return saved
@@ -0,0 +1,216 @@
+"""
+Raw Archive - Compressed, date-partitioned archive of raw provider payloads
+
+Every successful HTTP response fetched for a crawl unit (one (provider, board)
+fetched through JobAggregator.fetch_unit) is appended to the archive as a
+JSON line:
+
+    {"ts", "provider", "unit": [provider, board], "capture_id",
+     "method", "url", "status", "content_type", "body"}
+
+Lines are buffered and written as independent zstd frames (gzip members when
+zstandard is not installed) to segments under
+
+    RAW_ARCHIVE_DIR/YYYY-MM-DD/<host>-<pid>-<seq>.jsonl.zst
+
+so a crashed process loses at most its unflushed buffer and every segment
+stays readable. Capture hooks ride on the per-provider aiohttp TraceConfig
+(source_health.provider_trace), so the fetch_* functions need no changes.
+
+reprocess.py replays the latest capture of each unit through the current
+parsers and normalization, without network I/O.
+
+Configuration:
+    RAW_ARCHIVE_ENABLED          "false" disables capture (default on)
+    RAW_ARCHIVE_DIR              archive root (default backend/raw_archive)
+    RAW_ARCHIVE_RETENTION_DAYS   partitions older than this are pruned (default 30)
+"""
+
+import io
+import os
+import gzip
+import json
+import time
+import uuid
+import shutil
+import socket
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone, timedelta, date
+from typing import Dict, Any, List, Optional, Iterator
+
+import aiohttp
+
+try:
+    import zstandard
+except ImportError:  # gzip segments instead
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+RAW_ARCHIVE_ENABLED = os.getenv("RAW_ARCHIVE_ENABLED", "true").lower() != "false"
+RAW_ARCHIVE_DIR = os.getenv(
+    "RAW_ARCHIVE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "raw_archive")
+)
+RAW_ARCHIVE_RETENTION_DAYS = int(os.getenv("RAW_ARCHIVE_RETENTION_DAYS", "30"))
+FLUSH_BYTES = 4 * 1024 * 1024
+SEGMENT_MAX_BYTES = 256 * 1024 * 1024
+SEGMENT_SUFFIXES = (".jsonl.zst", ".jsonl.gz")
+
+current_capture: ContextVar[Optional[Dict[str, Any]]] = ContextVar("raw_archive_capture", default=None)
+
+
+@contextmanager
+def capture_unit(provider: str, board: str):
+    """Tag every response fetched inside the block with this crawl unit"""
+    token = current_capture.set({"unit": [provider, board], "capture_id": uuid.uuid4().hex})
+    try:
+        yield
+    finally:
+        current_capture.reset(token)
+
+
+def _compress(data: bytes) -> bytes:
+    if zstandard:
+        return zstandard.ZstdCompressor(level=6).compress(data)
+    return gzip.compress(data)
+
+
+def iter_segment(path: str) -> Iterator[Dict[str, Any]]:
+    """Records in one segment (concatenated zstd frames / gzip members)"""
+    with open(path, "rb") as raw:
+        if path.endswith(".zst"):
+            if not zstandard:
+                raise RuntimeError(f"zstandard is required to read {path}")
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+        else:
+            stream = gzip.GzipFile(fileobj=raw)
+        for line in io.TextIOWrapper(stream, encoding="utf-8"):
+            if line.strip():
+                yield json.loads(line)
+
+
+def decode_body(record: Dict[str, Any]) -> bytes:
+    return record["body"].encode("utf-8", "surrogateescape")
+
+
+class RawArchive:
+    def __init__(self, root: str = RAW_ARCHIVE_DIR):
+        self.root = root
+        self.lock = threading.Lock()
+        self.buffer: List[bytes] = []
+        self.buffered_bytes = 0
+        self.day: Optional[str] = None
+        self.segment: Optional[str] = None
+        self.sequence = 0
+        self.counters = {"records": 0, "bytes_written": 0}
+
+    def _segment_path(self, day: str) -> str:
+        if self.segment and self.day == day and os.path.exists(self.segment) \
+                and os.path.getsize(self.segment) < SEGMENT_MAX_BYTES:
+            return self.segment
+        self.day = day
+        self.sequence += 1
+        directory = os.path.join(self.root, day)
+        os.makedirs(directory, exist_ok=True)
+        name = f"{socket.gethostname()}-{os.getpid()}-{int(time.time())}-{self.sequence}"
+        self.segment = os.path.join(directory, name + SEGMENT_SUFFIXES[0 if zstandard else 1])
+        return self.segment
+
+    def append(self, record: Dict[str, Any]):
+        line = (json.dumps(record, ensure_ascii=True) + "\n").encode("utf-8")
+        with self.lock:
+            self.buffer.append(line)
+            self.buffered_bytes += len(line)
+            self.counters["records"] += 1
+            if self.buffered_bytes >= FLUSH_BYTES:
+                self._flush_locked()
+
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self.buffer:
+            return
+        frame = _compress(b"".join(self.buffer))
+        self.buffer, self.buffered_bytes = [], 0
+        try:
+            path = self._segment_path(datetime.now(timezone.utc).strftime("%Y-%m-%d"))
+            with open(path, "ab") as f:
+                f.write(frame)
+            self.counters["bytes_written"] += len(frame)
+        except OSError as e:
+            logger.error(f"Raw archive write failed: {e}")
+
+    def segments(self, since: Optional[date] = None, until: Optional[date] = None) -> List[str]:
+        """Segment paths in [since, until], oldest partition first"""
+        if not os.path.isdir(self.root):
+            return []
+        paths = []
+        for day in sorted(os.listdir(self.root)):
+            try:
+                day_date = date.fromisoformat(day)
+            except ValueError:
+                continue
+            if (since and day_date < since) or (until and day_date > until):
+                continue
+            directory = os.path.join(self.root, day)
+            paths += [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                      if name.endswith(SEGMENT_SUFFIXES)]
+        return paths
+
+    def prune(self, retention_days: int = RAW_ARCHIVE_RETENTION_DAYS) -> int:
+        """Delete partitions older than the retention window"""
+        cutoff = datetime.now(timezone.utc).date() - timedelta(days=retention_days)
+        removed = 0
+        if not os.path.isdir(self.root):
+            return 0
+        for day in os.listdir(self.root):
+            try:
+                if date.fromisoformat(day) < cutoff:
+                    shutil.rmtree(os.path.join(self.root, day), ignore_errors=True)
+                    removed += 1
+            except ValueError:
+                continue
+        return removed
+
+
+raw_archive = RawArchive()
+
+
+def add_archive_hooks(config: aiohttp.TraceConfig, provider: str):
+    """Append archive capture to a provider's TraceConfig"""
+    if not RAW_ARCHIVE_ENABLED:
+        return
+
+    async def on_request_start(session, ctx, params):
+        ctx.archive_url = str(params.url)
+
+    async def on_request_end(session, ctx, params):
+        ctx.archive_status = params.response.status
+        ctx.archive_content_type = params.response.headers.get("Content-Type", "")
+
+    async def on_response_chunk_received(session, ctx, params):
+        # ClientResponse.read() reports the whole body as one chunk
+        capture = current_capture.get()
+        if not capture or getattr(ctx, "archive_status", None) != 200:
+            return
+        raw_archive.append({
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "provider": provider,
+            "unit": capture["unit"],
+            "capture_id": capture["capture_id"],
+            "method": params.method,
+            "url": getattr(ctx, "archive_url", str(params.url)),
+            "status": 200,
+            "content_type": ctx.archive_content_type,
+            "body": params.chunk.decode("utf-8", "surrogateescape"),
+        })
+
+    config.on_request_start.append(on_request_start)
+    config.on_request_end.append(on_request_end)
+    config.on_response_chunk_received.append(on_response_chunk_received)
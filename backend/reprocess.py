@@ -0,0 +1,234 @@
+"""
+Reprocess archived provider payloads through the current parsers.
+
+After a parser fix (parse_job_sections, RSSJobService._parse_title, the Ashby
+extraction, job_normalizer...) this re-derives existing jobs from the raw
+archive (raw_archive.py) instead of refetching from providers:
+
+1. Index the archive segments in the date range and pick the latest capture
+   of every crawl unit (provider, board)
+2. A process pool replays each capture: JobAggregator.fetch_unit runs
+   against the archived responses (no network I/O), then the same filter /
+   dedupe / prepare / sanitize steps as live ingestion. Jobs whose detail
+   page is not in the capture (e.g. Ashby postings served from
+   detail_cache.db at crawl time) only have placeholder sections and are
+   skipped, so they never overwrite the stored description and derived columns
+3. Output rows are compared with the stored rows and only changed rows of
+   jobs that still exist are upserted (expired jobs are not resurrected and
+   created_at is left alone, so cleanup windows don't move)
+
+job_id is a hash of title|company|location, so a fix that changes those
+fields yields new job_ids; those rows are skipped here and arrive as new jobs
+on the next live crawl. Everything else (descriptions, sections, derived
+columns) is updated in place.
+
+Usage:
+    python reprocess.py [--since 2026-10-01] [--until 2026-10-18]
+                        [--provider greenhouse,ashby] [--workers 4] [--dry-run]
+"""
+import json
+import asyncio
+import logging
+import argparse
+import multiprocessing
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+import aiohttp
+from yarl import URL
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from supabase_service import SupabaseService
+from raw_archive import raw_archive, iter_segment, decode_body
+from ingest_replay import ReplayResponse
+from job_apis.job_aggregator import JobAggregator
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+LOOKUP_BATCH_SIZE = 200
+# Columns that legitimately differ between runs / are owned by the database
+IGNORED_COLUMNS = {"id", "created_at"}
+# Kept when already stored: sources without a date fall back to "now"
+KEEP_STORED_COLUMNS = {"posted_at"}
+
+
+@contextmanager
+def serve_capture(records: List[Dict[str, Any]]):
+    """Answer aiohttp requests from one capture's archived responses"""
+    responses: Dict[Tuple[str, str], deque] = defaultdict(deque)
+    for record in records:
+        responses[(record["method"].upper(), record["url"])].append(record)
+    stats = {"served": 0, "misses": 0}
+    original = aiohttp.ClientSession._request
+
+    async def archived_request(session, method, str_or_url, **kwargs):
+        url = URL(str(str_or_url))
+        if kwargs.get("params"):
+            url = url.update_query(kwargs["params"])
+        queue = responses.get((method.upper(), str(url)))
+        if not queue:
+            stats["misses"] += 1
+            return ReplayResponse(method, str(url), 404, {}, b"{}")
+        record = queue.popleft() if len(queue) > 1 else queue[0]
+        stats["served"] += 1
+        return ReplayResponse(
+            method, record["url"], 200, {"Content-Type": record.get("content_type") or ""}, decode_body(record)
+        )
+
+    aiohttp.ClientSession._request = archived_request
+    try:
+        yield stats
+    finally:
+        aiohttp.ClientSession._request = original
+
+
+def _comparable(value: Any) -> Any:
+    """Normalise timestamps / JSON so stored and re-derived values compare equal"""
+    if isinstance(value, str):
+        for parse in (lambda v: datetime.fromisoformat(v.replace("Z", "+00:00")), parsedate_to_datetime):
+            try:
+                parsed = parse(value)
+                return parsed.timestamp() if parsed.tzinfo else parsed.replace(tzinfo=None).isoformat()
+            except (ValueError, TypeError):
+                continue
+        return value
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, sort_keys=True, default=str)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def changed_rows(rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+    """Rows whose re-derived columns differ from the stored job. Returns (changed, existing)."""
+    changed = []
+    existing_count = 0
+    for start in range(0, len(rows), LOOKUP_BATCH_SIZE):
+        batch = rows[start:start + LOOKUP_BATCH_SIZE]
+        stored = {row["job_id"]: row for row in SupabaseService.get_jobs_by_job_ids([r["job_id"] for r in batch])}
+        existing_count += len(stored)
+        for row in batch:
+            current = stored.get(row["job_id"])
+            if not current:
+                continue
+            # Same rule as the spool flusher: never replace a rich description with a snippet
+            old_desc = current.get("description") or ""
+            if len(old_desc) > len(row.get("description") or "") + 100:
+                row["description"] = old_desc
+            update = {
+                k: v for k, v in row.items()
+                if k not in IGNORED_COLUMNS and not (k in KEEP_STORED_COLUMNS and current.get(k))
+            }
+            if any(_comparable(v) != _comparable(current.get(k)) for k, v in update.items()):
+                changed.append(update)
+    return changed, existing_count
+
+
+def reprocess_captures(segments: List[str], capture_ids: List[str], dry_run: bool) -> Dict[str, Any]:
+    """Pool task: replay the given captures from their segments and upsert what changed"""
+    wanted = set(capture_ids)
+    captures: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for path in segments:
+        for record in iter_segment(path):
+            if record.get("capture_id") in wanted:
+                captures[record["capture_id"]].append(record)
+
+    aggregator = JobAggregator()
+    stats = {"captures": 0, "jobs": 0, "existing": 0, "changed": 0, "upserted": 0, "misses": 0,
+             "no_detail": 0, "errors": 0}
+    for capture_id, records in captures.items():
+        provider, board = records[0]["unit"]
+        try:
+            with serve_capture(records) as served:
+                jobs = asyncio.run(aggregator.fetch_unit(provider, board, incremental=False))
+            complete = [job for job in jobs if not job.get("detailUnavailable")]
+            no_detail = len(jobs) - len(complete)
+            jobs = aggregator._deduplicate_jobs(aggregator._filter_jobs(complete))
+            rows = [SupabaseService._sanitize_job_data(job) for job in aggregator._prepare_jobs(jobs)]
+            changed, existing = changed_rows(rows)
+        except Exception as e:
+            logger.error(f"Reprocess failed for {provider}/{board}: {e}")
+            stats["errors"] += 1
+            continue
+
+        stats["captures"] += 1
+        stats["jobs"] += len(rows)
+        stats["existing"] += existing
+        stats["changed"] += len(changed)
+        stats["misses"] += served["misses"]
+        stats["no_detail"] += no_detail
+        if changed and not dry_run:
+            stats["upserted"] += SupabaseService.upsert_jobs(changed)
+        logger.info(
+            f"{provider}/{board}: {len(rows)} jobs, {existing} stored, {len(changed)} changed"
+            f"{f', {no_detail} skipped without detail page' if no_detail else ''}"
+        )
+    return stats
+
+
+def index_segment(path: str) -> Dict[str, Dict[str, Any]]:
+    """capture_id -> {unit, ts} for one segment"""
+    captures: Dict[str, Dict[str, Any]] = {}
+    for record in iter_segment(path):
+        capture = captures.setdefault(record["capture_id"], {"unit": tuple(record["unit"]), "ts": record["ts"]})
+        capture["ts"] = max(capture["ts"], record["ts"])
+    return captures
+
+
+def reprocess(since: Optional[date] = None, until: Optional[date] = None, providers: Optional[List[str]] = None,
+              workers: int = 4, dry_run: bool = False) -> Dict[str, Any]:
+    segments = raw_archive.segments(since, until)
+    logger.info(f"Indexing {len(segments)} archive segments...")
+    context = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        # Latest capture per unit, and the segments it spans
+        latest: Dict[tuple, Tuple[str, str]] = {}
+        capture_segments: Dict[str, List[str]] = defaultdict(list)
+        for path, captures in zip(segments, pool.map(index_segment, segments)):
+            for capture_id, info in captures.items():
+                capture_segments[capture_id].append(path)
+                if providers and info["unit"][0] not in providers:
+                    continue
+                if info["unit"] not in latest or latest[info["unit"]][1] < info["ts"]:
+                    latest[info["unit"]] = (capture_id, info["ts"])
+
+        # One task per segment set so each segment is decompressed once per task
+        tasks: Dict[tuple, List[str]] = defaultdict(list)
+        for capture_id, _ in latest.values():
+            tasks[tuple(capture_segments[capture_id])].append(capture_id)
+        logger.info(f"Reprocessing {len(latest)} units in {len(tasks)} tasks with {workers} workers...")
+
+        totals: Dict[str, Any] = defaultdict(int)
+        futures = [pool.submit(reprocess_captures, list(paths), ids, dry_run) for paths, ids in tasks.items()]
+        for future in futures:
+            for key, value in future.result().items():
+                totals[key] += value
+
+    totals["units"] = len(latest)
+    totals["segments"] = len(segments)
+    return dict(totals)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-derive stored jobs from the raw payload archive")
+    parser.add_argument("--since", type=date.fromisoformat, help="First archive partition (YYYY-MM-DD)")
+    parser.add_argument("--until", type=date.fromisoformat, help="Last archive partition (YYYY-MM-DD)")
+    parser.add_argument("--provider", default="", help="Comma-separated providers (default: all)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--dry-run", action="store_true", help="Report changes without writing")
+    args = parser.parse_args()
+
+    providers = [p.strip() for p in args.provider.split(",") if p.strip()] or None
+    result = reprocess(args.since, args.until, providers, args.workers, args.dry_run)
+    logger.info(f"Reprocess complete: {result}")
@@ -8,164 +8,88 @@ import json
 import re
 import logging
 import asyncio
-import aiohttp
 from dotenv import load_dotenv
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, AsyncIterator
 
-logger = logging.getLogger(__name__)
+from llm_gateway import llm_gateway, groq_keys, PROVIDERS
+from resume_facts import resume_facts
+from context_packer import pack_for
 
-# Add file handler for persistent AI debug logs
-try:
-    log_path = os.path.join(os.path.dirname(__file__), "ai_debug.log")
-    fh = logging.FileHandler(log_path)
-    fh.setLevel(logging.INFO)
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    fh.setFormatter(formatter)
-    logger.addHandler(fh)
-except Exception as e:
-    print(f"Failed to set up file logging: {e}")
+logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
 # API Keys
 # Supports multiple keys: GROQ_API_KEY, GROQ_API_KEY_1, GROQ_API_KEY_2, etc.
-def get_all_groq_keys():
-    keys = []
-    # Check primary key
-    main_key = os.environ.get('GROQ_API_KEY')
-    if main_key:
-        keys.append(main_key)
-    
-    # Check numbered keys
-    for i in range(1, 11):
-        key = os.environ.get(f'GROQ_API_KEY_{i}')
-        if key:
-            keys.append(key)
-    return keys
-
+# Key scheduling / rate limits live in llm_gateway
+get_all_groq_keys = groq_keys
 GROQ_API_KEYS = get_all_groq_keys()
-GROQ_KEY_INDEX = 0  # Global index for round-robin
 
 GOOGLE_API_KEY = os.environ.get('GOOGLE_API_KEY')
 
 # Groq API settings
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_API_URL = PROVIDERS["groq"]["url"]
 GROQ_MODEL = "llama-3.3-70b-versatile"  # Latest and most powerful
 
+GROQ_SYSTEM_PROMPT = "You are an expert ATS resume analyzer and optimization specialist. Always respond with valid JSON only when requested, otherwise respond with clear, expert text."
 
-async def call_groq_api(prompt: str, max_tokens: int = 4000, model: str = None, max_retries: int = None, api_key: str = None) -> Optional[str]:
-    """Call Groq API for text generation with exponential backoff"""
+
+async def call_groq_api(prompt: str, max_tokens: int = 4000, model: str = None, max_retries: int = None, api_key: str = None,
+                        call_site: str = "default", cache_if=None) -> Optional[str]:
+    """
+    Call Groq API for text generation through the shared key pool (and response cache, per call_site).
+    Every call is recorded per call_site by llm_telemetry.
+    """
     target_model = model or GROQ_MODEL
-    
-    # Use provided key or fall back to key pooling
-    global GROQ_KEY_INDEX
-    
-    current_key = api_key
-    if not current_key:
-        keys = GROQ_API_KEYS or get_all_groq_keys()
-        
-        if not keys:
-            logger.error("No Groq API keys found in environment")
-            return None
-        
-        # Round-robin selection
-        current_key = keys[GROQ_KEY_INDEX % len(keys)]
-        GROQ_KEY_INDEX += 1
-    
-    headers = {
-        "Authorization": f"Bearer {current_key}",
-        "Content-Type": "application/json"
-    }
-    
-    payload = {
-        "model": target_model,
-        "messages": [
-            {"role": "system", "content": "You are an expert ATS resume analyzer and optimization specialist. Always respond with valid JSON only when requested, otherwise respond with clear, expert text."},
+    if max_retries is None:
+        max_retries = 3
+
+    return await llm_gateway.chat(
+        [
+            {"role": "system", "content": GROQ_SYSTEM_PROMPT},
             {"role": "user", "content": prompt}
         ],
-        "max_tokens": max_tokens,
-        "temperature": 0.1
-    }
-    
-    # Use global default if not specifically overridden
-    # NOTE: keeping retries LOW to avoid blocking the async event loop
-    if max_retries is None:
-        max_retries = 3  # Was 7 - reduced to prevent event loop blockage
-    base_delay = 2  # Was 4 - shorter backoff window
-    
-    logger.info(f"Calling Groq API with model: {target_model} (max_retries: {max_retries})")
-    
-    async with aiohttp.ClientSession() as session:
-        for attempt in range(max_retries):
-            try:
-                async with session.post(GROQ_API_URL, headers=headers, json=payload) as response:
-                    status = response.status
-                    
-                    if status == 200:
-                        data = await response.json()
-                        if 'choices' in data and len(data['choices']) > 0:
-                            return data['choices'][0]['message']['content']
-                        else:
-                            logger.error(f"Empty choices in Groq response: {data}")
-                            return None
-                    
-                    elif status == 429:
-                        delay = base_delay * (2 ** attempt)
-                        logger.warning(f"Groq rate limit (429), retrying in {delay}s (Attempt {attempt+1}/{max_retries})...")
-                        await asyncio.sleep(delay)
-                        continue
-                        
-                    elif status == 401:
-                        logger.error("Groq API Authentication failed (401). Check GROQ_API_KEY.")
-                        return None
-                        
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Groq API error {status}: {error_text}")
-                        # Other errors might be temporary, but limit retries
-                        if attempt < max_retries - 1:
-                            await asyncio.sleep(base_delay)
-                            continue
-                        return None
-                        
-            except Exception as e:
-                logger.error(f"Error on attempt {attempt+1} calling Groq API: {e}")
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(base_delay)
-                    continue
-                return None
-                
-    return None
+        model=target_model,
+        max_tokens=max_tokens,
+        temperature=0.1,
+        provider="groq",
+        max_retries=max_retries,
+        api_key=api_key,
+        call_site=call_site,
+        cache_if=cache_if
+    )
+
+
+def stream_groq_api(prompt: str, max_tokens: int = 4000, model: str = None, call_site: str = "default") -> AsyncIterator[str]:
+    """Streaming variant of call_groq_api: yields content deltas (see llm_streaming.sse_response)"""
+    return llm_gateway.stream(
+        [
+            {"role": "system", "content": GROQ_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        model=model or GROQ_MODEL,
+        max_tokens=max_tokens,
+        temperature=0.1,
+        provider="groq",
+        call_site=call_site
+    )
 
 
 async def call_openai_api(prompt: str, api_key: str, max_tokens: int = 4000, model: str = "gpt-4o-mini") -> Optional[str]:
     """Call OpenAI API for text generation"""
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "model": model,
-        "messages": [
+    return await llm_gateway.chat(
+        [
             {"role": "system", "content": "You are a professional career advisor and ATS expert."},
             {"role": "user", "content": prompt}
         ],
-        "max_tokens": max_tokens,
-        "temperature": 0.1
-    }
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post("https://api.openai.com/v1/chat/completions", headers=headers, json=payload) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data['choices'][0]['message']['content']
-                else:
-                    logger.error(f"OpenAI API error {response.status}: {await response.text()}")
-                    return None
-    except Exception as e:
-        logger.error(f"Error calling OpenAI API: {e}")
-        return None
+        model=model,
+        max_tokens=max_tokens,
+        temperature=0.1,
+        provider="openai",
+        api_key=api_key,
+        call_site="openai_byok"
+    )
 
 async def call_anthropic_api(prompt: str, api_key: str, max_tokens: int = 4000, model: str = "claude-3-haiku-20240307") -> Optional[str]:
     """Call Anthropic API for text generation"""
@@ -180,14 +104,14 @@ async def call_anthropic_api(prompt: str, api_key: str, max_tokens: int = 4000,
         "messages": [{"role": "user", "content": prompt}]
     }
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post("https://api.anthropic.com/v1/messages", headers=headers, json=payload) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data['content'][0]['text']
-                else:
-                    logger.error(f"Anthropic API error {response.status}: {await response.text()}")
-                    return None
+        session = await llm_gateway.session()
+        async with session.post("https://api.anthropic.com/v1/messages", headers=headers, json=payload) as response:
+            if response.status == 200:
+                data = await response.json()
+                return data['content'][0]['text']
+            else:
+                logger.error(f"Anthropic API error {response.status}: {await response.text()}")
+                return None
     except Exception as e:
         logger.error(f"Error calling Anthropic API: {e}")
         return None
@@ -208,12 +132,14 @@ async def call_google_api(prompt: str, api_key: str, max_tokens: int = 4000) ->
         logger.error(f"Error calling Google Gemini API: {e}")
         return None
 
-async def unified_api_call(prompt: str, max_tokens: int = 4000, model: str = None) -> Optional[str]:
+async def unified_api_call(prompt: str, max_tokens: int = 4000, model: str = None,
+                           call_site: str = "default", cache_if=None) -> Optional[str]:
     """
     Unified AI call point. Falls back to internal Groq pooling.
+    call_site names the feature for the response cache (llm_cache.CALL_SITE_TTLS).
     """
     # Fallback to internal Groq key pooling
-    return await call_groq_api(prompt, max_tokens=max_tokens, model=model)
+    return await call_groq_api(prompt, max_tokens=max_tokens, model=model, call_site=call_site, cache_if=cache_if)
 
 
 def clean_json_response(text: str) -> str:
@@ -245,6 +171,15 @@ def clean_json_response(text: str) -> str:
     return text
 
 
+def is_json_response(text: str) -> bool:
+    """cache_if check: only cache responses that parse as JSON"""
+    try:
+        json.loads(clean_json_response(text))
+        return True
+    except ValueError:
+        return False
+
+
 async def analyze_resume(resume_text: str, job_description: str, target_score: int = 85) -> Dict[str, Any]:
     """
     Analyze a resume against a job description using Groq AI
@@ -262,6 +197,9 @@ async def analyze_resume(resume_text: str, job_description: str, target_score: i
             "error": "GROQ_API_KEY not configured. Please add it to environment variables.",
             "matchScore": 0
         }
+
+    # The resume goes in whole (word count, contact and section checks need all of it)
+    job_description = pack_for("analyze_resume", "jd", job_description)
     
     prompt = f"""
 You are an expert ATS (Applicant Tracking System) and resume analyst. Analyze this resume against the job description and provide a detailed assessment.
@@ -363,7 +301,9 @@ Important:
 
     try:
         # Use unified call with fallback support
-        response_text = await unified_api_call(prompt, model="llama-3.1-8b-instant")
+        response_text = await unified_api_call(
+            prompt, model="llama-3.1-8b-instant", call_site="analyze_resume", cache_if=is_json_response
+        )
         
         if not response_text:
             logger.warning("Resume analysis failed (rate limit). Using basic fallback.")
@@ -395,7 +335,22 @@ Important:
         }
 
 
+# Bump when the extraction prompt or schema changes (invalidates stored facts)
+RESUME_DATA_VERSION = 1
+
+
 async def extract_resume_data(resume_text: str) -> Dict[str, Any]:
+    """
+    Structured profile data of a resume, extracted once per resume content
+    (resume_facts store); see _extract_resume_data
+    """
+    return await resume_facts.get_or_extract(
+        "resume_data", RESUME_DATA_VERSION, resume_text, _extract_resume_data,
+        is_valid=lambda data: isinstance(data, dict) and bool(data) and not data.get("error")
+    )
+
+
+async def _extract_resume_data(resume_text: str) -> Dict[str, Any]:
     """
     Extract structured data from resume text using Groq AI
     
@@ -482,7 +437,10 @@ Return ONLY the JSON, no other text.
 
     try:
         # Use high-speed model for extraction
-        response_text = await unified_api_call(prompt, max_tokens=1000, model="llama-3.1-8b-instant")
+        response_text = await unified_api_call(
+            prompt, max_tokens=1000, model="llama-3.1-8b-instant",
+            call_site="extract_resume_data"
+        )
         if not response_text:
             return {"error": "Failed to get response from AI"}
         json_text = clean_json_response(response_text)
@@ -534,7 +492,7 @@ Return ONLY the JSON, no other text.
 """
 
     try:
-        response_text = await unified_api_call(prompt)
+        response_text = await unified_api_call(prompt, call_site="optimize_resume")
         if not response_text:
             return {"error": "Failed to get response from AI"}
         json_text = clean_json_response(response_text)
@@ -0,0 +1,118 @@
+"""
+Resume Facts - Extracted resume facts, stored by resume content
+
+A user tailors one resume to dozens of jobs, and every tailoring / parse call
+used to re-run the same extraction prompt over the same text. Extractors now
+go through get_or_extract(), keyed by
+
+    sha256(extractor name, extractor version, normalized resume text)
+
+- Normalization (NFKC, zero-width characters dropped, whitespace collapsed)
+  makes re-uploads and re-parses of the same document hash the same
+- Each extractor declares a version next to its prompt; bumping it when the
+  prompt or output schema changes invalidates every stored extraction of
+  that extractor (the old keys are simply never asked for again)
+- Lookups go memory LRU -> resume_facts table (resume_facts_schema.sql) ->
+  extraction; only results accepted by is_valid are stored, so a failed or
+  truncated extraction is retried next time
+- Concurrent calls for the same key share one extraction
+
+Without Supabase the store lives in memory for the life of the process.
+"""
+
+import os
+import re
+import copy
+import asyncio
+import hashlib
+import logging
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict
+
+from supabase_service import SupabaseService
+
+logger = logging.getLogger(__name__)
+
+RESUME_FACTS_MEMORY_ENTRIES = int(os.getenv("RESUME_FACTS_MEMORY_ENTRIES", "512"))
+
+_ZERO_WIDTH = re.compile("[\u200b\u200c\u200d\u2060\ufeff]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_resume_text(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text or "")
+    text = _ZERO_WIDTH.sub("", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def resume_fact_key(extractor: str, version: int, resume_text: str) -> str:
+    material = f"{extractor}\x1fv{version}\x1f{normalize_resume_text(resume_text)}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResumeFactStore:
+    def __init__(self, max_memory: int = RESUME_FACTS_MEMORY_ENTRIES):
+        self.max_memory = max_memory
+        self.memory: "OrderedDict[str, Any]" = OrderedDict()
+        self.inflight: Dict[str, asyncio.Task] = {}
+        self.writes: set = set()
+        self.counters = {"memory_hits": 0, "store_hits": 0, "extractions": 0, "rejected": 0}
+
+    async def get_or_extract(self, extractor: str, version: int, resume_text: str,
+                             extract: Callable[[str], Awaitable[Any]],
+                             is_valid: Callable[[Any], bool] = bool) -> Any:
+        """Stored facts for this resume text, extracting (once) when there are none"""
+        key = resume_fact_key(extractor, version, resume_text)
+        # Callers get their own copy; stored facts are shared
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.counters["memory_hits"] += 1
+            return copy.deepcopy(self.memory[key])
+
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, extractor, version, resume_text, extract, is_valid))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        # shield: one caller going away must not cancel the others' extraction
+        return copy.deepcopy(await asyncio.shield(task))
+
+    async def _load(self, key: str, extractor: str, version: int, resume_text: str,
+                    extract: Callable[[str], Awaitable[Any]], is_valid: Callable[[Any], bool]) -> Any:
+        row = await asyncio.to_thread(SupabaseService.get_resume_facts, key)
+        if row and is_valid(row.get("facts")):
+            self.counters["store_hits"] += 1
+            self._remember(key, row["facts"])
+            return row["facts"]
+
+        self.counters["extractions"] += 1
+        facts = await extract(resume_text)
+        if not is_valid(facts):
+            self.counters["rejected"] += 1
+            return facts
+        self._remember(key, facts)
+        # Persisting doesn't hold up the caller
+        write = asyncio.create_task(asyncio.to_thread(SupabaseService.upsert_resume_facts, {
+            "key": key,
+            "extractor": extractor,
+            "version": version,
+            "facts": facts,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }))
+        self.writes.add(write)
+        write.add_done_callback(self.writes.discard)
+        return facts
+
+    def _remember(self, key: str, facts: Any):
+        self.memory[key] = facts
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory:
+            self.memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "memory_entries": len(self.memory), "inflight": len(self.inflight)}
+
+
+resume_facts = ResumeFactStore()
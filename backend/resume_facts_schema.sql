@@ -0,0 +1,19 @@
+-- ================================================================
+-- Resume facts: extracted resume data by content hash (see resume_facts.py)
+-- Lets every tailoring / parse call after the first skip extraction.
+-- key = sha256(extractor, extractor version, normalized resume text);
+-- bumping an extractor's version leaves old rows unused.
+-- Run this in Supabase SQL Editor (safe to re-run)
+-- ================================================================
+
+CREATE TABLE IF NOT EXISTS resume_facts (
+    key           TEXT PRIMARY KEY,
+    extractor     TEXT NOT NULL,
+    version       INT NOT NULL,
+    facts         JSONB NOT NULL,
+    created_at    TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+ALTER TABLE resume_facts ENABLE ROW LEVEL SECURITY;
+
+SELECT 'Resume facts table ready ✅' AS result;
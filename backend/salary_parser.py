@@ -0,0 +1,214 @@
+"""
+Salary Parser - Normalizes free-text salary strings into annual USD numbers
+
+Providers format pay very differently:
+- format_salary_range():         "$120,000 - $150,000", "$90,000+", "Up to $80,000"
+- USAJobsService._format_salary: "$100,000 - $150,000/year"
+- JSearchService._format_salary: "$45 - $60/hour"
+- RemoteOK / Ashby:              "$80k - $120k", "€70K – €90K • Offers Equity"
+
+parse_salary() turns any of these into a (min, max) pair of annual USD
+integers that can be stored in the indexed salary_min_usd / salary_max_usd
+columns and filtered in SQL.
+"""
+
+import re
+import logging
+from typing import Optional, Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Approximate conversion rates to USD. Only used to bucket jobs for
+# filtering, so a static table is accurate enough.
+CURRENCY_TO_USD = {
+    "USD": 1.0,
+    "CAD": 0.73,
+    "AUD": 0.66,
+    "NZD": 0.60,
+    "SGD": 0.74,
+    "EUR": 1.08,
+    "GBP": 1.27,
+    "CHF": 1.13,
+    "INR": 0.012,
+}
+
+# Order matters: multi-character symbols must be checked before "$"
+CURRENCY_SYMBOLS = [
+    ("CA$", "CAD"), ("C$", "CAD"), ("A$", "AUD"), ("AU$", "AUD"),
+    ("NZ$", "NZD"), ("S$", "SGD"), ("€", "EUR"), ("£", "GBP"),
+    ("₹", "INR"), ("$", "USD"),
+]
+
+# Multiplier to convert a per-period amount into an annual amount
+PERIOD_MULTIPLIERS = {
+    "hour": 2080,
+    "day": 260,
+    "week": 52,
+    "month": 12,
+    "year": 1,
+}
+
+PERIOD_PATTERNS = [
+    ("hour", r"(?:/|\bper\s+|\ban\s+|\b)(?:hour|hr)s?\b|\bhourly\b"),
+    ("day", r"(?:/|\bper\s+|\b)day\b|\bdaily\b"),
+    ("week", r"(?:/|\bper\s+|\b)(?:week|wk)\b|\bweekly\b"),
+    ("month", r"(?:/|\bper\s+|\b)(?:month|mo)\b|\bmonthly\b"),
+    ("year", r"(?:/|\bper\s+|\b)(?:year|yr|annum)\b|\bannual(?:ly)?\b|\bp\.?a\b\.?"),
+]
+
+# An amount like "120,000", "120k", "45.50", "1.2M", "60.000" (EU thousands)
+# or "12,00,000" (Indian lakh grouping)
+AMOUNT_PATTERN = re.compile(r"(\d{1,3}(?:,\d{2})+,\d{3}|\d{1,3}(?:[,.]\d{3})+|\d+(?:\.\d+)?)\s*([kKmM])?(?![\w])")
+
+# Numbers in salary text that are not pay: "3+ years", "10% bonus"
+NON_SALARY_SUFFIX = re.compile(r"\s*\+?\s*(?:(?:years?|yrs?|percent)\b|%)", re.IGNORECASE)
+
+# Sanity bounds for an annual USD salary; anything outside is treated as noise
+MIN_ANNUAL_USD = 1_000
+MAX_ANNUAL_USD = 2_000_000
+
+
+def detect_currency(text: str) -> str:
+    """Detect the currency of a salary string (defaults to USD)"""
+    upper = text.upper()
+    for code in CURRENCY_TO_USD:
+        if re.search(rf"\b{code}\b", upper):
+            return code
+    for symbol, code in CURRENCY_SYMBOLS:
+        if symbol in text:
+            return code
+    return "USD"
+
+
+def detect_period(text: str) -> Optional[str]:
+    """Detect the pay period of a salary string, or None if not stated"""
+    lower = text.lower()
+    for period, pattern in PERIOD_PATTERNS:
+        if re.search(pattern, lower):
+            return period
+    return None
+
+
+def _parse_amount(number: str, suffix: Optional[str]) -> Optional[float]:
+    """Convert a matched amount token into a float"""
+    if re.fullmatch(r"\d{1,3}(?:,\d{2})+,\d{3}|\d{1,3}(?:[,.]\d{3})+", number):
+        # Grouping separators ("," or the European ".")
+        value = float(re.sub(r"[,.]", "", number))
+    else:
+        try:
+            value = float(number)
+        except ValueError:
+            return None
+
+    if suffix:
+        value *= 1_000_000 if suffix.lower() == "m" else 1_000
+    return value
+
+
+def parse_salary(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse a free-text salary string.
+
+    Returns a dict with min/max (in the original currency and period),
+    currency and period, or None if no amount could be found.
+    """
+    if not text or not isinstance(text, str):
+        return None
+
+    amounts = []
+    for match in AMOUNT_PATTERN.finditer(text):
+        if NON_SALARY_SUFFIX.match(text, match.end()):
+            continue
+        if match.group(1) == "401" and match.group(2) in ("k", "K"):
+            continue  # 401k retirement plan
+        value = _parse_amount(match.group(1), match.group(2))
+        if value and value > 0:
+            amounts.append(value)
+        if len(amounts) == 2:
+            break
+
+    if not amounts:
+        return None
+
+    lower = text.lower()
+    salary_min: Optional[float] = amounts[0]
+    salary_max: Optional[float] = amounts[1] if len(amounts) > 1 else None
+
+    if salary_max is None and re.search(r"\b(?:up\s+to|max(?:imum)?)\b", lower):
+        salary_min, salary_max = None, amounts[0]
+
+    # "80 - 120k": the suffix only appears on the upper bound
+    if salary_min and salary_max and salary_max >= 1_000 and salary_min < 1_000 and salary_max / salary_min >= 100:
+        salary_min *= 1_000
+
+    if salary_min and salary_max and salary_min > salary_max:
+        salary_min, salary_max = salary_max, salary_min
+
+    # "3 years experience" is not a pay period
+    period = detect_period(re.sub(r"\d+\s*\+?\s*(?:years?|yrs?)\b", " ", text, flags=re.IGNORECASE))
+    if period is None:
+        # Unlabelled small amounts are hourly rates ("$45 - $60")
+        top = salary_max or salary_min
+        period = "hour" if top < 300 else "year"
+
+    return {
+        "min": salary_min,
+        "max": salary_max,
+        "currency": detect_currency(text),
+        "period": period,
+    }
+
+
+def to_annual_usd(amount: Optional[float], currency: str = "USD", period: str = "year") -> Optional[int]:
+    """Convert an amount in a given currency and period into annual USD"""
+    if not amount:
+        return None
+    rate = CURRENCY_TO_USD.get(currency, 1.0)
+    annual = amount * PERIOD_MULTIPLIERS.get(period, 1) * rate
+    if annual < MIN_ANNUAL_USD or annual > MAX_ANNUAL_USD:
+        return None
+    return int(round(annual))
+
+
+def extract_salary_usd(job: Dict[str, Any]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Extract (salary_min_usd, salary_max_usd) from a job dict.
+
+    Numeric salaryMin/salaryMax from the fetchers win; otherwise the free-text
+    salary/salaryRange field is parsed. When only a lower bound is known the
+    max is set to the min so that a single `salary_max_usd >= X` predicate
+    answers "pays at least X".
+    """
+    salary_min = salary_max = None
+
+    numeric_min = job.get("salaryMin") or job.get("salary_min")
+    numeric_max = job.get("salaryMax") or job.get("salary_max")
+    if isinstance(numeric_min, (int, float)) or isinstance(numeric_max, (int, float)):
+        salary_min = to_annual_usd(numeric_min if isinstance(numeric_min, (int, float)) else None)
+        salary_max = to_annual_usd(numeric_max if isinstance(numeric_max, (int, float)) else None)
+
+    if salary_min is None and salary_max is None:
+        for field in ("salary", "salaryRange", "salary_range"):
+            parsed = parse_salary(job.get(field) or "")
+            if parsed:
+                salary_min = to_annual_usd(parsed["min"], parsed["currency"], parsed["period"])
+                salary_max = to_annual_usd(parsed["max"], parsed["currency"], parsed["period"])
+                if salary_min is not None or salary_max is not None:
+                    break
+
+    if salary_min is not None and salary_max is None:
+        salary_max = salary_min
+    return salary_min, salary_max
+
+
+def parse_salary_filter(value: Optional[str]) -> Optional[int]:
+    """Convert a /api/jobs salary filter value ("100k", "120000") into a USD floor"""
+    if not value or value == "all":
+        return None
+    match = re.fullmatch(r"\s*\$?(\d+(?:\.\d+)?)\s*([kK])?\+?\s*", value)
+    if not match:
+        return None
+    amount = float(match.group(1))
+    if match.group(2):
+        amount *= 1_000
+    return int(amount)
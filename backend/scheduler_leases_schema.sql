@@ -0,0 +1,86 @@
+-- ================================================================
+-- Scheduler leases: one row per scheduled job (see job_scheduler.py)
+-- Every API instance polls the row; the first to claim it when due
+-- holds the lease and runs the job, everyone else skips.
+-- Run this in Supabase SQL Editor (safe to re-run)
+-- ================================================================
+
+CREATE TABLE IF NOT EXISTS scheduler_leases (
+    name                  TEXT PRIMARY KEY,
+    holder                TEXT,
+    expires_at            TIMESTAMPTZ,
+    next_run_at           TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    run_requested         BOOLEAN NOT NULL DEFAULT FALSE,
+    last_run_at           TIMESTAMPTZ,
+    last_holder           TEXT,
+    last_status           TEXT,
+    last_duration_seconds REAL,
+    updated_at            TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+ALTER TABLE scheduler_leases ENABLE ROW LEVEL SECURITY;
+
+-- Atomically take the lease if the job is due and nobody holds a live lease.
+-- Uses the database clock so instances with skewed clocks agree.
+CREATE OR REPLACE FUNCTION claim_scheduler_lease(p_name TEXT, p_holder TEXT, p_ttl_seconds INT)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    claimed INT;
+BEGIN
+    UPDATE scheduler_leases
+       SET holder = p_holder,
+           expires_at = NOW() + make_interval(secs => p_ttl_seconds),
+           run_requested = FALSE,
+           updated_at = NOW()
+     WHERE name = p_name
+       AND (next_run_at <= NOW() OR run_requested)
+       AND (holder IS NULL OR expires_at < NOW());
+    GET DIAGNOSTICS claimed = ROW_COUNT;
+    RETURN claimed = 1;
+END;
+$$;
+
+-- Extend a lease we still hold (heartbeat while a long run is in progress)
+CREATE OR REPLACE FUNCTION renew_scheduler_lease(p_name TEXT, p_holder TEXT, p_ttl_seconds INT)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    renewed INT;
+BEGIN
+    UPDATE scheduler_leases
+       SET expires_at = NOW() + make_interval(secs => p_ttl_seconds),
+           updated_at = NOW()
+     WHERE name = p_name AND holder = p_holder;
+    GET DIAGNOSTICS renewed = ROW_COUNT;
+    RETURN renewed = 1;
+END;
+$$;
+
+-- Release the lease and schedule the next run. A run requested while this
+-- one was in progress is coalesced into a single immediate follow-up.
+CREATE OR REPLACE FUNCTION complete_scheduler_lease(
+    p_name TEXT, p_holder TEXT, p_interval_seconds INT, p_status TEXT, p_duration_seconds REAL
+)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE scheduler_leases
+       SET holder = NULL,
+           expires_at = NULL,
+           last_run_at = NOW(),
+           last_holder = p_holder,
+           last_status = p_status,
+           last_duration_seconds = p_duration_seconds,
+           next_run_at = CASE WHEN run_requested THEN NOW()
+                              ELSE NOW() + make_interval(secs => p_interval_seconds) END,
+           run_requested = FALSE,
+           updated_at = NOW()
+     WHERE name = p_name AND holder = p_holder;
+END;
+$$;
+
+SELECT 'Scheduler leases ready ✅' AS result;
@@ -3,7 +3,8 @@ import logging
 import re
 from typing import Dict, Any, Optional
 from bs4 import BeautifulSoup
-from resume_analyzer import call_groq_api, clean_json_response
+from resume_analyzer import call_groq_api, clean_json_response, is_json_response
+from context_packer import pack_for
 import json
 
 logger = logging.getLogger(__name__)
@@ -314,9 +315,9 @@ async def scrape_job_description(url: str) -> Dict[str, Any]:
             "error": f"{domain_name} is blocking access to this job's details. Please copy the job description and paste it manually into the field below."
         }
     
-    # Truncate text to avoid hitting token limits
-    # Reduced to 4000 to drastically reduce token usage and rate limits
-    truncated_text = raw_text[:4000]
+    # Pack to ~1000 tokens (what the old 4000-char cut allowed) keeping the page top
+    # (title, company, location) and the requirement sections instead of whatever came first
+    truncated_text = pack_for("scrape_job_description", "page", raw_text, keep_head=150)
     
     prompt = f"""Extract job details from the following raw text scraped from {url}:
 ---
@@ -348,7 +349,10 @@ Important:
     try:
         # For scraping, we want to fail faster if Groq is overloaded
         # Use 3 retries max instead of the global 7
-        response_text = await call_groq_api(prompt, max_tokens=2000, model="llama-3.1-8b-instant", max_retries=3)
+        response_text = await call_groq_api(
+            prompt, max_tokens=2000, model="llama-3.1-8b-instant", max_retries=3,
+            call_site="scrape_job_description", cache_if=is_json_response
+        )
         if not response_text:
             logger.warning("AI extraction failed (rate limit or timeout). Falling back to raw text.")
             # FALLBACK: If AI fails, return the raw text so the user at least gets the content
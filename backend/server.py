@@ -15,7 +15,7 @@ from fastapi import (
     Depends,
     BackgroundTasks,
 )
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import json
 import jwt
 import bcrypt
@@ -39,7 +39,7 @@ logging.basicConfig(level=logging.INFO)
 
 import asyncio
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Union
+from typing import List, Optional, Union, Dict, Any
 import uuid
 import traceback
 from dateutil.relativedelta import relativedelta
@@ -55,7 +55,6 @@ from resume_job_matcher import calculate_bulk_relevance
 from job_fetcher import (
     fetch_all_job_categories,
     update_jobs_in_database,
-    scheduled_job_fetch,
 )
 from job_apis.job_aggregator import JobAggregator
 
@@ -78,8 +77,17 @@ except (ImportError, ModuleNotFoundError) as e:
 from scraper_service import scrape_job_description
 from job_sync_service import JobSyncService
 from interview_service import InterviewOrchestrator
-from openai import AsyncOpenAI
+from interview_state import interview_states
+from resume_facts import resume_facts
+from context_packer import pack_for
+from generation_jobs import generation_queue, GeneratedFile, GenerationJobError
+from llm_gateway import llm_gateway
+from llm_telemetry import llm_telemetry
+from llm_streaming import sse_response
 from supabase_service import SupabaseService
+from job_facets import facet_index, FACET_WARMUP_WAIT_SECONDS
+from source_health import source_health
+from job_spool import get_job_spool
 # Ensure parser and enrichment are available
 try:
     from resume_parser import parse_resume, validate_resume_file
@@ -104,12 +112,8 @@ except ImportError:
     logger.error("google-auth libraries not found. Google login will be disabled.")
 
 
-# Initialize OpenAI client conditionally
-openai_api_key = os.environ.get("OPENAI_API_KEY")
-if openai_api_key:
-    openai_client = AsyncOpenAI(api_key=openai_api_key)
-else:
-    openai_client = None
+# OpenAI calls go through the shared LLM gateway (llm_gateway.py)
+if not llm_gateway.available("openai"):
     logger.warning("OPENAI_API_KEY not set. OpenAI features will be disabled.")
 
 # MongoDB decommissioned (Supabase is the sole data store)
@@ -174,18 +178,16 @@ app.add_middleware(
 
 
 # Initialize Job Sync Service (Supabase-ready)
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from worker import build_scheduler, start_embedded
 job_sync_service = JobSyncService()
-scheduler = AsyncIOScheduler()
 
 # No DB check needed, JobSyncService uses Supabase internally
-# Schedule job fetch every hour
-from job_fetcher import scheduled_job_fetch
-
-scheduler.add_job(scheduled_job_fetch, 'interval', hours=1, id='scheduled_job_fetch')
-scheduler.add_job(cleanup_old_jobs, 'interval', hours=24, id='cleanup_old_jobs')  # Run daily
-scheduler.start()
-logger.info("Job sync scheduler started successfully (Scheduled Fetch: 1hr, Cleanup: daily)")
+# Ingestion jobs run under a lease so only one worker/replica executes each run.
+# The API only triggers them; with INGESTION_WORKER=external (set by the
+# Procfile, which deploys worker.py) they run in worker.py, otherwise an
+# embedded worker is started in startup_event.
+INGESTION_WORKER = os.environ.get("INGESTION_WORKER", "embedded").lower()
+job_scheduler = build_scheduler()
 
 
 # Note: api_router will be included at the end of the file after all routes are defined
@@ -375,6 +377,16 @@ async def get_current_user(token: str = Header(None, alias="token")):
     return supabase_user
 
 
+async def get_optional_user(token: str = Header(None, alias="token")) -> Optional[dict]:
+    """Like get_current_user, but None for anonymous callers or unusable tokens"""
+    if not token:
+        return None
+    try:
+        return await get_current_user(token)
+    except HTTPException:
+        return None
+
+
 async def check_and_increment_daily_usage(user_email: str, usage_type: str, limit: Union[int, str]) -> bool:
     """
     Check if user has reached their daily limit for a specific usage type and increment if not.
@@ -1957,8 +1969,8 @@ async def save_user_consent(request: dict):
 
 
 @api_router.post("/ai/salary-negotiation")
-async def generate_salary_negotiation_script(request: dict):
-    """Generate personalized salary negotiation script"""
+async def generate_salary_negotiation_script(request: dict, stream: bool = False):
+    """Generate personalized salary negotiation script (?stream=true for SSE)"""
     try:
         prompt = f"""Create a professional salary negotiation script for:
 - Current offer: ${request.get('currentOffer')}
@@ -1976,12 +1988,19 @@ Generate a conversational script that:
 
 Keep it natural and confident, not robotic."""
 
-        from resume_analyzer import unified_api_call
+        from resume_analyzer import unified_api_call, stream_groq_api
+
+        if stream:
+            return sse_response(
+                stream_groq_api(prompt, max_tokens=1000, model="llama-3.1-8b-instant", call_site="salary_negotiation"),
+                lambda text: {"script": text}
+            )
         
         response = await unified_api_call(
             prompt,
             max_tokens=1000,
-            model="llama-3.1-8b-instant"
+            model="llama-3.1-8b-instant",
+            call_site="salary_negotiation"
         )
 
         if not response:
@@ -1993,9 +2012,15 @@ Keep it natural and confident, not robotic."""
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _split_headlines(response: str) -> List[str]:
+    headlines = response.strip().split("\n")
+    headlines = [h.strip() for h in headlines if h.strip()]
+    return headlines[:10]
+
+
 @api_router.post("/ai/linkedin-headline")
-async def generate_linkedin_headlines(request: dict):
-    """Generate optimized LinkedIn headlines"""
+async def generate_linkedin_headlines(request: dict, stream: bool = False):
+    """Generate optimized LinkedIn headlines (?stream=true for SSE)"""
     try:
         prompt = f"""Generate 10 optimized LinkedIn headlines based on:
 - Current headline: {request.get('current_headline')}
@@ -2010,29 +2035,40 @@ Each headline should:
 
 Return ONLY the 10 headlines, one per line, no numbering or extra text."""
 
-        from resume_analyzer import unified_api_call
+        from resume_analyzer import unified_api_call, stream_groq_api
+
+        if stream:
+            return sse_response(
+                stream_groq_api(prompt, max_tokens=1000, model="llama-3.1-8b-instant", call_site="linkedin_headline"),
+                lambda text: {"headlines": _split_headlines(text)}
+            )
         
         response = await unified_api_call(
             prompt,
             max_tokens=1000,
-            model="llama-3.1-8b-instant"
+            model="llama-3.1-8b-instant",
+            call_site="linkedin_headline"
         )
 
         if not response:
             raise HTTPException(status_code=500, detail="Failed to generate AI response")
 
-        headlines = response.strip().split("\n")
-        headlines = [h.strip() for h in headlines if h.strip()]
-
-        return {"headlines": headlines[:10]}
+        return {"headlines": _split_headlines(response)}
     except Exception as e:
         logger.error(f"Error generating headlines: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _split_career_gap(content: str) -> Dict[str, str]:
+    parts = content.split("INTERVIEW:")
+    resume_part = parts[0].replace("RESUME:", "").strip()
+    interview_part = parts[1].strip() if len(parts) > 1 else ""
+    return {"resume": resume_part, "interview": interview_part}
+
+
 @api_router.post("/ai/career-gap")
-async def generate_career_gap_explanations(request: dict):
-    """Generate professional career gap explanations"""
+async def generate_career_gap_explanations(request: dict, stream: bool = False):
+    """Generate professional career gap explanations (?stream=true for SSE)"""
     try:
         prompt = f"""Create professional explanations for a career gap:
 - Duration: {request.get('gapDuration')}
@@ -2058,31 +2094,104 @@ RESUME:
 INTERVIEW:
 [interview version]"""
 
-        from resume_analyzer import unified_api_call
+        from resume_analyzer import unified_api_call, stream_groq_api
+
+        if stream:
+            return sse_response(
+                stream_groq_api(prompt, max_tokens=1000, model="llama-3.1-8b-instant", call_site="career_gap"),
+                lambda text: {"explanations": _split_career_gap(text)}
+            )
         
         response = await unified_api_call(
             prompt,
             max_tokens=1000,
-            model="llama-3.1-8b-instant"
+            model="llama-3.1-8b-instant",
+            call_site="career_gap"
         )
 
         if not response:
             raise HTTPException(status_code=500, detail="Failed to generate AI response")
 
-        content = response
-        parts = content.split("INTERVIEW:")
-        resume_part = parts[0].replace("RESUME:", "").strip()
-        interview_part = parts[1].strip() if len(parts) > 1 else ""
-
-        return {"explanations": {"resume": resume_part, "interview": interview_part}}
+        return {"explanations": _split_career_gap(response)}
     except Exception as e:
         logger.error(f"Error generating career gap explanation: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _parse_job_decoder(content: str) -> Dict[str, Any]:
+    """Structure the decoder's free-text sections"""
+    # Parse the response into structured data
+    analysis = {
+        "red_flags": [],
+        "translations": [],
+        "hidden_requirements": [],
+        "green_flags": [],
+        "overall_assessment": "",
+    }
+
+    # Simple parsing (you can make this more robust)
+    sections = content.split("\n\n")
+    current_section = None
+
+    for section in sections:
+        if "RED FLAG" in section.upper():
+            current_section = "red_flags"
+        elif "TRANSLATION" in section.upper():
+            current_section = "translations"
+        elif "HIDDEN REQUIREMENT" in section.upper():
+            current_section = "hidden_requirements"
+        elif "GREEN FLAG" in section.upper():
+            current_section = "green_flags"
+        elif "OVERALL" in section.upper() or "ASSESSMENT" in section.upper():
+            current_section = "overall_assessment"
+        elif current_section:
+            lines = [
+                l.strip()
+                for l in section.split("\n")
+                if l.strip()
+                and not any(
+                    x in l.upper()
+                    for x in [
+                        "RED FLAG",
+                        "TRANSLATION",
+                        "HIDDEN",
+                        "GREEN",
+                        "OVERALL",
+                    ]
+                )
+            ]
+
+            if current_section == "overall_assessment":
+                analysis[current_section] = " ".join(lines)
+            elif current_section == "translations":
+                for line in lines:
+                    if "→" in line or "->" in line:
+                        parts = line.split("→" if "→" in line else "->")
+                        if len(parts) == 2:
+                            analysis[current_section].append(
+                                {
+                                    "phrase": parts[0]
+                                    .strip()
+                                    .strip('"')
+                                    .strip("'")
+                                    .strip("•")
+                                    .strip("-")
+                                    .strip(),
+                                    "meaning": parts[1].strip(),
+                                }
+                            )
+            else:
+                for line in lines:
+                    clean_line = line.strip("•").strip("-").strip("*").strip()
+                    if clean_line:
+                        analysis[current_section].append(clean_line)
+
+    return {"analysis": analysis, "raw_content": content}
+
+
 @api_router.post("/ai/job-decoder")
-async def decode_job_description(request: dict):
-    """Decode job description to reveal hidden meanings and red flags"""
+async def decode_job_description(request: dict, stream: bool = False):
+    """Decode job description to reveal hidden meanings and red flags (?stream=true for SSE)"""
     try:
         prompt = f"""Analyze this job description and decode what it really means:
 
@@ -2098,86 +2207,25 @@ Provide analysis in these categories:
 
 Be honest and insightful. Help the candidate make an informed decision."""
 
-        from resume_analyzer import unified_api_call
+        from resume_analyzer import unified_api_call, stream_groq_api
+
+        if stream:
+            return sse_response(
+                stream_groq_api(prompt, max_tokens=2000, model="llama-3.1-8b-instant", call_site="job_decoder"),
+                _parse_job_decoder
+            )
         
         response = await unified_api_call(
             prompt,
             max_tokens=2000,
-            model="llama-3.1-8b-instant"
+            model="llama-3.1-8b-instant",
+            call_site="job_decoder"
         )
 
         if not response:
             raise HTTPException(status_code=500, detail="Failed to generate AI response")
 
-        content = response
-
-        # Parse the response into structured data
-        analysis = {
-            "red_flags": [],
-            "translations": [],
-            "hidden_requirements": [],
-            "green_flags": [],
-            "overall_assessment": "",
-        }
-
-        # Simple parsing (you can make this more robust)
-        sections = content.split("\n\n")
-        current_section = None
-
-        for section in sections:
-            if "RED FLAG" in section.upper():
-                current_section = "red_flags"
-            elif "TRANSLATION" in section.upper():
-                current_section = "translations"
-            elif "HIDDEN REQUIREMENT" in section.upper():
-                current_section = "hidden_requirements"
-            elif "GREEN FLAG" in section.upper():
-                current_section = "green_flags"
-            elif "OVERALL" in section.upper() or "ASSESSMENT" in section.upper():
-                current_section = "overall_assessment"
-            elif current_section:
-                lines = [
-                    l.strip()
-                    for l in section.split("\n")
-                    if l.strip()
-                    and not any(
-                        x in l.upper()
-                        for x in [
-                            "RED FLAG",
-                            "TRANSLATION",
-                            "HIDDEN",
-                            "GREEN",
-                            "OVERALL",
-                        ]
-                    )
-                ]
-
-                if current_section == "overall_assessment":
-                    analysis[current_section] = " ".join(lines)
-                elif current_section == "translations":
-                    for line in lines:
-                        if "→" in line or "->" in line:
-                            parts = line.split("→" if "→" in line else "->")
-                            if len(parts) == 2:
-                                analysis[current_section].append(
-                                    {
-                                        "phrase": parts[0]
-                                        .strip()
-                                        .strip('"')
-                                        .strip("'")
-                                        .strip("•")
-                                        .strip("-")
-                                        .strip(),
-                                        "meaning": parts[1].strip(),
-                                    }
-                                )
-                else:
-                    for line in lines:
-                        clean_line = line.strip("•").strip("-").strip("*").strip()
-                        if clean_line:
-                            analysis[current_section].append(clean_line)
-
-        return {"analysis": analysis, "raw_content": content}
+        return _parse_job_decoder(response)
     except Exception as e:
         logger.error(f"Error decoding job description: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -3571,9 +3619,15 @@ async def get_resumes_legacy(email: str = Query(...)):
 
 
 @api_router.post("/ai-ninja/apply")
-async def ai_ninja_apply(request: Request, user: dict = Depends(get_current_user)):
+async def ai_ninja_apply(
+    request: Request,
+    user: dict = Depends(get_current_user),
+    run_async: bool = Query(False, alias="async"),
+    callbackUrl: Optional[str] = Query(None),
+):
     """
     AI Ninja apply endpoint - generates tailored resume, cover letter, and Q&A using Supabase.
+    With ?async=1 it returns a generation job (202) instead of waiting.
     """
     try:
         form = await request.form()
@@ -3609,109 +3663,121 @@ async def ai_ninja_apply(request: Request, user: dict = Depends(get_current_user
             resumeText = await parse_resume(file_content, resumeFile.filename)
             
         # PROACTIVE PROFILE SYNC -> Now using Supabase (Project Orion Boost)
-        try:
-            profile_email = user.get("email")
+        async def sync_profile():
+            try:
+                profile_email = user.get("email")
             
-            # Sync if target_role or resume_text is missing
-            if not user.get("target_role") or not user.get("resume_text"):
-                from resume_analyzer import extract_resume_data
-                byok_config = None
-                extracted_data = await extract_resume_data(resumeText)
+                # Sync if target_role or resume_text is missing
+                if not user.get("target_role") or not user.get("resume_text"):
+                    from resume_analyzer import extract_resume_data
+                    byok_config = None
+                    extracted_data = await extract_resume_data(resumeText)
                 
-                if extracted_data and not extracted_data.get("error"):
-                    update_fields = {}
+                    if extracted_data and not extracted_data.get("error"):
+                        update_fields = {}
                     
-                    # Update Name if missing
-                    new_name = extracted_data.get("person", {}).get("fullName")
-                    if new_name and new_name != "Your Name" and (not user.get("name") or user.get("name") == "New User"):
-                        update_fields["name"] = new_name
-
-                    # Update Target Role (Crucial for Recommendations)
-                    extracted_role = extracted_data.get("preferences", {}).get("target_role")
-                    if extracted_role and not user.get("target_role"):
-                        update_fields["target_role"] = extracted_role
-                        logger.info(f"Updated target_role for {profile_email}: {extracted_role}")
-
-                    # Update Resume Text
-                    if not user.get("resume_text"):
-                        update_fields["resume_text"] = resumeText
+                        # Update Name if missing
+                        new_name = extracted_data.get("person", {}).get("fullName")
+                        if new_name and new_name != "Your Name" and (not user.get("name") or user.get("name") == "New User"):
+                            update_fields["name"] = new_name
+
+                        # Update Target Role (Crucial for Recommendations)
+                        extracted_role = extracted_data.get("preferences", {}).get("target_role")
+                        if extracted_role and not user.get("target_role"):
+                            update_fields["target_role"] = extracted_role
+                            logger.info(f"Updated target_role for {profile_email}: {extracted_role}")
+
+                        # Update Resume Text
+                        if not user.get("resume_text"):
+                            update_fields["resume_text"] = resumeText
                     
-                    if update_fields:
-                        SupabaseService.update_user_profile(userId, update_fields)
-        except Exception as profile_err:
-            logger.error(f"Failed to proactive sync profile in ai_ninja_apply: {profile_err}")
-
-        # Tailoring logic
-        expert_docs = await generate_expert_documents(
-            resumeText, jobDescription, user_info=user
-        )
+                        if update_fields:
+                            SupabaseService.update_user_profile(userId, update_fields)
+            except Exception as profile_err:
+                logger.error(f"Failed to proactive sync profile in ai_ninja_apply: {profile_err}")
+
+        async def pipeline(progress):
+            # Tailoring logic, concurrently with the profile sync (independent LLM calls)
+            await progress("tailoring", 0.1)
+            expert_docs, _ = await asyncio.gather(
+                generate_expert_documents(
+                    resumeText, jobDescription, user_info=user, job_title=jobTitle, company=company
+                ),
+                sync_profile(),
+            )
         
-        tailoredResume = expert_docs.get("ats_resume", "")
-        detailedCv = expert_docs.get("detailed_cv", "")
-        tailoredCoverLetter = expert_docs.get("cover_letter", "")
-
-        # Save resume to Record Library in Supabase
-        resume_id = str(uuid.uuid4())
-        resume_doc = {
-            "id": resume_id,
-            "user_id": userId,
-            "user_email": user.get("email"),  # Ensure email is included for retrieval
-            "resume_name": f"AI Tailored: {company}",
-            "job_title": jobTitle,
-            "company_name": company,
-            "resume_text": tailoredResume,
-            "is_system_generated": True,
-            "origin": "ai-ninja",
-            "applied_at": datetime.now(timezone.utc).isoformat(),
-            "created_at": datetime.now(timezone.utc).isoformat(),
-        }
+            tailoredResume = expert_docs.get("ats_resume", "")
+            detailedCv = expert_docs.get("detailed_cv", "")
+            tailoredCoverLetter = expert_docs.get("cover_letter", "")
 
-        SupabaseService.create_saved_resume(resume_doc)
+            await progress("saving", 0.9)
 
-        # Save application to Supabase
-        app_doc = {
-            "user_id": userId,
-            "user_email": user.get("email"),
-            "job_id": jobId if jobId and len(jobId) > 30 else None,
-            "job_title": jobTitle,
-            "company": company,
-            "status": "applied",
-            "resume_id": resume_id,
-            "platform": company, # Legacy fallback
-            "source_url": jobUrl,
-            "applied_at": datetime.now(timezone.utc).isoformat(),
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "metadata": {
+            # Save resume to Record Library in Supabase
+            resume_id = str(uuid.uuid4())
+            resume_doc = {
+                "id": resume_id,
+                "user_id": userId,
+                "user_email": user.get("email"),  # Ensure email is included for retrieval
+                "resume_name": f"AI Tailored: {company}",
+                "job_title": jobTitle,
+                "company_name": company,
+                "resume_text": tailoredResume,
+                "is_system_generated": True,
                 "origin": "ai-ninja",
-                "resumeId": resume_id,
-                "jobUrl": jobUrl,
-                "resumeText": tailoredResume,
-                "jobDescription": jobDescription
+                "applied_at": datetime.now(timezone.utc).isoformat(),
+                "created_at": datetime.now(timezone.utc).isoformat(),
             }
-        }
 
-        app_result = SupabaseService.create_application(app_doc)
-        new_app_id = (app_result or {}).get("id", str(uuid.uuid4()))
+            SupabaseService.create_saved_resume(resume_doc)
 
-        logger.info(f"EXPERT DOCS CHANGES: {expert_docs.get('changes', [])}")
-        try:
-            with open("changes_log.json", "w") as f:
-                json.dump(expert_docs.get("changes", []), f, indent=2)
-        except Exception as e:
-            logger.error(f"Could not dump changes log: {e}")
+            # Save application to Supabase
+            app_doc = {
+                "user_id": userId,
+                "user_email": user.get("email"),
+                "job_id": jobId if jobId and len(jobId) > 30 else None,
+                "job_title": jobTitle,
+                "company": company,
+                "status": "applied",
+                "resume_id": resume_id,
+                "platform": company, # Legacy fallback
+                "source_url": jobUrl,
+                "applied_at": datetime.now(timezone.utc).isoformat(),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "metadata": {
+                    "origin": "ai-ninja",
+                    "resumeId": resume_id,
+                    "jobUrl": jobUrl,
+                    "resumeText": tailoredResume,
+                    "jobDescription": jobDescription
+                }
+            }
 
-        return {
-            "applicationId": new_app_id,
-            "resumeId": resume_id,
-            "tailoredResume": tailoredResume,
-            "detailedCv": detailedCv,
-            "tailoredCoverLetter": tailoredCoverLetter,
-            "changes": expert_docs.get("changes", []),
-            "skillsAdded": expert_docs.get("skills_added", []),
-            "skillsSkipped": expert_docs.get("skills_skipped", []),
-            "suggestedAnswers": [], # Simplified for now
-            "usage": await get_user_usage_limits(user["email"]),
-        }
+            app_result = SupabaseService.create_application(app_doc)
+            new_app_id = (app_result or {}).get("id", str(uuid.uuid4()))
+
+            logger.info(f"EXPERT DOCS CHANGES: {expert_docs.get('changes', [])}")
+            try:
+                with open("changes_log.json", "w") as f:
+                    json.dump(expert_docs.get("changes", []), f, indent=2)
+            except Exception as e:
+                logger.error(f"Could not dump changes log: {e}")
+
+            return {
+                "applicationId": new_app_id,
+                "resumeId": resume_id,
+                "tailoredResume": tailoredResume,
+                "detailedCv": detailedCv,
+                "tailoredCoverLetter": tailoredCoverLetter,
+                "changes": expert_docs.get("changes", []),
+                "skillsAdded": expert_docs.get("skills_added", []),
+                "skillsSkipped": expert_docs.get("skills_skipped", []),
+                "suggestedAnswers": [], # Simplified for now
+                "usage": await get_user_usage_limits(user["email"]),
+            }
+
+        return await _run_generation("ai_ninja_apply", pipeline, user, run_async, callbackUrl)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in AI Ninja apply: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -4052,6 +4118,67 @@ def _get_mock_insider_connections() -> list:
 # @app.get("/api/jobs")
 
 
+@app.get("/api/jobs/facets")
+async def get_job_facets(
+    type: str = Query(None),
+    visa: bool = Query(None),
+    job_functions: str = Query(None),
+    experience: str = Query(None),
+    cities: str = Query(None),
+    date_posted: str = Query(None),
+    salary: str = Query(None)
+):
+    """
+    Facet counts for the jobs filter sidebar, conditioned on the active filters.
+    Served from the in-memory facet index (see job_facets.py), which a startup
+    task builds and refreshes; until the first build is done this returns 503.
+    """
+    if not facet_index.ready.is_set():
+        await asyncio.to_thread(facet_index.ready.wait, FACET_WARMUP_WAIT_SECONDS)
+    if not facet_index.ready.is_set():
+        raise HTTPException(
+            status_code=503,
+            detail="Job facets are warming up",
+            headers={"Retry-After": str(FACET_WARMUP_WAIT_SECONDS)},
+        )
+    try:
+        result = facet_index.counts(
+            job_functions=job_functions,
+            experience=experience,
+            job_type=type,
+            cities=cities,
+            visa=bool(visa),
+            date_posted=date_posted,
+            salary=salary
+        )
+        return {"success": True, **result}
+    except Exception as e:
+        logger.error(f"Error computing job facets: {e}")
+        raise HTTPException(status_code=500, detail="Failed to compute job facets")
+
+
+@app.get("/api/jobs/aggregator-stats")
+async def get_aggregator_stats():
+    """
+    Get statistics about aggregated jobs in the database, plus per-source
+    health: latency percentiles, error rate and circuit breaker state
+    """
+    try:
+        aggregator = JobAggregator()
+        stats = await aggregator.get_job_stats()
+        sources = await asyncio.to_thread(source_health.merged_snapshot)
+
+        return {
+            "success": True,
+            "stats": stats,
+            "sources": sources,
+            "openCircuits": [s["key"] for s in sources if s["state"] != "closed"],
+        }
+    except Exception as e:
+        logger.error(f"Error fetching aggregator stats: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch aggregator stats")
+
+
 @app.get("/api/jobs/{job_id}")
 async def get_job_by_id(
     job_id: str,
@@ -4202,10 +4329,8 @@ async def get_jobs_stats():
 async def force_sync(background_tasks: BackgroundTasks):
     """Trigger partial sync immediately."""
     try:
-        from job_sync_service import JobSyncService
-        service = JobSyncService(app.mongodb)
-        background_tasks.add_task(service.sync_adzuna_jobs)
-        return {"status": "started", "message": "Adzuna sync triggered in background"}
+        result = await job_scheduler.trigger("sync_adzuna_jobs")
+        return {"status": result, "message": f"Adzuna sync {result} for the ingestion worker"}
     except Exception as e:
         return {"error": str(e)}
 
@@ -4368,8 +4493,8 @@ async def refresh_jobs():
     Manually trigger job refresh (admin only - add auth later)
     """
     try:
-        count = await scheduled_job_fetch()
-        return {"success": True, "message": f"Refreshed {count} jobs with Supabase", "count": count}
+        result = await job_scheduler.trigger("scheduled_job_fetch")
+        return {"success": True, "message": f"Job refresh {result}", "status": result}
     except Exception as e:
         logger.error(f"Error refreshing jobs: {e}")
         raise HTTPException(status_code=500, detail="Failed to refresh jobs")
@@ -4403,6 +4528,20 @@ async def aggregate_jobs_from_apis(
             max_jsearch_queries=max_jsearch_queries,
         )
 
+        # The jobs went to this process's spool; without the embedded flusher
+        # nothing else drains it, so write them to Supabase before answering
+        if INGESTION_WORKER != "embedded":
+            spool = get_job_spool()
+            stats["flushed"] = await asyncio.to_thread(spool.flush)
+            stats["spool_pending"] = (await asyncio.to_thread(spool.stats))["pending"]
+            if stats["spool_pending"]:
+                return {
+                    "success": False,
+                    "message": f"Aggregated {stats['total_stored']} jobs but {stats['spool_pending']} "
+                               f"are still spooled; Supabase writes failed: {spool.counters['last_error']}",
+                    "stats": stats,
+                }
+
         return {
             "success": True,
             "message": f"Aggregated {stats['total_stored']} unique USA jobs",
@@ -4416,21 +4555,6 @@ async def aggregate_jobs_from_apis(
         )
 
 
-@app.get("/api/jobs/aggregator-stats")
-async def get_aggregator_stats():
-    """
-    Get statistics about aggregated jobs in the database
-    """
-    try:
-        aggregator = JobAggregator()
-        stats = await aggregator.get_job_stats()
-
-        return {"success": True, "stats": stats}
-    except Exception as e:
-        logger.error(f"Error fetching aggregator stats: {e}")
-        raise HTTPException(status_code=500, detail="Failed to fetch aggregator stats")
-
-
 # ============================================
 # RAZORPAY PAYMENT ENDPOINTS
 # ============================================
@@ -4559,34 +4683,6 @@ async def get_razorpay_plans(currency: str = "INR"):
     return {"success": True, "plans": plans, "currency": currency}
 
 
-# ============================================
-# SCHEDULER SETUP
-# ============================================
-
-
-# Background task to fetch jobs periodically
-async def job_fetch_background_task():
-    """Background task that runs every 6 hours to fetch new jobs"""
-    # Initial fetch on startup, delayed to allow server to bind port and pass health checks
-    try:
-        logger.info("⏳ Waiting 30s before initial job fetch to pass health checks...")
-        await asyncio.sleep(30)
-        logger.info("🚀 Running initial job fetch after startup delay...")
-        await scheduled_job_fetch()
-    except Exception as e:
-        logger.error(f"Initial job fetch error: {e}")
-
-    while True:
-        # Wait 6 hours before next fetch
-        await asyncio.sleep(6 * 60 * 60)  # 6 hours in seconds
-
-        try:
-            logger.info("🔄 Running scheduled job fetch...")
-            await scheduled_job_fetch()
-        except Exception as e:
-            logger.error(f"Background job fetch error: {e}")
-
-
 # ============================================
 # RESUME SCANNER API ENDPOINTS
 # ============================================
@@ -4596,6 +4692,7 @@ from resume_analyzer import analyze_resume, extract_resume_data
 from document_generator import (
     generate_optimized_resume_content,
     generate_cover_letter_content,
+    stream_cover_letter_content,
     generate_expert_documents,
     create_resume_docx,
     create_cover_letter_docx,
@@ -4613,19 +4710,38 @@ class AIGenerateRequest(BaseModel):
     max_tokens: int = 1000
 
 
+def _tidy_generated_text(response: Optional[str]) -> Optional[str]:
+    if response:
+        # If it looks like a resume, strip excessive newlines
+        if any(h in response.upper() for h in ["EXPERIENCE", "SUMMARY", "SKILLS", "EDUCATION", "PROJECTS"]):
+            import re
+            # Strip ALL double+ newlines and replace with single
+            response = re.sub(r'\n{3,}', '\n\n', response.strip())
+            # Also strip leading/trailing spaces on each line
+            response = "\n".join([line.strip() for line in response.split("\n") if line.strip()])
+    return response
+
+
 @app.post("/api/ai/generate")
 async def generate_ai_content(
-    request: AIGenerateRequest, user: dict = Depends(get_current_user)
+    request: AIGenerateRequest, user: dict = Depends(get_current_user), stream: bool = False
 ):
     """
     General-purpose AI text generation endpoint for tools like
     Bullet Points Generator, Summary Generator, LinkedIn Optimizer.
+    ?stream=true streams the text as SSE.
     """
     try:
         # Enforce email verification
         ensure_verified(user)
 
-        from resume_analyzer import unified_api_call
+        from resume_analyzer import unified_api_call, stream_groq_api
+
+        if stream:
+            return sse_response(
+                stream_groq_api(request.prompt, max_tokens=request.max_tokens, model="llama-3.1-8b-instant", call_site="ai_generate"),
+                lambda text: {"success": True, "response": _tidy_generated_text(text)}
+            )
 
         # Check for BYOK
         # BYOK RESTRICTION: No longer using BYOK for general tools
@@ -4636,18 +4752,10 @@ async def generate_ai_content(
             # byok_config=byok_config, # Forces system keys
             max_tokens=request.max_tokens,
             model="llama-3.1-8b-instant",
+            call_site="ai_generate",
         )
 
-        if response:
-            # If it looks like a resume, strip excessive newlines
-            if any(h in response.upper() for h in ["EXPERIENCE", "SUMMARY", "SKILLS", "EDUCATION", "PROJECTS"]):
-                import re
-                # Strip ALL double+ newlines and replace with single
-                response = re.sub(r'\n{3,}', '\n\n', response.strip())
-                # Also strip leading/trailing spaces on each line
-                response = "\n".join([line.strip() for line in response.split("\n") if line.strip()])
-
-        return {"success": True, "response": response}
+        return {"success": True, "response": _tidy_generated_text(response)}
     except Exception as e:
         logger.error(f"AI generation error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -4657,16 +4765,18 @@ async def generate_ai_content(
 async def scan_resume(
     resume: UploadFile = File(...),
     job_description: str = Form(...),
-    email: str = Form(None),
     target_score: int = Form(85),
+    run_async: bool = Query(False, alias="async"),
+    callbackUrl: Optional[str] = Query(None),
+    user: Optional[dict] = Depends(get_optional_user),
 ):
     """
     Analyze a resume against a job description
-    Returns match score and detailed analysis
+    Returns match score and detailed analysis (or a generation job with ?async=1).
+    Queue priority and the per-user job cap follow the signed-in user; without
+    a valid token the scan runs as anonymous.
     """
     try:
-        # SAFETY PATCH: Define user to prevent NameError
-        user = None
         logger.info("SERVER VERSION SCAN PATCHED: Starting resume scan...")
 
         # Validate file
@@ -4683,40 +4793,42 @@ async def scan_resume(
                 detail="Could not extract text from resume. Please ensure it's not an image-based PDF.",
             )
 
-        # Check for BYOK - safely handle if email is missing
-        byok_config = None
+        async def pipeline(progress):
+            # Analyze with Gemini / BYOK
+            from resume_analyzer import analyze_resume
+            from document_generator import generate_optimized_resume_content
 
-        # Analyze with Gemini / BYOK
-        from resume_analyzer import analyze_resume
-        from document_generator import generate_optimized_resume_content
+            await progress("analyzing", 0.1)
+            analysis = await analyze_resume(
+                resume_text, job_description, target_score=target_score
+            )
 
-        analysis = await analyze_resume(
-            resume_text, job_description, target_score=target_score
-        )
+            if "error" in analysis:
+                raise HTTPException(status_code=500, detail=analysis["error"])
 
-        if "error" in analysis:
-            raise HTTPException(status_code=500, detail=analysis["error"])
+            # Generate optimized text for preview
+            await progress("optimizing", 0.5)
+            optimized_data = await generate_optimized_resume_content(
+                resume_text, 
+                job_description, 
+                analysis,
+                target_score=target_score
+            )
+            
+            # Convert structured data back to text for ResumePaper
+            from document_generator import render_preview_text_from_json
+            optimized_text = render_preview_text_from_json(optimized_data)
+            
+            return {
+                "success": True,
+                "analysis": analysis,
+                "resumeText": resume_text,
+                "optimizedText": optimized_text,
+                "optimizedData": optimized_data,
+                "resumeTextLength": len(resume_text),
+            }
 
-        # Generate optimized text for preview
-        optimized_data = await generate_optimized_resume_content(
-            resume_text, 
-            job_description, 
-            analysis,
-            target_score=target_score
-        )
-        
-        # Convert structured data back to text for ResumePaper
-        from document_generator import render_preview_text_from_json
-        optimized_text = render_preview_text_from_json(optimized_data)
-        
-        return {
-            "success": True,
-            "analysis": analysis,
-            "resumeText": resume_text,
-            "optimizedText": optimized_text,
-            "optimizedData": optimized_data,
-            "resumeTextLength": len(resume_text),
-        }
+        return await _run_generation("scan_analyze", pipeline, user, run_async, callbackUrl)
 
     except HTTPException:
         raise
@@ -4765,16 +4877,13 @@ async def parse_resume_endpoint(
                 status_code=400, detail="Could not extract text from resume"
             )
 
-        # Check for BYOK - use authenticated user email
-        byok_config = None
-
         # Extract structured data with Gemini / BYOK
         from resume_analyzer import extract_resume_data
 
         with open("debug_log.txt", "a") as f:
             f.write("Starting extraction...\n")
 
-        parsed_data = await extract_resume_data(resume_text, byok_config=byok_config)
+        parsed_data = await extract_resume_data(resume_text)
         
         # PROACTIVE PROFILE SYNC (Project Orion)
         try:
@@ -4878,9 +4987,14 @@ class GenerateResumeRequest(BaseModel):
 
 
 @app.post("/api/generate/resume")
-async def generate_resume_docx(request: GenerateResumeRequest):
+async def generate_resume_docx(
+    request: GenerateResumeRequest,
+    run_async: bool = Query(False, alias="async"),
+    callbackUrl: Optional[str] = Query(None),
+):
     """
     Generate an optimized resume as a Word document
+    (with ?async=1 a generation job; the document is then served from its fileUrl)
     """
     safe_company = request.company.replace(" ", "_").replace('"', "").replace("'", "")
     try:
@@ -4889,102 +5003,108 @@ async def generate_resume_docx(request: GenerateResumeRequest):
         if user:
             ensure_verified(user)
 
-        # Check if we should use raw text or structured data
-        if request.is_already_tailored and request.resume_text:
-            logger.info("Generating already tailored resume (fast path)")
+        async def pipeline(progress):
+            expert_docs = None
+            resume_data = None
+            await progress("generating", 0.1)
+
+            # Check if we should use raw text or structured data
+            if request.is_already_tailored and request.resume_text:
+                logger.info("Generating already tailored resume (fast path)")
             
-            # Clean up the resume text to remove excessive empty lines
-            import re
-            resume_text = request.resume_text.strip()
-            # Reduce multiple newlines to single newlines and clean each line
-            resume_text = re.sub(r'\n{3,}', '\n\n', resume_text) # Allow at most 1 blank line between paragraphs
-            resume_text = "\n".join([line.rstrip() for line in resume_text.split("\n")])
+                # Clean up the resume text to remove excessive empty lines
+                import re
+                resume_text = request.resume_text.strip()
+                # Reduce multiple newlines to single newlines and clean each line
+                resume_text = re.sub(r'\n{3,}', '\n\n', resume_text) # Allow at most 1 blank line between paragraphs
+                resume_text = "\n".join([line.rstrip() for line in resume_text.split("\n")])
             
-            docx_file = create_text_docx(
-                resume_text, 
-                "ATS_Resume", 
-                font_family=request.fontFamily,
-                template=request.template
-            )
-            # Skip redundant Expert AI calls!
-        else:
-            # BYOK RESTRICTION: Keep internal keys only
-            # Check for BYOK
-            user_email = user.get("email", "") if user else ""
-            # byok_config = await get_decrypted_byok_key(user_email)
-
-            from document_generator import (
-                generate_expert_documents,
-                generate_optimized_resume_content,
-            )
-
-            expert_docs = await generate_expert_documents(
-                request.resume_text,
-                request.job_description,
-                user_info=user,
-            )
-
-            if expert_docs and expert_docs.get("ats_resume"):
                 docx_file = create_text_docx(
-                    expert_docs["ats_resume"], 
-                    "Optimized_Resume",
+                    resume_text, 
+                    "ATS_Resume", 
                     font_family=request.fontFamily,
                     template=request.template
                 )
+                # Skip redundant Expert AI calls!
             else:
-                # Fallback to standard optimization if expert fails
-                # Stage 1 optimization - preserves all original content
-                resume_data = await generate_optimized_resume_content(
+                # BYOK RESTRICTION: Keep internal keys only
+                # Check for BYOK
+                user_email = user.get("email", "") if user else ""
+                # byok_config = await get_decrypted_byok_key(user_email)
+
+                from document_generator import (
+                    generate_expert_documents,
+                    generate_optimized_resume_content,
+                )
+
+                expert_docs = await generate_expert_documents(
                     request.resume_text,
                     request.job_description,
-                    request.analysis,
-                    target_score=request.targetScore
+                    user_info=user,
+                    include_cover_letter=False,
                 )
-                if not resume_data:
-                    raise HTTPException(
-                        status_code=500, detail="Failed to generate resume content"
-                    )
-                docx_file = create_resume_docx(resume_data, font_family=request.fontFamily)
 
-        # Track this generation for usage limits in Supabase
-        if user:
-            user_email = user.get("email")
-            # Log usage (Resumes)
-            today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-            SupabaseService.increment_daily_usage(user_email, today, "apps")
+                if expert_docs and expert_docs.get("ats_resume"):
+                    docx_file = create_text_docx(
+                        expert_docs["ats_resume"], 
+                        "Optimized_Resume",
+                        font_family=request.fontFamily,
+                        template=request.template
+                    )
+                else:
+                    # Fallback to standard optimization if expert fails
+                    # Stage 1 optimization - preserves all original content
+                    resume_data = await generate_optimized_resume_content(
+                        request.resume_text,
+                        request.job_description,
+                        request.analysis,
+                        target_score=request.targetScore
+                    )
+                    if not resume_data:
+                        raise HTTPException(
+                            status_code=500, detail="Failed to generate resume content"
+                        )
+                    docx_file = create_resume_docx(resume_data, font_family=request.fontFamily)
+
+            # Track this generation for usage limits in Supabase
+            if user:
+                user_email = user.get("email")
+                # Log usage (Resumes)
+                today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+                SupabaseService.increment_daily_usage(user_email, today, "apps")
             
-            # Also save to "My Resumes" library in Supabase
-            try:
-                # We content is tailored or expert docs, use that text
-                saved_text = ""
-                if 'expert_docs' in locals() and expert_docs and expert_docs.get("ats_resume"):
-                    saved_text = expert_docs["ats_resume"]
-                elif "resume_data" in locals() and resume_data:
-                    saved_text = str(resume_data)  # Simplification
-
-                if saved_text:
-                    SupabaseService.create_saved_resume({
-                        "userEmail": user_email,
-                        "userId": request.userId,
-                        "resumeName": f"Generated: {request.company}",
-                        "resumeText": saved_text,
-                        "fileName": f"Optimized_Resume_{safe_company}.docx",
-                        "createdAt": datetime.now(timezone.utc).isoformat(),
-                        "updatedAt": datetime.now(timezone.utc).isoformat(),
-                        "isSystemGenerated": True,
-                        "origin": "ai_generation"
-                    })
-            except Exception as e:
-                logger.error(f"Failed to auto-save generated resume to library: {e}")
+                # Also save to "My Resumes" library in Supabase
+                try:
+                    # We content is tailored or expert docs, use that text
+                    saved_text = ""
+                    if expert_docs and expert_docs.get("ats_resume"):
+                        saved_text = expert_docs["ats_resume"]
+                    elif resume_data:
+                        saved_text = str(resume_data)  # Simplification
+
+                    if saved_text:
+                        SupabaseService.create_saved_resume({
+                            "userEmail": user_email,
+                            "userId": request.userId,
+                            "resumeName": f"Generated: {request.company}",
+                            "resumeText": saved_text,
+                            "fileName": f"Optimized_Resume_{safe_company}.docx",
+                            "createdAt": datetime.now(timezone.utc).isoformat(),
+                            "updatedAt": datetime.now(timezone.utc).isoformat(),
+                            "isSystemGenerated": True,
+                            "origin": "ai_generation"
+                        })
+                except Exception as e:
+                    logger.error(f"Failed to auto-save generated resume to library: {e}")
+
+            # Return as downloadable file
+            return GeneratedFile(
+                f"Optimized_Resume_{safe_company}.docx",
+                "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                docx_file.getvalue(),
+            )
 
-        # Return as downloadable file
-        return StreamingResponse(
-            docx_file,
-            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            headers={
-                "Content-Disposition": f'attachment; filename="Optimized_Resume_{safe_company}.docx"'
-            },
-        )
+        return await _run_generation("generate_resume", pipeline, user, run_async, callbackUrl)
 
     except HTTPException:
         raise
@@ -5046,6 +5166,22 @@ class GenerateCoverLetterRequest(BaseModel):
     template: Optional[str] = "standard"
 
 
+@app.post("/api/generate/cover-letter/stream")
+async def stream_cover_letter_text(request: GenerateCoverLetterRequest):
+    """
+    Stream the cover letter text as SSE. The done event carries
+    cover_letter_text, which the client passes back to /api/generate/cover-letter
+    with is_already_tailored=true to build the document without a second LLM call.
+    """
+    user = SupabaseService.get_user_by_id(request.userId)
+    if user:
+        ensure_verified(user)
+    return sse_response(
+        stream_cover_letter_content(request.resume_text, request.job_description, request.job_title, request.company),
+        lambda text: {"cover_letter_text": text}
+    )
+
+
 @app.post("/api/generate/cover-letter")
 async def generate_cover_letter_docx(request: GenerateCoverLetterRequest):
     """
@@ -5755,14 +5891,24 @@ async def submit_answer(session_id: str, request: InterviewAnswerRequest, user:
 
 
 @app.post("/api/interview/finalize/{session_id}")
-async def finalize_interview(session_id: str, user: dict = Depends(get_current_user)):
-    """Finalize interview and generate report"""
+async def finalize_interview(
+    session_id: str,
+    user: dict = Depends(get_current_user),
+    run_async: bool = Query(False, alias="async"),
+    callbackUrl: Optional[str] = Query(None),
+):
+    """Finalize interview and generate report (or a generation job with ?async=1)"""
+    async def pipeline(progress):
+        await progress("reporting", 0.1)
+        try:
+            return await InterviewOrchestrator(session_id).finalize_and_generate_report()
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+
     try:
-        orchestrator = InterviewOrchestrator(session_id)
-        report = await orchestrator.finalize_and_generate_report()
-        return report
-    except ValueError as e:
-        raise HTTPException(status_code=404, detail=str(e))
+        return await _run_generation("interview_finalize", pipeline, user, run_async, callbackUrl)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Finalize interview error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -5783,7 +5929,7 @@ async def transcribe_audio(audio: UploadFile = File(...), user: dict = Depends(g
         audio_file.name = "recording.webm"
         
         # Transcribe
-        text = AIService.transcribe_audio(audio_file)
+        text = await AIService.transcribe_audio(audio_file)
         
         return {"text": text}
     except Exception as e:
@@ -5842,6 +5988,80 @@ async def health_check():
     }
 
 
+# ============================================
+# GENERATION JOBS
+# ============================================
+
+
+async def _run_generation(kind: str, pipeline, user: Optional[dict], run_async: bool, callback_url: Optional[str] = None):
+    """
+    Run an AI pipeline: with ?async=1 queue it as a generation job and answer
+    202 with the job at once, otherwise run it inline and return what the
+    endpoint always returned
+    """
+    if run_async:
+        try:
+            job = await generation_queue.submit(kind, pipeline, user=user, callback_url=callback_url)
+        except GenerationJobError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        return JSONResponse(status_code=202, content=await generation_queue.get(job.id))
+
+    async def no_progress(stage: str, fraction: Optional[float] = None):
+        pass
+
+    result = await pipeline(no_progress)
+    if isinstance(result, GeneratedFile):
+        return Response(
+            content=result.data,
+            media_type=result.media_type,
+            headers={"Content-Disposition": f'attachment; filename="{result.filename}"'},
+        )
+    return result
+
+
+@app.get("/api/generation-jobs/{job_id}")
+async def get_generation_job(job_id: str):
+    """Status, progress and (when finished) result of a generation job"""
+    job = await generation_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Generation job not found or expired")
+    return job
+
+
+@app.get("/api/generation-jobs/{job_id}/events")
+async def stream_generation_job(job_id: str):
+    """Server-sent events: a `progress` event per change, then `done`"""
+    if not await generation_queue.get(job_id):
+        raise HTTPException(status_code=404, detail="Generation job not found or expired")
+
+    async def events():
+        async for snapshot in generation_queue.watch(job_id):
+            if snapshot is None:
+                yield ": keep-alive\n\n"
+                continue
+            event = "done" if snapshot["status"] in ("succeeded", "failed") else "progress"
+            yield f"event: {event}\ndata: {json.dumps(snapshot, default=str)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/generation-jobs/{job_id}/file")
+async def download_generation_job_file(job_id: str):
+    """The document produced by a finished generation job (e.g. /api/generate/resume)"""
+    generated = await generation_queue.get_file(job_id)
+    if not generated:
+        raise HTTPException(status_code=404, detail="No file for this generation job")
+    return Response(
+        content=generated.data,
+        media_type=generated.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{generated.filename}"'},
+    )
+
+
 # ============================================
 # APP STARTUP & SHUTDOWN
 # ============================================
@@ -5852,16 +6072,27 @@ async def startup_event():
     """Initialize background tasks on startup"""
     logger.info("🚀 Starting Job Ninjas backend...")
 
-    # Start the background job fetcher (runs every 6 hours, including immediately on startup)
-    asyncio.create_task(job_fetch_background_task())
-    logger.info(
-        "📅 Job fetch scheduler started (fetches immediately, then every 6 hours)"
-    )
+    # Ingestion (job fetch 30s after boot then hourly, cleanup daily unless JOB_CLEANUP_MODE=off, spool flush)
+    if INGESTION_WORKER == "embedded":
+        start_embedded(job_scheduler)
+    else:
+        logger.info("📅 Ingestion runs in the external worker (worker.py); API only enqueues triggers")
+
+    # Facet index: first build now, then periodic sync (never on the request path)
+    app.state.facet_task = asyncio.create_task(facet_index.run(SupabaseService.get_jobs_batch))
 
     # MongoDB Indexing no longer needed
     pass
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.facet_task.cancel()
+    await generation_queue.close()
+    await interview_states.flush()
+    await llm_gateway.close()
+
+
 
 # ==================== ADMIN ANALYTICS ====================
 @app.get("/api/admin/analytics")
@@ -5939,9 +6170,10 @@ class NovaChatRequest(BaseModel):
 @app.post("/api/nova/chat")
 async def nova_chat_endpoint(
     req: NovaChatRequest,
-    user: dict = Depends(get_current_user)
+    user: dict = Depends(get_current_user),
+    stream: bool = False
 ):
-    if not openai_client:
+    if not llm_gateway.available("openai"):
          raise HTTPException(status_code=503, detail="AI service unavailable")
 
     # 1. Build System Prompt
@@ -5991,18 +6223,28 @@ async def nova_chat_endpoint(
     
     messages.append({"role": "user", "content": req.message})
 
-    try:
-        response = await openai_client.chat.completions.create(
-            model="gpt-3.5-turbo", # Or gpt-4 if available/configured
-            messages=messages,
-            temperature=0.7,
-            max_tokens=500
+    if stream:
+        return sse_response(
+            llm_gateway.stream(
+                messages, model="gpt-3.5-turbo", temperature=0.7, max_tokens=500,
+                provider="openai", call_site="nova_chat"
+            ),
+            lambda text: {"reply": text}
         )
-        return {"reply": response.choices[0].message.content}
-    except Exception as e:
-        logger.error(f"Nova Chat Error: {e}")
+
+    reply = await llm_gateway.chat(
+        messages,
+        model="gpt-3.5-turbo", # Or gpt-4 if available/configured
+        temperature=0.7,
+        max_tokens=500,
+        provider="openai",
+        call_site="nova_chat"
+    )
+    if reply is None:
+        logger.error("Nova Chat Error: no completion from OpenAI")
         # Return a fallback response if AI fails, rather than 500
         return {"reply": "I'm having trouble connecting to my brain right now. Please try again in a moment."}
+    return {"reply": reply}
 
 class LLMAnswerRequest(BaseModel):
     question: str
@@ -6011,9 +6253,10 @@ class LLMAnswerRequest(BaseModel):
 @app.post("/api/llm/generate-answer")
 async def generate_smart_answer_endpoint(
     req: LLMAnswerRequest,
-    user: dict = Depends(get_current_user)
+    user: dict = Depends(get_current_user),
+    stream: bool = False
 ):
-    if not openai_client:
+    if not llm_gateway.available("openai"):
          raise HTTPException(status_code=503, detail="AI service unavailable")
     
     # Get context (Resume)
@@ -6033,7 +6276,7 @@ async def generate_smart_answer_endpoint(
         You are an expert career assistant. You are filling out a job application for the user.
         
         User Context (Resume/Profile):
-        {context[:15000]} 
+        {pack_for("generate_answer", "resume", context, query=req.question, keep_head=60)}
         
         Job Application Question:
         {req.question}
@@ -6043,18 +6286,36 @@ async def generate_smart_answer_endpoint(
         Keep it natural and first-person. Do not include markdown or quotes, just the answer text.
         """
         
-        response = await openai_client.chat.completions.create(
+        messages = [
+            {"role": "system", "content": "You are a helpful job application assistant."},
+            {"role": "user", "content": prompt}
+        ]
+        if stream:
+            return sse_response(
+                llm_gateway.stream(
+                    messages, model="gpt-4o", max_tokens=300, temperature=1.0,
+                    provider="openai", call_site="generate_answer"
+                ),
+                lambda text: {"success": True, "answer": text.strip()}
+            )
+
+        response = await llm_gateway.chat(
+            messages,
             model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a helpful job application assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=300
+            max_tokens=300,
+            temperature=1.0,
+            provider="openai",
+            call_site="generate_answer"
         )
+        if response is None:
+            raise HTTPException(status_code=502, detail="AI service failed to generate an answer")
         
-        answer = response.choices[0].message.content.strip()
+        answer = response.strip()
         return {"success": True, "answer": answer}
         
+    except HTTPException:
+        raise
+        
     except Exception as e:
         logger.error(f"LLM generation failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -6287,14 +6548,14 @@ async def trigger_manual_sync(user: dict = Depends(get_current_user)):
     if not job_sync_service:
         raise HTTPException(status_code=503, detail="Job sync service not available")
     
-    # Trigger both syncs
-    adzuna_count = await job_sync_service.sync_adzuna_jobs()
-    jsearch_count = await job_sync_service.sync_jsearch_jobs()
+    # Trigger both syncs (run by the ingestion worker)
+    adzuna_status = await job_scheduler.trigger("sync_adzuna_jobs")
+    jsearch_status = await job_scheduler.trigger("sync_jsearch_jobs")
     
     return {
         "success": True,
-        "adzuna_jobs_added": adzuna_count,
-        "jsearch_jobs_added": jsearch_count
+        "adzuna": adzuna_status,
+        "jsearch": jsearch_status
     }
 
 @app.get("/api/debug/sync-jobs")
@@ -6323,17 +6584,16 @@ async def debug_force_sync():
         if not job_sync_service:
             return {"status": "error", "config": config_status, "error": "Service not available (DB connection failed?)"}
         
-        # Run Adzuna Sync
+        # Queue the syncs for the ingestion worker
         try:
-            adzuna_res = await job_sync_service.sync_adzuna_jobs()
+            adzuna_res = await job_scheduler.trigger("sync_adzuna_jobs")
         except Exception as e:
-            sync_errors.append(f"Adzuna Crash: {str(e)}\n{traceback.format_exc()}")
+            sync_errors.append(f"Adzuna Trigger Failed: {str(e)}\n{traceback.format_exc()}")
 
-        # Run JSearch Sync
         try:
-            jsearch_res = await job_sync_service.sync_jsearch_jobs()
+            jsearch_res = await job_scheduler.trigger("sync_jsearch_jobs")
         except Exception as e:
-             sync_errors.append(f"JSearch Crash: {str(e)}\n{traceback.format_exc()}")
+             sync_errors.append(f"JSearch Trigger Failed: {str(e)}\n{traceback.format_exc()}")
         
         # Get detailed status
         try:
@@ -6477,17 +6737,73 @@ async def force_job_fetch_v2(background_tasks: BackgroundTasks):
     Force run the job fetcher (v2 debug) - Uses Supabase logic
     """
     try:
-        from job_fetcher import scheduled_job_fetch
-        
-        # Run in background to avoid timeout
-        background_tasks.add_task(scheduled_job_fetch)
+        # Coalesces with a run that is already in progress on this instance
+        result = await job_scheduler.trigger("scheduled_job_fetch")
         
-        return {"success": True, "message": "Job fetch started in background (v2)"}
+        return {"success": True, "message": f"Job fetch {result} (v2)", "status": result}
 
     except Exception as e:
         logger.error(f"Force fetch failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@app.get("/api/admin/scheduler")
+async def get_scheduler_status(user: dict = Depends(get_current_user)):
+    """Scheduled jobs: lease holder, last run and next run (admin only)"""
+    if user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return {"success": True, "scheduler": await asyncio.to_thread(job_scheduler.status)}
+
+
+@app.get("/api/admin/job-spool")
+async def get_job_spool_status(user: dict = Depends(get_current_user)):
+    """Ingestion spool backlog and flush lag (admin only)"""
+    if user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return {"success": True, "spool": get_job_spool().stats()}
+
+
+@app.post("/api/admin/job-spool/requeue")
+async def requeue_job_spool_dead_letters(user: dict = Depends(get_current_user)):
+    """Retry dead-lettered spool rows and deactivations (admin only)"""
+    if user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    requeued = await asyncio.to_thread(get_job_spool().requeue_dead_letters)
+    return {"success": True, "requeued": requeued}
+
+
+@app.get("/api/admin/llm")
+async def get_llm_status(user: dict = Depends(get_current_user)):
+    """LLM key pool headroom, cache and fact store hit rates, generation queue (admin only)"""
+    if user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return {
+        "success": True,
+        "llm": await asyncio.to_thread(llm_gateway.stats),
+        "resume_facts": resume_facts.stats(),
+        "generation_queue": generation_queue.stats(),
+        "slowest_call_sites": llm_telemetry.slowest_call_sites(),
+    }
+
+
+@app.get("/api/admin/llm/metrics")
+async def get_llm_metrics(user: dict = Depends(get_current_user)):
+    """Per call site LLM counters, token totals and latency histograms (admin only)"""
+    if user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return {"success": True, **llm_telemetry.snapshot()}
+
+
+@app.get("/metrics")
+async def prometheus_metrics(authorization: Optional[str] = Header(None)):
+    """LLM telemetry in Prometheus text format; needs METRICS_TOKEN as a bearer token"""
+    metrics_token = os.environ.get("METRICS_TOKEN")
+    if not metrics_token:
+        raise HTTPException(status_code=404, detail="Not found")
+    if authorization != f"Bearer {metrics_token}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(content=llm_telemetry.prometheus(), media_type="text/plain; version=0.0.4")
+
 # Include the API router with all /api/* routes
 app.include_router(api_router)
 
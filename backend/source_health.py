@@ -0,0 +1,257 @@
+"""
+Source Health - Circuit breakers and telemetry for job providers
+
+Every job source talks HTTP through aiohttp, so the breakers hook in as an
+aiohttp TraceConfig: `aiohttp.ClientSession(trace_configs=[provider_trace("lever")])`.
+Each (provider, host) pair gets its own breaker:
+
+- closed: requests flow; the last BREAKER_WINDOW outcomes are kept and the
+  breaker opens once BREAKER_FAILURE_RATE of them failed (min BREAKER_MIN_REQUESTS)
+- open: requests fail immediately with CircuitOpenError (an aiohttp.ClientError,
+  so the fetch_* functions treat it like any connection failure) instead of
+  waiting out their 20-30s timeouts
+- half-open: after the cooldown one probe request is let through; success
+  closes the breaker, failure re-opens it with the cooldown doubled
+  (BREAKER_BASE_COOLDOWN_SECONDS up to BREAKER_MAX_COOLDOWN_SECONDS)
+
+A failure is a connection error / timeout, HTTP 5xx, 408, 422 or 429 (404 is a
+missing board, not an unhealthy provider). Application-level failures inside
+a 200, such as GraphQL errors, are reported with report_failure().
+
+Latency samples, error rates and breaker state are persisted to the
+source_health table (source_health_schema.sql) after each aggregation run,
+and restored on startup so a restarted worker doesn't hammer a provider that
+is still cooling down.
+
+provider_trace() is the single per-provider instrumentation point: the same
+TraceConfig also archives raw payloads (raw_archive.py).
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from supabase_service import SupabaseService
+from raw_archive import add_archive_hooks
+
+logger = logging.getLogger(__name__)
+
+BREAKER_WINDOW = 20
+BREAKER_MIN_REQUESTS = 5
+BREAKER_FAILURE_RATE = 0.5
+BREAKER_BASE_COOLDOWN_SECONDS = 30
+BREAKER_MAX_COOLDOWN_SECONDS = 30 * 60
+LATENCY_SAMPLES = 200
+FAILURE_STATUSES = {408, 422, 429}
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(aiohttp.ClientError):
+    """Raised instead of sending a request to a provider whose breaker is open"""
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts else None
+
+
+def _percentile(samples: List[float], pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))], 1)
+
+
+class SourceBreaker:
+    def __init__(self, provider: str, host: str):
+        self.provider = provider
+        self.host = host
+        self.state = CLOSED
+        self.outcomes: deque = deque(maxlen=BREAKER_WINDOW)
+        self.latencies_ms: deque = deque(maxlen=LATENCY_SAMPLES)
+        self.consecutive_opens = 0
+        self.open_until: Optional[float] = None
+        self.probe_in_flight = False
+        self.requests = 0
+        self.failures = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+        self.last_failure_at: Optional[float] = None
+        self.updated_at = time.time()
+
+    @property
+    def key(self) -> str:
+        return f"{self.provider}:{self.host}"
+
+    def before_request(self):
+        """Gate a request; raises CircuitOpenError while open / probing"""
+        if self.state == OPEN:
+            if time.time() < self.open_until:
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.key} circuit open until {_iso(self.open_until)}")
+            self.state = HALF_OPEN
+            self.probe_in_flight = False
+        if self.state == HALF_OPEN:
+            if self.probe_in_flight:
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.key} circuit half-open, probe in flight")
+            self.probe_in_flight = True
+
+    def record(self, success: bool, latency_ms: Optional[float] = None, error: Optional[str] = None):
+        now = time.time()
+        self.requests += 1
+        self.outcomes.append(success)
+        if latency_ms is not None:
+            self.latencies_ms.append(latency_ms)
+        if not success:
+            self.failures += 1
+            self.last_error = (error or "")[:300]
+            self.last_failure_at = now
+        self.updated_at = now
+
+        if self.state == HALF_OPEN:
+            if success:
+                logger.info(f"🟢 Circuit closed for {self.key} (probe succeeded)")
+                self.state = CLOSED
+                self.consecutive_opens = 0
+                self.outcomes.clear()
+                self.probe_in_flight = False
+            else:
+                self._open()
+        elif self.state == CLOSED and not success:
+            failed = self.outcomes.count(False)
+            if len(self.outcomes) >= BREAKER_MIN_REQUESTS and failed / len(self.outcomes) >= BREAKER_FAILURE_RATE:
+                self._open()
+
+    def _open(self):
+        self.consecutive_opens += 1
+        cooldown = min(BREAKER_BASE_COOLDOWN_SECONDS * 2 ** (self.consecutive_opens - 1), BREAKER_MAX_COOLDOWN_SECONDS)
+        self.state = OPEN
+        self.open_until = time.time() + cooldown
+        self.probe_in_flight = False
+        logger.warning(f"🔴 Circuit open for {self.key} for {cooldown}s (last error: {self.last_error})")
+
+    def snapshot(self) -> Dict[str, Any]:
+        samples = list(self.latencies_ms)
+        window = list(self.outcomes)
+        return {
+            "key": self.key,
+            "provider": self.provider,
+            "host": self.host,
+            "state": self.state,
+            "open_until": _iso(self.open_until) if self.state != CLOSED else None,
+            "consecutive_opens": self.consecutive_opens,
+            "requests": self.requests,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "error_rate": round(window.count(False) / len(window), 3) if window else 0.0,
+            "latency_p50_ms": _percentile(samples, 50),
+            "latency_p95_ms": _percentile(samples, 95),
+            "latency_p99_ms": _percentile(samples, 99),
+            "last_error": self.last_error,
+            "last_failure_at": _iso(self.last_failure_at),
+            "updated_at": _iso(self.updated_at),
+        }
+
+
+class SourceHealthRegistry:
+    def __init__(self):
+        self.breakers: Dict[str, SourceBreaker] = {}
+        self.trace_configs: Dict[str, aiohttp.TraceConfig] = {}
+        self.lock = threading.Lock()
+        self.restored = False
+
+    def get(self, provider: str, host: str) -> SourceBreaker:
+        key = f"{provider}:{host}"
+        with self.lock:
+            if key not in self.breakers:
+                self.breakers[key] = SourceBreaker(provider, host)
+            return self.breakers[key]
+
+    def trace_config(self, provider: str) -> aiohttp.TraceConfig:
+        """TraceConfig that gates and measures every request made for `provider`"""
+        if provider in self.trace_configs:
+            return self.trace_configs[provider]
+
+        async def on_request_start(session, ctx, params):
+            ctx.breaker = self.get(provider, params.url.host or "unknown")
+            ctx.breaker.before_request()
+            ctx.start = asyncio.get_running_loop().time()
+
+        async def on_request_end(session, ctx, params):
+            status = params.response.status
+            latency_ms = (asyncio.get_running_loop().time() - ctx.start) * 1000
+            failed = status >= 500 or status in FAILURE_STATUSES
+            ctx.breaker.record(not failed, latency_ms, f"HTTP {status}" if failed else None)
+
+        async def on_request_exception(session, ctx, params):
+            if isinstance(params.exception, CircuitOpenError) or not hasattr(ctx, "start"):
+                return
+            latency_ms = (asyncio.get_running_loop().time() - ctx.start) * 1000
+            ctx.breaker.record(False, latency_ms, f"{type(params.exception).__name__}: {params.exception}")
+
+        config = aiohttp.TraceConfig()
+        config.on_request_start.append(on_request_start)
+        config.on_request_end.append(on_request_end)
+        config.on_request_exception.append(on_request_exception)
+        add_archive_hooks(config, provider)
+        self.trace_configs[provider] = config
+        return config
+
+    def report_failure(self, provider: str, url: str, reason: str):
+        """Count an application-level failure (e.g. GraphQL errors in a 200) against the breaker"""
+        self.get(provider, urlsplit(url).hostname or "unknown").record(False, None, reason)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            breakers = list(self.breakers.values())
+        return [breaker.snapshot() for breaker in breakers]
+
+    def persist(self) -> int:
+        """Write every breaker's snapshot to the source_health table"""
+        rows = self.snapshot()
+        if rows:
+            SupabaseService.upsert_source_health(rows)
+        return len(rows)
+
+    def restore(self):
+        """Re-open breakers that were still cooling down when the last process exited"""
+        if self.restored:
+            return
+        self.restored = True
+        now = time.time()
+        for row in SupabaseService.get_source_health():
+            if row.get("state") != OPEN or not row.get("open_until"):
+                continue
+            open_until = datetime.fromisoformat(row["open_until"].replace("Z", "+00:00")).timestamp()
+            if open_until <= now:
+                continue
+            breaker = self.get(row["provider"], row["host"])
+            breaker.state = OPEN
+            breaker.open_until = open_until
+            breaker.consecutive_opens = row.get("consecutive_opens") or 1
+            breaker.last_error = row.get("last_error")
+            logger.info(f"🔴 Restored open circuit for {breaker.key} until {row['open_until']}")
+
+    def merged_snapshot(self) -> List[Dict[str, Any]]:
+        """Persisted rows from every worker, overridden by this process's fresher state"""
+        rows = {row["key"]: row for row in SupabaseService.get_source_health()}
+        for row in self.snapshot():
+            stored = rows.get(row["key"])
+            if not stored or (stored.get("updated_at") or "") <= row["updated_at"]:
+                rows[row["key"]] = row
+        return sorted(rows.values(), key=lambda r: (r["provider"], r["host"]))
+
+
+source_health = SourceHealthRegistry()
+
+
+def provider_trace(provider: str) -> aiohttp.TraceConfig:
+    return source_health.trace_config(provider)
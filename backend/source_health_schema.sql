@@ -0,0 +1,31 @@
+-- ================================================================
+-- Source health: one row per (provider, host) job source
+-- Circuit breaker state, error rate and latency percentiles written
+-- by the ingestion workers after every run (see source_health.py).
+-- Run this in Supabase SQL Editor (safe to re-run)
+-- ================================================================
+
+CREATE TABLE IF NOT EXISTS source_health (
+    key               TEXT PRIMARY KEY,          -- "<provider>:<host>"
+    provider          TEXT NOT NULL,
+    host              TEXT NOT NULL,
+    state             TEXT NOT NULL DEFAULT 'closed',  -- closed | open | half_open
+    open_until        TIMESTAMPTZ,
+    consecutive_opens INT NOT NULL DEFAULT 0,
+    requests          BIGINT NOT NULL DEFAULT 0,
+    failures          BIGINT NOT NULL DEFAULT 0,
+    rejected          BIGINT NOT NULL DEFAULT 0,
+    error_rate        REAL NOT NULL DEFAULT 0,
+    latency_p50_ms    REAL,
+    latency_p95_ms    REAL,
+    latency_p99_ms    REAL,
+    last_error        TEXT,
+    last_failure_at   TIMESTAMPTZ,
+    updated_at        TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_source_health_provider ON source_health (provider);
+
+ALTER TABLE source_health ENABLE ROW LEVEL SECURITY;
+
+SELECT 'source_health table ready ✅' AS result;
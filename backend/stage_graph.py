@@ -0,0 +1,89 @@
+"""
+Stage Graph - Run a multi-call LLM pipeline as a small dependency graph
+
+A pipeline is a list of Stage objects. Every stage starts as soon as the
+stages it depends on have finished, so independent stages (which all go
+through the LLM gateway) run concurrently instead of one after another.
+
+- run(results) gets the results of earlier stages by name; stages are listed
+  in dependency order
+- timeout bounds each stage; a stage that raises or times out yields its
+  fallback value instead, so the rest of the pipeline still produces a
+  partial result
+- when(results) makes a stage conditional (e.g. a rescue stage that only runs
+  if the main stage produced nothing); a skipped stage yields its fallback
+
+    results = await run_stages([
+        Stage("facts", lambda r: extract(resume), timeout=60, fallback={}),
+        Stage("draft", lambda r: draft(r["facts"]), deps=("facts",)),
+        Stage("rescue", lambda r: simple(resume), deps=("draft",), when=lambda r: r["draft"] is None),
+    ])
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Stage:
+    def __init__(self, name: str, run: Callable[[Dict[str, Any]], Awaitable[Any]], deps: Iterable[str] = (),
+                 timeout: float = 60, fallback: Any = None,
+                 when: Optional[Callable[[Dict[str, Any]], bool]] = None):
+        self.name = name
+        self.run = run
+        self.deps = tuple(deps)
+        self.timeout = timeout
+        self.fallback = fallback
+        self.when = when
+
+
+async def run_stages(stages: List[Stage], label: str = "pipeline") -> Dict[str, Any]:
+    """Run the stages concurrently as their dependencies allow; name -> result"""
+    # Dependencies must be listed earlier, which also rules out cycles
+    seen = set()
+    for stage in stages:
+        missing = [dep for dep in stage.deps if dep not in seen]
+        if missing:
+            raise ValueError(f"Stage {stage.name} depends on stages not listed before it: {missing}")
+        seen.add(stage.name)
+
+    results: Dict[str, Any] = {}
+    timings: Dict[str, str] = {}
+    tasks: Dict[str, asyncio.Task] = {}
+    start = time.perf_counter()
+
+    async def execute(stage: Stage) -> Any:
+        if stage.deps:
+            await asyncio.gather(*(tasks[dep] for dep in stage.deps))
+        if stage.when and not stage.when(results):
+            timings[stage.name] = "skipped"
+            results[stage.name] = stage.fallback
+            return stage.fallback
+        began = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(stage.run(results), timeout=stage.timeout)
+            timings[stage.name] = f"{time.perf_counter() - began:.1f}s"
+        except asyncio.TimeoutError:
+            logger.warning(f"{label}: stage {stage.name} timed out after {stage.timeout}s, using fallback")
+            timings[stage.name] = "timeout"
+            result = stage.fallback
+        except Exception as e:
+            logger.error(f"{label}: stage {stage.name} failed: {e}")
+            timings[stage.name] = "failed"
+            result = stage.fallback
+        results[stage.name] = result
+        return result
+
+    # Tasks are created before any of them runs, so dependencies can be awaited by name
+    for stage in stages:
+        tasks[stage.name] = asyncio.create_task(execute(stage))
+    try:
+        await asyncio.gather(*tasks.values())
+    finally:
+        for task in tasks.values():
+            task.cancel()
+    logger.info(f"{label} finished in {time.perf_counter() - start:.1f}s: {timings}")
+    return results
@@ -3,6 +3,10 @@ import logging
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta, timezone
 from supabase import create_client, Client
+from salary_parser import parse_salary_filter
+from job_normalizer import normalize_job, experience_filter_codes, remote_type_filter_codes
+from job_function_classifier import function_filter_codes
+from job_facets import facet_index
 
 logger = logging.getLogger(__name__)
 
@@ -115,9 +119,13 @@ class SupabaseService:
             if visa:
                 query = query.contains("categories", ["sponsoring"])
             
-            # Type filter
+            # Type filter (remote_type is classified at ingest)
             if job_type and job_type != "all":
-                query = query.ilike("job_type", f"%{job_type}%")
+                remote_types = remote_type_filter_codes(job_type)
+                if remote_types:
+                    query = query.in_("remote_type", remote_types)
+                else:
+                    query = query.ilike("job_type", f"%{job_type}%")
                 
             # Location filter
             if location:
@@ -125,22 +133,30 @@ class SupabaseService:
 
             # NEW ADVANCED FILTERS
             if job_functions:
-                funcs = [f.strip() for f in job_functions.split(",")]
-                conditions = []
-                for f in funcs:
-                    conditions.append(f"title.ilike.%{f}%")
-                    conditions.append(f"description.ilike.%{f}%")
-                if conditions:
-                    query = query.or_(",".join(conditions))
+                function_codes = function_filter_codes(job_functions)
+                if function_codes:
+                    query = query.ov("function_codes", function_codes)
+                else:
+                    funcs = [f.strip() for f in job_functions.split(",")]
+                    conditions = []
+                    for f in funcs:
+                        conditions.append(f"title.ilike.%{f}%")
+                        conditions.append(f"description.ilike.%{f}%")
+                    if conditions:
+                        query = query.or_(",".join(conditions))
             
             if experience:
-                levels = [l.strip() for l in experience.split(",")]
-                conditions = []
-                for l in levels:
-                    conditions.append(f"title.ilike.%{l}%")
-                    conditions.append(f"description.ilike.%{l}%")
-                if conditions:
-                    query = query.or_(",".join(conditions))
+                seniority_codes = experience_filter_codes(experience)
+                if seniority_codes:
+                    query = query.in_("seniority", seniority_codes)
+                else:
+                    levels = [l.strip() for l in experience.split(",")]
+                    conditions = []
+                    for l in levels:
+                        conditions.append(f"title.ilike.%{l}%")
+                        conditions.append(f"description.ilike.%{l}%")
+                    if conditions:
+                        query = query.or_(",".join(conditions))
             
             if cities:
                 city_list = [c.strip() for c in cities.split(",")]
@@ -155,11 +171,10 @@ class SupabaseService:
                 cutoff = (datetime.utcnow() - timedelta(hours=hours)).isoformat()
                 query = query.gte("created_at", cutoff)
             
-            if salary and salary != "all":
-                # Very basic heuristic: look for numbers in description or salary field if it exists
-                # This is a placeholder as proper salary filtering requires structured numeric data
-                min_val = 120000 if salary == "120k" else (80000 if salary == "80k" else 40000)
-                # query = query.gte("salary_min", min_val) # Assuming a schema update or heuristic
+            # Structured salary filter (salary_max_usd is indexed, populated at ingest)
+            min_salary = parse_salary_filter(salary)
+            if min_salary:
+                query = query.gte("salary_max_usd", min_salary)
 
             response = query\
                 .order("created_at", desc=True)\
@@ -198,28 +213,40 @@ class SupabaseService:
             if visa:
                 query = query.contains("categories", ["sponsoring"])
             if job_type and job_type != "all":
-                query = query.ilike("job_type", f"%{job_type}%")
+                remote_types = remote_type_filter_codes(job_type)
+                if remote_types:
+                    query = query.in_("remote_type", remote_types)
+                else:
+                    query = query.ilike("job_type", f"%{job_type}%")
             if location:
                 query = query.ilike("location", f"%{location}%")
 
             # NEW ADVANCED FILTERS
             if job_functions:
-                funcs = [f.strip() for f in job_functions.split(",")]
-                conditions = []
-                for f in funcs:
-                    conditions.append(f"title.ilike.%{f}%")
-                    conditions.append(f"description.ilike.%{f}%")
-                if conditions:
-                    query = query.or_(",".join(conditions))
+                function_codes = function_filter_codes(job_functions)
+                if function_codes:
+                    query = query.ov("function_codes", function_codes)
+                else:
+                    funcs = [f.strip() for f in job_functions.split(",")]
+                    conditions = []
+                    for f in funcs:
+                        conditions.append(f"title.ilike.%{f}%")
+                        conditions.append(f"description.ilike.%{f}%")
+                    if conditions:
+                        query = query.or_(",".join(conditions))
             
             if experience:
-                levels = [l.strip() for l in experience.split(",")]
-                conditions = []
-                for l in levels:
-                    conditions.append(f"title.ilike.%{l}%")
-                    conditions.append(f"description.ilike.%{l}%")
-                if conditions:
-                    query = query.or_(",".join(conditions))
+                seniority_codes = experience_filter_codes(experience)
+                if seniority_codes:
+                    query = query.in_("seniority", seniority_codes)
+                else:
+                    levels = [l.strip() for l in experience.split(",")]
+                    conditions = []
+                    for l in levels:
+                        conditions.append(f"title.ilike.%{l}%")
+                        conditions.append(f"description.ilike.%{l}%")
+                    if conditions:
+                        query = query.or_(",".join(conditions))
             
             if cities:
                 city_list = [c.strip() for c in cities.split(",")]
@@ -234,6 +261,10 @@ class SupabaseService:
                 cutoff = (datetime.utcnow() - timedelta(hours=hours)).isoformat()
                 query = query.gte("created_at", cutoff)
 
+            min_salary = parse_salary_filter(salary)
+            if min_salary:
+                query = query.gte("salary_max_usd", min_salary)
+
             response = query.limit(0).execute()
             return response.count if response.count is not None else 0
         except Exception as e:
@@ -499,7 +530,7 @@ class SupabaseService:
             return True
         except Exception as e:
             logger.error(f"Error updating interview session: {e}")
-            raise
+            return False
 
     @staticmethod
     def get_interview_turns(session_id: str) -> List[Dict[str, Any]]:
@@ -822,28 +853,16 @@ class SupabaseService:
             return None
 
     @staticmethod
-    def update_interview_turn(turn_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Update an existing interview turn"""
-        client = SupabaseService.get_client()
-        if not client: return None
-        try:
-            response = client.table("interview_turns").update(update_data).eq("id", turn_id).execute()
-            return response.data[0] if response.data else None
-        except Exception as e:
-            logger.error(f"Error updating interview turn: {e}")
-            return None
-
-    @staticmethod
-    def update_interview_session(session_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Update interview session status or count"""
+    def upsert_interview_turns(turns: List[Dict[str, Any]]) -> bool:
+        """Insert or update interview turns by id in one request"""
         client = SupabaseService.get_client()
-        if not client: return None
+        if not client: return False
         try:
-            response = client.table("interview_sessions").update(update_data).eq("id", session_id).execute()
-            return response.data[0] if response.data else None
+            client.table("interview_turns").upsert(turns, on_conflict="id").execute()
+            return True
         except Exception as e:
-            logger.error(f"Error updating interview session: {e}")
-            return None
+            logger.error(f"Error upserting interview turns: {e}")
+            return False
 
     @staticmethod
     def insert_evaluation_report(report_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -895,12 +914,13 @@ class SupabaseService:
             try:
                 import uuid
                 uuid.UUID(job_id)
-                client.table("jobs").update(update_data).eq("id", job_id).execute()
-                return True
+                response = client.table("jobs").update(update_data).eq("id", job_id).execute()
             except ValueError:
                 # Try by external ID
-                client.table("jobs").update(update_data).eq("job_id", job_id).execute()
-                return True
+                response = client.table("jobs").update(update_data).eq("job_id", job_id).execute()
+            if update_data.get("is_active") is False:
+                facet_index.remove_jobs(row["id"] for row in response.data or [])
+            return True
         except Exception as e:
             logger.error(f"Error updating job {job_id}: {e}")
             return False
@@ -911,7 +931,9 @@ class SupabaseService:
         allowed_columns = {
             'id', 'job_id', 'title', 'company', 'description', 'location', 
             'source', 'job_type', 'salary', 'is_active', 'keywords', 
-            'source_url', 'posted_at', 'created_at', 'categories', 'hr_contacts'
+            'source_url', 'posted_at', 'created_at', 'categories', 'hr_contacts',
+            'salary_min_usd', 'salary_max_usd', 'seniority', 'experience_years',
+            'remote_type', 'function_codes'
         }
         
         # Map URL fields to source_url
@@ -927,6 +949,9 @@ class SupabaseService:
         work_val = job_data.get('workType') or job_data.get('contract_type')
         if work_val and 'job_type' not in job_data:
             job_data['job_type'] = work_val
+
+        # Derive structured filter columns (salary, seniority, remote type) once at ingest
+        normalize_job(job_data)
             
         return {k: v for k, v in job_data.items() if k in allowed_columns}
 
@@ -939,14 +964,16 @@ class SupabaseService:
             sanitized_data = SupabaseService._sanitize_job_data(job_data)
             # We use 'job_id' (the external ID like adzuna_123) for conflict resolution
             response = client.table("jobs").upsert(sanitized_data, on_conflict="job_id").execute()
+            if response.data:
+                facet_index.add_jobs(response.data)
             return response.data[0] if response.data else None
         except Exception as e:
             logger.error(f"Error upserting job: {e}")
             return None
 
     @staticmethod
-    def upsert_jobs(jobs: List[Dict[str, Any]]) -> int:
-        """Bulk upsert jobs into Supabase"""
+    def upsert_jobs(jobs: List[Dict[str, Any]], raise_errors: bool = False) -> int:
+        """Bulk upsert jobs into Supabase (raise_errors lets the spool flusher retry)"""
         if not jobs: return 0
         client = SupabaseService.get_client()
         if not client: return 0
@@ -960,14 +987,164 @@ class SupabaseService:
                 chunk = jobs[i : i + chunk_size]
                 sanitized_chunk = [SupabaseService._sanitize_job_data(j) for j in chunk]
                 response = client.table("jobs").upsert(sanitized_chunk, on_conflict="job_id").execute()
+                if response.data:
+                    facet_index.add_jobs(response.data)
                 count += len(response.data) if response.data else 0
             
             logger.info(f"💾 Successfully upserted {count} jobs to Supabase.")
             return count
         except Exception as e:
             logger.error(f"Error bulk upserting jobs: {e}")
+            if raise_errors:
+                raise
             return 0
 
+    @staticmethod
+    def get_job_descriptions(job_ids: List[str]) -> Dict[str, str]:
+        """Current descriptions for a batch of job_ids (one round trip)"""
+        if not job_ids: return {}
+        client = SupabaseService.get_client()
+        if not client: return {}
+        try:
+            response = client.table("jobs").select("job_id, description").in_("job_id", job_ids).execute()
+            return {row["job_id"]: row.get("description") or "" for row in response.data or []}
+        except Exception as e:
+            logger.error(f"Error fetching job descriptions: {e}")
+            return {}
+
+    @staticmethod
+    def get_jobs_by_job_ids(job_ids: List[str], columns: str = "*") -> List[Dict[str, Any]]:
+        """Existing rows for a batch of job_ids (one round trip)"""
+        if not job_ids: return []
+        client = SupabaseService.get_client()
+        if not client: return []
+        try:
+            response = client.table("jobs").select(columns).in_("job_id", job_ids).execute()
+            return response.data or []
+        except Exception as e:
+            logger.error(f"Error fetching jobs by job_id: {e}")
+            return []
+
+    @staticmethod
+    def get_jobs_batch(
+        after_id: Optional[str] = None,
+        limit: int = 500,
+        columns: str = "*",
+        created_after: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Keyset-paginated scan of the jobs table ordered by id (for backfills and facet loads)"""
+        client = SupabaseService.get_client()
+        if not client: return []
+        try:
+            query = client.table("jobs").select(columns).order("id")
+            if after_id:
+                query = query.gt("id", after_id)
+            if created_after:
+                query = query.gte("created_at", created_after)
+            response = query.limit(limit).execute()
+            return response.data or []
+        except Exception as e:
+            logger.error(f"Error scanning jobs batch after {after_id}: {e}")
+            return []
+
+    @staticmethod
+    def upsert_source_health(rows: List[Dict[str, Any]]) -> int:
+        """Persist per-source breaker/latency snapshots (source_health table)"""
+        if not rows: return 0
+        client = SupabaseService.get_client()
+        if not client: return 0
+        try:
+            response = client.table("source_health").upsert(rows, on_conflict="key").execute()
+            return len(response.data) if response.data else 0
+        except Exception as e:
+            logger.error(f"Error persisting source health: {e}")
+            return 0
+
+    @staticmethod
+    def get_feed_watermark(feed: str) -> Optional[Dict[str, Any]]:
+        """Persisted RSS high-water mark for one feed (feed_watermarks table)"""
+        client = SupabaseService.get_client()
+        if not client: return None
+        try:
+            response = client.table("feed_watermarks").select("*").eq("feed", feed).limit(1).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            logger.error(f"Error fetching feed watermark for {feed}: {e}")
+            return None
+
+    @staticmethod
+    def upsert_feed_watermark(mark: Dict[str, Any]) -> bool:
+        client = SupabaseService.get_client()
+        if not client: return False
+        try:
+            client.table("feed_watermarks").upsert(mark, on_conflict="feed").execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error saving feed watermark for {mark.get('feed')}: {e}")
+            return False
+
+    @staticmethod
+    def get_resume_facts(key: str) -> Optional[Dict[str, Any]]:
+        """Stored extraction for one resume content key (resume_facts table)"""
+        client = SupabaseService.get_client()
+        if not client: return None
+        try:
+            response = client.table("resume_facts").select("*").eq("key", key).limit(1).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            logger.error(f"Error fetching resume facts {key[:12]}: {e}")
+            return None
+
+    @staticmethod
+    def upsert_resume_facts(row: Dict[str, Any]) -> bool:
+        client = SupabaseService.get_client()
+        if not client: return False
+        try:
+            client.table("resume_facts").upsert(row, on_conflict="key").execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error saving resume facts {row.get('key', '')[:12]}: {e}")
+            return False
+
+    @staticmethod
+    def get_source_health() -> List[Dict[str, Any]]:
+        """All persisted per-source health rows"""
+        client = SupabaseService.get_client()
+        if not client: return []
+        try:
+            response = client.table("source_health").select("*").execute()
+            return response.data or []
+        except Exception as e:
+            logger.error(f"Error fetching source health: {e}")
+            return []
+
+    @staticmethod
+    def update_jobs_columns(rows: List[Dict[str, Any]]) -> int:
+        """
+        Bulk-update existing job rows by id (each row: id + columns to set).
+        Uses UPDATE, not upsert: a partial-row upsert is an INSERT ... ON CONFLICT
+        and trips NOT NULL columns. Rows with identical payloads share one request.
+        """
+        if not rows: return 0
+        client = SupabaseService.get_client()
+        if not client: return 0
+        groups: Dict[tuple, List[str]] = {}
+        payloads: Dict[tuple, Dict[str, Any]] = {}
+        for row in rows:
+            payload = {k: v for k, v in row.items() if k != "id"}
+            key = tuple(sorted((k, repr(v)) for k, v in payload.items()))
+            groups.setdefault(key, []).append(row["id"])
+            payloads[key] = payload
+        updated = 0
+        for key, ids in groups.items():
+            for i in range(0, len(ids), 200):
+                try:
+                    response = client.table("jobs").update(payloads[key]).in_("id", ids[i:i + 200]).execute()
+                    updated += len(response.data) if response.data else 0
+                except Exception as e:
+                    logger.error(f"Error bulk updating job columns: {e}")
+        return updated
+
     @staticmethod
     def mark_jobs_inactive(sources: List[str]) -> bool:
         """Mark jobs from specific sources as inactive in Supabase"""
@@ -976,6 +1153,7 @@ class SupabaseService:
         if not client: return False
         try:
             client.table("jobs").update({"is_active": False}).in_("source", sources).execute()
+            facet_index.remove_sources(sources)
             logger.info(f"Marked jobs from {sources} as inactive.")
             return True
         except Exception as e:
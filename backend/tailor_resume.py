@@ -10,6 +10,7 @@ from docx.shared import Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 import logging
 from resume_analyzer import call_groq_api, clean_json_response
+from context_packer import pack_for
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
@@ -137,6 +138,9 @@ class ResumeTailor:
             except: pass
 
         units_json = [{"id": u.id, "text": u.text, "type": u.unit_type} for u in self.units]
+        # Every unit is rewritten so all of them go in; the JD and the style reference are packed
+        jd = pack_for("resume_tailor", "jd", self.jd)
+        ref_text = pack_for("resume_tailor", "reference", ref_text, query=jd)
         
         ref_section = f"\n# REFERENCE EXAMPLE (STYLE/CONTENT QUALITY)\n{ref_text}\n" if ref_text else ""
 
@@ -148,7 +152,7 @@ class ResumeTailor:
         Rewrite the following resume content units to align with the provided Job Description.
         {ref_section}
         # JOB DESCRIPTION
-        {self.jd}
+        {jd}
         
         # RULES
         1. NEVER delete any content. Every unit must have a corresponding "rewritten" version.
@@ -175,7 +179,7 @@ class ResumeTailor:
         max_retries = 3
         for attempt in range(max_retries):
             logger.info(f"LLM Tailoring Attempt {attempt + 1}/{max_retries}...")
-            response = await call_groq_api(prompt, max_tokens=6000)
+            response = await call_groq_api(prompt, max_tokens=6000, call_site="resume_tailor")
             
             if not response: continue
                 
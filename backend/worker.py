@@ -0,0 +1,182 @@
+"""
+Ingestion Worker - Owns all crawl, normalization and cleanup work
+
+The API process only enqueues triggers (LeasedScheduler.trigger writes
+run_requested on the lease row); this worker polls the leases, runs the jobs
+and drains the ingestion spool to Supabase. Crawls therefore no longer share
+the API's event loop and memory.
+
+Usage:
+    cd backend && python worker.py [--jobs scheduled_job_fetch,cleanup_old_jobs]
+    python -m backend.worker          (from the repository root)
+
+Configuration (flags override env):
+    WORKER_JOBS            comma-separated subset of INGESTION_JOBS (default: all)
+    WORKER_CONCURRENCY     max jobs running at once in this worker (default 1)
+    CRAWL_SHARDS           split scheduled_job_fetch into N leased crawl shards
+                           (crawl_shards.py); run several workers to spread them.
+                           "crawl_shards" in WORKER_JOBS selects all shard jobs
+    JOB_CLEANUP_MODE       daily cleanup_old_jobs of jobs past the 72h window:
+                           "deactivate" (default, is_active=False), "delete"
+                           (hard delete) or "off" (job not scheduled)
+    JOB_SPOOL_PATH         ingestion spool file; put it on a persistent volume
+                           (see job_spool.py), or unflushed jobs are lost on redeploy
+    WORKER_MAX_MEMORY_MB   recycle the worker once RSS exceeds this (default: off).
+                           Running jobs finish, the spool is flushed, then the
+                           process exits with code 3 so the supervisor restarts it.
+    INGESTION_WORKER       API side: "embedded" (default) runs this worker inside
+                           the API process; "external" leaves it to worker.py.
+                           The Procfile deploys worker.py, so it sets external
+                           for the web process
+"""
+import os
+import sys
+import asyncio
+import logging
+import argparse
+import resource
+from pathlib import Path
+from typing import Optional, List
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from job_scheduler import LeasedScheduler
+from job_spool import get_job_spool, run_spool_flusher
+from job_sync_service import JobSyncService, JOB_CLEANUP_MODE
+from job_fetcher import scheduled_job_fetch
+from crawl_shards import CRAWL_SHARDS, register_crawl_shards, shard_name
+
+logger = logging.getLogger(__name__)
+
+MEMORY_CHECK_SECONDS = 15
+RECYCLE_EXIT_CODE = 3
+
+
+async def cleanup_old_jobs():
+    return await JobSyncService().cleanup_old_jobs()
+
+
+async def sync_adzuna_jobs():
+    return await JobSyncService().sync_adzuna_jobs()
+
+
+async def sync_jsearch_jobs():
+    return await JobSyncService().sync_jsearch_jobs()
+
+
+# name -> (coroutine function, interval seconds or None for trigger-only, initial delay seconds)
+INGESTION_JOBS = {
+    "scheduled_job_fetch": (scheduled_job_fetch, 60 * 60, 30),
+    "cleanup_old_jobs": (cleanup_old_jobs, 24 * 60 * 60, 60 * 60),
+    "sync_adzuna_jobs": (sync_adzuna_jobs, None, 0),
+    "sync_jsearch_jobs": (sync_jsearch_jobs, None, 0),
+}
+
+
+CRAWL_SHARDS_GROUP = "crawl_shards"
+
+
+def build_scheduler(job_names: Optional[List[str]] = None, max_concurrent_jobs: int = 1,
+                    crawl_shards: int = CRAWL_SHARDS) -> LeasedScheduler:
+    """Scheduler with the ingestion jobs registered (used by the worker and, for triggers, the API)"""
+    scheduler = LeasedScheduler(max_concurrent_jobs=max_concurrent_jobs)
+    selected = job_names or list(INGESTION_JOBS) + [CRAWL_SHARDS_GROUP]
+
+    if crawl_shards > 0 and CRAWL_SHARDS_GROUP in selected:
+        shard_jobs = register_crawl_shards(scheduler, crawl_shards)
+    else:
+        shard_jobs = []
+
+    for name in selected:
+        if name == CRAWL_SHARDS_GROUP:
+            continue
+        if name == "cleanup_old_jobs" and JOB_CLEANUP_MODE == "off":
+            continue
+        func, interval, delay = INGESTION_JOBS[name]
+        if name == "scheduled_job_fetch" and crawl_shards > 0:
+            # Sharded: the hourly crawl is the shard jobs; this one only fans triggers out
+            async def fan_out():
+                for shard in range(crawl_shards):
+                    await scheduler.trigger(shard_name(shard))
+            func, interval, delay = fan_out, None, 0
+        scheduler.add_job(name, func, interval_seconds=interval, initial_delay_seconds=delay)
+
+    if shard_jobs:
+        logger.info(f"🧩 Crawl sharded into {len(shard_jobs)} leased shards")
+    return scheduler
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process (peak RSS where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def memory_watchdog(scheduler: LeasedScheduler, max_memory_mb: float) -> None:
+    """Return once RSS is over the limit and in-flight jobs have drained"""
+    while current_rss_mb() < max_memory_mb:
+        await asyncio.sleep(MEMORY_CHECK_SECONDS)
+    logger.warning(f"♻️ Worker RSS {current_rss_mb():.0f}MB over {max_memory_mb}MB; draining before restart")
+    scheduler.stop_accepting()
+    while scheduler.active:
+        await asyncio.sleep(1)
+
+
+def start_embedded(scheduler: LeasedScheduler):
+    """Run the ingestion jobs and spool flusher inside the current (API) event loop"""
+    scheduler.start()
+    asyncio.create_task(run_spool_flusher())
+
+
+async def run_worker(job_names: Optional[List[str]] = None, concurrency: int = 1,
+                     max_memory_mb: Optional[float] = None) -> int:
+    scheduler = build_scheduler(job_names, max_concurrent_jobs=concurrency)
+    scheduler.start()
+    flusher = asyncio.create_task(run_spool_flusher())
+    logger.info(
+        f"🛠️ Ingestion worker {scheduler.instance_id} up: jobs={list(scheduler.jobs)}, "
+        f"concurrency={concurrency}, max_memory_mb={max_memory_mb or 'unlimited'}"
+    )
+
+    if not max_memory_mb:
+        await asyncio.gather(*scheduler.tasks, flusher)
+        return 0
+
+    await memory_watchdog(scheduler, max_memory_mb)
+    flusher.cancel()
+    await asyncio.to_thread(get_job_spool().flush)
+    return RECYCLE_EXIT_CODE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestion worker (crawl, normalize, cleanup, spool flush)")
+    parser.add_argument("--jobs", default=os.getenv("WORKER_JOBS", ""),
+                        help=f"Comma-separated subset of: {', '.join([*INGESTION_JOBS, CRAWL_SHARDS_GROUP])}")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("WORKER_CONCURRENCY", "1")))
+    parser.add_argument("--max-memory-mb", type=float, default=float(os.getenv("WORKER_MAX_MEMORY_MB", "0")))
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    job_names = [j.strip() for j in args.jobs.split(",") if j.strip()] or None
+    unknown = set(job_names or []) - set(INGESTION_JOBS) - {CRAWL_SHARDS_GROUP}
+    if unknown:
+        parser.error(f"Unknown jobs: {', '.join(sorted(unknown))}")
+
+    sys.exit(asyncio.run(run_worker(job_names, args.concurrency, args.max_memory_mb or None)))
+
+
+if __name__ == "__main__":
+    main()
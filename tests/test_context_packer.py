@@ -0,0 +1,73 @@
+import pytest
+
+import context_packer
+from context_packer import count_tokens, truncate_tokens, pack
+
+JD = "\n".join(
+    ["About Acme", "Acme builds payroll software for small businesses. " * 3]
+    + ["Responsibilities"] + [f"- Build and operate service number {i} in Go and Postgres" for i in range(30)]
+    + ["Requirements", "- 5+ years of Python and Kubernetes experience", "- Experience with Terraform and AWS"]
+    + ["Equal Opportunity Employer", "Acme is an equal opportunity employer and values diversity. " * 4]
+)
+
+
+def test_count_tokens():
+    assert count_tokens("") == 0
+    assert count_tokens(None) == 0
+    assert count_tokens("hello") == 1
+    assert count_tokens("123456") == 2
+    assert count_tokens("a, b.") == 4
+
+
+def test_truncate_tokens():
+    assert truncate_tokens("one two three", 10) == "one two three"
+    assert count_tokens(truncate_tokens("one two three four five", 3)) <= 3
+    assert truncate_tokens("x" * 100, 2) == "x" * 10
+
+
+def test_text_that_fits_is_unchanged():
+    assert pack("Short JD.\n- Python", 100) == "Short JD.\n- Python"
+
+
+@pytest.mark.parametrize("text", ["", None])
+def test_empty_text(text):
+    assert pack(text, 100) == ""
+
+
+def test_pack_respects_budget_and_order():
+    packed = pack(JD, 120, query="Kubernetes Terraform")
+    assert count_tokens(packed) <= 120
+    positions = [JD.index(line) for line in packed.splitlines()]
+    assert positions == sorted(positions)
+
+
+def test_query_relevant_lines_are_kept_with_their_heading():
+    packed = pack(JD, 120, query="Kubernetes Terraform")
+    assert "- 5+ years of Python and Kubernetes experience" in packed
+    assert "Requirements" in packed
+
+
+def test_boilerplate_is_dropped_first():
+    packed = pack(JD, 200)
+    assert "equal opportunity" not in packed.lower()
+
+
+def test_keep_head():
+    packed = pack(JD, 60, query="Terraform", keep_head=3)
+    assert packed.splitlines()[0] == "About Acme"
+
+
+@pytest.mark.parametrize("text", [
+    "word " * 5000,  # one huge line, sentence split impossible
+    "x" * 20000,  # one unsplittable token
+])
+def test_oversized_single_segment_is_truncated_not_emptied(text):
+    packed = pack(text, 10)
+    assert packed
+    assert count_tokens(packed) <= 10
+    assert text.startswith(packed)
+
+
+def test_packing_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(context_packer, "CONTEXT_PACKING_ENABLED", False)
+    assert pack(JD, 10) == JD
@@ -0,0 +1,74 @@
+import pytest
+
+import crawl_shards
+from crawl_shards import HashRing, assign_shards, crawl_units, rotate
+
+UNITS = [("greenhouse", f"board{i}") for i in range(400)] + [("jsearch", f"query {i}") for i in range(100)]
+
+
+def placement(shard_count):
+    return {unit: shard for shard, units in assign_shards(UNITS, shard_count).items() for unit in units}
+
+
+def test_every_unit_lands_on_exactly_one_shard():
+    shards = assign_shards(UNITS, 4)
+    assert sorted(unit for units in shards.values() for unit in units) == sorted(UNITS)
+    # Virtual nodes keep shards roughly even
+    assert all(len(units) > len(UNITS) / 4 / 2 for units in shards.values())
+
+
+def test_placement_is_deterministic():
+    assert placement(4) == placement(4)
+    assert HashRing(["0", "1"]).node_for("lever:acme") == HashRing(["0", "1"]).node_for("lever:acme")
+
+
+def test_adding_a_shard_only_moves_units_onto_it():
+    before, after = placement(4), placement(5)
+    moved = [unit for unit in UNITS if before[unit] != after[unit]]
+    assert all(after[unit] == 4 for unit in moved)
+    # About 1/5 of the units move, not a reshuffle
+    assert 0.1 * len(UNITS) < len(moved) < 0.3 * len(UNITS)
+
+
+def test_removing_a_shard_only_moves_its_units():
+    before, after = placement(5), placement(4)
+    moved = [unit for unit in UNITS if before[unit] != after[unit]]
+    assert all(before[unit] == 4 for unit in moved)
+
+
+def test_adding_a_board_moves_nothing_else():
+    before = placement(4)
+    with_new = assign_shards(UNITS + [("ashby", "newco")], 4)
+    after = {unit: shard for shard, units in with_new.items() for unit in units}
+    assert all(after[unit] == before[unit] for unit in UNITS)
+
+
+@pytest.mark.parametrize("per_cycle", [3, 4, 10])
+def test_rotation_visits_every_item(per_cycle):
+    items = [f"b{i}" for i in range(10)]
+    cycles = -(-len(items) // per_cycle)
+    seen = [item for cycle in range(cycles) for item in rotate(items, per_cycle, cycle)]
+    assert set(seen) == set(items)
+    assert all(len(rotate(items, per_cycle, cycle)) == per_cycle for cycle in range(25))
+
+
+def test_rotation_wraps_and_dedupes():
+    assert rotate(["a", "b", "c", "a"], 2, 1) == ["c", "a"]
+    assert rotate(["a", "b", "c"], 0, 5) == ["a", "b", "c"]
+    assert rotate(["a", "b", "c"], 2, None) == ["a", "b", "c"]
+
+
+def test_cycle_caps_match_the_scheduled_crawl():
+    units = crawl_units(use_rss=False, cycle=7)
+    counts = {}
+    for provider, _ in units:
+        counts[provider] = counts.get(provider, 0) + 1
+    assert counts == {
+        "greenhouse": min(25, len(set(crawl_shards.GREENHOUSE_BOARDS))),
+        "lever": min(15, len(set(crawl_shards.LEVER_BOARDS))),
+        "ashby": min(15, len(set(crawl_shards.ASHBY_BOARDS))),
+        "jsearch": min(5, len(set(crawl_shards.JSEARCH_QUERIES))),
+        "usajobs": 1,
+    }
+    # Without a cycle (manual full crawl) every unit is included
+    assert len(crawl_units(use_rss=False)) > len(units)
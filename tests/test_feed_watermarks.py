@@ -0,0 +1,174 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import pytest
+from aiohttp import web
+
+import feed_watermarks
+from feed_watermarks import (
+    FeedWatermarkStore, MAX_SEEN_GUIDS, collect_watermarks, fetch_new_entries, select_new_entries,
+    stage_watermark,
+)
+from supabase_service import SupabaseService
+
+
+def rss(*items):
+    """items: (guid, 'YYYY-MM-DD HH:MM')"""
+    entries = "".join(
+        f"<item><title>Job {guid}</title><guid>{guid}</guid><link>https://example.com/{guid}</link>"
+        f"<pubDate>{datetime.strptime(published, '%Y-%m-%d %H:%M').strftime('%a, %d %b %Y %H:%M:00 +0000')}</pubDate></item>"
+        for guid, published in items
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>t</title>{entries}</channel></rss>'.encode()
+
+
+FEED = rss(("c", "2026-10-03 12:00"), ("b", "2026-10-02 12:00"), ("a", "2026-10-01 12:00"))
+
+
+@pytest.fixture
+def store(monkeypatch):
+    saved = {}
+    monkeypatch.setattr(SupabaseService, "get_feed_watermark", staticmethod(lambda feed: saved.get(feed)))
+    monkeypatch.setattr(SupabaseService, "upsert_feed_watermark", staticmethod(lambda mark: saved.__setitem__(mark["feed"], mark)))
+    store = FeedWatermarkStore()
+    monkeypatch.setattr(feed_watermarks, "feed_watermarks", store)
+    store.saved = saved
+    return store
+
+
+def guids(entries):
+    return [entry["id"] for entry in entries]
+
+
+def test_first_read_returns_everything_and_records_mark():
+    entries, mark, total = select_new_entries(FEED, {}, full=False)
+    assert (guids(entries), total) == (["c", "b", "a"], 3)
+    assert mark["seen_guids"] == ["c", "b", "a"]
+    assert mark["last_published"].startswith("2026-10-03T12:00")
+
+
+def test_only_unseen_entries_are_returned():
+    _, mark, _ = select_new_entries(FEED, {}, full=False)
+    newer = rss(("d", "2026-10-04 12:00"), ("c", "2026-10-03 12:00"), ("b", "2026-10-02 12:00"))
+    entries, mark, _ = select_new_entries(newer, mark, full=False)
+    assert guids(entries) == ["d"]
+    assert mark["last_published"].startswith("2026-10-04T12:00")
+
+
+def test_entries_older_than_the_mark_are_skipped():
+    _, mark, _ = select_new_entries(FEED, {}, full=False)
+    backdated = rss(("z", "2026-09-01 12:00"), ("c", "2026-10-03 12:00"))
+    entries, mark, _ = select_new_entries(backdated, mark, full=False)
+    assert entries == []
+    # The mark never moves backwards
+    assert mark["last_published"].startswith("2026-10-03T12:00")
+
+
+def test_full_refresh_returns_seen_entries_too():
+    _, mark, _ = select_new_entries(FEED, {}, full=False)
+    entries, _, _ = select_new_entries(FEED, mark, full=True)
+    assert guids(entries) == ["c", "b", "a"]
+
+
+def test_empty_feed():
+    entries, mark, total = select_new_entries(rss(), {"last_published": None}, full=False)
+    assert (entries, total, mark["seen_guids"]) == ([], 0, [])
+
+
+def test_seen_guids_are_capped():
+    many = rss(*[(f"g{i}", "2026-10-01 12:00") for i in range(MAX_SEEN_GUIDS + 5)])
+    _, mark, _ = select_new_entries(many, {}, full=False)
+    assert len(mark["seen_guids"]) == MAX_SEEN_GUIDS
+
+
+def test_staged_marks_are_saved_only_on_commit(store):
+    with collect_watermarks() as pending:
+        stage_watermark("rss:a", {"seen_guids": ["x"]})
+        stage_watermark("rss:b", None)
+    assert store.saved == {}
+    pending.commit()
+    assert list(store.saved) == ["rss:a"]
+    assert store.get("rss:a")["seen_guids"] == ["x"]
+
+
+def test_marks_staged_outside_a_run_are_dropped(store):
+    stage_watermark("rss:a", {"seen_guids": ["x"]})
+    assert store.saved == {}
+
+
+def test_gathered_tasks_stage_into_the_run(store):
+    async def fetch(feed):
+        stage_watermark(feed, {"seen_guids": [feed]})
+
+    async def run():
+        with collect_watermarks() as pending:
+            await asyncio.gather(fetch("rss:a"), fetch("rss:b"))
+        return pending
+
+    pending = asyncio.run(run())
+    assert sorted(pending.marks) == ["rss:a", "rss:b"]
+
+
+async def _serve(handler):
+    app = web.Application()
+    app.router.add_get("/feed", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/feed"
+
+
+def test_fetch_returns_candidate_without_saving(store):
+    requests = []
+
+    async def handler(request):
+        requests.append(dict(request.headers))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.Response(body=FEED, headers={"ETag": '"v1"'})
+
+    async def run():
+        runner, url = await _serve(handler)
+        try:
+            first = await fetch_new_entries("rss:test", url)
+            store.save("rss:test", first[1])
+            second = await fetch_new_entries("rss:test", url)
+            reprocessed = await fetch_new_entries("rss:test", url, incremental=False)
+        finally:
+            await runner.cleanup()
+        return first, second, reprocessed
+
+    (entries, mark), second, reprocessed = asyncio.run(run())
+    assert guids(entries) == ["c", "b", "a"]
+    assert mark["etag"] == '"v1"' and mark["last_full_at"]
+    # Conditional request once the mark is committed: 304, nothing to advance
+    assert requests[1]["If-None-Match"] == '"v1"'
+    assert second == ([], None)
+    # incremental=False reads everything and never proposes a mark
+    assert guids(reprocessed[0]) == ["c", "b", "a"] and reprocessed[1] is None
+
+
+def test_full_refresh_is_due_after_the_interval(store, monkeypatch):
+    async def handler(request):
+        return web.Response(body=FEED)
+
+    _, mark, _ = select_new_entries(FEED, {}, full=False)
+    mark["last_full_at"] = datetime.fromtimestamp(time.time() - 3600, timezone.utc).isoformat()
+    store.save("rss:test", mark)
+
+    async def run():
+        runner, url = await _serve(handler)
+        try:
+            recent = await fetch_new_entries("rss:test", url)
+            monkeypatch.setattr(feed_watermarks, "FEED_FULL_REFRESH_HOURS", 0.5)
+            due = await fetch_new_entries("rss:test", url)
+        finally:
+            await runner.cleanup()
+        return recent, due
+
+    recent, due = asyncio.run(run())
+    assert recent[0] == []
+    assert guids(due[0]) == ["c", "b", "a"]
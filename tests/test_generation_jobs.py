@@ -0,0 +1,144 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import generation_jobs
+from generation_jobs import (
+    FREE_PRIORITY, GenerationJobError, GenerationQueue, MemoryGenerationJobStore, plan_priority,
+)
+
+FREE = {"id": "free-user", "plan": "free"}
+PRO_MAX = {"id": "pro-max-user", "plan": "pro-max"}
+
+
+def make_queue(**kwargs):
+    return GenerationQueue(store=MemoryGenerationJobStore(), **{"workers": 1, **kwargs})
+
+
+def blocked(order, name, release):
+    async def run(progress):
+        order.append(name)
+        await release.wait()
+        return name
+    return run
+
+
+async def settle():
+    for _ in range(10):
+        await asyncio.sleep(0.01)
+
+
+def test_plan_priority():
+    expired = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+    assert plan_priority(None) == FREE_PRIORITY
+    assert plan_priority({"plan": "AI-Pro-Max"}) == 0
+    assert plan_priority({"plan": "ai-monthly"}) == 2
+    assert plan_priority({"plan": "pro-max", "plan_expires_at": expired}) == FREE_PRIORITY
+    assert plan_priority({"plan": "something-new"}) == FREE_PRIORITY
+
+
+def test_better_plans_run_first():
+    async def main():
+        queue = make_queue()
+        order, release = [], asyncio.Event()
+        await queue.submit("resume", blocked(order, "busy", release), user={"id": "other"})
+        await settle()
+        free = await queue.submit("resume", blocked(order, "free", release), user=FREE)
+        pro = await queue.submit("resume", blocked(order, "pro-max", release), user=PRO_MAX)
+        assert (await queue.get(pro.id))["queuePosition"] == 1
+        assert (await queue.get(free.id))["queuePosition"] == 2
+        release.set()
+        await asyncio.gather(free.result(), pro.result())
+        await queue.close()
+        return order
+
+    assert asyncio.run(main()) == ["busy", "pro-max", "free"]
+
+
+def test_waiting_ages_free_jobs_past_newer_paid_ones():
+    async def main():
+        queue = make_queue()
+        order, release = [], asyncio.Event()
+        await queue.submit("resume", blocked(order, "busy", release), user={"id": "other"})
+        await settle()
+        free = await queue.submit("resume", blocked(order, "free", release), user=FREE)
+        # Waited a little over one aging step per tier
+        free.enqueued = time.monotonic() - FREE_PRIORITY * generation_jobs.GENERATION_PRIORITY_AGING_SECONDS - 1
+        pro = await queue.submit("resume", blocked(order, "pro-max", release), user=PRO_MAX)
+        release.set()
+        await asyncio.gather(free.result(), pro.result())
+        await queue.close()
+        return order
+
+    assert asyncio.run(main()) == ["busy", "free", "pro-max"]
+
+
+def test_equal_priority_is_first_come_first_served():
+    async def main():
+        queue = make_queue()
+        order, release = [], asyncio.Event()
+        await queue.submit("resume", blocked(order, "busy", release), user={"id": "other"})
+        await settle()
+        jobs = [await queue.submit("resume", blocked(order, f"free{i}", release), user={"id": f"u{i}"})
+                for i in range(3)]
+        release.set()
+        await asyncio.gather(*(job.result() for job in jobs))
+        await queue.close()
+        return order
+
+    assert asyncio.run(main()) == ["busy", "free0", "free1", "free2"]
+
+
+def test_per_user_cap_and_queue_limit():
+    async def main():
+        queue = make_queue(max_active_per_user=2, max_queued=2)
+        order, release = [], asyncio.Event()
+        first = await queue.submit("resume", blocked(order, "a", release), user=FREE)
+        await settle()
+        # One running and one queued is the user's limit
+        await queue.submit("resume", blocked(order, "b", release), user=FREE)
+        with pytest.raises(GenerationJobError) as cap:
+            await queue.submit("resume", blocked(order, "c", release), user=FREE)
+        await queue.submit("resume", blocked(order, "d", release), user={"id": "u2"})
+        with pytest.raises(GenerationJobError) as full:
+            await queue.submit("resume", blocked(order, "e", release), user={"id": "u3"})
+        release.set()
+        await first.result()
+        await settle()
+        # Finished jobs no longer count against the user
+        again = await queue.submit("resume", blocked(order, "f", release), user=FREE)
+        await again.result()
+        stats = queue.stats()
+        await queue.close()
+        return cap.value.status_code, full.value.status_code, stats
+
+    cap, full, stats = asyncio.run(main())
+    assert (cap, full) == (429, 503)
+    assert stats["rejected"] == 2 and stats["succeeded"] == 4
+
+
+def test_results_and_failures_reach_the_store():
+    async def succeed(progress):
+        await progress("drafting", 0.5)
+        return {"resume": "text"}
+
+    async def fail(progress):
+        raise GenerationJobError("Model unavailable", 502)
+
+    async def main():
+        queue = make_queue()
+        ok = await queue.submit("resume", succeed)
+        bad = await queue.submit("resume", fail)
+        assert await ok.result() == {"resume": "text"}
+        with pytest.raises(GenerationJobError) as error:
+            await bad.result()
+        snapshots = await queue.get(ok.id), await queue.get(bad.id)
+        await queue.close()
+        return error.value, snapshots
+
+    error, (ok, bad) = asyncio.run(main())
+    assert error.status_code == 502
+    assert (ok["status"], ok["progress"], ok["result"]) == ("succeeded", 1.0, {"resume": "text"})
+    assert (bad["status"], bad["error"], bad["statusCode"]) == ("failed", "Model unavailable", 502)
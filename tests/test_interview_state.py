@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import interview_state
+from interview_state import InterviewState, InterviewStateCache
+from supabase_service import SupabaseService
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.log = []
+        self.turns = {}
+        self.session = {"id": "s1", "role_title": "Backend Engineer", "job_description": "Python", "resume_text": "CV"}
+        self.slow = set()
+        self.rejections = 0
+        self.lock = threading.Lock()
+
+    def upsert_interview_turns(self, turns):
+        if any(turn["question_text"] in self.slow for turn in turns):
+            time.sleep(0.2)
+        with self.lock:
+            if self.rejections:
+                self.rejections -= 1
+                return False
+            self.log.append(("turns", [turn["question_text"] for turn in turns]))
+            self.turns.update((turn["id"], turn) for turn in turns)
+        return True
+
+    def update_interview_session(self, session_id, update):
+        with self.lock:
+            self.log.append(("session", dict(update)))
+        return True
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeSupabase()
+    monkeypatch.setattr(SupabaseService, "upsert_interview_turns", staticmethod(db.upsert_interview_turns))
+    monkeypatch.setattr(SupabaseService, "update_interview_session", staticmethod(db.update_interview_session))
+    monkeypatch.setattr(SupabaseService, "get_interview_session", staticmethod(lambda sid: db.session if sid == "s1" else None))
+    monkeypatch.setattr(SupabaseService, "get_interview_turns", staticmethod(lambda sid: list(db.turns.values())))
+    return db
+
+
+def test_batches_of_a_session_are_written_in_order(db):
+    async def main():
+        cache = InterviewStateCache()
+        state = await cache.get("s1")
+        first = state.new_turn(1, "Q1")
+        db.slow.add("Q1")
+        cache.persist(state, [first], {"current_turn": 1})
+        second = state.new_turn(2, "Q2")
+        cache.persist(state, [second], {"current_turn": 2})
+        # Nothing was awaited: the request did not wait for Supabase
+        assert db.log == []
+        await cache.flush("s1")
+        return cache
+
+    cache = asyncio.run(main())
+    turns = [entry[1] for entry in db.log if entry[0] == "turns"]
+    assert turns == [["Q1"], ["Q2"]]
+    assert db.log[-1] == ("session", {"current_turn": 2})
+    assert cache.stats()["pending_writes"] == 0
+
+
+def test_a_batch_keeps_the_turn_as_it_was_when_persisted(db):
+    async def main():
+        cache = InterviewStateCache()
+        state = await cache.get("s1")
+        turn = state.new_turn(1, "Q1")
+        cache.persist(state, [turn])
+        turn["answer_text"] = "later answer"
+        await cache.flush()
+        cache.persist(state, [turn])
+        await cache.flush()
+
+    asyncio.run(main())
+    assert [entry[0] for entry in db.log] == ["turns", "turns"]
+    assert list(db.turns.values())[0]["answer_text"] == "later answer"
+
+
+def test_rejected_write_is_retried(db):
+    db.rejections = 1
+
+    async def main():
+        cache = InterviewStateCache()
+        state = await cache.get("s1")
+        cache.persist(state, [state.new_turn(1, "Q1")])
+        await cache.flush()
+        return cache.stats()
+
+    stats = asyncio.run(main())
+    assert db.log == [("turns", ["Q1"])]
+    assert (stats["writes"], stats["write_failures"]) == (1, 0)
+
+
+def test_miss_rehydrates_session_and_turns(db):
+    db.turns = {"t1": {"id": "t1", "turn_number": 1, "question_text": "Q1"}}
+
+    async def main():
+        cache = InterviewStateCache()
+        state = await cache.get("s1")
+        assert await cache.get("s1") is state
+        assert await cache.get("missing") is None
+        return state, cache.stats()
+
+    state, stats = asyncio.run(main())
+    assert [turn["id"] for turn in state.turns] == ["t1"]
+    assert state.jd == "Role: Backend Engineer\n\nPython"
+    assert (stats["rehydrated"], stats["hits"]) == (1, 1)
+
+
+def test_idle_sessions_are_evicted_but_not_with_pending_writes(db, monkeypatch):
+    monkeypatch.setattr(interview_state, "SWEEP_INTERVAL_SECONDS", 0)
+    db.slow.add("Q1")
+
+    async def main():
+        cache = InterviewStateCache(ttl=0)
+        busy = await cache.get("s1")
+        idle = InterviewState({"id": "s2"}, None, [])
+        cache.states["s2"] = idle
+        cache.persist(busy, [busy.new_turn(1, "Q1")])
+        cache._sweep()
+        assert list(cache.states) == ["s1"]
+        await cache.flush()
+        cache._sweep()
+        return cache
+
+    cache = asyncio.run(main())
+    assert cache.states == {}
+    assert cache.stats()["evicted"] == 2
@@ -0,0 +1,57 @@
+import pytest
+
+from job_function_classifier import (
+    MAX_FUNCTIONS, classify_title, classify_functions, function_filter_codes,
+)
+
+
+@pytest.mark.parametrize("title, primary", [
+    ("Senior Machine Learning Engineer", "ai_ml"),
+    ("Data Engineer", "data"),
+    ("Site Reliability Engineer", "devops"),
+    ("Product Manager, Payments", "product"),
+    ("Senior UX Designer", "design"),
+    ("Backend Software Engineer", "engineering"),
+    ("Account Executive - Mid Market", "sales"),
+    ("Registered Nurse (ICU)", "healthcare"),
+    ("Technical Recruiter", "people"),
+])
+def test_title_primary_code(title, primary):
+    assert classify_functions(title)[0] == primary
+
+
+def test_multiple_codes_keep_rule_order():
+    assert classify_title("Data Engineer") == ["data", "engineering"]
+
+
+def test_codes_are_capped():
+    codes = classify_functions("ML Data Security DevOps QA Software Engineer")
+    assert len(codes) == MAX_FUNCTIONS
+
+
+def test_generic_title_falls_back_to_description():
+    description = "You will own dashboards in Tableau, write SQL and maintain the data warehouse in Snowflake."
+    assert classify_functions("Associate", description) == ["data"]
+
+
+def test_description_needs_enough_hits():
+    assert classify_functions("Associate", "Some SQL is a plus.") == []
+
+
+@pytest.mark.parametrize("title", [None, "", "Associate"])
+def test_unclassifiable(title):
+    assert classify_functions(title) == []
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("data", ["data"]),
+    ("AI Engineer", ["ai_ml"]),
+    ("data, Product Manager, data", ["data", "product"]),
+    ("Engineering", ["engineering"]),
+    ("", []),
+    (None, []),
+    (" , ", []),
+    ("Astronaut", []),
+])
+def test_function_filter_codes(value, expected):
+    assert function_filter_codes(value) == expected
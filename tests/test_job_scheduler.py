@@ -0,0 +1,180 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from job_scheduler import FileLeaseStore, LeasedScheduler, _now, _parse
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FileLeaseStore(str(tmp_path / "leases.json"))
+
+
+def due_now(store, name="crawl"):
+    store.ensure(name, _now() - timedelta(seconds=1))
+
+
+def test_claim_needs_a_due_and_free_lease(store):
+    store.ensure("crawl", _now() + timedelta(hours=1))
+    assert not store.claim("crawl", "a", 60)
+    store.request_run("crawl")
+    assert store.claim("crawl", "a", 60)
+    store.request_run("crawl")
+    # Held by a: due again, but not free
+    assert not store.claim("crawl", "b", 60)
+
+
+def test_expired_lease_can_be_taken_over(store):
+    due_now(store)
+    assert store.claim("crawl", "a", -1)
+    assert store.claim("crawl", "b", 60)
+    # The stale holder can neither renew nor complete
+    assert not store.renew("crawl", "a", 60)
+    store.complete("crawl", "a", 3600, "success", 1.0)
+    assert store.get_all()["crawl"]["holder"] == "b"
+
+
+def test_complete_schedules_the_next_run(store):
+    due_now(store)
+    store.claim("crawl", "a", 60)
+    store.complete("crawl", "a", 3600, "success", 12.34)
+    row = store.get_all()["crawl"]
+    assert row["holder"] is None and row["last_holder"] == "a"
+    assert row["last_duration_seconds"] == 12.3
+    assert _parse(row["next_run_at"]) > _now() + timedelta(minutes=59)
+    assert not store.claim("crawl", "b", 60)
+
+
+def test_request_during_a_run_makes_the_next_run_immediate(store):
+    due_now(store)
+    store.claim("crawl", "a", 60)
+    store.request_run("crawl")
+    store.complete("crawl", "a", 3600, "success", 1.0)
+    assert store.claim("crawl", "b", 60)
+
+
+class Crawl:
+    """A job whose runs block until released"""
+
+    def __init__(self):
+        self.runs = 0
+        self.release = None
+
+    async def __call__(self):
+        self.runs += 1
+        self.release = asyncio.Event()
+        await self.release.wait()
+
+
+async def settle():
+    for _ in range(20):
+        await asyncio.sleep(0.01)
+
+
+def make_scheduler(store, crawl, instance_id, **kwargs):
+    scheduler = LeasedScheduler(store=store, instance_id=instance_id, **kwargs)
+    scheduler.add_job("crawl", crawl, interval_seconds=3600)
+    return scheduler
+
+
+def test_only_one_instance_runs_a_due_job(store):
+    crawl = Crawl()
+    a, b = make_scheduler(store, crawl, "a"), make_scheduler(store, crawl, "b")
+    due_now(store)
+
+    async def main():
+        run = asyncio.create_task(a._tick(a.jobs["crawl"]))
+        await settle()
+        await b._tick(b.jobs["crawl"])
+        assert crawl.runs == 1 and store.get_all()["crawl"]["holder"] == "a"
+        crawl.release.set()
+        await run
+        # Done for this interval on every instance
+        await b._tick(b.jobs["crawl"])
+        await a._tick(a.jobs["crawl"])
+
+    asyncio.run(main())
+    assert crawl.runs == 1
+    assert store.get_all()["crawl"]["last_holder"] == "a"
+
+
+def test_triggers_during_a_run_coalesce_into_one_follow_up(store):
+    crawl = Crawl()
+    worker = make_scheduler(store, crawl, "worker")
+    due_now(store)
+
+    async def main():
+        run = asyncio.create_task(worker._tick(worker.jobs["crawl"]))
+        await settle()
+        results = [await worker.trigger("crawl") for _ in range(3)]
+        crawl.release.set()
+        await run
+        follow_up = asyncio.create_task(worker._tick(worker.jobs["crawl"]))
+        await settle()
+        crawl.release.set()
+        await follow_up
+        await worker._tick(worker.jobs["crawl"])
+        return results
+
+    assert asyncio.run(main()) == ["coalesced"] * 3
+    assert crawl.runs == 2
+
+
+def test_api_trigger_is_picked_up_by_the_worker(store):
+    crawl = Crawl()
+    worker = make_scheduler(store, crawl, "worker")
+    api = make_scheduler(store, lambda: None, "api")
+    store.ensure("crawl", _now() + timedelta(hours=1))
+
+    async def main():
+        await worker._tick(worker.jobs["crawl"])
+        assert crawl.runs == 0
+        # The API never started its scheduler: it only marks the lease row
+        assert await api.trigger("crawl") == "scheduled"
+        run = asyncio.create_task(worker._tick(worker.jobs["crawl"]))
+        await settle()
+        crawl.release.set()
+        await run
+
+    asyncio.run(main())
+    assert crawl.runs == 1
+    assert not store.get_all()["crawl"]["run_requested"]
+
+
+def test_concurrency_cap(store):
+    crawl, sync = Crawl(), Crawl()
+    worker = LeasedScheduler(store=store, instance_id="worker", max_concurrent_jobs=1)
+    worker.add_job("crawl", crawl, interval_seconds=3600)
+    worker.add_job("sync", sync, interval_seconds=3600)
+    due_now(store, "crawl")
+    due_now(store, "sync")
+
+    async def main():
+        run = asyncio.create_task(worker._tick(worker.jobs["crawl"]))
+        await settle()
+        await worker._tick(worker.jobs["sync"])
+        assert sync.runs == 0
+        crawl.release.set()
+        await run
+        run = asyncio.create_task(worker._tick(worker.jobs["sync"]))
+        await settle()
+        sync.release.set()
+        await run
+
+    asyncio.run(main())
+    assert (crawl.runs, sync.runs) == (1, 1)
+
+
+def test_failed_run_is_recorded_and_releases_the_lease(store):
+    async def boom():
+        raise RuntimeError("provider down")
+
+    worker = LeasedScheduler(store=store, instance_id="worker")
+    worker.add_job("crawl", boom, interval_seconds=3600)
+    due_now(store)
+    asyncio.run(worker._tick(worker.jobs["crawl"]))
+    row = store.get_all()["crawl"]
+    assert row["holder"] is None
+    assert row["last_status"] == "error: provider down"
+    assert worker.active == 0
@@ -0,0 +1,165 @@
+import sqlite3
+
+import pytest
+
+import job_spool
+from job_spool import JobSpool
+from supabase_service import SupabaseService
+
+
+class RowError(Exception):
+    """Shaped like postgrest's APIError: Supabase answered and rejected the rows"""
+
+    def __init__(self, code):
+        super().__init__(f"rejected ({code})")
+        self.code = code
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.rows = {}
+        self.calls = 0
+        self.bad = set()
+        self.down = False
+        self.deactivations = []
+        self.deactivation_ok = True
+
+    def upsert_jobs(self, jobs, raise_errors=False):
+        self.calls += 1
+        if self.down:
+            raise ConnectionError("connection refused")
+        if any(job["job_id"] in self.bad for job in jobs):
+            raise RowError("22P02")
+        self.rows.update((job["job_id"], job) for job in jobs)
+        return len(jobs)
+
+    def mark_jobs_inactive(self, sources):
+        self.deactivations.append((sources, sorted(self.rows)))
+        return self.deactivation_ok
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeSupabase()
+    monkeypatch.setattr(SupabaseService, "upsert_jobs", staticmethod(db.upsert_jobs))
+    monkeypatch.setattr(SupabaseService, "mark_jobs_inactive", staticmethod(db.mark_jobs_inactive))
+    monkeypatch.setattr(SupabaseService, "get_job_descriptions", staticmethod(lambda ids: {}))
+    return db
+
+
+@pytest.fixture
+def spool(tmp_path):
+    spool = JobSpool(str(tmp_path / "spool.db"))
+    yield spool
+    spool.conn.close()
+
+
+def jobs(*ids):
+    return [{"job_id": job_id, "title": f"Engineer {job_id}", "company": "Acme"} for job_id in ids]
+
+
+def make_due(spool):
+    spool.conn.execute("UPDATE pending_jobs SET next_attempt_at = 0")
+    spool.conn.execute("UPDATE pending_deactivations SET next_attempt_at = 0")
+
+
+def test_flush_writes_and_drains(spool, db):
+    assert spool.enqueue(jobs("a", "b") + [{"title": "No job_id"}]) == 2
+    assert spool.flush() == 2
+    assert sorted(db.rows) == ["a", "b"]
+    assert spool.stats()["pending"] == 0
+
+
+def test_reenqueue_replaces_pending_payload(spool, db):
+    spool.enqueue(jobs("a"))
+    spool.enqueue([{"job_id": "a", "title": "Staff Engineer", "company": "Acme"}])
+    spool.flush()
+    assert db.calls == 1
+    assert db.rows["a"]["title"] == "Staff Engineer"
+
+
+def test_row_error_only_retries_the_rejected_rows(spool, db):
+    ids = [f"j{i}" for i in range(20)]
+    db.bad = {"j7"}
+    spool.enqueue(jobs(*ids))
+    assert spool.flush(batch_size=20) == 19
+    assert "j7" not in db.rows and len(db.rows) == 19
+    stats = spool.stats()
+    assert (stats["pending"], stats["retrying"]) == (1, 1)
+    # Bisection costs about log2(batch) extra calls per bad row
+    assert db.calls <= 2 * 5 + 1
+
+
+def test_outage_backs_off_the_whole_batch_unsplit(spool, db):
+    db.down = True
+    spool.enqueue(jobs("a", "b", "c", "d"))
+    assert spool.flush() == 0
+    assert db.calls == 1
+    assert spool.stats()["retrying"] == 4
+    # Not due until the backoff passes
+    db.down = False
+    assert spool.flush() == 0
+    make_due(spool)
+    assert spool.flush() == 4
+
+
+def test_transient_error_codes_do_not_bisect(spool, db, monkeypatch):
+    def timeout(jobs, raise_errors=False):
+        db.calls += 1
+        raise RowError("57014")
+    monkeypatch.setattr(SupabaseService, "upsert_jobs", staticmethod(timeout))
+    spool.enqueue(jobs("a", "b", "c", "d"))
+    spool.flush()
+    assert db.calls == 1
+
+
+def test_poison_row_is_dead_lettered_and_requeued(spool, db, monkeypatch):
+    monkeypatch.setattr(job_spool, "MAX_ATTEMPTS", 2)
+    db.bad = {"bad"}
+    spool.enqueue(jobs("bad", "good"))
+    spool.flush()
+    make_due(spool)
+    spool.flush()
+    stats = spool.stats()
+    assert (stats["pending"], stats["dead_letters"], stats["dead_lettered"]) == (0, 1, 1)
+    assert "good" in db.rows
+    # Dead letters are not retried ...
+    make_due(spool)
+    calls = db.calls
+    assert spool.flush() == 0 and db.calls == calls
+    # ... until requeued
+    db.bad = set()
+    assert spool.requeue_dead_letters() == 1
+    assert spool.flush() == 1
+    assert spool.stats()["dead_letters"] == 0
+
+
+def test_deactivation_runs_before_jobs_enqueued_after_it(spool, db):
+    spool.enqueue_deactivation(["greenhouse"])
+    spool.enqueue(jobs("a"))
+    spool.flush()
+    assert db.deactivations == [(["greenhouse"], [])]
+    assert "a" in db.rows
+
+
+def test_failing_deactivation_holds_jobs_until_dead_lettered(spool, db, monkeypatch):
+    monkeypatch.setattr(job_spool, "MAX_ATTEMPTS", 2)
+    db.deactivation_ok = False
+    spool.enqueue_deactivation(["lever"])
+    spool.enqueue(jobs("a"))
+    assert spool.flush() == 0 and db.rows == {}
+    make_due(spool)
+    assert spool.flush() == 1
+    assert spool.stats()["dead_deactivations"] == 1
+
+
+def test_migrates_spool_files_without_dead_at(tmp_path, db):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(job_spool.SCHEMA.replace(",\n    dead_at              REAL", "").replace(",\n    dead_at         REAL", ""))
+    assert "dead_at" not in {row[1] for row in conn.execute("PRAGMA table_info(pending_jobs)")}
+    conn.close()
+    spool = JobSpool(path)
+    spool.enqueue(jobs("a"))
+    assert spool.flush() == 1
+    spool.conn.close()
@@ -0,0 +1,96 @@
+import time
+
+import pytest
+
+import llm_cache
+from llm_cache import LLMResponseCache, cache_key, cache_ttl
+
+MESSAGES = [{"role": "user", "content": "Tailor this resume"}]
+PARAMS = {"max_tokens": 100, "temperature": 0.1, "response_format": None}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm_cache.db"), max_bytes=1000)
+    yield cache
+    cache.conn.close()
+
+
+def test_cache_key_ignores_whitespace_only_changes():
+    reindented = [{"role": "user", "content": "  Tailor\n\tthis   resume "}]
+    assert cache_key("groq", "m", MESSAGES, PARAMS) == cache_key("groq", "m", reindented, PARAMS)
+
+
+@pytest.mark.parametrize("change", [
+    {"provider": "openai"},
+    {"model": "other"},
+    {"messages": [{"role": "system", "content": "Tailor this resume"}]},
+    {"params": {**PARAMS, "temperature": 0.7}},
+])
+def test_cache_key_changes_with_inputs(change):
+    args = {"provider": "groq", "model": "m", "messages": MESSAGES, "params": PARAMS}
+    assert cache_key(**args) != cache_key(**{**args, **change})
+
+
+def test_cache_ttl(monkeypatch):
+    assert cache_ttl("analyze_resume") == 7 * llm_cache.DAY
+    assert cache_ttl("not_a_call_site") is None
+    # Cached by resume_facts instead
+    assert cache_ttl("extract_resume_data") is None
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_DISABLED_SITES", {"analyze_resume"})
+    assert cache_ttl("analyze_resume") is None
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_DISABLED_SITES", set())
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_ENABLED", False)
+    assert cache_ttl("analyze_resume") is None
+
+
+def test_hit_and_miss(cache):
+    assert cache.get("k", "site") is None
+    cache.put("k", "site", "response", ttl=60, latency_ms=1500)
+    assert cache.get("k", "site") == ("response", 1500)
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["saved_seconds"] == 1.5
+    assert stats["sites"]["site"] == {"hits": 1, "misses": 1}
+
+
+def test_expired_entries_are_misses(cache, monkeypatch):
+    cache.put("k", "site", "response", ttl=60, latency_ms=10)
+    now = time.time()
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now + 61)
+    assert cache.get("k", "site") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_replacing_an_entry_keeps_byte_count(cache):
+    cache.put("k", "site", "a" * 100, ttl=60, latency_ms=10)
+    cache.put("k", "site", "b" * 40, ttl=60, latency_ms=10)
+    assert cache.stats()["bytes"] == 40
+    assert cache.get("k", "site")[0] == "b" * 40
+
+
+def test_lru_eviction(cache):
+    for i in range(4):
+        cache.put(f"k{i}", "site", "x" * 300, ttl=60, latency_ms=10)
+        cache.get("k0", "site")  # k0 stays most recently used
+    assert cache.stats()["bytes"] <= 900
+    assert cache.get("k0", "site") is not None
+    assert cache.get("k1", "site") is None
+    assert cache.stats()["evictions"] >= 1
+
+
+def test_oversized_response_is_not_stored(cache):
+    cache.put("k", "site", "x" * 2000, ttl=60, latency_ms=10)
+    assert cache.get("k", "site") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_reopen_restores_byte_count(tmp_path):
+    path = str(tmp_path / "llm_cache.db")
+    first = LLMResponseCache(path, max_bytes=1000)
+    first.put("k", "site", "x" * 50, ttl=60, latency_ms=10)
+    first.conn.close()
+    second = LLMResponseCache(path, max_bytes=1000)
+    assert second.stats()["bytes"] == 50
+    assert second.get("k", "site") == ("x" * 50, 10)
+    second.conn.close()
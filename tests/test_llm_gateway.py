@@ -0,0 +1,186 @@
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+
+import llm_gateway
+from llm_gateway import KeyState, LLMGateway
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "LLM_QUEUE_TIMEOUT_SECONDS", 0.3)
+    gateway = LLMGateway()
+    gateway.pools = {"groq": [KeyState("groq", "key-a"), KeyState("groq", "key-b")]}
+    return gateway
+
+
+def key(gateway, name):
+    return next(state for state in gateway.pools["groq"] if state.key == name)
+
+
+class Upstream:
+    """OpenAI-style chat endpoint; status per API key, 200 by default"""
+
+    def __init__(self):
+        self.status = {}
+        self.requests = []
+
+    async def handle(self, request):
+        api_key = request.headers["Authorization"].split()[-1]
+        self.requests.append(api_key)
+        status = self.status.get(api_key, 200)
+        if status == 429:
+            return web.json_response({"error": "rate limited"}, status=429, headers={"retry-after": "30"})
+        if status != 200:
+            return web.json_response({"error": "boom"}, status=status)
+        return web.json_response({
+            "choices": [{"message": {"content": f"answer from {api_key}"}}],
+            "usage": {"prompt_tokens": 3, "completion_tokens": 4},
+        })
+
+
+def run(gateway, upstream, monkeypatch, scenario):
+    async def main():
+        app = web.Application()
+        app.router.add_post("/chat", upstream.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        monkeypatch.setitem(llm_gateway.PROVIDERS["groq"], "url", f"http://127.0.0.1:{port}/chat")
+        try:
+            return await scenario()
+        finally:
+            await gateway.close()
+            await runner.cleanup()
+
+    return asyncio.run(main())
+
+
+def test_key_with_most_headroom_is_chosen(gateway):
+    now = time.monotonic()
+    key(gateway, "key-a").remaining_requests, key(gateway, "key-a").requests_reset_at = 2, now + 60
+    key(gateway, "key-b").remaining_requests, key(gateway, "key-b").requests_reset_at = 10, now + 60
+
+    async def main():
+        return await gateway._acquire_key("groq", 100)
+
+    state = asyncio.run(main())
+    assert state.key == "key-b"
+    assert (state.in_flight, state.reserved_tokens) == (1, 100)
+
+
+def test_in_flight_reservations_count_against_headroom(gateway):
+    now = time.monotonic()
+    for state, remaining in zip(gateway.pools["groq"], (5, 2)):
+        state.remaining_requests, state.requests_reset_at = remaining, now + 60
+
+    async def main():
+        return [(await gateway._acquire_key("groq", 10)).key for _ in range(4)]
+
+    assert asyncio.run(main()) == ["key-a", "key-a", "key-a", "key-b"]
+
+
+def test_cooling_down_key_is_skipped(gateway):
+    key(gateway, "key-a").cooldown_until = time.monotonic() + 30
+
+    async def main():
+        return [(await gateway._acquire_key("groq", 10)).key for _ in range(3)]
+
+    assert asyncio.run(main()) == ["key-b"] * 3
+
+
+def test_queue_times_out_when_every_key_cools_down(gateway):
+    for state in gateway.pools["groq"]:
+        state.cooldown_until = time.monotonic() + 30
+
+    async def main():
+        started = time.monotonic()
+        return await gateway._acquire_key("groq", 10), time.monotonic() - started
+
+    state, waited = asyncio.run(main())
+    assert state is None
+    assert 0.25 <= waited < 1
+
+
+def test_released_key_wakes_a_queued_caller(gateway):
+    gateway.pools["groq"] = gateway.pools["groq"][:1]
+    only = gateway.pools["groq"][0]
+    only.remaining_requests, only.requests_reset_at = 1, time.monotonic() + 60
+
+    async def main():
+        held = await gateway._acquire_key("groq", 10)
+        waiter = asyncio.create_task(gateway._acquire_key("groq", 10))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        await gateway._release_key(held, 10)
+        return await asyncio.wait_for(waiter, 0.2)
+
+    assert asyncio.run(main()) is only
+
+
+def test_429_cools_the_key_down_and_retries_on_another(gateway, monkeypatch):
+    upstream = Upstream()
+    upstream.status["key-a"] = 429
+
+    async def scenario():
+        first = await gateway.chat(MESSAGES, call_site="test")
+        second = await gateway.chat(MESSAGES, call_site="test")
+        return first, second
+
+    assert run(gateway, upstream, monkeypatch, scenario) == ("answer from key-b", "answer from key-b")
+    # key-a was tried once, then skipped for its Retry-After
+    assert upstream.requests == ["key-a", "key-b", "key-b"]
+    assert key(gateway, "key-a").cooldown_until - time.monotonic() > 25
+
+
+def test_revoked_key_is_disabled(gateway, monkeypatch):
+    upstream = Upstream()
+    upstream.status["key-a"] = 401
+
+    async def scenario():
+        return await gateway.chat(MESSAGES, call_site="test")
+
+    assert run(gateway, upstream, monkeypatch, scenario) == "answer from key-b"
+    assert key(gateway, "key-a").disabled
+    assert not key(gateway, "key-b").disabled
+
+
+def test_byok_cooldown_persists_across_attempts_and_calls(gateway, monkeypatch):
+    upstream = Upstream()
+    upstream.status["mine"] = 429
+
+    async def scenario():
+        first = await gateway.chat(MESSAGES, call_site="test", api_key="mine", max_retries=3)
+        second = await gateway.chat(MESSAGES, call_site="test", api_key="mine", max_retries=3)
+        return first, second
+
+    assert run(gateway, upstream, monkeypatch, scenario) == (None, None)
+    # Later attempts waited out the queue instead of hammering the key, and the pool was never used
+    assert upstream.requests == ["mine"]
+    assert gateway.byok[("groq", "mine")].cooldown_until > time.monotonic()
+
+
+def test_calls_queued_for_a_key_do_not_hold_the_concurrency_slot(gateway, monkeypatch):
+    monkeypatch.setattr(llm_gateway, "LLM_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(llm_gateway, "LLM_QUEUE_TIMEOUT_SECONDS", 2)
+    upstream = Upstream()
+
+    async def scenario():
+        gateway._byok_state("groq", "mine").cooldown_until = time.monotonic() + 0.5
+        byok = asyncio.create_task(gateway.chat(MESSAGES, call_site="test", api_key="mine"))
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        pooled = await gateway.chat(MESSAGES, call_site="test")
+        pooled_seconds = time.monotonic() - started
+        assert not byok.done()
+        return pooled, pooled_seconds, await byok
+
+    pooled, pooled_seconds, byok = run(gateway, upstream, monkeypatch, scenario)
+    assert pooled == "answer from key-a" and pooled_seconds < 0.3
+    assert byok == "answer from mine"
@@ -0,0 +1,59 @@
+import pytest
+
+from salary_parser import parse_salary, extract_salary_usd, parse_salary_filter, to_annual_usd
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("$120,000 - $150,000", (120_000, 150_000)),
+    ("$80k - $120k", (80_000, 120_000)),
+    ("80 - 120k", (80_000, 120_000)),
+    ("$100,000 - $150,000/year", (100_000, 150_000)),
+    ("$45 - $60/hour", (45 * 2080, 60 * 2080)),
+    ("$45 - $60", (45 * 2080, 60 * 2080)),
+    ("$8,000 per month", (96_000, 96_000)),
+    ("$90,000+", (90_000, 90_000)),
+    ("Up to $80,000", (None, 80_000)),
+    ("€70K – €90K • Offers Equity", (75_600, 97_200)),
+    ("12,00,000 INR per annum", (14_400, 14_400)),
+])
+def test_extract_salary_usd(text, expected):
+    assert extract_salary_usd({"salary": text}) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("3 years experience, $100k", (100_000, 100_000)),
+    ("5+ yrs, $90,000 - $110,000, 10% bonus", (90_000, 110_000)),
+    ("$120,000 + 401k match", (120_000, 120_000)),
+    ("2 yrs exp; $30 - $40", (30 * 2080, 40 * 2080)),
+])
+def test_numbers_that_are_not_pay_are_ignored(text, expected):
+    assert extract_salary_usd({"salary": text}) == expected
+
+
+def test_years_of_experience_do_not_set_the_period():
+    assert parse_salary("$55, 3 years")["period"] == "hour"
+
+
+@pytest.mark.parametrize("text", ["", None, "Competitive", "DOE", "3 years experience"])
+def test_no_amount(text):
+    assert parse_salary(text) is None
+    assert extract_salary_usd({"salary": text}) == (None, None)
+
+
+def test_numeric_fields_win_over_text():
+    job = {"salaryMin": 95_000, "salaryMax": 105_000, "salary": "$10k - $20k"}
+    assert extract_salary_usd(job) == (95_000, 105_000)
+
+
+def test_out_of_range_amounts_are_dropped():
+    assert to_annual_usd(500) is None
+    assert to_annual_usd(5_000_000) is None
+    assert extract_salary_usd({"salaryMin": 0, "salaryMax": 0}) == (None, None)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("100k", 100_000), ("$150K+", 150_000), ("120000", 120_000),
+    ("all", None), ("", None), (None, None), ("lots", None),
+])
+def test_parse_salary_filter(value, expected):
+    assert parse_salary_filter(value) == expected
@@ -0,0 +1,158 @@
+import asyncio
+from datetime import datetime, timezone
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+import source_health
+from source_health import (
+    BREAKER_BASE_COOLDOWN_SECONDS, BREAKER_MAX_COOLDOWN_SECONDS, CLOSED, HALF_OPEN, OPEN,
+    CircuitOpenError, SourceBreaker, SourceHealthRegistry,
+)
+from supabase_service import SupabaseService
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(source_health, "time", clock)
+    return clock
+
+
+def open_breaker(breaker):
+    for _ in range(5):
+        breaker.before_request()
+        breaker.record(False, 10, "HTTP 503")
+
+
+def test_stays_closed_until_enough_requests(clock):
+    breaker = SourceBreaker("lever", "api.lever.co")
+    for _ in range(4):
+        breaker.record(False, 10, "HTTP 503")
+    assert breaker.state == CLOSED
+
+
+def test_opens_at_the_failure_rate(clock):
+    breaker = SourceBreaker("lever", "api.lever.co")
+    for success in (True, True, True, False, False, True):
+        breaker.record(success, 10)
+    assert breaker.state == CLOSED
+    breaker.record(False, 10, "HTTP 503")
+    breaker.record(False, 10, "HTTP 503")
+    assert breaker.state == OPEN
+    assert breaker.open_until == clock.now + BREAKER_BASE_COOLDOWN_SECONDS
+
+
+def test_open_breaker_rejects_without_a_request(clock):
+    breaker = SourceBreaker("lever", "api.lever.co")
+    open_breaker(breaker)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    assert (breaker.rejected, breaker.requests) == (1, 5)
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = SourceBreaker("lever", "api.lever.co")
+    open_breaker(breaker)
+    clock.now += BREAKER_BASE_COOLDOWN_SECONDS
+    breaker.before_request()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+
+def test_successful_probe_closes(clock):
+    breaker = SourceBreaker("lever", "api.lever.co")
+    open_breaker(breaker)
+    clock.now += BREAKER_BASE_COOLDOWN_SECONDS
+    breaker.before_request()
+    breaker.record(True, 10)
+    assert breaker.state == CLOSED
+    assert breaker.consecutive_opens == 0
+    # The old failures no longer count towards the next opening
+    breaker.record(False, 10, "HTTP 503")
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_reopens_with_doubled_cooldown_up_to_the_cap(clock):
+    breaker = SourceBreaker("lever", "api.lever.co")
+    open_breaker(breaker)
+    cooldowns = []
+    for _ in range(8):
+        clock.now = breaker.open_until
+        breaker.before_request()
+        breaker.record(False, 10, "timeout")
+        assert breaker.state == OPEN
+        cooldowns.append(breaker.open_until - clock.now)
+    assert cooldowns[:3] == [2 * BREAKER_BASE_COOLDOWN_SECONDS, 4 * BREAKER_BASE_COOLDOWN_SECONDS,
+                             8 * BREAKER_BASE_COOLDOWN_SECONDS]
+    assert cooldowns[-1] == BREAKER_MAX_COOLDOWN_SECONDS
+
+
+def test_restore_reopens_breakers_still_cooling_down(clock, monkeypatch):
+    def iso(ts):
+        return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+    rows = [
+        {"provider": "lever", "host": "api.lever.co", "state": OPEN, "open_until": iso(clock.now + 60),
+         "consecutive_opens": 3, "last_error": "HTTP 503"},
+        {"provider": "ashby", "host": "api.ashbyhq.com", "state": OPEN, "open_until": iso(clock.now - 60)},
+        {"provider": "greenhouse", "host": "boards-api.greenhouse.io", "state": CLOSED, "open_until": None},
+    ]
+    monkeypatch.setattr(SupabaseService, "get_source_health", staticmethod(lambda: rows))
+    registry = SourceHealthRegistry()
+    registry.restore()
+    assert list(registry.breakers) == ["lever:api.lever.co"]
+    breaker = registry.breakers["lever:api.lever.co"]
+    assert (breaker.state, breaker.consecutive_opens) == (OPEN, 3)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+
+def test_trace_config_gates_real_requests():
+    hits = []
+
+    async def handler(request):
+        hits.append(request.path)
+        return web.Response(status=404 if request.path == "/missing" else 503)
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/{path}", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        registry = SourceHealthRegistry()
+        try:
+            async with aiohttp.ClientSession(trace_configs=[registry.trace_config("lever")]) as session:
+                # 404 is a missing board, not an unhealthy provider
+                for _ in range(6):
+                    async with session.get(f"http://127.0.0.1:{port}/missing"):
+                        pass
+                assert registry.get("lever", "127.0.0.1").state == CLOSED
+                # Six 503s make the window of 12 half failures
+                for _ in range(6):
+                    async with session.get(f"http://127.0.0.1:{port}/postings"):
+                        pass
+                with pytest.raises(CircuitOpenError):
+                    await session.get(f"http://127.0.0.1:{port}/postings")
+        finally:
+            await runner.cleanup()
+        return registry.get("lever", "127.0.0.1")
+
+    breaker = asyncio.run(main())
+    assert breaker.state == OPEN
+    # The rejected request never reached the server
+    assert hits.count("/postings") == 6
+    assert breaker.rejected == 1
@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+import pytest
+
+from stage_graph import Stage, run_stages
+
+
+def after(seconds, value):
+    async def run(results):
+        await asyncio.sleep(seconds)
+        return value
+    return run
+
+
+async def fail(results):
+    raise RuntimeError("model returned garbage")
+
+
+def test_independent_stages_run_concurrently():
+    async def main():
+        started = time.perf_counter()
+        results = await run_stages([Stage("a", after(0.2, 1)), Stage("b", after(0.2, 2))])
+        return results, time.perf_counter() - started
+
+    results, elapsed = asyncio.run(main())
+    assert results == {"a": 1, "b": 2}
+    assert elapsed < 0.35
+
+
+def test_dependents_see_earlier_results():
+    async def double(results):
+        return results["a"] * 2
+
+    results = asyncio.run(run_stages([Stage("a", after(0.05, 21)), Stage("b", double, deps=("a",))]))
+    assert results == {"a": 21, "b": 42}
+
+
+def test_failed_stage_yields_its_fallback_and_the_pipeline_continues():
+    async def draft(results):
+        return f"draft from {results['facts']}"
+
+    results = asyncio.run(run_stages([
+        Stage("facts", fail, fallback={}),
+        Stage("draft", draft, deps=("facts",)),
+        Stage("cover_letter", after(0, "letter")),
+    ]))
+    assert results == {"facts": {}, "draft": "draft from {}", "cover_letter": "letter"}
+
+
+def test_timed_out_stage_yields_its_fallback():
+    async def main():
+        started = time.perf_counter()
+        results = await run_stages([
+            Stage("slow", after(5, "late"), timeout=0.1, fallback="fallback"),
+            Stage("fast", after(0, "ok")),
+        ])
+        return results, time.perf_counter() - started
+
+    results, elapsed = asyncio.run(main())
+    assert results == {"slow": "fallback", "fast": "ok"}
+    assert elapsed < 1
+
+
+@pytest.mark.parametrize("draft, rescued", [(None, "simple resume"), ("expert resume", None)])
+def test_conditional_rescue_stage(draft, rescued):
+    calls = []
+
+    async def simple(results):
+        calls.append("rescue")
+        return "simple resume"
+
+    results = asyncio.run(run_stages([
+        Stage("draft", after(0, draft)),
+        Stage("rescue", simple, deps=("draft",), when=lambda r: r["draft"] is None),
+    ]))
+    assert results["rescue"] == rescued
+    assert calls == (["rescue"] if rescued else [])
+
+
+def test_dependencies_must_be_listed_first():
+    with pytest.raises(ValueError, match="draft"):
+        asyncio.run(run_stages([Stage("cover", after(0, 1), deps=("draft",)), Stage("draft", after(0, 2))]))
+
+
+def test_cancelling_the_pipeline_cancels_its_stages():
+    finished = []
+
+    async def slow(results):
+        await asyncio.sleep(0.2)
+        finished.append(True)
+
+    async def main():
+        pipeline = asyncio.create_task(run_stages([Stage("slow", slow)]))
+        await asyncio.sleep(0.05)
+        pipeline.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await pipeline
+        await asyncio.sleep(0.3)
+
+    asyncio.run(main())
+    assert finished == []